@@ -407,24 +407,35 @@ module SampleService {
             the current time. Providing a time allows for reproducibility of previous results.
         as_admin - run the method as a service administrator. The user must have read
             administration permissions.
+        page_size - the maximum number of links to return, from 1 to 10000. If omitted, all the
+            links are returned.
+        continuation_token - the continuation token from the previous page of results, if
+            any. The token fixes the effective time of the query, so if the effective_time
+            is also provided it must match the effective time of the previous page.
     */
     typedef structure {
         sample_id id;
         version version;
         timestamp effective_time;
         boolean as_admin;
+        int page_size;
+        string continuation_token;
     } GetDataLinksFromSampleParams;
 
     /* get_data_links_from_sample results.
 
-        links - the links.
+        links - the links, sorted by the time the link was created and then by link ID.
         effective_time - the time at which the query was run. This timestamp, if saved, can be
             used when running the method again to ensure reproducible results. Note that changes
             to workspace permissions may cause results to change over time.
+        continuation_token - a token that can be used to retrieve the next page of links. Null
+            if there are no more links. If the number of links returned is exactly the page
+            size, the next page may be empty.
     */
     typedef structure {
         list<DataLink> links;
         timestamp effective_time;
+        string continuation_token;
     } GetDataLinksFromSampleResults;
 
     /* Get data links to Workspace objects originating from a sample.
@@ -442,22 +453,33 @@ module SampleService {
             the current time. Providing a time allows for reproducibility of previous results.
         as_admin - run the method as a service administrator. The user must have read
             administration permissions.
+        page_size - the maximum number of links to return, from 1 to 10000. If omitted, all the
+            links are returned.
+        continuation_token - the continuation token from the previous page of results, if
+            any. The token fixes the effective time of the query, so if the effective_time
+            is also provided it must match the effective time of the previous page.
     */
     typedef structure {
         ws_upa upa;
         timestamp effective_time;
         boolean as_admin;
+        int page_size;
+        string continuation_token;
     } GetDataLinksFromDataParams;
 
     /* get_data_links_from_data results.
 
-        links - the links.
+        links - the links, sorted by the time the link was created and then by link ID.
         effective_time - the time at which the query was run. This timestamp, if saved, can be
             used when running the method again to ensure reproducible results.
+        continuation_token - a token that can be used to retrieve the next page of links. Null
+            if there are no more links. If the number of links returned is exactly the page
+            size, the next page may be empty.
     */
     typedef structure {
         list<DataLink> links;
         timestamp effective_time;
+        string continuation_token;
     } GetDataLinksFromDataResults;
 
     /* Get data links to samples originating from Workspace data.
@@ -499,4 +521,576 @@ module SampleService {
        for the service.
      */
     funcdef get_data_link(GetDataLinkParams params) returns(DataLink link) authentication required;
+
+    /* get_samples parameters.
+        samples - the IDs and versions of the samples to retrieve. If a version is omitted the
+            most recent version of the sample is returned. At most 1000 samples may be
+            requested.
+        as_admin - get the samples regardless of ACLs as long as the user has administration
+            read permissions.
+     */
+    typedef structure {
+        list<SampleAddress> samples;
+        boolean as_admin;
+    } GetSamplesParams;
+
+    /* The result of retrieving one sample from get_samples.
+        sample - the sample, if it could be retrieved.
+        error - the reason the sample could not be retrieved, if it could not, including the
+            error code. For example, the sample or version may not exist or the user may not
+            have read access to the sample.
+     */
+    typedef structure {
+        Sample sample;
+        string error;
+    } GetSamplesResult;
+
+    /* get_samples results.
+        samples - the results, in the same order as the sample addresses in the input
+            parameters.
+     */
+    typedef structure {
+        list<GetSamplesResult> samples;
+    } GetSamplesResults;
+
+    /* Get many samples at once. If a sample cannot be retrieved, an error is returned for that
+        sample rather than failing the entire request.
+     */
+    funcdef get_samples(GetSamplesParams params) returns(GetSamplesResults results)
+        authentication optional;
+
+    /* create_samples parameters.
+        samples - the samples to create. The samples must not have IDs - only new samples may be
+            created in bulk. Any incoming user, version or timestamp in the incoming samples is
+            ignored. At most 1000 samples may be created at once.
+     */
+    typedef structure {
+        list<Sample> samples;
+    } CreateSamplesParams;
+
+    /* create_samples results.
+        addresses - the IDs and versions of the new samples, in the same order as the samples in
+            the input parameters.
+     */
+    typedef structure {
+        list<SampleAddress> addresses;
+    } CreateSamplesResults;
+
+    /* Create many new samples at once. All the samples are validated before any are saved, and
+        if any sample fails validation no samples are saved.
+     */
+    funcdef create_samples(CreateSamplesParams params) returns(CreateSamplesResults results)
+        authentication required;
+
+    /* A link to create as part of a create_data_links call.
+
+        upa - the workspace UPA of the object to be linked.
+        dataid - the dataid of the data to be linked, if any, within the object. If omitted the
+            entire object is linked to the sample.
+        id - the sample id.
+        version - the sample version.
+        node - the sample node.
+     */
+    typedef structure {
+        ws_upa upa;
+        data_id dataid;
+        sample_id id;
+        version version;
+        node_id node;
+    } DataLinkSpec;
+
+    /* create_data_links parameters.
+
+        links - the links to create. No two links may be from the same data unit (the
+            combination of the UPA and dataid). At most 10000 links may be created at once.
+        update - if false (the default), fail to create a link if a link already exists from the
+            data unit. if true, expire the old link and create the new link unless the link is
+            already to the requested sample node, in which case the link is a no-op.
+        as_admin - run the method as a service administrator. The user must have full
+            administration permissions.
+        as_user - create the links as a different user. Ignored if as_admin is not true. Neither
+            the administrator nor the impersonated user need have permissions to the data or
+            samples.
+     */
+    typedef structure {
+        list<DataLinkSpec> links;
+        boolean update;
+        boolean as_admin;
+        user as_user;
+    } CreateDataLinksParams;
+
+    /* The result of creating one link in create_data_links.
+
+        status - one of 'created' if the link was created, 'noop' if an equivalent link already
+            exists and update was true, or 'error' if the link could not be created.
+        new_link - the new link, if it was created.
+        error - the reason the link could not be created, including the error code. For example,
+            the sample node may not exist, the user may not have permission to the sample or the
+            workspace object, or a link may already exist from the data unit.
+     */
+    typedef structure {
+        string status;
+        DataLink new_link;
+        string error;
+    } CreateDataLinksResult;
+
+    /* create_data_links results.
+
+        results - the results, in the same order as the links in the input parameters.
+     */
+    typedef structure {
+        list<CreateDataLinksResult> results;
+    } CreateDataLinksResults;
+
+    /* Create many links from KBase Workspace objects to samples at once.
+
+        The user must have admin permissions for each sample and write permissions for each
+        Workspace object. If a link cannot be created, an error is returned for that link rather
+        than failing the entire request.
+     */
+    funcdef create_data_links(CreateDataLinksParams params)
+        returns(CreateDataLinksResults results) authentication required;
+
+    /* expire_data_links parameters.
+
+        Exactly one of upa, id, or link_ids must be provided.
+
+        upa - expire all the extant links from the workspace object with this upa.
+        id - the sample ID. Expire all the extant links from the sample version.
+        version - the sample version. Required if id is provided.
+        link_ids - expire the links with these IDs. At most 10000 links may be expired at once.
+        as_admin - run the method as a service administrator. The user must have full
+            administration permissions.
+        as_user - expire the links as a different user. Ignored if as_admin is not true. Neither
+            the administrator nor the impersonated user need have permissions to the links.
+    */
+    typedef structure {
+        ws_upa upa;
+        sample_id id;
+        version version;
+        list<link_id> link_ids;
+        boolean as_admin;
+        user as_user;
+    } ExpireDataLinksParams;
+
+    /* expire_data_links results.
+
+        expired_links - the links that were expired.
+    */
+    typedef structure {
+        list<DataLink> expired_links;
+    } ExpireDataLinksResults;
+
+    /* Expire many links at once.
+
+        The user must have admin permissions for every sample and write permissions for every
+        Workspace object with a link that is to be expired. If the user lacks permissions for
+        any of the links, or any of the link IDs do not exist or are expired, no links are
+        expired.
+    */
+    funcdef expire_data_links(ExpireDataLinksParams params)
+        returns(ExpireDataLinksResults results) authentication required;
+
+    /* A condition on a controlled metadata value for search_samples.
+
+        Exactly one of equals, prefix, or min and / or max must be provided.
+
+        key - the metadata key.
+        value_key - the key of the value in the metadata value. Defaults to 'value'.
+        equals - the value must be equal to this string, number, or boolean.
+        prefix - the value must be a string starting with this string.
+        min - the value must be a number greater than or equal to this number.
+        max - the value must be a number less than or equal to this number.
+        units - the units of min and max, e.g. 'cm'. If provided, the condition matches values in
+            any units of the same dimensionality, e.g. a range in meters matches values in feet.
+            The value_key must be 'value' and only metadata values with a 'units' value key
+            are matched.
+     */
+    typedef structure {
+        metadata_key key;
+        metadata_value_key value_key;
+        UnspecifiedObject equals;
+        string prefix;
+        float min;
+        float max;
+        string units;
+    } MetadataCondition;
+
+    /* search_samples parameters.
+
+        conditions - the conditions to match. A sample version matches if every condition is
+            matched by at least one of its nodes. At least one and at most 10 conditions may be
+            provided. Only controlled metadata is searched.
+        page_size - the maximum number of sample versions to return, from 1 to 10000. Defaults
+            to 1000.
+        continuation_token - the token returned by the previous call of this method to fetch
+            the next page of results. The conditions must be the same as the previous call.
+        as_admin - search all samples regardless of ACLs as long as the user has administration
+            read permissions.
+     */
+    typedef structure {
+        list<MetadataCondition> conditions;
+        int page_size;
+        string continuation_token;
+        boolean as_admin;
+    } SearchSamplesParams;
+
+    /* search_samples results.
+
+        samples - the matching sample versions, sorted by sample ID and then version.
+        continuation_token - a token to fetch the next page of results, or null if there are no
+            more results.
+     */
+    typedef structure {
+        list<SampleAddress> samples;
+        string continuation_token;
+    } SearchSamplesResults;
+
+    /* Search for the sample versions the user can read by their controlled metadata. */
+    funcdef search_samples(SearchSamplesParams params) returns(SearchSamplesResults results)
+        authentication optional;
+
+    /* search_samples_by_text parameters.
+
+        text - the words to search for. Words are runs of letters, digits, and underscores, and
+            are matched case insensitively. At most 20 distinct words may be provided.
+        page_size - the maximum number of sample versions to return, from 1 to 10000. Defaults
+            to 1000.
+        continuation_token - the token returned by the previous call of this method to fetch
+            the next page of results. The text must be the same as the previous call.
+        as_admin - search all samples regardless of ACLs as long as the user has administration
+            read permissions.
+     */
+    typedef structure {
+        string text;
+        int page_size;
+        string continuation_token;
+        boolean as_admin;
+    } SearchSamplesByTextParams;
+
+    /* A sample version found by search_samples_by_text.
+
+        id - the ID of the sample.
+        version - the version of the sample.
+        score - the number of distinct words from the search text the sample version contains.
+            Word frequency and where the words occur, e.g. in the name or the metadata, are not
+            taken into account, so many sample versions may have the same score.
+     */
+    typedef structure {
+        sample_id id;
+        version version;
+        int score;
+    } TextSearchResult;
+
+    /* search_samples_by_text results.
+
+        samples - the matching sample versions, sorted by descending score, then sample ID, and
+            then version. Sample versions with the same score are not ordered by relevance.
+        continuation_token - a token to fetch the next page of results, or null if there are no
+            more results.
+     */
+    typedef structure {
+        list<TextSearchResult> samples;
+        string continuation_token;
+    } SearchSamplesByTextResults;
+
+    /* Search for the sample versions the user can read by the words in the sample names and the
+        string values of the controlled and user metadata. A sample version matches if it
+        contains any of the words.
+
+        Sample versions saved before full text search was added to the service are not found
+        until the service indexes them in the background after it is upgraded.
+     */
+    funcdef search_samples_by_text(SearchSamplesByTextParams params)
+        returns(SearchSamplesByTextResults results) authentication optional;
+
+    /* A bounding box for search_samples_by_location in decimal degrees. If min_longitude is
+        greater than max_longitude the box crosses the antimeridian.
+     */
+    typedef structure {
+        float min_latitude;
+        float min_longitude;
+        float max_latitude;
+        float max_longitude;
+    } BoundingBox;
+
+    /* A point for search_samples_by_location in decimal degrees. */
+    typedef structure {
+        float latitude;
+        float longitude;
+    } Coordinates;
+
+    /* search_samples_by_location parameters.
+
+        Exactly one of bounding_box or center and radius must be provided.
+
+        bounding_box - find samples located within this box.
+        center - find samples located within the radius of this point.
+        radius - the radius in meters.
+        page_size - the maximum number of sample versions to return, from 1 to 10000. Defaults
+            to 1000.
+        continuation_token - the token returned by the previous call of this method to fetch
+            the next page of results. The area must be the same as the previous call.
+        as_admin - search all samples regardless of ACLs as long as the user has administration
+            read permissions.
+     */
+    typedef structure {
+        BoundingBox bounding_box;
+        Coordinates center;
+        float radius;
+        int page_size;
+        string continuation_token;
+        boolean as_admin;
+    } SearchSamplesByLocationParams;
+
+    /* Search for the sample versions the user can read with at least one node located in an
+        area. The location of a node is taken from the 'value' keys of the 'latitude' and
+        'longitude' controlled metadata keys, which must be in decimal degrees.
+
+        Sample versions saved before location search was added to the service are not found
+        until the service indexes them in the background after it is upgraded.
+     */
+    funcdef search_samples_by_location(SearchSamplesByLocationParams params)
+        returns(SearchSamplesResults results) authentication optional;
+
+    /* list_samples parameters.
+
+        page_size - the maximum number of samples to return, from 1 to 10000. Defaults to 1000.
+        continuation_token - the token returned by the previous call of this method to fetch
+            the next page of results.
+     */
+    typedef structure {
+        int page_size;
+        string continuation_token;
+    } ListSamplesParams;
+
+    /* list_samples results.
+
+        samples - the latest versions of the samples, sorted by the time the sample was created,
+            newest first.
+        continuation_token - a token to fetch the next page of results, or null if there are no
+            more results.
+     */
+    typedef structure {
+        list<SampleAddress> samples;
+        string continuation_token;
+    } ListSamplesResults;
+
+    /* List the samples the user owns, administrates, or can write or read, and the public
+        samples. Anonymous users only see public samples.
+     */
+    funcdef list_samples(ListSamplesParams params) returns(ListSamplesResults results)
+        authentication optional;
+
+    /* get_metadata_facets parameters.
+
+        keys - the controlled metadata keys for which to count values. The value_key 'value'
+            is counted. At least one and at most 10 keys may be provided.
+        conditions - conditions, as for search_samples, that a sample must match to be counted.
+            At most 10 conditions may be provided.
+        limit - the maximum number of values to return for each key, from 1 to 1000. Defaults
+            to 100.
+        as_admin - count all samples regardless of ACLs as long as the user has administration
+            read permissions.
+     */
+    typedef structure {
+        list<metadata_key> keys;
+        list<MetadataCondition> conditions;
+        int limit;
+        boolean as_admin;
+    } GetMetadataFacetsParams;
+
+    /* The number of samples with a metadata value.
+
+        value - the value.
+        count - the number of samples.
+     */
+    typedef structure {
+        UnspecifiedObject value;
+        int count;
+    } FacetCount;
+
+    /* get_metadata_facets results.
+
+        facets - a mapping of metadata key to the counts of the values of the key, sorted by
+            descending count and then by value.
+     */
+    typedef structure {
+        mapping<metadata_key, list<FacetCount>> facets;
+    } GetMetadataFacetsResults;
+
+    /* Count the samples the user can read with each value of one or more controlled metadata
+        keys. Only the latest version of each sample is counted.
+
+        Sample versions saved before metadata search was added to the service are not counted
+        until the service indexes them in the background after it is upgraded.
+     */
+    funcdef get_metadata_facets(GetMetadataFacetsParams params)
+        returns(GetMetadataFacetsResults results) authentication optional;
+
+    /* get_sample_diff parameters.
+
+        id - the ID of the sample.
+        version_a - the old version of the sample.
+        version_b - the new version of the sample.
+        as_admin - get the differences regardless of ACLs as long as the user has administration
+            read permissions.
+     */
+    typedef structure {
+        sample_id id;
+        version version_a;
+        version version_b;
+        boolean as_admin;
+    } GetSampleDiffParams;
+
+    /* A change in a metadata value.
+
+        old - the value in the old version.
+        new - the value in the new version.
+     */
+    typedef structure {
+        metadata_value old;
+        metadata_value new;
+    } MetadataValueChange;
+
+    /* The differences between two versions of a node's metadata.
+
+        added - the metadata only present in the new version.
+        removed - the metadata only present in the old version.
+        changed - the metadata keys present in both versions with differing values.
+     */
+    typedef structure {
+        metadata added;
+        metadata removed;
+        mapping<metadata_key, MetadataValueChange> changed;
+    } MetadataDiff;
+
+    /* A change in source metadata.
+
+        old - the source metadata in the old version.
+        new - the source metadata in the new version.
+     */
+    typedef structure {
+        SourceMetadata old;
+        SourceMetadata new;
+    } SourceMetadataChange;
+
+    /* The differences between two versions of a node's source metadata, keyed by the metadata
+        key.
+
+        added - the source metadata only present in the new version.
+        removed - the source metadata only present in the old version.
+        changed - the source metadata present in both versions that differs.
+     */
+    typedef structure {
+        mapping<metadata_key, SourceMetadata> added;
+        mapping<metadata_key, SourceMetadata> removed;
+        mapping<metadata_key, SourceMetadataChange> changed;
+    } SourceMetadataDiff;
+
+    /* A change in a node's type.
+
+        old - the type in the old version.
+        new - the type in the new version.
+     */
+    typedef structure {
+        samplenode_type old;
+        samplenode_type new;
+    } NodeTypeChange;
+
+    /* A change in a node's parent.
+
+        old - the parent in the old version.
+        new - the parent in the new version.
+     */
+    typedef structure {
+        node_id old;
+        node_id new;
+    } NodeParentChange;
+
+    /* The differences between two versions of a node with the same ID.
+
+        id - the ID of the node.
+        type - the change in the node's type. Absent if the type is unchanged.
+        parent - the change in the node's parent. Absent if the parent is unchanged.
+        meta_controlled - the differences in the controlled metadata.
+        meta_user - the differences in the user metadata.
+        source_meta - the differences in the source metadata.
+     */
+    typedef structure {
+        node_id id;
+        NodeTypeChange type;
+        NodeParentChange parent;
+        MetadataDiff meta_controlled;
+        MetadataDiff meta_user;
+        SourceMetadataDiff source_meta;
+    } NodeDiff;
+
+    /* The differences between two versions of a sample.
+
+        added_nodes - the nodes only present in the new version.
+        removed_nodes - the IDs of the nodes only present in the old version.
+        changed_nodes - the differences in the nodes present in both versions. Nodes that are
+            the same in both versions are omitted.
+     */
+    typedef structure {
+        list<SampleNode> added_nodes;
+        list<node_id> removed_nodes;
+        list<NodeDiff> changed_nodes;
+    } SampleDiff;
+
+    /* Get the differences between the nodes of two versions of a sample. Nodes are matched
+        by their IDs.
+     */
+    funcdef get_sample_diff(GetSampleDiffParams params) returns(SampleDiff diff)
+        authentication optional;
+
+    /* get_data_links_from_data_bulk parameters.
+
+        upas - the data UPAs. At most 1000 UPAs may be requested.
+        effective_time - the effective time at which the query should be run - the default is
+            the current time. Providing a time allows for reproducibility of previous results.
+        as_admin - run the method as a service administrator. The user must have read
+            administration permissions.
+    */
+    typedef structure {
+        list<ws_upa> upas;
+        timestamp effective_time;
+        boolean as_admin;
+    } GetDataLinksFromDataBulkParams;
+
+    /* The result of retrieving the links for one UPA from get_data_links_from_data_bulk.
+
+        upa - the data UPA.
+        links - the links, sorted by the time the link was created and then by link ID, if
+            they could be retrieved.
+        error - the reason the links could not be retrieved, if they could not, including the
+            error code. For example, the data may not exist or the user may not have read
+            access to the data.
+    */
+    typedef structure {
+        ws_upa upa;
+        list<DataLink> links;
+        string error;
+    } GetDataLinksFromDataBulkResult;
+
+    /* get_data_links_from_data_bulk results.
+
+        results - the results, in the same order as the UPAs in the input parameters.
+        effective_time - the time at which the query was run. This timestamp, if saved, can be
+            used when running the method again to ensure reproducible results.
+    */
+    typedef structure {
+        list<GetDataLinksFromDataBulkResult> results;
+        timestamp effective_time;
+    } GetDataLinksFromDataBulkResults;
+
+    /* Get data links to samples originating from many Workspace objects at once. If the links
+        for an object cannot be retrieved, an error is returned for that object rather than
+        failing the entire request.
+
+        The user must have read permissions to the workspace data.
+     */
+    funcdef get_data_links_from_data_bulk(GetDataLinksFromDataBulkParams params)
+        returns(GetDataLinksFromDataBulkResults results) authentication optional;
 };
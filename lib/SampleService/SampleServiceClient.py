@@ -469,52 +469,60 @@ class SampleService(object):
                 The user must have read permissions to the sample. Only Workspace objects the user
                 can read are returned.
         :param params: instance of type "GetDataLinksFromSampleParams"
-           (get_data_links_from_sample parameters. id - the sample ID.
-           version - the sample version. effective_time - the effective time
-           at which the query should be run - the default is the current
-           time. Providing a time allows for reproducibility of previous
-           results. as_admin - run the method as a service administrator. The
-           user must have read administration permissions.) -> structure:
-           parameter "id" of type "sample_id" (A Sample ID. Must be globally
-           unique. Always assigned by the Sample service.), parameter
-           "version" of type "version" (The version of a sample. Always >
-           0.), parameter "effective_time" of type "timestamp" (A timestamp
-           in epoch milliseconds.), parameter "as_admin" of type "boolean" (A
-           boolean value, 0 for false, 1 for true.)
+           (get_data_links_from_sample parameters. id - the sample ID. version -
+           the sample version. effective_time - the effective time at which the
+           query should be run - the default is the current time. Providing a
+           time allows for reproducibility of previous results. as_admin - run
+           the method as a service administrator. The user must have read
+           administration permissions. page_size - the maximum number of links to
+           return, from 1 to 10000. If omitted, all the links are returned.
+           continuation_token - the continuation token from the previous page of
+           results, if any. The token fixes the effective time of the query, so
+           if the effective_time is also provided it must match the effective
+           time of the previous page.) -> structure: parameter "id" of type
+           "sample_id" (A Sample ID. Must be globally unique. Always assigned by
+           the Sample service.), parameter "version" of type "version" (The
+           version of a sample. Always > 0.), parameter "effective_time" of type
+           "timestamp" (A timestamp in epoch milliseconds.), parameter "as_admin"
+           of type "boolean" (A boolean value, 0 for false, 1 for true.),
+           parameter "page_size" of Long, parameter "continuation_token" of
+           String
         :returns: instance of type "GetDataLinksFromSampleResults"
-           (get_data_links_from_sample results. links - the links.
-           effective_time - the time at which the query was run. This
-           timestamp, if saved, can be used when running the method again to
-           ensure reproducible results. Note that changes to workspace
-           permissions may cause results to change over time.) -> structure:
-           parameter "links" of list of type "DataLink" (A data link from a
-           KBase workspace object to a sample. upa - the workspace UPA of the
-           linked object. dataid - the dataid of the linked data, if any,
-           within the object. If omitted the entire object is linked to the
-           sample. id - the sample id. version - the sample version. node -
-           the sample node. createdby - the user that created the link.
-           created - the time the link was created. expiredby - the user that
-           expired the link, if any. expired - the time the link was expired,
-           if at all.) -> structure: parameter "linkid" of type "link_id" (A
-           link ID. Must be globally unique. Always assigned by the Sample
-           service. Typically only of use to service admins.), parameter
-           "upa" of type "ws_upa" (A KBase Workspace service Unique Permanent
-           Address (UPA). E.g. 5/6/7 where 5 is the workspace ID, 6 the
-           object ID, and 7 the object version.), parameter "dataid" of type
-           "data_id" (An id for a unit of data within a KBase Workspace
-           object. A single object may contain many data units. A dataid is
-           expected to be unique within a single object. Must be less than
-           255 characters.), parameter "id" of type "sample_id" (A Sample ID.
-           Must be globally unique. Always assigned by the Sample service.),
-           parameter "version" of type "version" (The version of a sample.
-           Always > 0.), parameter "node" of type "node_id" (A SampleNode ID.
-           Must be unique within a Sample and be less than 255 characters.),
-           parameter "createdby" of type "user" (A user's username.),
-           parameter "created" of type "timestamp" (A timestamp in epoch
-           milliseconds.), parameter "expiredby" of type "user" (A user's
-           username.), parameter "expired" of type "timestamp" (A timestamp
-           in epoch milliseconds.), parameter "effective_time" of type
-           "timestamp" (A timestamp in epoch milliseconds.)
+           (get_data_links_from_sample results. links - the links, sorted by the
+           time the link was created and then by link ID. effective_time - the
+           time at which the query was run. This timestamp, if saved, can be used
+           when running the method again to ensure reproducible results. Note
+           that changes to workspace permissions may cause results to change over
+           time. continuation_token - a token that can be used to retrieve the
+           next page of links. Null if there are no more links. If the number of
+           links returned is exactly the page size, the next page may be empty.)
+           -> structure: parameter "links" of list of type "DataLink" (A data
+           link from a KBase workspace object to a sample. upa - the workspace
+           UPA of the linked object. dataid - the dataid of the linked data, if
+           any, within the object. If omitted the entire object is linked to the
+           sample. id - the sample id. version - the sample version. node - the
+           sample node. createdby - the user that created the link. created - the
+           time the link was created. expiredby - the user that expired the link,
+           if any. expired - the time the link was expired, if at all.) ->
+           structure: parameter "linkid" of type "link_id" (A link ID. Must be
+           globally unique. Always assigned by the Sample service. Typically only
+           of use to service admins.), parameter "upa" of type "ws_upa" (A KBase
+           Workspace service Unique Permanent Address (UPA). E.g. 5/6/7 where 5
+           is the workspace ID, 6 the object ID, and 7 the object version.),
+           parameter "dataid" of type "data_id" (An id for a unit of data within
+           a KBase Workspace object. A single object may contain many data units.
+           A dataid is expected to be unique within a single object. Must be less
+           than 255 characters.), parameter "id" of type "sample_id" (A Sample
+           ID. Must be globally unique. Always assigned by the Sample service.),
+           parameter "version" of type "version" (The version of a sample. Always
+           > 0.), parameter "node" of type "node_id" (A SampleNode ID. Must be
+           unique within a Sample and be less than 255 characters.), parameter
+           "createdby" of type "user" (A user's username.), parameter "created"
+           of type "timestamp" (A timestamp in epoch milliseconds.), parameter
+           "expiredby" of type "user" (A user's username.), parameter "expired"
+           of type "timestamp" (A timestamp in epoch milliseconds.), parameter
+           "effective_time" of type "timestamp" (A timestamp in epoch
+           milliseconds.), parameter "continuation_token" of String
         """
         return self._client.call_method('SampleService.get_data_links_from_sample',
                                         [params], self._service_ver, context)
@@ -525,49 +533,57 @@ class SampleService(object):
                 The user must have read permissions to the workspace data.
         :param params: instance of type "GetDataLinksFromDataParams"
            (get_data_links_from_data parameters. upa - the data UPA.
-           effective_time - the effective time at which the query should be
-           run - the default is the current time. Providing a time allows for
-           reproducibility of previous results. as_admin - run the method as
-           a service administrator. The user must have read administration
-           permissions.) -> structure: parameter "upa" of type "ws_upa" (A
-           KBase Workspace service Unique Permanent Address (UPA). E.g. 5/6/7
-           where 5 is the workspace ID, 6 the object ID, and 7 the object
-           version.), parameter "effective_time" of type "timestamp" (A
-           timestamp in epoch milliseconds.), parameter "as_admin" of type
-           "boolean" (A boolean value, 0 for false, 1 for true.)
+           effective_time - the effective time at which the query should be run -
+           the default is the current time. Providing a time allows for
+           reproducibility of previous results. as_admin - run the method as a
+           service administrator. The user must have read administration
+           permissions. page_size - the maximum number of links to return, from 1
+           to 10000. If omitted, all the links are returned. continuation_token -
+           the continuation token from the previous page of results, if any. The
+           token fixes the effective time of the query, so if the effective_time
+           is also provided it must match the effective time of the previous
+           page.) -> structure: parameter "upa" of type "ws_upa" (A KBase
+           Workspace service Unique Permanent Address (UPA). E.g. 5/6/7 where 5
+           is the workspace ID, 6 the object ID, and 7 the object version.),
+           parameter "effective_time" of type "timestamp" (A timestamp in epoch
+           milliseconds.), parameter "as_admin" of type "boolean" (A boolean
+           value, 0 for false, 1 for true.), parameter "page_size" of Long,
+           parameter "continuation_token" of String
         :returns: instance of type "GetDataLinksFromDataResults"
-           (get_data_links_from_data results. links - the links.
-           effective_time - the time at which the query was run. This
-           timestamp, if saved, can be used when running the method again to
-           ensure reproducible results.) -> structure: parameter "links" of
-           list of type "DataLink" (A data link from a KBase workspace object
-           to a sample. upa - the workspace UPA of the linked object. dataid
-           - the dataid of the linked data, if any, within the object. If
-           omitted the entire object is linked to the sample. id - the sample
-           id. version - the sample version. node - the sample node.
-           createdby - the user that created the link. created - the time the
-           link was created. expiredby - the user that expired the link, if
-           any. expired - the time the link was expired, if at all.) ->
-           structure: parameter "linkid" of type "link_id" (A link ID. Must
-           be globally unique. Always assigned by the Sample service.
-           Typically only of use to service admins.), parameter "upa" of type
-           "ws_upa" (A KBase Workspace service Unique Permanent Address
-           (UPA). E.g. 5/6/7 where 5 is the workspace ID, 6 the object ID,
-           and 7 the object version.), parameter "dataid" of type "data_id"
-           (An id for a unit of data within a KBase Workspace object. A
-           single object may contain many data units. A dataid is expected to
-           be unique within a single object. Must be less than 255
-           characters.), parameter "id" of type "sample_id" (A Sample ID.
-           Must be globally unique. Always assigned by the Sample service.),
-           parameter "version" of type "version" (The version of a sample.
-           Always > 0.), parameter "node" of type "node_id" (A SampleNode ID.
-           Must be unique within a Sample and be less than 255 characters.),
-           parameter "createdby" of type "user" (A user's username.),
-           parameter "created" of type "timestamp" (A timestamp in epoch
-           milliseconds.), parameter "expiredby" of type "user" (A user's
-           username.), parameter "expired" of type "timestamp" (A timestamp
-           in epoch milliseconds.), parameter "effective_time" of type
-           "timestamp" (A timestamp in epoch milliseconds.)
+           (get_data_links_from_data results. links - the links, sorted by the
+           time the link was created and then by link ID. effective_time - the
+           time at which the query was run. This timestamp, if saved, can be used
+           when running the method again to ensure reproducible results.
+           continuation_token - a token that can be used to retrieve the next
+           page of links. Null if there are no more links. If the number of links
+           returned is exactly the page size, the next page may be empty.) ->
+           structure: parameter "links" of list of type "DataLink" (A data link
+           from a KBase workspace object to a sample. upa - the workspace UPA of
+           the linked object. dataid - the dataid of the linked data, if any,
+           within the object. If omitted the entire object is linked to the
+           sample. id - the sample id. version - the sample version. node - the
+           sample node. createdby - the user that created the link. created - the
+           time the link was created. expiredby - the user that expired the link,
+           if any. expired - the time the link was expired, if at all.) ->
+           structure: parameter "linkid" of type "link_id" (A link ID. Must be
+           globally unique. Always assigned by the Sample service. Typically only
+           of use to service admins.), parameter "upa" of type "ws_upa" (A KBase
+           Workspace service Unique Permanent Address (UPA). E.g. 5/6/7 where 5
+           is the workspace ID, 6 the object ID, and 7 the object version.),
+           parameter "dataid" of type "data_id" (An id for a unit of data within
+           a KBase Workspace object. A single object may contain many data units.
+           A dataid is expected to be unique within a single object. Must be less
+           than 255 characters.), parameter "id" of type "sample_id" (A Sample
+           ID. Must be globally unique. Always assigned by the Sample service.),
+           parameter "version" of type "version" (The version of a sample. Always
+           > 0.), parameter "node" of type "node_id" (A SampleNode ID. Must be
+           unique within a Sample and be less than 255 characters.), parameter
+           "createdby" of type "user" (A user's username.), parameter "created"
+           of type "timestamp" (A timestamp in epoch milliseconds.), parameter
+           "expiredby" of type "user" (A user's username.), parameter "expired"
+           of type "timestamp" (A timestamp in epoch milliseconds.), parameter
+           "effective_time" of type "timestamp" (A timestamp in epoch
+           milliseconds.), parameter "continuation_token" of String
         """
         return self._client.call_method('SampleService.get_data_links_from_data',
                                         [params], self._service_ver, context)
@@ -711,6 +727,825 @@ class SampleService(object):
         return self._client.call_method('SampleService.get_data_link',
                                         [params], self._service_ver, context)
 
+    def get_samples(self, params, context=None):
+        """
+        Get many samples at once. If a sample cannot be retrieved, an error is returned for that
+        sample rather than failing the entire request.
+        :param params: instance of type "GetSamplesParams" (get_samples
+           parameters. samples - the IDs and versions of the samples to retrieve.
+           If a version is omitted the most recent version of the sample is
+           returned. At most 1000 samples may be requested. as_admin - get the
+           samples regardless of ACLs as long as the user has administration read
+           permissions.) -> structure: parameter "samples" of list of type
+           "SampleAddress" (A Sample ID and version. id - the ID of the sample.
+           version - the version of the sample.) -> structure: parameter "id" of
+           type "sample_id" (A Sample ID. Must be globally unique. Always
+           assigned by the Sample service.), parameter "version" of type
+           "version" (The version of a sample. Always > 0.), parameter "as_admin"
+           of type "boolean" (A boolean value, 0 for false, 1 for true.)
+        :returns: instance of type "GetSamplesResults" (get_samples results.
+           samples - the results, in the same order as the sample addresses in
+           the input parameters.) -> structure: parameter "samples" of list of
+           type "GetSamplesResult" (The result of retrieving one sample from
+           get_samples. sample - the sample, if it could be retrieved. error -
+           the reason the sample could not be retrieved, if it could not,
+           including the error code. For example, the sample or version may not
+           exist or the user may not have read access to the sample.) ->
+           structure: parameter "sample" of type "Sample" (A Sample, consisting
+           of a tree of subsamples and replicates.), parameter "error" of String
+        """
+        return self._client.call_method('SampleService.get_samples',
+                                        [params], self._service_ver, context)
+
+    def create_samples(self, params, context=None):
+        """
+        Create many new samples at once. All the samples are validated before any are saved, and
+        if any sample fails validation no samples are saved.
+        :param params: instance of type "CreateSamplesParams" (create_samples
+           parameters. samples - the samples to create. The samples must not have
+           IDs - only new samples may be created in bulk. Any incoming user,
+           version or timestamp in the incoming samples is ignored. At most 1000
+           samples may be created at once.) -> structure: parameter "samples" of
+           list of type "Sample" (A Sample, consisting of a tree of subsamples
+           and replicates. id - the ID of the sample. user - the user that saved
+           the sample. node_tree - the tree(s) of sample nodes in the sample. The
+           the roots of all trees must be BioReplicate nodes. All the
+           BioReplicate nodes must be at the start of the list, and all child
+           nodes must occur after their parents in the list. name - the name of
+           the sample. Must be less than 255 characters. save_date - the date the
+           sample version was saved. version - the version of the sample.) ->
+           structure: parameter "id" of type "sample_id" (A Sample ID. Must be
+           globally unique. Always assigned by the Sample service.), parameter
+           "user" of type "user" (A user's username.), parameter "node_tree" of
+           list of type "SampleNode" (A node in a sample tree. id - the ID of the
+           node. parent - the id of the parent node for the current node.
+           BioReplicate nodes, and only BioReplicate nodes, do not have a parent.
+           type - the type of the node. meta_controlled - metadata restricted by
+           the sample controlled vocabulary and validators. source_meta - the
+           pre-transformation keys and values of the controlled metadata at the
+           data source for controlled metadata keys. In some cases the source
+           metadata may be transformed prior to ingestion by the Sample Service;
+           the contents of this data structure allows for reconstructing the
+           original representation. The metadata here is not validated other than
+           basic size checks and is provided on an informational basis only. The
+           metadata keys in the SourceMetadata data structure must be a subset of
+           the meta_controlled mapping keys. meta_user - unrestricted metadata.)
+           -> structure: parameter "id" of type "node_id" (A SampleNode ID. Must
+           be unique within a Sample and be less than 255 characters.), parameter
+           "parent" of type "node_id" (A SampleNode ID. Must be unique within a
+           Sample and be less than 255 characters.), parameter "type" of type
+           "samplenode_type" (The type of a sample node. One of: BioReplicate - a
+           biological replicate. Always at the top of the sample tree.
+           TechReplicate - a technical replicate. SubSample - a sub sample that
+           is not a technical replicate.), parameter "meta_controlled" of type
+           "metadata" (Metadata attached to a sample.) -> mapping from type
+           "metadata_key" (A key in a metadata key/value pair. Less than 1000
+           unicode characters.) to type "metadata_value" (A metadata value,
+           represented by a mapping of value keys to primitive values. An example
+           for a location metadata key might be: { "name": "Castle Geyser",
+           "lat": 44.463816, "long": -110.836471 } "primitive values" means an
+           int, float, string, or equivalent typedefs. Including any collection
+           types is an error.) -> mapping from type "metadata_value_key" (A key
+           for a value associated with a piece of metadata. Less than 1000
+           unicode characters. Examples: units, value, species) to unspecified
+           object, parameter "source_meta" of list of type "SourceMetadata"
+           (Information about a metadata key as it appeared at the data source.
+           The source key and value represents the original state of the metadata
+           before it was tranformed for ingestion by the sample service. key -
+           the metadata key. skey - the key as it appeared at the data source.
+           svalue - the value as it appeared at the data source.) -> structure:
+           parameter "key" of type "metadata_key" (A key in a metadata key/value
+           pair. Less than 1000 unicode characters.), parameter "skey" of type
+           "metadata_key" (A key in a metadata key/value pair. Less than 1000
+           unicode characters.), parameter "svalue" of type "metadata_value" (A
+           metadata value, represented by a mapping of value keys to primitive
+           values. An example for a location metadata key might be: { "name":
+           "Castle Geyser", "lat": 44.463816, "long": -110.836471 } "primitive
+           values" means an int, float, string, or equivalent typedefs. Including
+           any collection types is an error.) -> mapping from type
+           "metadata_value_key" (A key for a value associated with a piece of
+           metadata. Less than 1000 unicode characters. Examples: units, value,
+           species) to unspecified object, parameter "meta_user" of type
+           "metadata" (Metadata attached to a sample.) -> mapping from type
+           "metadata_key" (A key in a metadata key/value pair. Less than 1000
+           unicode characters.) to type "metadata_value" (A metadata value,
+           represented by a mapping of value keys to primitive values. An example
+           for a location metadata key might be: { "name": "Castle Geyser",
+           "lat": 44.463816, "long": -110.836471 } "primitive values" means an
+           int, float, string, or equivalent typedefs. Including any collection
+           types is an error.) -> mapping from type "metadata_value_key" (A key
+           for a value associated with a piece of metadata. Less than 1000
+           unicode characters. Examples: units, value, species) to unspecified
+           object, parameter "name" of type "sample_name" (A sample name. Must be
+           less than 255 characters.), parameter "save_date" of type "timestamp"
+           (A timestamp in epoch milliseconds.), parameter "version" of type
+           "version" (The version of a sample. Always > 0.)
+        :returns: instance of type "CreateSamplesResults" (create_samples
+           results. addresses - the IDs and versions of the new samples, in the
+           same order as the samples in the input parameters.) -> structure:
+           parameter "addresses" of list of type "SampleAddress" (A Sample ID and
+           version. id - the ID of the sample. version - the version of the
+           sample.) -> structure: parameter "id" of type "sample_id" (A Sample
+           ID. Must be globally unique. Always assigned by the Sample service.),
+           parameter "version" of type "version" (The version of a sample. Always
+           > 0.)
+        """
+        return self._client.call_method('SampleService.create_samples',
+                                        [params], self._service_ver, context)
+
+    def create_data_links(self, params, context=None):
+        """
+        Create many links from KBase Workspace objects to samples at once.
+        The user must have admin permissions for each sample and write permissions for each
+        Workspace object. If a link cannot be created, an error is returned for that link rather
+        than failing the entire request.
+        :param params: instance of type "CreateDataLinksParams"
+           (create_data_links parameters. links - the links to create. No two
+           links may be from the same data unit (the combination of the UPA and
+           dataid). At most 10000 links may be created at once. update - if false
+           (the default), fail to create a link if a link already exists from the
+           data unit. if true, expire the old link and create the new link unless
+           the link is already to the requested sample node, in which case the
+           link is a no-op. as_admin - run the method as a service administrator.
+           The user must have full administration permissions. as_user - create
+           the links as a different user. Ignored if as_admin is not true.
+           Neither the administrator nor the impersonated user need have
+           permissions to the data or samples.) -> structure: parameter "links"
+           of list of type "DataLinkSpec" (A link to create as part of a
+           create_data_links call. upa - the workspace UPA of the object to be
+           linked. dataid - the dataid of the data to be linked, if any, within
+           the object. If omitted the entire object is linked to the sample. id -
+           the sample id. version - the sample version. node - the sample node.)
+           -> structure: parameter "upa" of type "ws_upa" (A KBase Workspace
+           service Unique Permanent Address (UPA). E.g. 5/6/7 where 5 is the
+           workspace ID, 6 the object ID, and 7 the object version.), parameter
+           "dataid" of type "data_id" (An id for a unit of data within a KBase
+           Workspace object. A single object may contain many data units. A
+           dataid is expected to be unique within a single object. Must be less
+           than 255 characters.), parameter "id" of type "sample_id" (A Sample
+           ID. Must be globally unique. Always assigned by the Sample service.),
+           parameter "version" of type "version" (The version of a sample. Always
+           > 0.), parameter "node" of type "node_id" (A SampleNode ID. Must be
+           unique within a Sample and be less than 255 characters.), parameter
+           "update" of type "boolean" (A boolean value, 0 for false, 1 for
+           true.), parameter "as_admin" of type "boolean" (A boolean value, 0 for
+           false, 1 for true.), parameter "as_user" of type "user" (A user's
+           username.)
+        :returns: instance of type "CreateDataLinksResults" (create_data_links
+           results. results - the results, in the same order as the links in the
+           input parameters.) -> structure: parameter "results" of list of type
+           "CreateDataLinksResult" (The result of creating one link in
+           create_data_links. status - one of 'created' if the link was created,
+           'noop' if an equivalent link already exists and update was true, or
+           'error' if the link could not be created. new_link - the new link, if
+           it was created. error - the reason the link could not be created,
+           including the error code. For example, the sample node may not exist,
+           the user may not have permission to the sample or the workspace
+           object, or a link may already exist from the data unit.) -> structure:
+           parameter "status" of String, parameter "new_link" of type "DataLink"
+           (A data link from a KBase workspace object to a sample. upa - the
+           workspace UPA of the linked object. dataid - the dataid of the linked
+           data, if any, within the object. If omitted the entire object is
+           linked to the sample. id - the sample id. version - the sample
+           version. node - the sample node. createdby - the user that created the
+           link. created - the time the link was created. expiredby - the user
+           that expired the link, if any. expired - the time the link was
+           expired, if at all.) -> structure: parameter "linkid" of type
+           "link_id" (A link ID. Must be globally unique. Always assigned by the
+           Sample service. Typically only of use to service admins.), parameter
+           "upa" of type "ws_upa" (A KBase Workspace service Unique Permanent
+           Address (UPA). E.g. 5/6/7 where 5 is the workspace ID, 6 the object
+           ID, and 7 the object version.), parameter "dataid" of type "data_id"
+           (An id for a unit of data within a KBase Workspace object. A single
+           object may contain many data units. A dataid is expected to be unique
+           within a single object. Must be less than 255 characters.), parameter
+           "id" of type "sample_id" (A Sample ID. Must be globally unique. Always
+           assigned by the Sample service.), parameter "version" of type
+           "version" (The version of a sample. Always > 0.), parameter "node" of
+           type "node_id" (A SampleNode ID. Must be unique within a Sample and be
+           less than 255 characters.), parameter "createdby" of type "user" (A
+           user's username.), parameter "created" of type "timestamp" (A
+           timestamp in epoch milliseconds.), parameter "expiredby" of type
+           "user" (A user's username.), parameter "expired" of type "timestamp"
+           (A timestamp in epoch milliseconds.), parameter "error" of String
+        """
+        return self._client.call_method('SampleService.create_data_links',
+                                        [params], self._service_ver, context)
+
+    def expire_data_links(self, params, context=None):
+        """
+        Expire many links at once.
+        The user must have admin permissions for every sample and write permissions for every
+        Workspace object with a link that is to be expired. If the user lacks permissions for
+        any of the links, or any of the link IDs do not exist or are expired, no links are
+        expired.
+        :param params: instance of type "ExpireDataLinksParams"
+           (expire_data_links parameters. Exactly one of upa, id, or link_ids
+           must be provided. upa - expire all the extant links from the workspace
+           object with this upa. id - the sample ID. Expire all the extant links
+           from the sample version. version - the sample version. Required if id
+           is provided. link_ids - expire the links with these IDs. At most 10000
+           links may be expired at once. as_admin - run the method as a service
+           administrator. The user must have full administration permissions.
+           as_user - expire the links as a different user. Ignored if as_admin is
+           not true. Neither the administrator nor the impersonated user need
+           have permissions to the links.) -> structure: parameter "upa" of type
+           "ws_upa" (A KBase Workspace service Unique Permanent Address (UPA).
+           E.g. 5/6/7 where 5 is the workspace ID, 6 the object ID, and 7 the
+           object version.), parameter "id" of type "sample_id" (A Sample ID.
+           Must be globally unique. Always assigned by the Sample service.),
+           parameter "version" of type "version" (The version of a sample. Always
+           > 0.), parameter "link_ids" of list of type "link_id" (A link ID. Must
+           be globally unique. Always assigned by the Sample service. Typically
+           only of use to service admins.), parameter "as_admin" of type
+           "boolean" (A boolean value, 0 for false, 1 for true.), parameter
+           "as_user" of type "user" (A user's username.)
+        :returns: instance of type "ExpireDataLinksResults" (expire_data_links
+           results. expired_links - the links that were expired.) -> structure:
+           parameter "expired_links" of list of type "DataLink" (A data link from
+           a KBase workspace object to a sample. upa - the workspace UPA of the
+           linked object. dataid - the dataid of the linked data, if any, within
+           the object. If omitted the entire object is linked to the sample. id -
+           the sample id. version - the sample version. node - the sample node.
+           createdby - the user that created the link. created - the time the
+           link was created. expiredby - the user that expired the link, if any.
+           expired - the time the link was expired, if at all.) -> structure:
+           parameter "linkid" of type "link_id" (A link ID. Must be globally
+           unique. Always assigned by the Sample service. Typically only of use
+           to service admins.), parameter "upa" of type "ws_upa" (A KBase
+           Workspace service Unique Permanent Address (UPA). E.g. 5/6/7 where 5
+           is the workspace ID, 6 the object ID, and 7 the object version.),
+           parameter "dataid" of type "data_id" (An id for a unit of data within
+           a KBase Workspace object. A single object may contain many data units.
+           A dataid is expected to be unique within a single object. Must be less
+           than 255 characters.), parameter "id" of type "sample_id" (A Sample
+           ID. Must be globally unique. Always assigned by the Sample service.),
+           parameter "version" of type "version" (The version of a sample. Always
+           > 0.), parameter "node" of type "node_id" (A SampleNode ID. Must be
+           unique within a Sample and be less than 255 characters.), parameter
+           "createdby" of type "user" (A user's username.), parameter "created"
+           of type "timestamp" (A timestamp in epoch milliseconds.), parameter
+           "expiredby" of type "user" (A user's username.), parameter "expired"
+           of type "timestamp" (A timestamp in epoch milliseconds.)
+        """
+        return self._client.call_method('SampleService.expire_data_links',
+                                        [params], self._service_ver, context)
+
+    def search_samples(self, params, context=None):
+        """
+        Search for the sample versions the user can read by their controlled metadata.
+        :param params: instance of type "SearchSamplesParams" (search_samples
+           parameters. conditions - the conditions to match. A sample version
+           matches if every condition is matched by at least one of its nodes. At
+           least one and at most 10 conditions may be provided. Only controlled
+           metadata is searched. page_size - the maximum number of sample
+           versions to return, from 1 to 10000. Defaults to 1000.
+           continuation_token - the token returned by the previous call of this
+           method to fetch the next page of results. The conditions must be the
+           same as the previous call. as_admin - search all samples regardless of
+           ACLs as long as the user has administration read permissions.) ->
+           structure: parameter "conditions" of list of type "MetadataCondition"
+           (A condition on a controlled metadata value for search_samples.
+           Exactly one of equals, prefix, or min and / or max must be provided.
+           key - the metadata key. value_key - the key of the value in the
+           metadata value. Defaults to 'value'. equals - the value must be equal
+           to this string, number, or boolean. prefix - the value must be a
+           string starting with this string. min - the value must be a number
+           greater than or equal to this number. max - the value must be a number
+           less than or equal to this number. units - the units of min and max,
+           e.g. 'cm'. If provided, the condition matches values in any units of
+           the same dimensionality, e.g. a range in meters matches values in
+           feet. The value_key must be 'value' and only metadata values with a
+           'units' value key are matched.) -> structure: parameter "key" of type
+           "metadata_key" (A key in a metadata key/value pair. Less than 1000
+           unicode characters.), parameter "value_key" of type
+           "metadata_value_key" (A key for a value associated with a piece of
+           metadata. Less than 1000 unicode characters. Examples: units, value,
+           species), parameter "equals" of unspecified object, parameter "prefix"
+           of String, parameter "min" of Double, parameter "max" of Double,
+           parameter "units" of String, parameter "page_size" of Long, parameter
+           "continuation_token" of String, parameter "as_admin" of type "boolean"
+           (A boolean value, 0 for false, 1 for true.)
+        :returns: instance of type "SearchSamplesResults" (search_samples
+           results. samples - the matching sample versions, sorted by sample ID
+           and then version. continuation_token - a token to fetch the next page
+           of results, or null if there are no more results.) -> structure:
+           parameter "samples" of list of type "SampleAddress" (A Sample ID and
+           version. id - the ID of the sample. version - the version of the
+           sample.) -> structure: parameter "id" of type "sample_id" (A Sample
+           ID. Must be globally unique. Always assigned by the Sample service.),
+           parameter "version" of type "version" (The version of a sample. Always
+           > 0.), parameter "continuation_token" of String
+        """
+        return self._client.call_method('SampleService.search_samples',
+                                        [params], self._service_ver, context)
+
+    def search_samples_by_text(self, params, context=None):
+        """
+        Search for the sample versions the user can read by the words in the sample names and the
+        string values of the controlled and user metadata. A sample version matches if it
+        contains any of the words.
+        Sample versions saved before full text search was added to the service are not found
+        until the service indexes them in the background after it is upgraded.
+        :param params: instance of type "SearchSamplesByTextParams"
+           (search_samples_by_text parameters. text - the words to search for.
+           Words are runs of letters, digits, and underscores, and are matched
+           case insensitively. At most 20 distinct words may be provided.
+           page_size - the maximum number of sample versions to return, from 1 to
+           10000. Defaults to 1000. continuation_token - the token returned by
+           the previous call of this method to fetch the next page of results.
+           The text must be the same as the previous call. as_admin - search all
+           samples regardless of ACLs as long as the user has administration read
+           permissions.) -> structure: parameter "text" of String, parameter
+           "page_size" of Long, parameter "continuation_token" of String,
+           parameter "as_admin" of type "boolean" (A boolean value, 0 for false,
+           1 for true.)
+        :returns: instance of type "SearchSamplesByTextResults"
+           (search_samples_by_text results. samples - the matching sample
+           versions, sorted by descending score, then sample ID, and then
+           version. Sample versions with the same score are not ordered by
+           relevance. continuation_token - a token to fetch the next page of
+           results, or null if there are no more results.) -> structure:
+           parameter "samples" of list of type "TextSearchResult" (A sample
+           version found by search_samples_by_text. id - the ID of the sample.
+           version - the version of the sample. score - the number of distinct
+           words from the search text the sample version contains. Word
+           frequency and where the words occur, e.g. in the name or the
+           metadata, are not taken into account, so many sample versions may
+           have the same score.) -> structure:
+           parameter "id" of type "sample_id" (A Sample ID. Must be globally
+           unique. Always assigned by the Sample service.), parameter "version"
+           of type "version" (The version of a sample. Always > 0.), parameter
+           "score" of Long, parameter "continuation_token" of String
+        """
+        return self._client.call_method('SampleService.search_samples_by_text',
+                                        [params], self._service_ver, context)
+
+    def search_samples_by_location(self, params, context=None):
+        """
+        Search for the sample versions the user can read with at least one node located in an
+        area. The location of a node is taken from the 'value' keys of the 'latitude' and
+        'longitude' controlled metadata keys, which must be in decimal degrees.
+        Sample versions saved before location search was added to the service are not found
+        until the service indexes them in the background after it is upgraded.
+        :param params: instance of type "SearchSamplesByLocationParams"
+           (search_samples_by_location parameters. Exactly one of bounding_box or
+           center and radius must be provided. bounding_box - find samples
+           located within this box. center - find samples located within the
+           radius of this point. radius - the radius in meters. page_size - the
+           maximum number of sample versions to return, from 1 to 10000. Defaults
+           to 1000. continuation_token - the token returned by the previous call
+           of this method to fetch the next page of results. The area must be the
+           same as the previous call. as_admin - search all samples regardless of
+           ACLs as long as the user has administration read permissions.) ->
+           structure: parameter "bounding_box" of type "BoundingBox" (A bounding
+           box for search_samples_by_location in decimal degrees. If
+           min_longitude is greater than max_longitude the box crosses the
+           antimeridian.) -> structure: parameter "min_latitude" of Double,
+           parameter "min_longitude" of Double, parameter "max_latitude" of
+           Double, parameter "max_longitude" of Double, parameter "center" of
+           type "Coordinates" (A point for search_samples_by_location in decimal
+           degrees.) -> structure: parameter "latitude" of Double, parameter
+           "longitude" of Double, parameter "radius" of Double, parameter
+           "page_size" of Long, parameter "continuation_token" of String,
+           parameter "as_admin" of type "boolean" (A boolean value, 0 for false,
+           1 for true.)
+        :returns: instance of type "SearchSamplesResults" (search_samples
+           results. samples - the matching sample versions, sorted by sample ID
+           and then version. continuation_token - a token to fetch the next page
+           of results, or null if there are no more results.) -> structure:
+           parameter "samples" of list of type "SampleAddress" (A Sample ID and
+           version. id - the ID of the sample. version - the version of the
+           sample.) -> structure: parameter "id" of type "sample_id" (A Sample
+           ID. Must be globally unique. Always assigned by the Sample service.),
+           parameter "version" of type "version" (The version of a sample. Always
+           > 0.), parameter "continuation_token" of String
+        """
+        return self._client.call_method('SampleService.search_samples_by_location',
+                                        [params], self._service_ver, context)
+
+    def list_samples(self, params, context=None):
+        """
+        List the samples the user owns, administrates, or can write or read, and the public
+        samples. Anonymous users only see public samples.
+        :param params: instance of type "ListSamplesParams" (list_samples
+           parameters. page_size - the maximum number of samples to return, from
+           1 to 10000. Defaults to 1000. continuation_token - the token returned
+           by the previous call of this method to fetch the next page of
+           results.) -> structure: parameter "page_size" of Long, parameter
+           "continuation_token" of String
+        :returns: instance of type "ListSamplesResults" (list_samples results.
+           samples - the latest versions of the samples, sorted by the time the
+           sample was created, newest first. continuation_token - a token to
+           fetch the next page of results, or null if there are no more results.)
+           -> structure: parameter "samples" of list of type "SampleAddress" (A
+           Sample ID and version. id - the ID of the sample. version - the
+           version of the sample.) -> structure: parameter "id" of type
+           "sample_id" (A Sample ID. Must be globally unique. Always assigned by
+           the Sample service.), parameter "version" of type "version" (The
+           version of a sample. Always > 0.), parameter "continuation_token" of
+           String
+        """
+        return self._client.call_method('SampleService.list_samples',
+                                        [params], self._service_ver, context)
+
+    def get_metadata_facets(self, params, context=None):
+        """
+        Count the samples the user can read with each value of one or more controlled metadata
+        keys. Only the latest version of each sample is counted.
+        Sample versions saved before metadata search was added to the service are not counted
+        until the service indexes them in the background after it is upgraded.
+        :param params: instance of type "GetMetadataFacetsParams"
+           (get_metadata_facets parameters. keys - the controlled metadata keys
+           for which to count values. The value_key 'value' is counted. At least
+           one and at most 10 keys may be provided. conditions - conditions, as
+           for search_samples, that a sample must match to be counted. At most 10
+           conditions may be provided. limit - the maximum number of values to
+           return for each key, from 1 to 1000. Defaults to 100. as_admin - count
+           all samples regardless of ACLs as long as the user has administration
+           read permissions.) -> structure: parameter "keys" of list of type
+           "metadata_key" (A key in a metadata key/value pair. Less than 1000
+           unicode characters.), parameter "conditions" of list of type
+           "MetadataCondition" (A condition on a controlled metadata value for
+           search_samples. Exactly one of equals, prefix, or min and / or max
+           must be provided. key - the metadata key. value_key - the key of the
+           value in the metadata value. Defaults to 'value'. equals - the value
+           must be equal to this string, number, or boolean. prefix - the value
+           must be a string starting with this string. min - the value must be a
+           number greater than or equal to this number. max - the value must be a
+           number less than or equal to this number. units - the units of min and
+           max, e.g. 'cm'. If provided, the condition matches values in any units
+           of the same dimensionality, e.g. a range in meters matches values in
+           feet. The value_key must be 'value' and only metadata values with a
+           'units' value key are matched.) -> structure: parameter "key" of type
+           "metadata_key" (A key in a metadata key/value pair. Less than 1000
+           unicode characters.), parameter "value_key" of type
+           "metadata_value_key" (A key for a value associated with a piece of
+           metadata. Less than 1000 unicode characters. Examples: units, value,
+           species), parameter "equals" of unspecified object, parameter "prefix"
+           of String, parameter "min" of Double, parameter "max" of Double,
+           parameter "units" of String, parameter "limit" of Long, parameter
+           "as_admin" of type "boolean" (A boolean value, 0 for false, 1 for
+           true.)
+        :returns: instance of type "GetMetadataFacetsResults"
+           (get_metadata_facets results. facets - a mapping of metadata key to
+           the counts of the values of the key, sorted by descending count and
+           then by value.) -> structure: parameter "facets" of mapping from type
+           "metadata_key" (A key in a metadata key/value pair. Less than 1000
+           unicode characters.) to list of type "FacetCount" (The number of
+           samples with a metadata value. value - the value. count - the number
+           of samples.) -> structure: parameter "value" of unspecified object,
+           parameter "count" of Long
+        """
+        return self._client.call_method('SampleService.get_metadata_facets',
+                                        [params], self._service_ver, context)
+
+    def get_sample_diff(self, params, context=None):
+        """
+        Get the differences between the nodes of two versions of a sample. Nodes are matched
+        by their IDs.
+        :param params: instance of type "GetSampleDiffParams" (get_sample_diff
+           parameters. id - the ID of the sample. version_a - the old version of
+           the sample. version_b - the new version of the sample. as_admin - get
+           the differences regardless of ACLs as long as the user has
+           administration read permissions.) -> structure: parameter "id" of type
+           "sample_id" (A Sample ID. Must be globally unique. Always assigned by
+           the Sample service.), parameter "version_a" of type "version" (The
+           version of a sample. Always > 0.), parameter "version_b" of type
+           "version" (The version of a sample. Always > 0.), parameter "as_admin"
+           of type "boolean" (A boolean value, 0 for false, 1 for true.)
+        :returns: instance of type "SampleDiff" (The differences between two
+           versions of a sample. added_nodes - the nodes only present in the new
+           version. removed_nodes - the IDs of the nodes only present in the old
+           version. changed_nodes - the differences in the nodes present in both
+           versions. Nodes that are the same in both versions are omitted.) ->
+           structure: parameter "added_nodes" of list of type "SampleNode" (A
+           node in a sample tree. id - the ID of the node. parent - the id of the
+           parent node for the current node. BioReplicate nodes, and only
+           BioReplicate nodes, do not have a parent. type - the type of the node.
+           meta_controlled - metadata restricted by the sample controlled
+           vocabulary and validators. source_meta - the pre-transformation keys
+           and values of the controlled metadata at the data source for
+           controlled metadata keys. In some cases the source metadata may be
+           transformed prior to ingestion by the Sample Service; the contents of
+           this data structure allows for reconstructing the original
+           representation. The metadata here is not validated other than basic
+           size checks and is provided on an informational basis only. The
+           metadata keys in the SourceMetadata data structure must be a subset of
+           the meta_controlled mapping keys. meta_user - unrestricted metadata.)
+           -> structure: parameter "id" of type "node_id" (A SampleNode ID. Must
+           be unique within a Sample and be less than 255 characters.), parameter
+           "parent" of type "node_id" (A SampleNode ID. Must be unique within a
+           Sample and be less than 255 characters.), parameter "type" of type
+           "samplenode_type" (The type of a sample node. One of: BioReplicate - a
+           biological replicate. Always at the top of the sample tree.
+           TechReplicate - a technical replicate. SubSample - a sub sample that
+           is not a technical replicate.), parameter "meta_controlled" of type
+           "metadata" (Metadata attached to a sample.) -> mapping from type
+           "metadata_key" (A key in a metadata key/value pair. Less than 1000
+           unicode characters.) to type "metadata_value" (A metadata value,
+           represented by a mapping of value keys to primitive values. An example
+           for a location metadata key might be: { "name": "Castle Geyser",
+           "lat": 44.463816, "long": -110.836471 } "primitive values" means an
+           int, float, string, or equivalent typedefs. Including any collection
+           types is an error.) -> mapping from type "metadata_value_key" (A key
+           for a value associated with a piece of metadata. Less than 1000
+           unicode characters. Examples: units, value, species) to unspecified
+           object, parameter "source_meta" of list of type "SourceMetadata"
+           (Information about a metadata key as it appeared at the data source.
+           The source key and value represents the original state of the metadata
+           before it was tranformed for ingestion by the sample service. key -
+           the metadata key. skey - the key as it appeared at the data source.
+           svalue - the value as it appeared at the data source.) -> structure:
+           parameter "key" of type "metadata_key" (A key in a metadata key/value
+           pair. Less than 1000 unicode characters.), parameter "skey" of type
+           "metadata_key" (A key in a metadata key/value pair. Less than 1000
+           unicode characters.), parameter "svalue" of type "metadata_value" (A
+           metadata value, represented by a mapping of value keys to primitive
+           values. An example for a location metadata key might be: { "name":
+           "Castle Geyser", "lat": 44.463816, "long": -110.836471 } "primitive
+           values" means an int, float, string, or equivalent typedefs. Including
+           any collection types is an error.) -> mapping from type
+           "metadata_value_key" (A key for a value associated with a piece of
+           metadata. Less than 1000 unicode characters. Examples: units, value,
+           species) to unspecified object, parameter "meta_user" of type
+           "metadata" (Metadata attached to a sample.) -> mapping from type
+           "metadata_key" (A key in a metadata key/value pair. Less than 1000
+           unicode characters.) to type "metadata_value" (A metadata value,
+           represented by a mapping of value keys to primitive values. An example
+           for a location metadata key might be: { "name": "Castle Geyser",
+           "lat": 44.463816, "long": -110.836471 } "primitive values" means an
+           int, float, string, or equivalent typedefs. Including any collection
+           types is an error.) -> mapping from type "metadata_value_key" (A key
+           for a value associated with a piece of metadata. Less than 1000
+           unicode characters. Examples: units, value, species) to unspecified
+           object, parameter "removed_nodes" of list of type "node_id" (A
+           SampleNode ID. Must be unique within a Sample and be less than 255
+           characters.), parameter "changed_nodes" of list of type "NodeDiff"
+           (The differences between two versions of a node with the same ID. id -
+           the ID of the node. type - the change in the node's type. Absent if
+           the type is unchanged. parent - the change in the node's parent.
+           Absent if the parent is unchanged. meta_controlled - the differences
+           in the controlled metadata. meta_user - the differences in the user
+           metadata. source_meta - the differences in the source metadata.) ->
+           structure: parameter "id" of type "node_id" (A SampleNode ID. Must be
+           unique within a Sample and be less than 255 characters.), parameter
+           "type" of type "NodeTypeChange" (A change in a node's type. old - the
+           type in the old version. new - the type in the new version.) ->
+           structure: parameter "old" of type "samplenode_type" (The type of a
+           sample node. One of: BioReplicate - a biological replicate. Always at
+           the top of the sample tree. TechReplicate - a technical replicate.
+           SubSample - a sub sample that is not a technical replicate.),
+           parameter "new" of type "samplenode_type" (The type of a sample node.
+           One of: BioReplicate - a biological replicate. Always at the top of
+           the sample tree. TechReplicate - a technical replicate. SubSample - a
+           sub sample that is not a technical replicate.), parameter "parent" of
+           type "NodeParentChange" (A change in a node's parent. old - the parent
+           in the old version. new - the parent in the new version.) ->
+           structure: parameter "old" of type "node_id" (A SampleNode ID. Must be
+           unique within a Sample and be less than 255 characters.), parameter
+           "new" of type "node_id" (A SampleNode ID. Must be unique within a
+           Sample and be less than 255 characters.), parameter "meta_controlled"
+           of type "MetadataDiff" (The differences between two versions of a
+           node's metadata. added - the metadata only present in the new version.
+           removed - the metadata only present in the old version. changed - the
+           metadata keys present in both versions with differing values.) ->
+           structure: parameter "added" of type "metadata" (Metadata attached to
+           a sample.) -> mapping from type "metadata_key" (A key in a metadata
+           key/value pair. Less than 1000 unicode characters.) to type
+           "metadata_value" (A metadata value, represented by a mapping of value
+           keys to primitive values. An example for a location metadata key might
+           be: { "name": "Castle Geyser", "lat": 44.463816, "long": -110.836471 }
+           "primitive values" means an int, float, string, or equivalent
+           typedefs. Including any collection types is an error.) -> mapping from
+           type "metadata_value_key" (A key for a value associated with a piece
+           of metadata. Less than 1000 unicode characters. Examples: units,
+           value, species) to unspecified object, parameter "removed" of type
+           "metadata" (Metadata attached to a sample.) -> mapping from type
+           "metadata_key" (A key in a metadata key/value pair. Less than 1000
+           unicode characters.) to type "metadata_value" (A metadata value,
+           represented by a mapping of value keys to primitive values. An example
+           for a location metadata key might be: { "name": "Castle Geyser",
+           "lat": 44.463816, "long": -110.836471 } "primitive values" means an
+           int, float, string, or equivalent typedefs. Including any collection
+           types is an error.) -> mapping from type "metadata_value_key" (A key
+           for a value associated with a piece of metadata. Less than 1000
+           unicode characters. Examples: units, value, species) to unspecified
+           object, parameter "changed" of mapping from type "metadata_key" (A key
+           in a metadata key/value pair. Less than 1000 unicode characters.) to
+           type "MetadataValueChange" (A change in a metadata value. old - the
+           value in the old version. new - the value in the new version.) ->
+           structure: parameter "old" of type "metadata_value" (A metadata value,
+           represented by a mapping of value keys to primitive values. An example
+           for a location metadata key might be: { "name": "Castle Geyser",
+           "lat": 44.463816, "long": -110.836471 } "primitive values" means an
+           int, float, string, or equivalent typedefs. Including any collection
+           types is an error.) -> mapping from type "metadata_value_key" (A key
+           for a value associated with a piece of metadata. Less than 1000
+           unicode characters. Examples: units, value, species) to unspecified
+           object, parameter "new" of type "metadata_value" (A metadata value,
+           represented by a mapping of value keys to primitive values. An example
+           for a location metadata key might be: { "name": "Castle Geyser",
+           "lat": 44.463816, "long": -110.836471 } "primitive values" means an
+           int, float, string, or equivalent typedefs. Including any collection
+           types is an error.) -> mapping from type "metadata_value_key" (A key
+           for a value associated with a piece of metadata. Less than 1000
+           unicode characters. Examples: units, value, species) to unspecified
+           object, parameter "meta_user" of type "MetadataDiff" (The differences
+           between two versions of a node's metadata. added - the metadata only
+           present in the new version. removed - the metadata only present in the
+           old version. changed - the metadata keys present in both versions with
+           differing values.) -> structure: parameter "added" of type "metadata"
+           (Metadata attached to a sample.) -> mapping from type "metadata_key"
+           (A key in a metadata key/value pair. Less than 1000 unicode
+           characters.) to type "metadata_value" (A metadata value, represented
+           by a mapping of value keys to primitive values. An example for a
+           location metadata key might be: { "name": "Castle Geyser", "lat":
+           44.463816, "long": -110.836471 } "primitive values" means an int,
+           float, string, or equivalent typedefs. Including any collection types
+           is an error.) -> mapping from type "metadata_value_key" (A key for a
+           value associated with a piece of metadata. Less than 1000 unicode
+           characters. Examples: units, value, species) to unspecified object,
+           parameter "removed" of type "metadata" (Metadata attached to a
+           sample.) -> mapping from type "metadata_key" (A key in a metadata
+           key/value pair. Less than 1000 unicode characters.) to type
+           "metadata_value" (A metadata value, represented by a mapping of value
+           keys to primitive values. An example for a location metadata key might
+           be: { "name": "Castle Geyser", "lat": 44.463816, "long": -110.836471 }
+           "primitive values" means an int, float, string, or equivalent
+           typedefs. Including any collection types is an error.) -> mapping from
+           type "metadata_value_key" (A key for a value associated with a piece
+           of metadata. Less than 1000 unicode characters. Examples: units,
+           value, species) to unspecified object, parameter "changed" of mapping
+           from type "metadata_key" (A key in a metadata key/value pair. Less
+           than 1000 unicode characters.) to type "MetadataValueChange" (A change
+           in a metadata value. old - the value in the old version. new - the
+           value in the new version.) -> structure: parameter "old" of type
+           "metadata_value" (A metadata value, represented by a mapping of value
+           keys to primitive values. An example for a location metadata key might
+           be: { "name": "Castle Geyser", "lat": 44.463816, "long": -110.836471 }
+           "primitive values" means an int, float, string, or equivalent
+           typedefs. Including any collection types is an error.) -> mapping from
+           type "metadata_value_key" (A key for a value associated with a piece
+           of metadata. Less than 1000 unicode characters. Examples: units,
+           value, species) to unspecified object, parameter "new" of type
+           "metadata_value" (A metadata value, represented by a mapping of value
+           keys to primitive values. An example for a location metadata key might
+           be: { "name": "Castle Geyser", "lat": 44.463816, "long": -110.836471 }
+           "primitive values" means an int, float, string, or equivalent
+           typedefs. Including any collection types is an error.) -> mapping from
+           type "metadata_value_key" (A key for a value associated with a piece
+           of metadata. Less than 1000 unicode characters. Examples: units,
+           value, species) to unspecified object, parameter "source_meta" of type
+           "SourceMetadataDiff" (The differences between two versions of a node's
+           source metadata, keyed by the metadata key. added - the source
+           metadata only present in the new version. removed - the source
+           metadata only present in the old version. changed - the source
+           metadata present in both versions that differs.) -> structure:
+           parameter "added" of mapping from type "metadata_key" (A key in a
+           metadata key/value pair. Less than 1000 unicode characters.) to type
+           "SourceMetadata" (Information about a metadata key as it appeared at
+           the data source. The source key and value represents the original
+           state of the metadata before it was tranformed for ingestion by the
+           sample service. key - the metadata key. skey - the key as it appeared
+           at the data source. svalue - the value as it appeared at the data
+           source.) -> structure: parameter "key" of type "metadata_key" (A key
+           in a metadata key/value pair. Less than 1000 unicode characters.),
+           parameter "skey" of type "metadata_key" (A key in a metadata key/value
+           pair. Less than 1000 unicode characters.), parameter "svalue" of type
+           "metadata_value" (A metadata value, represented by a mapping of value
+           keys to primitive values. An example for a location metadata key might
+           be: { "name": "Castle Geyser", "lat": 44.463816, "long": -110.836471 }
+           "primitive values" means an int, float, string, or equivalent
+           typedefs. Including any collection types is an error.) -> mapping from
+           type "metadata_value_key" (A key for a value associated with a piece
+           of metadata. Less than 1000 unicode characters. Examples: units,
+           value, species) to unspecified object, parameter "removed" of mapping
+           from type "metadata_key" (A key in a metadata key/value pair. Less
+           than 1000 unicode characters.) to type "SourceMetadata" (Information
+           about a metadata key as it appeared at the data source. The source key
+           and value represents the original state of the metadata before it was
+           tranformed for ingestion by the sample service. key - the metadata
+           key. skey - the key as it appeared at the data source. svalue - the
+           value as it appeared at the data source.) -> structure: parameter
+           "key" of type "metadata_key" (A key in a metadata key/value pair. Less
+           than 1000 unicode characters.), parameter "skey" of type
+           "metadata_key" (A key in a metadata key/value pair. Less than 1000
+           unicode characters.), parameter "svalue" of type "metadata_value" (A
+           metadata value, represented by a mapping of value keys to primitive
+           values. An example for a location metadata key might be: { "name":
+           "Castle Geyser", "lat": 44.463816, "long": -110.836471 } "primitive
+           values" means an int, float, string, or equivalent typedefs. Including
+           any collection types is an error.) -> mapping from type
+           "metadata_value_key" (A key for a value associated with a piece of
+           metadata. Less than 1000 unicode characters. Examples: units, value,
+           species) to unspecified object, parameter "changed" of mapping from
+           type "metadata_key" (A key in a metadata key/value pair. Less than
+           1000 unicode characters.) to type "SourceMetadataChange" (A change in
+           source metadata. old - the source metadata in the old version. new -
+           the source metadata in the new version.) -> structure: parameter "old"
+           of type "SourceMetadata" (Information about a metadata key as it
+           appeared at the data source. The source key and value represents the
+           original state of the metadata before it was tranformed for ingestion
+           by the sample service. key - the metadata key. skey - the key as it
+           appeared at the data source. svalue - the value as it appeared at the
+           data source.) -> structure: parameter "key" of type "metadata_key" (A
+           key in a metadata key/value pair. Less than 1000 unicode characters.),
+           parameter "skey" of type "metadata_key" (A key in a metadata key/value
+           pair. Less than 1000 unicode characters.), parameter "svalue" of type
+           "metadata_value" (A metadata value, represented by a mapping of value
+           keys to primitive values. An example for a location metadata key might
+           be: { "name": "Castle Geyser", "lat": 44.463816, "long": -110.836471 }
+           "primitive values" means an int, float, string, or equivalent
+           typedefs. Including any collection types is an error.) -> mapping from
+           type "metadata_value_key" (A key for a value associated with a piece
+           of metadata. Less than 1000 unicode characters. Examples: units,
+           value, species) to unspecified object, parameter "new" of type
+           "SourceMetadata" (Information about a metadata key as it appeared at
+           the data source. The source key and value represents the original
+           state of the metadata before it was tranformed for ingestion by the
+           sample service. key - the metadata key. skey - the key as it appeared
+           at the data source. svalue - the value as it appeared at the data
+           source.) -> structure: parameter "key" of type "metadata_key" (A key
+           in a metadata key/value pair. Less than 1000 unicode characters.),
+           parameter "skey" of type "metadata_key" (A key in a metadata key/value
+           pair. Less than 1000 unicode characters.), parameter "svalue" of type
+           "metadata_value" (A metadata value, represented by a mapping of value
+           keys to primitive values. An example for a location metadata key might
+           be: { "name": "Castle Geyser", "lat": 44.463816, "long": -110.836471 }
+           "primitive values" means an int, float, string, or equivalent
+           typedefs. Including any collection types is an error.) -> mapping from
+           type "metadata_value_key" (A key for a value associated with a piece
+           of metadata. Less than 1000 unicode characters. Examples: units,
+           value, species) to unspecified object
+        """
+        return self._client.call_method('SampleService.get_sample_diff',
+                                        [params], self._service_ver, context)
+
+    def get_data_links_from_data_bulk(self, params, context=None):
+        """
+        Get data links to samples originating from many Workspace objects at once. If the links
+        for an object cannot be retrieved, an error is returned for that object rather than
+        failing the entire request.
+                The user must have read permissions to the workspace data.
+        :param params: instance of type "GetDataLinksFromDataBulkParams"
+           (get_data_links_from_data_bulk parameters. upas - the data UPAs. At
+           most 1000 UPAs may be requested. effective_time - the effective time
+           at which the query should be run - the default is the current time.
+           Providing a time allows for reproducibility of previous results.
+           as_admin - run the method as a service administrator. The user must
+           have read administration permissions.) -> structure: parameter "upas"
+           of list of type "ws_upa" (A KBase Workspace service Unique Permanent
+           Address (UPA). E.g. 5/6/7 where 5 is the workspace ID, 6 the object
+           ID, and 7 the object version.), parameter "effective_time" of type
+           "timestamp" (A timestamp in epoch milliseconds.), parameter "as_admin"
+           of type "boolean" (A boolean value, 0 for false, 1 for true.)
+        :returns: instance of type "GetDataLinksFromDataBulkResults"
+           (get_data_links_from_data_bulk results. results - the results, in the
+           same order as the UPAs in the input parameters. effective_time - the
+           time at which the query was run. This timestamp, if saved, can be used
+           when running the method again to ensure reproducible results.) ->
+           structure: parameter "results" of list of type
+           "GetDataLinksFromDataBulkResult" (The result of retrieving the links
+           for one UPA from get_data_links_from_data_bulk. upa - the data UPA.
+           links - the links, sorted by the time the link was created and then by
+           link ID, if they could be retrieved. error - the reason the links
+           could not be retrieved, if they could not, including the error code.
+           For example, the data may not exist or the user may not have read
+           access to the data.) -> structure: parameter "upa" of type "ws_upa" (A
+           KBase Workspace service Unique Permanent Address (UPA). E.g. 5/6/7
+           where 5 is the workspace ID, 6 the object ID, and 7 the object
+           version.), parameter "links" of list of type "DataLink" (A data link
+           from a KBase workspace object to a sample. upa - the workspace UPA of
+           the linked object. dataid - the dataid of the linked data, if any,
+           within the object. If omitted the entire object is linked to the
+           sample. id - the sample id. version - the sample version. node - the
+           sample node. createdby - the user that created the link. created - the
+           time the link was created. expiredby - the user that expired the link,
+           if any. expired - the time the link was expired, if at all.) ->
+           structure: parameter "linkid" of type "link_id" (A link ID. Must be
+           globally unique. Always assigned by the Sample service. Typically only
+           of use to service admins.), parameter "upa" of type "ws_upa" (A KBase
+           Workspace service Unique Permanent Address (UPA). E.g. 5/6/7 where 5
+           is the workspace ID, 6 the object ID, and 7 the object version.),
+           parameter "dataid" of type "data_id" (An id for a unit of data within
+           a KBase Workspace object. A single object may contain many data units.
+           A dataid is expected to be unique within a single object. Must be less
+           than 255 characters.), parameter "id" of type "sample_id" (A Sample
+           ID. Must be globally unique. Always assigned by the Sample service.),
+           parameter "version" of type "version" (The version of a sample. Always
+           > 0.), parameter "node" of type "node_id" (A SampleNode ID. Must be
+           unique within a Sample and be less than 255 characters.), parameter
+           "createdby" of type "user" (A user's username.), parameter "created"
+           of type "timestamp" (A timestamp in epoch milliseconds.), parameter
+           "expiredby" of type "user" (A user's username.), parameter "expired"
+           of type "timestamp" (A timestamp in epoch milliseconds.), parameter
+           "error" of String, parameter "effective_time" of type "timestamp" (A
+           timestamp in epoch milliseconds.)
+        """
+        return self._client.call_method('SampleService.get_data_links_from_data_bulk',
+                                        [params], self._service_ver, context)
+
     def status(self, context=None):
         return self._client.call_method('SampleService.status',
                                         [], self._service_ver, context)
@@ -392,6 +392,50 @@ class Application(object):
                              name='SampleService.get_data_link',
                              types=[dict])
         self.method_authentication['SampleService.get_data_link'] = 'required'  # noqa
+        self.rpc_service.add(impl_SampleService.get_samples,
+                             name='SampleService.get_samples',
+                             types=[dict])
+        self.method_authentication['SampleService.get_samples'] = 'optional'  # noqa
+        self.rpc_service.add(impl_SampleService.create_samples,
+                             name='SampleService.create_samples',
+                             types=[dict])
+        self.method_authentication['SampleService.create_samples'] = 'required'  # noqa
+        self.rpc_service.add(impl_SampleService.create_data_links,
+                             name='SampleService.create_data_links',
+                             types=[dict])
+        self.method_authentication['SampleService.create_data_links'] = 'required'  # noqa
+        self.rpc_service.add(impl_SampleService.expire_data_links,
+                             name='SampleService.expire_data_links',
+                             types=[dict])
+        self.method_authentication['SampleService.expire_data_links'] = 'required'  # noqa
+        self.rpc_service.add(impl_SampleService.search_samples,
+                             name='SampleService.search_samples',
+                             types=[dict])
+        self.method_authentication['SampleService.search_samples'] = 'optional'  # noqa
+        self.rpc_service.add(impl_SampleService.search_samples_by_text,
+                             name='SampleService.search_samples_by_text',
+                             types=[dict])
+        self.method_authentication['SampleService.search_samples_by_text'] = 'optional'  # noqa
+        self.rpc_service.add(impl_SampleService.search_samples_by_location,
+                             name='SampleService.search_samples_by_location',
+                             types=[dict])
+        self.method_authentication['SampleService.search_samples_by_location'] = 'optional'  # noqa
+        self.rpc_service.add(impl_SampleService.list_samples,
+                             name='SampleService.list_samples',
+                             types=[dict])
+        self.method_authentication['SampleService.list_samples'] = 'optional'  # noqa
+        self.rpc_service.add(impl_SampleService.get_metadata_facets,
+                             name='SampleService.get_metadata_facets',
+                             types=[dict])
+        self.method_authentication['SampleService.get_metadata_facets'] = 'optional'  # noqa
+        self.rpc_service.add(impl_SampleService.get_sample_diff,
+                             name='SampleService.get_sample_diff',
+                             types=[dict])
+        self.method_authentication['SampleService.get_sample_diff'] = 'optional'  # noqa
+        self.rpc_service.add(impl_SampleService.get_data_links_from_data_bulk,
+                             name='SampleService.get_data_links_from_data_bulk',
+                             types=[dict])
+        self.method_authentication['SampleService.get_data_links_from_data_bulk'] = 'optional'  # noqa
         self.rpc_service.add(impl_SampleService.status,
                              name='SampleService.status',
                              types=[dict])
@@ -3,8 +3,10 @@ Contains helper functions for translating between the SDK API and the core Sampl
 '''
 
 
+import base64 as _base64
+import json as _json
 from uuid import UUID
-from typing import Dict, Any, Optional, Tuple, List, Callable, cast as _cast
+from typing import Dict, Any, Optional, Tuple, List, Callable, Union, cast as _cast
 import datetime
 
 from SampleService.core.core_types import PrimitiveType
@@ -17,19 +19,23 @@ from SampleService.core.sample import (
     SubSampleType as _SubSampleType,
     SourceMetadata as _SourceMetadata,
 )
+from SampleService.core.sample_diff import MetadataDiff, SampleDiff
 from SampleService.core.acls import SampleACLOwnerless, SampleACL, AdminPermission, SampleACLDelta
 from SampleService.core.user_lookup import KBaseUserLookup
 from SampleService.core.arg_checkers import (
     not_falsy as _not_falsy,
     not_falsy_in_iterable as _not_falsy_in_iterable,
-    check_string as _check_string
+    check_string as _check_string,
+    check_timestamp as _check_timestamp,
 )
 from SampleService.core.data_link import DataLink
+from SampleService.core.search import LocationCondition, MetadataCondition
 from SampleService.core.errors import (
     IllegalParameterError as _IllegalParameterError,
     MissingParameterError as _MissingParameterError,
     UnauthorizedError as _UnauthorizedError,
-    NoSuchUserError as _NoSuchUserError
+    NoSuchUserError as _NoSuchUserError,
+    SampleError,
 )
 from SampleService.core.user import UserID
 from SampleService.core.workspace import DataUnitID, UPA
@@ -37,6 +43,14 @@ from SampleService.core.workspace import DataUnitID, UPA
 ID = 'id'
 ''' The ID of a sample. '''
 
+_MAX_LINK_PAGE_SIZE = 10000
+_MAX_SEARCH_PAGE_SIZE = 10000
+_DEFAULT_SEARCH_PAGE_SIZE = 1000
+_MAX_SEARCH_TEXT_LEN = 1000
+_MAX_FACET_LIMIT = 1000
+_DEFAULT_FACET_LIMIT = 100
+_MAX_FACET_KEY_LEN = 256
+
 
 def get_user_from_object(params: Dict[str, Any], key: str) -> Optional[UserID]:
     '''
@@ -153,6 +167,44 @@ def create_sample_params(params: Dict[str, Any]) -> Tuple[Sample, Optional[UUID]
     if type(params.get('sample')) != dict:
         raise _IllegalParameterError('params must contain sample key that maps to a structure')
     s = params['sample']
+    id_ = get_id_from_object(s, ID, name='sample.id')
+
+    pv = params.get('prior_version')
+    if pv is not None and type(pv) != int:
+        raise _IllegalParameterError('prior_version must be an integer if supplied')
+    return (_sample_from_dict(s), id_, pv)
+
+
+def create_samples_params(params: Dict[str, Any]) -> List[Sample]:
+    '''
+    Process the input from the create_samples API call and translate it into standard types.
+
+    :param params: The unmarshalled JSON recieved from the API as part of the create_samples
+        call.
+    :returns: the samples to save.
+    :raises MissingParameterError: if a sample has no nodes.
+    :raises IllegalParameterError: if any of the arguments are illegal.
+    '''
+    _check_params(params)
+    if type(params.get('samples')) != list:
+        raise _IllegalParameterError('params must contain samples key that maps to a list')
+    ret = []
+    for i, s in enumerate(params['samples']):
+        if type(s) != dict:
+            raise _IllegalParameterError(f'Sample at index {i} is not a structure')
+        if s.get(ID) is not None:
+            raise _IllegalParameterError(
+                f'Sample at index {i} has an ID. Only new samples may be created in bulk')
+        try:
+            ret.append(_sample_from_dict(s))
+        except _MissingParameterError as e:
+            raise _MissingParameterError(f'Sample at index {i}: {e.message}') from e
+        except _IllegalParameterError as e:
+            raise _IllegalParameterError(f'Sample at index {i}: {e.message}') from e
+    return ret
+
+
+def _sample_from_dict(s: Dict[str, Any]) -> Sample:
     if type(s.get('node_tree')) != list:
         raise _IllegalParameterError('sample node tree must be present and a list')
     if s.get('name') is not None and type(s.get('name')) != str:
@@ -181,14 +233,7 @@ def create_sample_params(params: Dict[str, Any]) -> Tuple[Sample, Optional[UUID]
         except _IllegalParameterError as e:
             raise _IllegalParameterError(
                 f'Error for node at index {i}: ' + _cast(str, e.message)) from e
-
-    id_ = get_id_from_object(s, ID, name='sample.id')
-
-    pv = params.get('prior_version')
-    if pv is not None and type(pv) != int:
-        raise _IllegalParameterError('prior_version must be an integer if supplied')
-    s = Sample(nodes, s.get('name'))
-    return (s, id_, pv)
+    return Sample(nodes, s.get('name'))
 
 
 def _check_meta(m, index, name) -> Optional[Dict[str, Dict[str, PrimitiveType]]]:
@@ -260,22 +305,25 @@ def _check_params(params):
     return params
 
 
-def get_version_from_object(params: Dict[str, Any], required: bool = False) -> Optional[int]:
+def get_version_from_object(
+        params: Dict[str, Any], required: bool = False, key: str = 'version') -> Optional[int]:
     '''
-    Given a dict, get a sample version from the dict if it exists, using the key 'version'.
+    Given a dict, get a sample version from the dict if it exists, using the key 'version' by
+    default.
 
     :param params: the unmarshalled JSON recieved from the API as part of the API call.
     :param required: if True, throw and exception if the version is not supplied.
+    :param key: the key in the dict where the version is stored.
     :returns: the version or None if no version was provided.
     :raises MissingParameterError: if the version is required and not present.
     :raises IllegalParameterError: if the version is not an integer or < 1.
     '''
     _check_params(params)
-    ver = params.get('version')
+    ver = params.get(key)
     if ver is None and required:
-        raise _MissingParameterError('version')
+        raise _MissingParameterError(key)
     if ver is not None and (type(ver) != int or ver < 1):
-        raise _IllegalParameterError(f'Illegal version argument: {ver}')
+        raise _IllegalParameterError(f'Illegal {key} argument: {ver}')
     return ver
 
 
@@ -296,6 +344,37 @@ def get_sample_address_from_object(
             get_version_from_object(params, version_required))
 
 
+def get_sample_addresses_from_object(params: Dict[str, Any]) -> List[Tuple[UUID, Optional[int]]]:
+    '''
+    Given a dict, get a list of sample IDs and versions from the dict. The list is expected
+    under the key 'samples', and each entry in the list is a dict with the keys 'id' and
+    'version'. The sample ID is required but the version is not.
+
+    :param params: the unmarshalled JSON recieved from the API as part of the API call.
+    :returns: a list of tuples containing the ID and the version or None if no version was
+        provided.
+    :raises MissingParameterError: if the list or an ID is missing.
+    :raises IllegalParameterError: if the list is not a list, an entry is not a dict, an ID is
+        malformed or a version is not an integer or < 1.
+    '''
+    samples = _check_params(params).get('samples')
+    if not samples:
+        raise _MissingParameterError('samples')
+    if type(samples) != list:
+        raise _IllegalParameterError('samples must be a list')
+    ret = []
+    for i, s in enumerate(samples):
+        if type(s) != dict:
+            raise _IllegalParameterError(f'Sample address at index {i} is not a structure')
+        try:
+            ret.append(get_sample_address_from_object(s))
+        except _MissingParameterError as e:
+            raise _MissingParameterError(f'Sample address at index {i}: {e.message}') from e
+        except _IllegalParameterError as e:
+            raise _IllegalParameterError(f'Sample address at index {i}: {e.message}') from e
+    return ret
+
+
 def sample_to_dict(sample: SavedSample) -> Dict[str, Any]:
     '''
     Convert a sample to a JSONable structure to return to the SDK API.
@@ -303,14 +382,7 @@ def sample_to_dict(sample: SavedSample) -> Dict[str, Any]:
     :param sample: The sample to convert.
     :return: The sample as a dict.
     '''
-    nodes = [{ID: n.name,
-              'type': n.type.value,
-              'parent': n.parent,
-              'meta_controlled': _unfreeze_meta(n.controlled_metadata),
-              'meta_user': _unfreeze_meta(n.user_metadata),
-              'source_meta': _source_meta_to_list(n.source_metadata)
-              }
-             for n in _not_falsy(sample, 'sample').nodes]
+    nodes = [_node_to_dict(n) for n in _not_falsy(sample, 'sample').nodes]
     return {ID: str(sample.id),
             'user': sample.user.id,
             'name': sample.name,
@@ -320,6 +392,85 @@ def sample_to_dict(sample: SavedSample) -> Dict[str, Any]:
             }
 
 
+def _node_to_dict(n: _SampleNode) -> Dict[str, Any]:
+    return {ID: n.name,
+            'type': n.type.value,
+            'parent': n.parent,
+            'meta_controlled': _unfreeze_meta(n.controlled_metadata),
+            'meta_user': _unfreeze_meta(n.user_metadata),
+            'source_meta': _source_meta_to_list(n.source_metadata)
+            }
+
+
+def get_sample_diff_params(params: Dict[str, Any]) -> Tuple[UUID, int, int]:
+    '''
+    Process the input from the get_sample_diff API call and translate it into standard types.
+
+    The sample ID is expected in the key 'id' and the two versions to compare in the keys
+    'version_a' and 'version_b'.
+
+    :param params: The unmarshalled JSON recieved from the API as part of the get_sample_diff
+        call.
+    :returns: a tuple consisting of the sample ID, the old version, and the new version.
+    :raises MissingParameterError: if any of the arguments are missing.
+    :raises IllegalParameterError: if the ID is malformed or a version is not an integer or < 1.
+    '''
+    _check_params(params)
+    id_ = _cast(UUID, get_id_from_object(params, ID, required=True))
+    vera = _cast(int, get_version_from_object(params, required=True, key='version_a'))
+    verb = _cast(int, get_version_from_object(params, required=True, key='version_b'))
+    return id_, vera, verb
+
+
+def sample_diff_to_dict(diff: SampleDiff) -> Dict[str, Any]:
+    '''
+    Convert the differences between two versions of a sample to a JSONable structure to return
+    to the SDK API.
+
+    :param diff: the differences to convert.
+    :returns: the differences as a dict.
+    '''
+    _not_falsy(diff, 'diff')
+    changed = []
+    for nd in diff.changed_nodes:
+        d: Dict[str, Any] = {ID: nd.name}
+        if nd.type:
+            d['type'] = {'old': nd.type[0].value, 'new': nd.type[1].value}
+        if nd.parent:
+            d['parent'] = {'old': nd.parent[0], 'new': nd.parent[1]}
+        d['meta_controlled'] = _meta_diff_to_dict(nd.controlled_metadata, dict)
+        d['meta_user'] = _meta_diff_to_dict(nd.user_metadata, dict)
+        d['source_meta'] = _meta_diff_to_dict(nd.source_metadata, _source_meta_to_dict)
+        changed.append(d)
+    return {'added_nodes': [_node_to_dict(n) for n in diff.added_nodes],
+            'removed_nodes': list(diff.removed_nodes),
+            'changed_nodes': changed,
+            }
+
+
+def _meta_diff_to_dict(md: MetadataDiff, conv: Callable[[Any], Any]) -> Dict[str, Any]:
+    return {'added': {k: conv(v) for k, v in md.added.items()},
+            'removed': {k: conv(v) for k, v in md.removed.items()},
+            'changed': {k: {'old': conv(o), 'new': conv(n)} for k, (o, n) in md.changed.items()}
+            }
+
+
+def sample_results_to_dicts(results: List[Union[SavedSample, SampleError]]
+                            ) -> List[Dict[str, Any]]:
+    '''
+    Convert a list of samples or errors, as returned from a bulk sample retrieval, to a JSONable
+    structure to return to the SDK API.
+
+    :param results: the samples or errors.
+    :returns: a list of dicts, each with a 'sample' key and an 'error' key. One of the two
+        values will be None.
+    '''
+    return [{'sample': sample_to_dict(r), 'error': None} if isinstance(r, SavedSample)
+            else {'sample': None, 'error': str(r)}
+            for r in _cast(List[Union[SavedSample, SampleError]],
+                           _not_falsy_in_iterable(results, 'results'))]
+
+
 def _unfreeze_meta(m):
     ret = {}
     for k in m:
@@ -328,7 +479,11 @@ def _unfreeze_meta(m):
 
 
 def _source_meta_to_list(m):
-    return [{'key': sm.key, 'skey': sm.sourcekey, 'svalue': dict(sm.sourcevalue)} for sm in m]
+    return [_source_meta_to_dict(sm) for sm in m]
+
+
+def _source_meta_to_dict(sm: _SourceMetadata):
+    return {'key': sm.key, 'skey': sm.sourcekey, 'svalue': dict(sm.sourcevalue)}
 
 
 def acls_to_dict(acls: SampleACL) -> Dict[str, Any]:
@@ -520,6 +675,78 @@ def create_data_link_params(params: Dict[str, Any]) -> Tuple[DataUnitID, SampleN
     return (duid, sna, bool(params.get('update')))
 
 
+def create_data_links_params(params: Dict[str, Any]
+                             ) -> Tuple[List[Tuple[DataUnitID, SampleNodeAddress]], bool]:
+    '''
+    Given a dict, extract the parameters for creating many data links at once.
+
+    Expected keys:
+    links - a list of dicts, each with the keys id, version, node, upa, and dataid as for
+        create_data_link_params(). Any update key in the dicts is ignored.
+    update - whether the links should be updated
+
+    :param params: the parameters.
+    :returns: a tuple consisting of:
+        1) A list of tuples of the data unit ID and sample node that are the targets of each link,
+        2) A boolean that indicates whether the links should be updated if they already exist.
+    :raises MissingParameterError: if any of the required arguments are missing.
+    :raises IllegalParameterError: if any of the arguments are illegal.
+    '''
+    _check_params(params)
+    if type(params.get('links')) != list:
+        raise _IllegalParameterError('params must contain links key that maps to a list')
+    ret = []
+    for i, link in enumerate(params['links']):
+        if type(link) != dict:
+            raise _IllegalParameterError(f'Link at index {i} is not a structure')
+        try:
+            duid, sna, _ = create_data_link_params(link)
+        except _MissingParameterError as e:
+            raise _MissingParameterError(f'Link at index {i}: {e.message}') from e
+        except _IllegalParameterError as e:
+            raise _IllegalParameterError(f'Link at index {i}: {e.message}') from e
+        ret.append((duid, sna))
+    return (ret, bool(params.get('update')))
+
+
+def expire_data_links_params(
+        params: Dict[str, Any]
+        ) -> Tuple[Optional[UPA], Optional[_SampleAddress], Optional[List[UUID]]]:
+    '''
+    Given a dict, extract the parameters for expiring many data links at once. Exactly one of
+    the selectors must be provided.
+
+    Expected keys:
+    upa - workspace object UPA, to expire all the links from the object.
+    id and version - sample id and version, to expire all the links from the sample version.
+    link_ids - a list of link IDs, to expire the specified links.
+
+    :param params: the parameters.
+    :returns: a tuple consisting of the UPA, the sample address, and the link IDs. Exactly one
+        of the three entries will be present.
+    :raises MissingParameterError: if the sample version is missing.
+    :raises IllegalParameterError: if any of the arguments are illegal or if zero or more than one
+        selector is provided.
+    '''
+    _check_params(params)
+    selectors = [k for k in ('upa', ID, 'link_ids') if params.get(k) is not None]
+    if len(selectors) != 1:
+        raise _IllegalParameterError('Exactly one of upa, id, or link_ids must be provided')
+    if selectors[0] == 'upa':
+        return (get_upa_from_object(params), None, None)
+    if selectors[0] == ID:
+        sa = _SampleAddress(
+            _cast(UUID, get_id_from_object(params, ID, required=True)),
+            _cast(int, get_version_from_object(params, required=True)))
+        return (None, sa, None)
+    if type(params['link_ids']) != list:
+        raise _IllegalParameterError('link_ids must be a list')
+    ids = [_cast(UUID, get_id_from_object(
+                {ID: lid}, ID, name=f'Link ID at index {i}', required=True))
+           for i, lid in enumerate(params['link_ids'])]
+    return (None, None, ids)
+
+
 def get_data_unit_id_from_object(params: Dict[str, Any]) -> DataUnitID:
     '''
     Get a Data Unit ID from a parameter object. Expects an UPA in the key 'upa' and a data unit
@@ -547,6 +774,31 @@ def get_upa_from_object(params: Dict[str, Any]) -> UPA:
     return UPA(_cast(str, _check_string_int(params, 'upa', True)))
 
 
+def get_upas_from_object(params: Dict[str, Any]) -> List[UPA]:
+    '''
+    Get a list of UPAs from a parameter object. Expects the UPAs in the key 'upas'.
+
+    :param params: the parameters.
+    :returns: the UPAs.
+    :raises MissingParameterError: if the UPAs are missing.
+    :raises IllegalParameterError: if the UPAs are not a list or any UPA is illegal.
+    '''
+    upas = _check_params(params).get('upas')
+    if not upas:
+        raise _MissingParameterError('upas')
+    if type(upas) != list:
+        raise _IllegalParameterError('upas must be a list')
+    ret = []
+    for i, upa in enumerate(upas):
+        if type(upa) != str:
+            raise _IllegalParameterError(f'UPA at index {i} is not a string')
+        try:
+            ret.append(UPA(upa))
+        except _IllegalParameterError as e:
+            raise _IllegalParameterError(f'UPA at index {i}: {e.message}') from e
+    return ret
+
+
 def _check_string_int(params: Dict[str, Any], key: str, required=False) -> Optional[str]:
     v = params.get(key)
     if v is None:
@@ -582,3 +834,389 @@ def links_to_dicts(links: List[DataLink]) -> List[Dict[str, Any]]:
             'expired': ex
         })
     return ret
+
+
+def get_link_paging_from_object(
+        params: Dict[str, Any],
+        effective_time: Optional[datetime.datetime]
+        ) -> Tuple[Optional[datetime.datetime],
+                   Optional[int],
+                   Optional[Tuple[datetime.datetime, UUID]]]:
+    '''
+    Get link paging parameters from a parameter object. Expects an optional page size in the key
+    'page_size' and an optional continuation token, as created by
+    create_link_continuation_token, in the key 'continuation_token'.
+
+    The continuation token contains the effective time of the first query so that all the pages
+    are retrieved at the same effective time.
+
+    :param params: the parameters.
+    :param effective_time: the effective time provided in the parameters, if any.
+    :returns: a tuple consisting of the effective time to use for the query, the page size, and
+        the created time and ID of the last link on the previous page.
+    :raises IllegalParameterError: if the page size or continuation token is illegal, or the
+        effective time does not match the effective time in the continuation token.
+    '''
+    _check_params(params)
+    page_size = params.get('page_size')
+    if page_size is not None and (
+            type(page_size) != int or not 0 < page_size <= _MAX_LINK_PAGE_SIZE):
+        raise _IllegalParameterError(
+            f'page_size must be an integer from 1 to {_MAX_LINK_PAGE_SIZE}')
+    token = params.get('continuation_token')
+    if token is None:
+        return effective_time, page_size, None
+    if type(token) != str:
+        raise _IllegalParameterError('continuation_token must be a string')
+    try:
+        ts, created, lid = _json.loads(_base64.urlsafe_b64decode(token.encode()))
+        ts = datetime.datetime.fromtimestamp(ts, tz=datetime.timezone.utc)
+        created = datetime.datetime.fromtimestamp(created, tz=datetime.timezone.utc)
+        lid = UUID(lid)
+    except Exception as e:
+        raise _IllegalParameterError(f'Invalid continuation_token: {token}') from e
+    if effective_time and (
+            datetime_to_epochmilliseconds(effective_time) != datetime_to_epochmilliseconds(ts)):
+        raise _IllegalParameterError(
+            'effective_time does not match the effective time in the continuation_token')
+    return ts, page_size, (created, lid)
+
+
+def create_link_continuation_token(
+        effective_time: datetime.datetime,
+        links: List[DataLink],
+        page_size: Optional[int]) -> Optional[str]:
+    '''
+    Create an opaque continuation token for retrieving the next page of links.
+
+    :param effective_time: the effective time of the query.
+    :param links: the links returned by the query.
+    :param page_size: the page size of the query, if any.
+    :returns: the token, or None if the page was not full and therefore there are no more links.
+    '''
+    _check_timestamp(effective_time, 'effective_time')
+    if not page_size or len(links) < page_size:
+        return None
+    last = links[-1]
+    token = _json.dumps([effective_time.timestamp(), last.created.timestamp(), str(last.id)])
+    return _base64.urlsafe_b64encode(token.encode()).decode()
+
+
+def search_samples_params(
+        params: Dict[str, Any]
+        ) -> Tuple[List[MetadataCondition], int, Optional[_SampleAddress]]:
+    '''
+    Process the input from the search_samples API call and translate it into standard types.
+
+    The conditions are expected under the key 'conditions'. Each condition is a dict with the
+    keys 'key', an optional 'value_key' that defaults to 'value', and one of 'equals', 'prefix',
+    or 'min' and / or 'max' with optional 'units'. An optional page size is expected in the key
+    'page_size' and an optional continuation token, as created by
+    create_search_continuation_token, in the key 'continuation_token'.
+
+    :param params: The unmarshalled JSON recieved from the API as part of the search_samples
+        call.
+    :returns: a tuple consisting of the conditions, the page size, and the address of the last
+        sample version on the previous page.
+    :raises MissingParameterError: if the conditions or a condition key is missing.
+    :raises IllegalParameterError: if any of the arguments are illegal.
+    '''
+    _check_params(params)
+    conditions = params.get('conditions')
+    if not conditions:
+        raise _MissingParameterError('conditions')
+    conds = _get_metadata_conditions(conditions)
+    return conds, _get_search_page_size(params), _get_search_after(params)
+
+
+def _get_metadata_conditions(conditions: Any) -> List[MetadataCondition]:
+    if type(conditions) != list:
+        raise _IllegalParameterError('conditions must be a list')
+    conds = []
+    for i, c in enumerate(conditions):
+        if type(c) != dict:
+            raise _IllegalParameterError(f'Condition at index {i} is not a structure')
+        try:
+            conds.append(MetadataCondition(
+                _cast(str, c.get('key')),
+                c.get('value_key', 'value'),
+                c.get('equals'),
+                c.get('min'),
+                c.get('max'),
+                c.get('prefix'),
+                c.get('units')))
+        except _MissingParameterError as e:
+            raise _MissingParameterError(f'Condition at index {i}: {e.message}') from e
+        except _IllegalParameterError as e:
+            raise _IllegalParameterError(f'Condition at index {i}: {e.message}') from e
+    return conds
+
+
+def _get_search_page_size(params: Dict[str, Any]) -> int:
+    page_size = params.get('page_size')
+    if page_size is None:
+        return _DEFAULT_SEARCH_PAGE_SIZE
+    if type(page_size) != int or not 0 < page_size <= _MAX_SEARCH_PAGE_SIZE:
+        raise _IllegalParameterError(
+            f'page_size must be an integer from 1 to {_MAX_SEARCH_PAGE_SIZE}')
+    return page_size
+
+
+def _get_continuation_token(params: Dict[str, Any]) -> Optional[str]:
+    token = params.get('continuation_token')
+    if token is not None and type(token) != str:
+        raise _IllegalParameterError('continuation_token must be a string')
+    return token
+
+
+def _get_search_after(params: Dict[str, Any]) -> Optional[_SampleAddress]:
+    # parses a token created by create_search_continuation_token
+    token = _get_continuation_token(params)
+    if token is None:
+        return None
+    try:
+        id_, ver = _json.loads(_base64.urlsafe_b64decode(token.encode()))
+        return _SampleAddress(UUID(id_), ver)
+    except Exception as e:
+        raise _IllegalParameterError(f'Invalid continuation_token: {token}') from e
+
+
+def create_search_continuation_token(
+        addresses: List[_SampleAddress], page_size: int) -> Optional[str]:
+    '''
+    Create an opaque continuation token for retrieving the next page of search results.
+
+    :param addresses: the sample versions returned by the search.
+    :param page_size: the page size of the search.
+    :returns: the token, or None if the page was not full and therefore there are no more
+        results.
+    '''
+    _not_falsy_in_iterable(addresses, 'addresses')
+    if len(addresses) < page_size:
+        return None
+    last = addresses[-1]
+    token = _json.dumps([str(last.sampleid), last.version])
+    return _base64.urlsafe_b64encode(token.encode()).decode()
+
+
+def search_samples_by_text_params(
+        params: Dict[str, Any]
+        ) -> Tuple[str, int, Optional[Tuple[int, _SampleAddress]]]:
+    '''
+    Process the input from the search_samples_by_text API call and translate it into standard
+    types.
+
+    The search text is expected under the key 'text'. An optional page size is expected in the
+    key 'page_size' and an optional continuation token, as created by
+    create_text_search_continuation_token, in the key 'continuation_token'.
+
+    :param params: The unmarshalled JSON recieved from the API as part of the
+        search_samples_by_text call.
+    :returns: a tuple consisting of the search text, the page size, and the score and address
+        of the last sample version on the previous page.
+    :raises MissingParameterError: if the text is missing.
+    :raises IllegalParameterError: if any of the arguments are illegal.
+    '''
+    _check_params(params)
+    text = params.get('text')
+    if text is not None and type(text) != str:
+        raise _IllegalParameterError('text must be a string')
+    text = _cast(str, _check_string(text, 'text', max_len=_MAX_SEARCH_TEXT_LEN))
+    page_size = _get_search_page_size(params)
+    token = _get_continuation_token(params)
+    if token is None:
+        return text, page_size, None
+    try:
+        score, id_, ver = _json.loads(_base64.urlsafe_b64decode(token.encode()))
+        if type(score) != int:
+            raise ValueError('bad score')
+        after = (score, _SampleAddress(UUID(id_), ver))
+    except Exception as e:
+        raise _IllegalParameterError(f'Invalid continuation_token: {token}') from e
+    return text, page_size, after
+
+
+def search_samples_by_location_params(
+        params: Dict[str, Any]
+        ) -> Tuple[LocationCondition, int, Optional[_SampleAddress]]:
+    '''
+    Process the input from the search_samples_by_location API call and translate it into
+    standard types.
+
+    Either a bounding box is expected under the key 'bounding_box', as a dict with the keys
+    'min_latitude', 'min_longitude', 'max_latitude', and 'max_longitude', or a center and
+    radius are expected under the keys 'center', as a dict with the keys 'latitude' and
+    'longitude', and 'radius'. An optional page size is expected in the key 'page_size' and an
+    optional continuation token, as created by create_search_continuation_token, in the key
+    'continuation_token'.
+
+    :param params: The unmarshalled JSON recieved from the API as part of the
+        search_samples_by_location call.
+    :returns: a tuple consisting of the location condition, the page size, and the address of
+        the last sample version on the previous page.
+    :raises IllegalParameterError: if any of the arguments are illegal.
+    '''
+    _check_params(params)
+    bb = params.get('bounding_box')
+    center = params.get('center')
+    for val, name in [(bb, 'bounding_box'), (center, 'center')]:
+        if val is not None and type(val) != dict:
+            raise _IllegalParameterError(f'{name} must be a structure')
+    cond = LocationCondition(
+        (bb.get('min_latitude'), bb.get('min_longitude'), bb.get('max_latitude'),
+         bb.get('max_longitude')) if bb is not None else None,
+        (center.get('latitude'), center.get('longitude')) if center is not None else None,
+        params.get('radius'))
+    return cond, _get_search_page_size(params), _get_search_after(params)
+
+
+def get_metadata_facets_params(
+        params: Dict[str, Any]) -> Tuple[List[str], List[MetadataCondition], int]:
+    '''
+    Process the input from the get_metadata_facets API call and translate it into standard
+    types.
+
+    The metadata keys are expected as a list of strings under the key 'keys'. Optional
+    conditions, as for search_samples_params, are expected under the key 'conditions' and an
+    optional maximum number of values per key is expected under the key 'limit'.
+
+    :param params: The unmarshalled JSON recieved from the API as part of the
+        get_metadata_facets call.
+    :returns: a tuple consisting of the metadata keys, the conditions, and the maximum number of
+        values per key.
+    :raises MissingParameterError: if the keys or a condition key is missing.
+    :raises IllegalParameterError: if any of the arguments are illegal.
+    '''
+    _check_params(params)
+    keys = params.get('keys')
+    if not keys:
+        raise _MissingParameterError('keys')
+    if type(keys) != list:
+        raise _IllegalParameterError('keys must be a list')
+    for i, k in enumerate(keys):
+        if type(k) != str:
+            raise _IllegalParameterError(f'Key at index {i} must be a string')
+        _check_string(k, f'key at index {i}', max_len=_MAX_FACET_KEY_LEN)
+    conditions = params.get('conditions')
+    conds = _get_metadata_conditions(conditions) if conditions is not None else []
+    limit = params.get('limit')
+    if limit is None:
+        limit = _DEFAULT_FACET_LIMIT
+    elif type(limit) != int or not 0 < limit <= _MAX_FACET_LIMIT:
+        raise _IllegalParameterError(f'limit must be an integer from 1 to {_MAX_FACET_LIMIT}')
+    return keys, conds, limit
+
+
+def list_samples_params(
+        params: Dict[str, Any]
+        ) -> Tuple[int, Optional[Tuple[datetime.datetime, UUID]]]:
+    '''
+    Process the input from the list_samples API call and translate it into standard types.
+
+    An optional page size is expected in the key 'page_size' and an optional continuation
+    token, as created by create_list_samples_continuation_token, in the key
+    'continuation_token'.
+
+    :param params: The unmarshalled JSON recieved from the API as part of the list_samples
+        call.
+    :returns: a tuple consisting of the page size and the save time and ID of the last sample on
+        the previous page.
+    :raises IllegalParameterError: if any of the arguments are illegal.
+    '''
+    _check_params(params)
+    page_size = _get_search_page_size(params)
+    token = _get_continuation_token(params)
+    if token is None:
+        return page_size, None
+    try:
+        saved, id_ = _json.loads(_base64.urlsafe_b64decode(token.encode()))
+        after = (datetime.datetime.fromtimestamp(saved, tz=datetime.timezone.utc), UUID(id_))
+    except Exception as e:
+        raise _IllegalParameterError(f'Invalid continuation_token: {token}') from e
+    return page_size, after
+
+
+def create_list_samples_continuation_token(
+        results: List[Tuple[_SampleAddress, datetime.datetime]], page_size: int) -> Optional[str]:
+    '''
+    Create an opaque continuation token for retrieving the next page of a sample listing.
+
+    :param results: the sample addresses and save times returned by the listing.
+    :param page_size: the page size of the listing.
+    :returns: the token, or None if the page was not full and therefore there are no more
+        results.
+    '''
+    _not_falsy_in_iterable(results, 'results')
+    if len(results) < page_size:
+        return None
+    last, saved = results[-1]
+    token = _json.dumps([saved.timestamp(), str(last.sampleid)])
+    return _base64.urlsafe_b64encode(token.encode()).decode()
+
+
+def create_text_search_continuation_token(
+        results: List[Tuple[_SampleAddress, int]], page_size: int) -> Optional[str]:
+    '''
+    Create an opaque continuation token for retrieving the next page of full text search
+    results.
+
+    :param results: the sample versions and scores returned by the search.
+    :param page_size: the page size of the search.
+    :returns: the token, or None if the page was not full and therefore there are no more
+        results.
+    '''
+    _not_falsy_in_iterable(results, 'results')
+    if len(results) < page_size:
+        return None
+    last, score = results[-1]
+    token = _json.dumps([score, str(last.sampleid), last.version])
+    return _base64.urlsafe_b64encode(token.encode()).decode()
+
+
+def data_links_bulk_results_to_dicts(
+        upas: List[UPA],
+        results: List[Union[List[DataLink], SampleError]]
+        ) -> List[Dict[str, Any]]:
+    '''
+    Convert a list of link lists or errors, as returned from a bulk retrieval of links from
+    data, to a JSONable structure to return to the SDK API.
+
+    :param upas: the UPAs from which the links were retrieved, in the same order as the results.
+    :param results: the results.
+    :returns: a list of dicts, each with an 'upa' key, a 'links' key containing the links for
+        the UPA, if they could be retrieved, and an 'error' key containing the error, if any.
+    '''
+    _not_falsy_in_iterable(upas, 'upas')
+    _not_falsy(results, 'results')
+    if len(upas) != len(results):
+        raise ValueError('upas and results must be the same length')
+    ret = []
+    for upa, r in zip(upas, results):
+        if isinstance(r, list):
+            ret.append({'upa': str(upa), 'links': links_to_dicts(r), 'error': None})
+        else:
+            ret.append({'upa': str(upa), 'links': None, 'error': str(r)})
+    return ret
+
+
+def data_link_results_to_dicts(results: List[Union[Optional[DataLink], SampleError]]
+                               ) -> List[Dict[str, Any]]:
+    '''
+    Convert a list of links, Nones, or errors, as returned from a bulk link creation, to a
+    JSONable structure to return to the SDK API.
+
+    :param results: the results, where None denotes that an equivalent link already existed.
+    :returns: a list of dicts, each with a 'status' key that is one of 'created', 'noop', or
+        'error', a 'new_link' key containing the link, if created, and an 'error' key containing
+        the error, if any.
+    '''
+    _not_falsy(results, 'results')
+    ret = []
+    for r in results:
+        if isinstance(r, DataLink):
+            ret.append({'status': 'created', 'new_link': links_to_dicts([r])[0], 'error': None})
+        elif r is None:
+            ret.append({'status': 'noop', 'new_link': None, 'error': None})
+        else:
+            ret.append({'status': 'error', 'new_link': None, 'error': str(r)})
+    return ret
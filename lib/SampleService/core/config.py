@@ -20,6 +20,8 @@ from SampleService.core.validator.metadata_validator import MetadataValidator as
 from SampleService.core.samples import Samples
 from SampleService.core.storage.arango_sample_storage import ArangoSampleStorage \
     as _ArangoSampleStorage
+from SampleService.core.storage.sample_version_cache import SampleVersionCache \
+    as _SampleVersionCache
 from SampleService.core.arg_checkers import check_string as _check_string
 from SampleService.core.notification import KafkaNotifier as _KafkaNotifer
 from SampleService.core.user_lookup import KBaseUserLookup
@@ -53,6 +55,12 @@ def build_samples(config: Dict[str, str]) -> Tuple[Samples, KBaseUserLookup]:
         config.get('node-edge-collection'), 'config param node-edge-collection')
     col_data_link = _check_string_req(
         config.get('data-link-collection'), 'config param data-link-collection')
+    col_data_link_count = _check_string_req(
+        config.get('data-link-count-collection'), 'config param data-link-count-collection')
+    col_meta = _check_string_req(
+        config.get('metadata-collection'), 'config param metadata-collection')
+    col_node_content = _check_string_req(
+        config.get('node-content-collection'), 'config param node-content-collection')
     col_ws_obj_ver = _check_string_req(
         config.get('workspace-object-version-shadow-collection'),
         'config param workspace-object-version-shadow-collection')
@@ -63,10 +71,13 @@ def build_samples(config: Dict[str, str]) -> Tuple[Samples, KBaseUserLookup]:
     auth_token = _check_string_req(config.get('auth-token'), 'config param auth-token')
     full_roles = split_value(config, 'auth-full-admin-roles')
     read_roles = split_value(config, 'auth-read-admin-roles')
+    valid_user_exp = get_int_value(config, 'auth-valid-user-cache-expiration-sec', 3600)
+    admin_exp = get_int_value(config, 'auth-admin-cache-expiration-sec', 60)
 
     ws_url = _check_string_req(config.get('workspace-url'), 'config param workspace-url')
     ws_token = _check_string_req(config.get('workspace-read-admin-token'),
                                  'config param workspace-read-admin-token')
+    ws_cache_exp = get_int_value(config, 'workspace-cache-expiration-sec', 60)
 
     kafka_servers = _check_string(config.get('kafka-bootstrap-servers'),
                                   'config param kafka-bootstrap-servers',
@@ -79,6 +90,10 @@ def build_samples(config: Dict[str, str]) -> Tuple[Samples, KBaseUserLookup]:
                                 'config param metadata-validator-config-url',
                                 optional=True)
 
+    version_cache_mb = get_int_value(config, 'version-cache-size-mb', 100)
+    link_transactions = get_choice_value(
+        config, 'data-link-transactions', ['js', 'stream'], 'stream')
+
     # meta params may have info that shouldn't be logged so don't log any for now.
     # Add code to deal with this later if needed
     print(f'''
@@ -93,17 +108,25 @@ def build_samples(config: Dict[str, str]) -> Tuple[Samples, KBaseUserLookup]:
             node-collection: {col_node}
             node-edge-collection: {col_node_edge}
             data-link-collection: {col_data_link}
+            data-link-count-collection: {col_data_link_count}
+            metadata-collection: {col_meta}
+            node-content-collection: {col_node_content}
             workspace-object-version-shadow-collection: {col_ws_obj_ver}
             schema-collection: {col_schema}
             auth-root-url: {auth_root_url}
             auth-token: [REDACTED FOR YOUR CONVENIENCE AND ENJOYMENT]
             auth-full-admin-roles: {', '.join(full_roles)}
             auth-read-admin-roles: {', '.join(read_roles)}
+            auth-valid-user-cache-expiration-sec: {valid_user_exp}
+            auth-admin-cache-expiration-sec: {admin_exp}
             workspace-url: {ws_url}
             workspace-read-admin-token: [REDACTED FOR YOUR ULTIMATE PLEASURE]
+            workspace-cache-expiration-sec: {ws_cache_exp}
             kafka-bootstrap-servers: {kafka_servers}
             kafka-topic: {kafka_topic}
             metadata-validators-config-url: {metaval_url}
+            version-cache-size-mb: {version_cache_mb}
+            data-link-transactions: {link_transactions}
     ''')
 
     # build the validators before trying to connect to arango
@@ -121,12 +144,23 @@ def build_samples(config: Dict[str, str]) -> Tuple[Samples, KBaseUserLookup]:
         col_node_edge,
         col_ws_obj_ver,
         col_data_link,
+        col_data_link_count,
+        col_meta,
+        col_node_content,
         col_schema,
+        _SampleVersionCache(version_cache_mb * 1024 * 1024) if version_cache_mb else None,
+        js_link_transactions=link_transactions == 'js',
     )
     storage.start_consistency_checker()
     kafka = _KafkaNotifer(kafka_servers, _cast(str, kafka_topic)) if kafka_servers else None
-    user_lookup = KBaseUserLookup(auth_root_url, auth_token, full_roles, read_roles)
-    ws = _WS(_Workspace(ws_url, token=ws_token))
+    user_lookup = KBaseUserLookup(
+        auth_root_url,
+        auth_token,
+        full_roles,
+        read_roles,
+        cache_valid_user_expiration=valid_user_exp,
+        cache_admin_expiration=admin_exp)
+    ws = _WS(_Workspace(ws_url, token=ws_token), cache_expiration=ws_cache_exp)
     return Samples(storage, user_lookup, metaval, ws, kafka), user_lookup
 
 
@@ -147,6 +181,51 @@ def split_value(d: Dict[str, str], key: str):
     return [x.strip() for x in rstr.split(',') if x.strip()]
 
 
+def get_int_value(d: Dict[str, str], key: str, default: int) -> int:
+    '''
+    Get a non-negative integer from a configuration dict.
+    :param config: The configuration dict containing the integer to be processed as a value.
+    :param key: The key in the dict containing the value.
+    :param default: The value to return if the key does not exist or contains only whitespace.
+    :returns: the integer.
+    :raises ValueError: if the value is not a non-negative integer.
+    '''
+    if d is None:
+        raise ValueError('d cannot be None')
+    rstr = _check_string(d.get(key), 'config param ' + key, optional=True)
+    if not rstr:
+        return default
+    try:
+        ret = int(rstr)
+    except ValueError:
+        ret = -1
+    if ret < 0:
+        raise ValueError(f'config param {key} must be a non-negative integer, got {rstr}')
+    return ret
+
+
+def get_choice_value(d: Dict[str, str], key: str, choices: List[str], default: str) -> str:
+    '''
+    Get one of a set of allowed strings from a configuration dict.
+    :param config: The configuration dict containing the string to be processed as a value.
+    :param key: The key in the dict containing the value.
+    :param choices: The allowed values.
+    :param default: The value to return if the key does not exist or contains only whitespace.
+    :returns: the string.
+    :raises ValueError: if the value is not one of the allowed values.
+    '''
+    if d is None:
+        raise ValueError('d cannot be None')
+    rstr = _check_string(d.get(key), 'config param ' + key, optional=True)
+    if not rstr:
+        return default
+    rstr = rstr.strip()
+    if rstr not in choices:
+        raise ValueError(
+            f'config param {key} must be one of {", ".join(choices)}, got {rstr}')
+    return rstr
+
+
 def _check_string_req(s: Optional[str], name: str) -> str:
     return _cast(str, _check_string(s, name))
 
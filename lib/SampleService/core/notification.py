@@ -6,12 +6,13 @@ import json as _json
 import re as _re
 
 from uuid import UUID
-from typing import cast as _cast
+from typing import List, cast as _cast
 
 from kafka import KafkaProducer as _KafkaProducer
 
 from SampleService.core.arg_checkers import (
     not_falsy as _not_falsy,
+    not_falsy_in_iterable as _not_falsy_in_iterable,
     check_string as _check_string
 )
 
@@ -151,12 +152,32 @@ class KafkaNotifier:
             self._LINK_ID: str(_not_falsy(link_id, 'link_id'))
             })
 
+    def notify_expired_links(self, link_ids: List[UUID]):
+        """
+        Send notifications that links have been expired. The messages are identical to those
+        sent by notify_expired_link, but are all sent before waiting for Kafka to acknowledge
+        any of them.
+
+        :param link_ids: the link IDs.
+        """
+        _not_falsy_in_iterable(link_ids, 'link_ids')
+        self._send_messages([{
+            self._EVENT_TYPE: self._EXPIRED_LINK,
+            self._LINK_ID: str(link_id)
+            } for link_id in link_ids])
+
     def _send_message(self, message):
+        self._send_messages([message])
+
+    def _send_messages(self, messages):
         if self._closed:
             raise ValueError('client is closed')
-        future = self._prod.send(self._topic, _json.dumps(message).encode('utf-8'))
-        # ensure the message was send correctly, or if not throw an exeption in the correct thread
-        future.get(timeout=35)  # this is very difficult to test
+        futures = [self._prod.send(self._topic, _json.dumps(m).encode('utf-8'))
+                   for m in messages]
+        # ensure the messages were sent correctly, or if not throw an exeption in the correct
+        # thread
+        for future in futures:
+            future.get(timeout=35)  # this is very difficult to test
 
     def close(self):
         """
@@ -0,0 +1,141 @@
+'''
+Contains classes for computing the differences between two versions of a sample.
+'''
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Mapping
+
+from SampleService.core.arg_checkers import not_falsy_in_iterable as _not_falsy_in_iterable
+from SampleService.core.sample import SampleNode, SourceMetadata, SubSampleType
+
+# for now we'll assume people are nice and don't change attributes after init.
+# if that doesn't hold true, override __setattr__.
+
+
+class MetadataDiff:
+    '''
+    The differences between two sets of metadata for a node, keyed by the metadata key.
+
+    :ivar added: a mapping of the keys only present in the new metadata to their values.
+    :ivar removed: a mapping of the keys only present in the old metadata to their values.
+    :ivar changed: a mapping of the keys with differing values to a tuple of the old and new
+        values.
+    '''
+
+    def __init__(self, old: Mapping[str, Any], new: Mapping[str, Any]):
+        '''
+        Compute the differences between two sets of metadata.
+
+        :param old: the old metadata.
+        :param new: the new metadata.
+        '''
+        self.added: Dict[str, Any] = {k: new[k] for k in sorted(new.keys() - old.keys())}
+        self.removed: Dict[str, Any] = {k: old[k] for k in sorted(old.keys() - new.keys())}
+        self.changed: Dict[str, Tuple[Any, Any]] = {
+            k: (old[k], new[k]) for k in sorted(old.keys() & new.keys()) if old[k] != new[k]}
+
+    def is_empty(self) -> bool:
+        '''
+        Check if there are no differences.
+
+        :returns: True if the metadata are the same.
+        '''
+        return not (self.added or self.removed or self.changed)
+
+    def __eq__(self, other):
+        if type(self) is type(other):
+            return (self.added, self.removed, self.changed) == (
+                other.added, other.removed, other.changed)
+        return NotImplemented
+
+
+class NodeDiff:
+    '''
+    The differences between two versions of a sample node with the same name.
+
+    :ivar name: the name of the node.
+    :ivar type: a tuple of the old and new type of the node, or None if the type is unchanged.
+    :ivar parent: a tuple of the old and new parent of the node, or None if the parent is
+        unchanged.
+    :ivar controlled_metadata: the differences in the controlled metadata.
+    :ivar user_metadata: the differences in the user metadata.
+    :ivar source_metadata: the differences in the source metadata. The values are
+        SourceMetadata instances.
+    '''
+
+    def __init__(self, old: SampleNode, new: SampleNode):
+        '''
+        Compute the differences between two versions of a node.
+
+        :param old: the old version of the node.
+        :param new: the new version of the node.
+        :raises ValueError: if the node names differ.
+        '''
+        if old.name != new.name:
+            raise ValueError(f'Node names differ: {old.name} and {new.name}')
+        self.name = new.name
+        self.type: Optional[Tuple[SubSampleType, SubSampleType]] = (
+            (old.type, new.type) if old.type != new.type else None)
+        self.parent: Optional[Tuple[Optional[str], Optional[str]]] = (
+            (old.parent, new.parent) if old.parent != new.parent else None)
+        self.controlled_metadata = MetadataDiff(old.controlled_metadata, new.controlled_metadata)
+        self.user_metadata = MetadataDiff(old.user_metadata, new.user_metadata)
+        self.source_metadata = MetadataDiff(
+            _source_meta_to_map(old.source_metadata), _source_meta_to_map(new.source_metadata))
+
+    def is_empty(self) -> bool:
+        '''
+        Check if there are no differences.
+
+        :returns: True if the node versions are the same.
+        '''
+        return (self.type is None and self.parent is None and
+                self.controlled_metadata.is_empty() and self.user_metadata.is_empty() and
+                self.source_metadata.is_empty())
+
+    def __eq__(self, other):
+        if type(self) is type(other):
+            return (self.name, self.type, self.parent, self.controlled_metadata,
+                    self.user_metadata, self.source_metadata) == (
+                        other.name, other.type, other.parent, other.controlled_metadata,
+                        other.user_metadata, other.source_metadata)
+        return NotImplemented
+
+
+def _source_meta_to_map(sm: Iterable[SourceMetadata]) -> Dict[str, SourceMetadata]:
+    return {s.key: s for s in sm}
+
+
+class SampleDiff:
+    '''
+    The differences between the nodes of two versions of a sample.
+
+    :ivar added_nodes: the nodes only present in the new version, in the order of the new
+        version.
+    :ivar removed_nodes: the names of the nodes only present in the old version, in the order of
+        the old version.
+    :ivar changed_nodes: the differences in the nodes present in both versions, in the order of
+        the new version.
+    '''
+
+    def __init__(self, old_nodes: List[SampleNode], new_nodes: List[SampleNode]):
+        '''
+        Compute the differences between the nodes of two versions of a sample. Nodes that are
+        identical in both versions may be omitted from the input.
+
+        :param old_nodes: nodes from the old version of the sample.
+        :param new_nodes: nodes from the new version of the sample.
+        '''
+        _not_falsy_in_iterable(old_nodes, 'old_nodes')
+        _not_falsy_in_iterable(new_nodes, 'new_nodes')
+        old = {n.name: n for n in old_nodes}
+        newnames = {n.name for n in new_nodes}
+        self.added_nodes = [n for n in new_nodes if n.name not in old]
+        self.removed_nodes = [name for name in old if name not in newnames]
+        diffs = [NodeDiff(old[n.name], n) for n in new_nodes if n.name in old]
+        self.changed_nodes = [d for d in diffs if not d.is_empty()]
+
+    def __eq__(self, other):
+        if type(self) is type(other):
+            return (self.added_nodes, self.removed_nodes, self.changed_nodes) == (
+                other.added_nodes, other.removed_nodes, other.changed_nodes)
+        return NotImplemented
@@ -19,10 +19,14 @@ from SampleService.core.errors import (
     IllegalParameterError as _IllegalParameterError,
     MetadataValidationError as _MetadataValidationError,
     NoSuchUserError as _NoSuchUserError,
-    NoSuchLinkError as _NoSuchLinkError
+    NoSuchLinkError as _NoSuchLinkError,
+    NoSuchSampleVersionError as _NoSuchSampleVersionError,
+    SampleError,
 )
 from SampleService.core.notification import KafkaNotifier
 from SampleService.core.sample import Sample, SavedSample, SampleAddress, SampleNodeAddress
+from SampleService.core.sample_diff import SampleDiff
+from SampleService.core.search import LocationCondition, MetadataCondition, get_search_terms
 from SampleService.core.user_lookup import KBaseUserLookup
 from SampleService.core import user_lookup as _user_lookup_mod
 from SampleService.core.validator.metadata_validator import MetadataValidatorSet
@@ -32,6 +36,18 @@ from SampleService.core.user import UserID
 from SampleService.core.workspace import WS, WorkspaceAccessType as _WorkspaceAccessType
 from SampleService.core.workspace import DataUnitID, UPA
 
+_MAX_GET_SAMPLES = 1000
+_MAX_CREATE_SAMPLES = 1000
+_MAX_CREATE_DATA_LINKS = 10000
+_MAX_EXPIRE_DATA_LINKS = 10000
+_MAX_GET_LINKS_FROM_DATA_BULK = 1000
+_MAX_SEARCH_CONDITIONS = 10
+_MAX_SEARCH_RESULTS = 10000
+_MAX_SEARCH_TERMS = 20
+_MAX_FACET_KEYS = 10
+_MAX_FACET_VALUES = 1000
+_FACET_VALUE_KEY = 'value'
+
 
 # TODO remove own acls.
 
@@ -115,6 +131,40 @@ class Samples:
             self._kafka.notify_new_sample_version(id_, ver)
         return (id_, ver)
 
+    def create_samples(
+            self, samples: List[Sample], user: UserID) -> List[Tuple[UUID, int]]:
+        '''
+        Create many new samples at once. All the samples are validated before any are saved.
+
+        :param samples: the samples to save.
+        :param user: the username of the user saving the samples.
+        :returns: a list of tuples of the sample ID and version, in the same order as the
+            input samples.
+        :raises IllegalParameterError: if no samples or too many samples are provided.
+        :raises MetadataValidationError: if any of the samples fail validation.
+        :raises SampleStorageError: if the samples fail to save.
+        '''
+        if not samples:
+            raise _IllegalParameterError('At least one sample must be supplied')
+        if len(samples) > _MAX_CREATE_SAMPLES:
+            raise _IllegalParameterError(
+                f'No more than {_MAX_CREATE_SAMPLES} samples may be created at once')
+        _not_falsy(user, 'user')
+        for i, sample in enumerate(samples):
+            _not_falsy(sample, f'sample at index {i}')
+            try:
+                self._validate_metadata(sample)
+            except _MetadataValidationError as e:
+                raise _MetadataValidationError(f'Sample at index {i}: {e.message}') from e
+        now = self._now()
+        saved = [SavedSample(self._uuid_gen(), user, list(s.nodes), now, s.name)
+                 for s in samples]
+        self._storage.save_samples(saved)
+        if self._kafka:
+            for s in saved:
+                self._kafka.notify_new_sample_version(s.id, 1)
+        return [(s.id, 1) for s in saved]
+
     def _validate_metadata(self, sample: Sample):
         for i, n in enumerate(sample.nodes):
             try:
@@ -176,8 +226,249 @@ class Samples:
         '''
         if version is not None and version < 1:
             raise _IllegalParameterError('Version must be > 0')
-        self._check_perms(_not_falsy(id_, 'id_'), user, _SampleAccessType.READ, as_admin=as_admin)
-        return self._storage.get_sample(id_, version)
+        _not_falsy(id_, 'id_')
+        if as_admin:
+            return self._storage.get_sample(id_, version)
+        try:
+            # fetch the sample and acls together to save round trips to the DB
+            sample, acls = self._storage.get_sample_and_acls(id_, version)
+        except _NoSuchSampleVersionError:
+            # don't leak the existence of versions to unauthorized users
+            self._check_perms(id_, user, _SampleAccessType.READ)
+            raise
+        self._check_perms(id_, user, _SampleAccessType.READ, acls)
+        return sample
+
+    def get_sample_diff(
+            self,
+            id_: UUID,
+            user: Optional[UserID],
+            version_a: int,
+            version_b: int,
+            as_admin: bool = False) -> SampleDiff:
+        '''
+        Get the differences between two versions of a sample.
+        :param id_: the ID of the sample.
+        :param user: the username of the user getting the differences, or None for an anonymous
+            user.
+        :param version_a: the old version of the sample.
+        :param version_b: the new version of the sample.
+        :param as_admin: Skip ACL checks.
+        :returns: the differences between the versions.
+        :raises IllegalParameterError: if either version is < 1
+        :raises UnauthorizedError: if the user does not have read permission for the sample.
+        :raises NoSuchSampleError: if the sample does not exist.
+        :raises NoSuchSampleVersionError: if either sample version does not exist.
+        :raises SampleStorageError: if the sample could not be retrieved.
+        '''
+        if version_a is None or version_a < 1 or version_b is None or version_b < 1:
+            raise _IllegalParameterError('Version must be > 0')
+        _not_falsy(id_, 'id_')
+        self._check_perms(id_, user, _SampleAccessType.READ, as_admin=as_admin)
+        old, new = self._storage.get_changed_nodes(id_, version_a, version_b)
+        return SampleDiff(old, new)
+
+    def get_samples(
+            self,
+            addresses: List[Tuple[UUID, Optional[int]]],
+            user: Optional[UserID],
+            as_admin: bool = False) -> List[Union[SavedSample, SampleError]]:
+        '''
+        Get many samples at once. Errors for individual samples are returned in place of the
+        sample rather than thrown.
+        :param addresses: the IDs and versions of the samples to retrieve. A version of None
+            retrieves the latest version of the sample.
+        :param user: the username of the user getting the samples, or None for an anonymous user.
+        :param as_admin: Skip ACL checks.
+        :returns: a list of results in the same order as the addresses. Each result is either
+            the sample or a NoSuchSampleError, NoSuchSampleVersionError or UnauthorizedError.
+        :raises IllegalParameterError: if no addresses are supplied, too many addresses are
+            supplied, or a version is < 1.
+        :raises SampleStorageError: if the samples could not be retrieved.
+        '''
+        if not addresses:
+            raise _IllegalParameterError('At least one sample address must be supplied')
+        if len(addresses) > _MAX_GET_SAMPLES:
+            raise _IllegalParameterError(
+                f'No more than {_MAX_GET_SAMPLES} samples may be requested at once')
+        for i, (id_, version) in enumerate(addresses):
+            _not_falsy(id_, f'id_ at index {i}')
+            if version is not None and version < 1:
+                raise _IllegalParameterError(f'Version at index {i} must be > 0')
+        ret: List[Union[SavedSample, SampleError]] = []
+        for (id_, _), (acls, sample) in zip(
+                addresses, self._storage.get_samples_and_acls(addresses)):
+            if acls and not as_admin:
+                # check even if the version doesn't exist to avoid leaking version info
+                try:
+                    self._check_perms(id_, user, _SampleAccessType.READ, acls)
+                except _UnauthorizedError as e:
+                    ret.append(e)
+                    continue
+            ret.append(sample)
+        return ret
+
+    def search_samples(
+            self,
+            conditions: List[MetadataCondition],
+            user: Optional[UserID],
+            as_admin: bool = False,
+            limit: int = 1000,
+            after: Optional[SampleAddress] = None) -> List[SampleAddress]:
+        '''
+        Search for sample versions by their controlled metadata. A sample version matches if
+        every condition is matched by at least one of its nodes.
+        :param conditions: the conditions to match.
+        :param user: the username of the user running the search, or None for an anonymous
+            user. Only samples the user can read are returned.
+        :param as_admin: Skip ACL checks.
+        :param limit: the maximum number of sample versions to return.
+        :param after: the last sample version on the previous page of results.
+        :returns: the addresses of the matching sample versions, sorted by the sample ID and
+            then by the version.
+        :raises IllegalParameterError: if no conditions are supplied, too many conditions are
+            supplied, or the limit is out of range.
+        :raises SampleStorageError: if the search fails.
+        '''
+        if not conditions:
+            raise _IllegalParameterError('At least one search condition must be supplied')
+        if len(conditions) > _MAX_SEARCH_CONDITIONS:
+            raise _IllegalParameterError(
+                f'No more than {_MAX_SEARCH_CONDITIONS} search conditions may be supplied')
+        for i, c in enumerate(conditions):
+            _not_falsy(c, f'condition at index {i}')
+        if limit < 1 or limit > _MAX_SEARCH_RESULTS:
+            raise _IllegalParameterError(f'limit must be between 1 and {_MAX_SEARCH_RESULTS}')
+        return self._storage.search_samples(
+            conditions, user, check_acls=not as_admin, limit=limit, after=after)
+
+    def search_samples_by_text(
+            self,
+            text: str,
+            user: Optional[UserID],
+            as_admin: bool = False,
+            limit: int = 1000,
+            after: Optional[Tuple[int, SampleAddress]] = None
+            ) -> List[Tuple[SampleAddress, int]]:
+        '''
+        Search for sample versions by the words in their names and metadata string values.
+        The search is case insensitive and a sample version matches if it contains any of the
+        words.
+        :param text: the words to search for.
+        :param user: the username of the user running the search, or None for an anonymous
+            user. Only samples the user can read are returned.
+        :param as_admin: Skip ACL checks.
+        :param limit: the maximum number of sample versions to return.
+        :param after: the score and address of the last sample version on the previous page of
+            results.
+        :returns: tuples of the addresses of the matching sample versions and their scores,
+            which are the number of words in the search text they contain. The results are
+            sorted by descending score, then by the sample ID, and then by the version.
+        :raises IllegalParameterError: if the text contains no words or too many words, or the
+            limit is out of range.
+        :raises SampleStorageError: if the search fails.
+        '''
+        terms = get_search_terms(text)
+        if not terms:
+            raise _IllegalParameterError('The search text must contain at least one word')
+        if len(terms) > _MAX_SEARCH_TERMS:
+            raise _IllegalParameterError(
+                f'The search text may contain no more than {_MAX_SEARCH_TERMS} distinct words')
+        if limit < 1 or limit > _MAX_SEARCH_RESULTS:
+            raise _IllegalParameterError(f'limit must be between 1 and {_MAX_SEARCH_RESULTS}')
+        return self._storage.search_samples_by_text(
+            terms, user, check_acls=not as_admin, limit=limit, after=after)
+
+    def search_samples_by_location(
+            self,
+            condition: LocationCondition,
+            user: Optional[UserID],
+            as_admin: bool = False,
+            limit: int = 1000,
+            after: Optional[SampleAddress] = None) -> List[SampleAddress]:
+        '''
+        Search for sample versions with at least one node located in a bounding box or within a
+        radius of a point.
+        :param condition: the area to search.
+        :param user: the username of the user running the search, or None for an anonymous
+            user. Only samples the user can read are returned.
+        :param as_admin: Skip ACL checks.
+        :param limit: the maximum number of sample versions to return.
+        :param after: the last sample version on the previous page of results.
+        :returns: the addresses of the matching sample versions, sorted by the sample ID and
+            then by the version.
+        :raises IllegalParameterError: if the limit is out of range.
+        :raises SampleStorageError: if the search fails.
+        '''
+        _not_falsy(condition, 'condition')
+        if limit < 1 or limit > _MAX_SEARCH_RESULTS:
+            raise _IllegalParameterError(f'limit must be between 1 and {_MAX_SEARCH_RESULTS}')
+        return self._storage.search_samples_by_location(
+            condition, user, check_acls=not as_admin, limit=limit, after=after)
+
+    def get_metadata_facets(
+            self,
+            keys: List[str],
+            user: Optional[UserID],
+            conditions: Optional[List[MetadataCondition]] = None,
+            as_admin: bool = False,
+            limit: int = 100) -> Dict[str, List[Tuple[PrimitiveType, int]]]:
+        '''
+        Count the samples with each value of one or more controlled metadata keys. The 'value'
+        value key of each metadata key is counted. Only the latest version of each sample is
+        counted.
+        :param keys: the metadata keys.
+        :param user: the username of the user requesting the counts, or None for an anonymous
+            user. Only samples the user can read are counted.
+        :param conditions: conditions the latest version of a sample must match to be counted,
+            as for search_samples.
+        :param as_admin: Skip ACL checks.
+        :param limit: the maximum number of values to return for each key.
+        :returns: a mapping of metadata key to tuples of the values and the number of samples
+            with each value, sorted by descending count and then by value.
+        :raises IllegalParameterError: if no keys are supplied, too many keys or conditions are
+            supplied, or the limit is out of range.
+        :raises SampleStorageError: if the count fails.
+        '''
+        if not keys:
+            raise _IllegalParameterError('At least one metadata key must be supplied')
+        if len(keys) > _MAX_FACET_KEYS:
+            raise _IllegalParameterError(
+                f'No more than {_MAX_FACET_KEYS} metadata keys may be supplied')
+        conditions = conditions if conditions else []
+        if len(conditions) > _MAX_SEARCH_CONDITIONS:
+            raise _IllegalParameterError(
+                f'No more than {_MAX_SEARCH_CONDITIONS} search conditions may be supplied')
+        for i, c in enumerate(conditions):
+            _not_falsy(c, f'condition at index {i}')
+        if limit < 1 or limit > _MAX_FACET_VALUES:
+            raise _IllegalParameterError(f'limit must be between 1 and {_MAX_FACET_VALUES}')
+        return {k: self._storage.count_metadata_values(
+                    k, _FACET_VALUE_KEY, user, conditions, check_acls=not as_admin, limit=limit)
+                for k in keys}
+
+    def list_samples(
+            self,
+            user: Optional[UserID],
+            limit: int = 1000,
+            after: Optional[Tuple[datetime.datetime, UUID]] = None
+            ) -> List[Tuple[SampleAddress, datetime.datetime]]:
+        '''
+        List the samples a user owns, administrates, can write or read, and the public samples.
+        :param user: the username of the user, or None for an anonymous user, in which case
+            only public samples are listed.
+        :param limit: the maximum number of samples to return.
+        :param after: the save time of the first version and the ID of the last sample on the
+            previous page of results.
+        :returns: tuples of the address of the latest version of each sample and the time the
+            first version of the sample was saved, sorted by the save time, newest first, and
+            then by the sample ID, descending.
+        :raises IllegalParameterError: if the limit is out of range.
+        :raises SampleStorageError: if the listing fails.
+        '''
+        if limit < 1 or limit > _MAX_SEARCH_RESULTS:
+            raise _IllegalParameterError(f'limit must be between 1 and {_MAX_SEARCH_RESULTS}')
+        return self._storage.list_samples(user, limit=limit, after=after)
 
     def get_sample_acls(
             self, id_: UUID, user: Optional[UserID], as_admin: bool = False) -> SampleACL:
@@ -357,6 +648,85 @@ class Samples:
                 self._kafka.notify_expired_link(expired_id)
         return dl
 
+    def create_data_links(
+            self,
+            user: UserID,
+            links: List[Tuple[DataUnitID, SampleNodeAddress]],
+            update: bool = False,
+            as_admin: bool = False) -> List[Union[Optional[DataLink], SampleError]]:
+        '''
+        Create many links from data units to samples at once. Permissions are checked once per
+        sample and once per workspace object, and the links are saved in a single transaction.
+        See create_data_link() for the permissions required and the rules for links.
+
+        A link that cannot be created does not prevent the other links from being created.
+
+        :param user: the user creating the links.
+        :param links: the data units and the sample nodes to link them to. No two links may be
+            from the same data unit.
+        :param update: True to expire any extant link if it does not link to the provided sample.
+            If False and a link from the data unit already exists, link creation will fail.
+        :param as_admin: allow link creation to proceed if user does not have
+            appropriate permissions.
+        :returns: a list of results in the same order as the input links. Each result is either
+            the new link, None if an equivalent link already exists and update is True, or the
+            error that prevented the link from being created.
+        :raises IllegalParameterError: if no links or too many links are provided or two links
+            are from the same data unit.
+        :raises SampleStorageError: if the links could not be saved.
+        '''
+        _not_falsy(user, 'user')
+        if not links:
+            raise _IllegalParameterError('At least one link must be supplied')
+        if len(links) > _MAX_CREATE_DATA_LINKS:
+            raise _IllegalParameterError(
+                f'No more than {_MAX_CREATE_DATA_LINKS} links may be created at once')
+        seen = set()
+        for i, (duid, sna) in enumerate(links):
+            _not_falsy(duid, f'duid at index {i}')
+            _not_falsy(sna, f'sna at index {i}')
+            if duid in seen:
+                raise _IllegalParameterError(f'Duplicate data unit ID at index {i}: {duid}')
+            seen.add(duid)
+        errors: Dict[Union[UUID, UPA], SampleError] = {}
+        for id_ in dict.fromkeys(sna.sampleid for _, sna in links):
+            try:
+                self._check_perms(id_, user, _SampleAccessType.ADMIN, as_admin=as_admin)
+            except SampleError as e:
+                errors[id_] = e
+        wsperm = _WorkspaceAccessType.NONE if as_admin else _WorkspaceAccessType.WRITE
+        upas = list(dict.fromkeys(duid.upa for duid, _ in links))
+        for upa, err in zip(upas, self._ws.has_permissions(user, wsperm, upas=upas)):
+            if err:
+                errors[upa] = err
+        now = self._now()
+        ret: List[Union[Optional[DataLink], SampleError]] = []
+        dls = []
+        for duid, sna in links:
+            err = errors.get(sna.sampleid, errors.get(duid.upa))
+            if err:
+                ret.append(err)
+            else:
+                dl = DataLink(self._uuid_gen(), duid, sna, now, user)
+                ret.append(dl)
+                dls.append(dl)
+        if not dls:
+            return ret
+        results = iter(self._storage.create_data_links(dls, update=update))
+        for i, r in enumerate(ret):
+            if not isinstance(r, DataLink):
+                continue
+            res = next(results)
+            if isinstance(res, SampleError):
+                ret[i] = res
+            elif not res[0]:
+                ret[i] = None
+            elif self._kafka:
+                self._kafka.notify_new_link(r.id)
+                if res[1]:
+                    self._kafka.notify_expired_link(res[1])
+        return ret
+
     def expire_data_link(self, user: UserID, duid: DataUnitID, as_admin: bool = False) -> None:
         '''
         Expire a data link, ensuring that it will not show up in link queries without an effective
@@ -392,14 +762,91 @@ class Samples:
         if self._kafka:
             self._kafka.notify_expired_link(link.id)
 
+    def expire_data_links(
+            self,
+            user: UserID,
+            upa: UPA = None,
+            sample: SampleAddress = None,
+            link_ids: List[UUID] = None,
+            as_admin: bool = False) -> List[DataLink]:
+        '''
+        Expire many data links at once. Exactly one of upa, sample, or link_ids must be provided.
+        The user must have admin access to the sample and write access to the workspace for
+        every link that is to be expired. The data may be deleted.
+
+        If the user does not have permission to expire any of the links, no links are expired.
+
+        :param user: the user expiring the links.
+        :param upa: expire all the extant links from this workspace object.
+        :param sample: expire all the extant links from this sample version.
+        :param link_ids: expire the links with these IDs.
+        :param as_admin: allow link expiration to proceed if user does not have
+            appropriate permissions.
+        :returns: the expired links.
+        :raises IllegalParameterError: if link_ids is empty or too long.
+        :raises UnauthorizedError: if the user does not have acceptable permissions.
+        :raises NoSuchWorkspaceDataError: if a workspace doesn't exist.
+        :raises NoSuchSampleError: if the sample does not exist.
+        :raises NoSuchSampleVersionError: if the sample version does not exist.
+        :raises NoSuchLinkError: if a link ID does not exist or the link is already expired.
+        '''
+        _not_falsy(user, 'user')
+        if len([x for x in (upa, sample, link_ids) if x is not None]) != 1:
+            raise ValueError('exactly one of upa, sample, or link_ids must be provided')
+        if link_ids is not None:
+            if not link_ids:
+                raise _IllegalParameterError('At least one link ID must be supplied')
+            if len(link_ids) > _MAX_EXPIRE_DATA_LINKS:
+                raise _IllegalParameterError(
+                    f'No more than {_MAX_EXPIRE_DATA_LINKS} links may be expired at once')
+            if len(set(link_ids)) != len(link_ids):
+                raise _IllegalParameterError('link_ids contains duplicate IDs')
+        wsperm = _WorkspaceAccessType.NONE if as_admin else _WorkspaceAccessType.WRITE
+        now = self._now()
+        checked_wsid = None
+        checked_sample = None
+        if upa:
+            # allow expiring links for deleted objects, see expire_data_link.
+            self._ws.has_permission(user, wsperm, workspace_id=upa.wsid)
+            checked_wsid = upa.wsid
+            links = self._storage.get_links_from_data(upa, now)
+        elif sample:
+            self._check_perms(sample.sampleid, user, _SampleAccessType.ADMIN, as_admin=as_admin)
+            checked_sample = sample.sampleid
+            links = self._storage.get_links_from_sample(sample, None, now)
+        else:
+            links = self._storage.get_data_links(_cast(List[UUID], link_ids))
+            for link in links:
+                if link.expired:
+                    raise _NoSuchLinkError(str(link.id))
+        for id_ in dict.fromkeys(link.sample_node_address.sampleid for link in links):
+            if id_ != checked_sample:
+                self._check_perms(id_, user, _SampleAccessType.ADMIN, as_admin=as_admin)
+        wsids = [wsid for wsid in dict.fromkeys(link.duid.upa.wsid for link in links)
+                 if wsid != checked_wsid]
+        if wsids:
+            for err in self._ws.has_permissions(user, wsperm, workspace_ids=wsids):
+                if err:
+                    raise err
+        if not links:
+            return []
+        expired = self._storage.expire_data_links(now, user, [link.id for link in links])
+        if self._kafka:
+            self._kafka.notify_expired_links([link.id for link in expired])
+        return expired
+
     def get_links_from_sample(
             self,
             user: Optional[UserID],
             sample: SampleAddress,
             timestamp: datetime.datetime = None,
-            as_admin: bool = False) -> Tuple[List[DataLink], datetime.datetime]:
+            as_admin: bool = False,
+            limit: int = None,
+            after: Tuple[datetime.datetime, UUID] = None
+            ) -> Tuple[List[DataLink], datetime.datetime]:
         '''
-        Get a set of data links originating from a sample at a particular time.
+        Get a set of data links originating from a sample at a particular time. The links are
+        sorted by their created time and then their ID.
 
         :param user: the user requesting the links or None if the user is anonymous.
         :param sample: the sample from which the links originate.
@@ -407,6 +854,9 @@ class Samples:
             the current time.
         :param as_admin: allow link retrieval to proceed if user does not have
             appropriate permissions.
+        :param limit: the maximum number of links to return. Default is no limit.
+        :param after: the created time and ID of the last link on the previous page of results.
+            Only links that sort after this link are returned.
         :returns: a tuple consisting of a list of links and the timestamp used to query the links.
         :raises UnauthorizedError: if the user does not have read permission for the sample.
         :raises NoSuchSampleError: if the sample does not exist.
@@ -418,7 +868,8 @@ class Samples:
         self._check_perms(sample.sampleid, user, _SampleAccessType.READ, as_admin=as_admin)
         wsids = None if as_admin else self._ws.get_user_workspaces(user)
         # TODO DATALINK what about deleted objects? Currently not handled
-        return self._storage.get_links_from_sample(sample, wsids, timestamp), timestamp
+        return self._storage.get_links_from_sample(
+            sample, wsids, timestamp, limit, after), timestamp
 
     def _resolve_timestamp(self, timestamp: datetime.datetime = None) -> datetime.datetime:
         if timestamp:
@@ -432,9 +883,13 @@ class Samples:
             user: Optional[UserID],
             upa: UPA,
             timestamp: datetime.datetime = None,
-            as_admin: bool = False) -> Tuple[List[DataLink], datetime.datetime]:
+            as_admin: bool = False,
+            limit: int = None,
+            after: Tuple[datetime.datetime, UUID] = None
+            ) -> Tuple[List[DataLink], datetime.datetime]:
         '''
-        Get a set of data links originating from a workspace object at a particular time.
+        Get a set of data links originating from a workspace object at a particular time. The
+        links are sorted by their created time and then their ID.
 
         :param user: the user requesting the links, or None for an anonymous user.
         :param upa: the data from which the links originate.
@@ -442,6 +897,9 @@ class Samples:
             the current time.
         :param as_admin: allow link retrieval to proceed if user does not have
             appropriate permissions.
+        :param limit: the maximum number of links to return. Default is no limit.
+        :param after: the created time and ID of the last link on the previous page of results.
+            Only links that sort after this link are returned.
         :returns: a tuple consisting of a list of links and the timestamp used to query the links.
         :raises UnauthorizedError: if the user does not have read permission for the data.
         :raises NoSuchWorkspaceDataError: if the data does not exist.
@@ -453,7 +911,47 @@ class Samples:
         # NONE still checks that WS/obj exists. If it's deleted this method should fail
         wsperm = _WorkspaceAccessType.NONE if as_admin else _WorkspaceAccessType.READ
         self._ws.has_permission(user, wsperm, upa=upa)
-        return self._storage.get_links_from_data(upa, timestamp), timestamp
+        return self._storage.get_links_from_data(upa, timestamp, limit, after), timestamp
+
+    def get_links_from_data_bulk(
+            self,
+            user: Optional[UserID],
+            upas: List[UPA],
+            timestamp: datetime.datetime = None,
+            as_admin: bool = False
+            ) -> Tuple[List[Union[List[DataLink], SampleError]], datetime.datetime]:
+        '''
+        Get the data links originating from many workspace objects at a particular time.
+        Errors for individual objects are returned in place of the links rather than thrown.
+        The links for each object are sorted by their created time and then their ID.
+
+        :param user: the user requesting the links, or None for an anonymous user.
+        :param upas: the data from which the links originate.
+        :param timestamp: the timestamp during which the links should be active, defaulting to
+            the current time.
+        :param as_admin: allow link retrieval to proceed if user does not have
+            appropriate permissions.
+        :returns: a tuple consisting of a list of results in the same order as the UPAs and the
+            timestamp used to query the links. Each result is either the list of links for
+            the UPA or an UnauthorizedError or NoSuchWorkspaceDataError.
+        :raises IllegalParameterError: if no UPAs or too many UPAs are provided.
+        '''
+        if not upas:
+            raise _IllegalParameterError('At least one UPA must be supplied')
+        if len(upas) > _MAX_GET_LINKS_FROM_DATA_BULK:
+            raise _IllegalParameterError(
+                f'No more than {_MAX_GET_LINKS_FROM_DATA_BULK} UPAs may be requested at once')
+        for i, upa in enumerate(upas):
+            _not_falsy(upa, f'upa at index {i}')
+        timestamp = self._resolve_timestamp(timestamp)
+        # NONE still checks that WS/obj exists. If it's deleted this method should fail
+        wsperm = _WorkspaceAccessType.NONE if as_admin else _WorkspaceAccessType.READ
+        errors = self._ws.has_permissions(user, wsperm, upas=upas)
+        readable = [upa for upa, err in zip(upas, errors) if not err]
+        links = self._storage.get_links_from_data_bulk(readable, timestamp) if readable else {}
+        ret: List[Union[List[DataLink], SampleError]] = [
+            err if err else links[upa] for upa, err in zip(upas, errors)]
+        return ret, timestamp
 
     def get_sample_via_data(
             self,
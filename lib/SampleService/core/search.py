@@ -0,0 +1,275 @@
+'''
+Contains classes related to searching for samples.
+'''
+
+import re as _re
+from typing import Optional, List, Tuple, Set as _Set, cast as _cast
+
+from SampleService.core.arg_checkers import check_string as _check_string
+from SampleService.core.core_types import PrimitiveType
+from SampleService.core.errors import IllegalParameterError
+from SampleService.core.sample import Sample, SampleNode
+from SampleService.core.units import get_canonical_value as _get_canonical_value
+
+# for now we'll assume people are nice and don't change attributes after init.
+# if that doesn't hold true, override __setattr__.
+
+UNITS_VALUE_KEY = 'value'
+''' The value key for the numeric value of a metadata value with units. '''
+UNITS_KEY = 'units'
+''' The value key for the units of a metadata value with units. '''
+LATITUDE_KEY = 'latitude'
+''' The controlled metadata key for the latitude of a sample node in decimal degrees. '''
+LONGITUDE_KEY = 'longitude'
+''' The controlled metadata key for the longitude of a sample node in decimal degrees. '''
+LOCATION_VALUE_KEY = 'value'
+''' The value key for the latitude and longitude in the location metadata values. '''
+
+_MAX_KEY_LEN = 256
+# longer words are almost certainly identifiers or junk, and bloat the term index
+_MAX_TERM_LEN = 64
+_TERM_REGEX = _re.compile(r'\w+')
+
+
+def _is_number(value) -> bool:
+    return type(value) in (int, float)
+
+
+class MetadataCondition:
+    '''
+    A condition on a controlled metadata value in a sample. A sample version matches the
+    condition if any of its nodes has a matching value. Exactly one of an equality condition,
+    a numeric range condition, or a prefix condition is specified.
+
+    A range condition may specify units, in which case it matches values in any units of the
+    same dimensionality, e.g. a range in meters matches values in feet. Only values saved with
+    a numeric value key of 'value' and a units value key of 'units' are matched, and the value
+    key of the condition must be 'value'.
+
+    :ivar key: the metadata key.
+    :ivar value_key: the key of the value in the metadata value, for example 'value' or 'units'.
+    :ivar equals: the value must equal this value, or None.
+    :ivar minimum: the value must be a number greater than or equal to this number, or None.
+    :ivar maximum: the value must be a number less than or equal to this number, or None.
+    :ivar prefix: the value must be a string starting with this string, or None.
+    :ivar units: the units of the range condition, or None.
+    '''
+
+    def __init__(
+            self,
+            key: str,
+            value_key: str,
+            equals: Optional[PrimitiveType] = None,
+            minimum: Optional[float] = None,
+            maximum: Optional[float] = None,
+            prefix: Optional[str] = None,
+            units: Optional[str] = None):
+        '''
+        Create the condition.
+
+        :param key: the metadata key.
+        :param value_key: the key of the value in the metadata value.
+        :param equals: the value must equal this value.
+        :param minimum: the value must be a number greater than or equal to this number.
+        :param maximum: the value must be a number less than or equal to this number.
+        :param prefix: the value must be a string starting with this string.
+        :param units: the units of the range condition, e.g. 'cm'.
+        :raises IllegalParameterError: if the condition is illegal.
+        :raises MissingParameterError: if the key or value key is missing.
+        '''
+        self.key = _cast(str, _check_string(key, 'key', max_len=_MAX_KEY_LEN))
+        self.value_key = _cast(
+            str, _check_string(value_key, 'value_key', max_len=_MAX_KEY_LEN))
+        kinds = sum([equals is not None,
+                     minimum is not None or maximum is not None,
+                     prefix is not None])
+        if kinds != 1:
+            raise IllegalParameterError(
+                'Exactly one of an equality, range, or prefix condition must be provided for ' +
+                f'metadata key {self.key}')
+        if equals is not None and type(equals) not in (str, int, float, bool):
+            raise IllegalParameterError(
+                f'The equality condition for metadata key {self.key} must be a string, number, ' +
+                'or boolean')
+        for bound in [minimum, maximum]:
+            if bound is not None and not _is_number(bound):
+                raise IllegalParameterError(
+                    f'The range condition for metadata key {self.key} must have numeric bounds')
+        if minimum is not None and maximum is not None and minimum > maximum:
+            raise IllegalParameterError(
+                f'The range condition for metadata key {self.key} has a minimum greater than ' +
+                'the maximum')
+        if prefix is not None and (type(prefix) != str or not prefix):
+            raise IllegalParameterError(
+                f'The prefix condition for metadata key {self.key} must be a non-empty string')
+        if units is not None:
+            if minimum is None and maximum is None:
+                raise IllegalParameterError(
+                    f'Only range conditions may have units, as for metadata key {self.key}')
+            if self.value_key != UNITS_VALUE_KEY:
+                raise IllegalParameterError(
+                    f'The value key for metadata key {self.key} must be {UNITS_VALUE_KEY} ' +
+                    'when units are provided')
+            if not _get_canonical_value(0, units):
+                raise IllegalParameterError(
+                    f"Unable to parse units '{units}' for metadata key {self.key}")
+        self.equals = equals
+        self.minimum = minimum
+        self.maximum = maximum
+        self.prefix = prefix
+        self.units = units
+
+    def get_canonical_range(self) -> Tuple[Optional[float], Optional[float], str]:
+        '''
+        Get the range of the condition in canonical units, as produced by
+        SampleService.core.units.get_canonical_value.
+
+        :returns: a tuple of the minimum, or None, the maximum, or None, and the canonical units.
+        :raises ValueError: if the condition has no units.
+        '''
+        if not self.units:
+            raise ValueError('The condition has no units')
+        units = self.units
+        mn = _get_canonical_value(self.minimum, units) if self.minimum is not None else None
+        mx = _get_canonical_value(self.maximum, units) if self.maximum is not None else None
+        return (mn[0] if mn else None,
+                mx[0] if mx else None,
+                _cast(Tuple[float, str], _get_canonical_value(0, units))[1])
+
+    def __eq__(self, other):
+        if type(self) is type(other):
+            return (self.key, self.value_key, type(self.equals), self.equals, self.minimum,
+                    self.maximum, self.prefix, self.units) == (
+                        other.key, other.value_key, type(other.equals), other.equals,
+                        other.minimum, other.maximum, other.prefix, other.units)
+        return False
+
+    def __hash__(self):
+        return hash((self.key, self.value_key, type(self.equals), self.equals, self.minimum,
+                     self.maximum, self.prefix, self.units))
+
+
+def _check_latitude(lat, name: str):
+    if not _is_number(lat) or not -90 <= lat <= 90:
+        raise IllegalParameterError(f'{name} must be a number from -90 to 90')
+
+
+def _check_longitude(lon, name: str):
+    if not _is_number(lon) or not -180 <= lon <= 180:
+        raise IllegalParameterError(f'{name} must be a number from -180 to 180')
+
+
+class LocationCondition:
+    '''
+    A condition on the location of a sample. A sample version matches the condition if any of
+    its nodes has a location, as determined by get_node_location, that is inside the area
+    specified by the condition. Exactly one of a bounding box or a center and radius is
+    specified.
+
+    A bounding box with a minimum longitude greater than the maximum longitude crosses the
+    antimeridian.
+
+    :ivar bounding_box: the minimum latitude, minimum longitude, maximum latitude, and maximum
+        longitude of the bounding box in decimal degrees, or None.
+    :ivar center: the latitude and longitude of the center of the circle in decimal degrees, or
+        None.
+    :ivar radius: the radius of the circle in meters, or None.
+    '''
+
+    def __init__(
+            self,
+            bounding_box: Optional[Tuple[float, float, float, float]] = None,
+            center: Optional[Tuple[float, float]] = None,
+            radius: Optional[float] = None):
+        '''
+        Create the condition.
+
+        :param bounding_box: the minimum latitude, minimum longitude, maximum latitude, and
+            maximum longitude of the bounding box in decimal degrees.
+        :param center: the latitude and longitude of the center of the circle in decimal degrees.
+        :param radius: the radius of the circle in meters.
+        :raises IllegalParameterError: if the condition is illegal.
+        '''
+        if (bounding_box is None) == (center is None and radius is None):
+            raise IllegalParameterError(
+                'Exactly one of a bounding box or a center and radius must be provided for a ' +
+                'location condition')
+        if bounding_box is not None:
+            if type(bounding_box) != tuple or len(bounding_box) != 4:
+                raise IllegalParameterError('The bounding box must have 4 coordinates')
+            minlat, minlon, maxlat, maxlon = bounding_box
+            _check_latitude(minlat, 'The bounding box minimum latitude')
+            _check_longitude(minlon, 'The bounding box minimum longitude')
+            _check_latitude(maxlat, 'The bounding box maximum latitude')
+            _check_longitude(maxlon, 'The bounding box maximum longitude')
+            if minlat > maxlat:
+                raise IllegalParameterError(
+                    'The bounding box minimum latitude is greater than the maximum latitude')
+        else:
+            if type(center) != tuple or len(_cast(tuple, center)) != 2:
+                raise IllegalParameterError('The center must have 2 coordinates')
+            lat, lon = _cast(Tuple[float, float], center)
+            _check_latitude(lat, 'The center latitude')
+            _check_longitude(lon, 'The center longitude')
+            if not _is_number(radius) or _cast(float, radius) <= 0:
+                raise IllegalParameterError('The radius must be a number greater than 0')
+        self.bounding_box = bounding_box
+        self.center = center
+        self.radius = radius
+
+    def __eq__(self, other):
+        if type(self) is type(other):
+            return (self.bounding_box, self.center, self.radius) == (
+                other.bounding_box, other.center, other.radius)
+        return False
+
+    def __hash__(self):
+        return hash((self.bounding_box, self.center, self.radius))
+
+
+def get_node_location(node: SampleNode) -> Optional[Tuple[float, float]]:
+    '''
+    Get the location of a sample node from the 'value' keys of the 'latitude' and 'longitude'
+    controlled metadata keys.
+
+    :param node: the node.
+    :returns: the latitude and longitude of the node in decimal degrees, or None if the node
+        doesn't have both keys or the values are not valid coordinates.
+    '''
+    lat = node.controlled_metadata.get(LATITUDE_KEY, {}).get(LOCATION_VALUE_KEY)
+    lon = node.controlled_metadata.get(LONGITUDE_KEY, {}).get(LOCATION_VALUE_KEY)
+    if (not _is_number(lat) or not _is_number(lon) or not -90 <= _cast(float, lat) <= 90 or
+            not -180 <= _cast(float, lon) <= 180):
+        return None
+    return _cast(float, lat), _cast(float, lon)
+
+
+def get_search_terms(text: Optional[str]) -> List[str]:
+    '''
+    Split text into the terms used for full text search. Terms are runs of letters, digits, and
+    underscores, and are case folded. Terms longer than 64 characters are dropped.
+
+    :param text: the text to split.
+    :returns: the unique terms in the text, sorted.
+    '''
+    if not text:
+        return []
+    return sorted({t for t in _TERM_REGEX.findall(text.casefold()) if len(t) <= _MAX_TERM_LEN})
+
+
+def get_sample_search_terms(sample: Sample) -> List[str]:
+    '''
+    Get the terms for full text search for a sample from the sample name and the string values
+    of the controlled and user metadata in all the sample nodes.
+
+    :param sample: the sample.
+    :returns: the unique terms in the sample, sorted.
+    '''
+    terms: _Set[str] = set(get_search_terms(sample.name))
+    for n in sample.nodes:
+        for meta in [n.controlled_metadata, n.user_metadata]:
+            for v in meta.values():
+                for val in v.values():
+                    if type(val) == str:
+                        terms.update(get_search_terms(_cast(str, val)))
+    return sorted(terms)
@@ -12,7 +12,15 @@ An ArangoDB based storage system for the Sample service.
 # ouside of this layer
 #
 # The process is:
-# 1) save all the node documents with the integer version = -1 and a UUID version.
+# 0) save the node content documents that do not already exist. Node content - the metadata of
+#    a node - is content addressed and shared between node documents with the same content, so
+#    the documents have no version and are never deleted. A content document left over from a
+#    failed save is harmless and will be reused if the same content is saved again.
+#    The controlled metadata documents for new content are saved first, so that if a content
+#    document exists its metadata documents do too. Like the content documents, they have no
+#    version - searches get it from the node and version documents.
+# 1) save all the node documents with the integer version = -1, a UUID version, and the latest
+#    version flag set.
 # 2) save all the node edges.
 # 3) save the version document with the integer version = -1 and the same UUID version.
 # 4) save all the version edges.
@@ -22,6 +30,8 @@ An ArangoDB based storage system for the Sample service.
 #        add the UUID version to the end of the sample document's version list.
 # 6) Update the integer version on the node documents.
 # 7) Update the integer version on the version document.
+# 8) if not a new sample:
+#        mark the node documents for the prior version as not the latest version.
 #
 # When accessing data, the data access methods should look for versions == -1 and correct the
 # database appropriately:
@@ -39,7 +49,14 @@ An ArangoDB based storage system for the Sample service.
 # is always possible to correct the database as long as one server is running.
 #
 # The server runs correction code on startup and every minute if start_consistency_checker is
-# called with default arguments.
+# called with default arguments. The first run checks all documents; later runs only check
+# documents saved after a watermark, which trails the time of the previous run by the deletion
+# delay above.
+#
+# The data derived from a sample version for searches, e.g. the controlled metadata documents,
+# is generated when the version is saved. Versions saved before the derived data was added or
+# changed are marked with an older derived data version, or none at all, and the consistency
+# checker regenerates their derived data in batches.
 #
 # There are two choices for how to deal with node and version documents with an integer version
 # of -1 in new code:
@@ -68,11 +85,15 @@ An ArangoDB based storage system for the Sample service.
 import arango as _arango
 import datetime
 import hashlib as _hashlib
+import json as _json
+import logging as _logging
+import random as _random
+import time as _time
 import uuid as _uuid  # lgtm [py/import-and-import-from]
 from uuid import UUID
 from collections import defaultdict
 from typing import List, Tuple, Callable, cast as _cast, Optional, Sequence as _Sequence
-from typing import Dict as _Dict, Any as _Any
+from typing import Dict as _Dict, Any as _Any, Union as _Union, TypeVar as _TypeVar
 
 from apscheduler.schedulers.background import BackgroundScheduler as _BackgroundScheduler
 from arango.database import StandardDatabase
@@ -97,15 +118,26 @@ from SampleService.core.arg_checkers import (
 from SampleService.core.errors import (
     ConcurrencyError as _ConcurrencyError,
     DataLinkExistsError as _DataLinkExistsError,
+    NoDataException as _NoDataException,
     NoSuchLinkError as _NoSuchLinkError,
     NoSuchSampleError as _NoSuchSampleError,
     NoSuchSampleVersionError as _NoSuchSampleVersionError,
     NoSuchSampleNodeError as _NoSuchSampleNodeError,
+    SampleError,
     TooManyDataLinksError as _TooManyDataLinksError,
 )
+from SampleService.core.search import (
+    LocationCondition,
+    MetadataCondition,
+    get_node_location,
+    get_sample_search_terms,
+)
+from SampleService.core.search import UNITS_KEY as _UNITS_KEY, UNITS_VALUE_KEY as _UNITS_VALUE_KEY
+from SampleService.core.units import get_canonical_value as _get_canonical_value
 from SampleService.core.storage.errors import SampleStorageError as _SampleStorageError
 from SampleService.core.storage.errors import StorageInitError as _StorageInitError
 from SampleService.core.storage.errors import OwnerChangedError as _OwnerChangedError
+from SampleService.core.storage.sample_version_cache import SampleVersionCache
 from SampleService.core.user import UserID
 from SampleService.core.workspace import DataUnitID, UPA
 
@@ -117,9 +149,12 @@ _FLD_UUID_VER = 'uuidver'
 _FLD_VER = 'ver'
 _VAL_NO_VER = -1
 _FLD_NAME = 'name'
+_FLD_TERMS = 'terms'
 _FLD_USER = 'user'
 _FLD_SAVE_TIME = 'saved'
 _FLD_ACL_UPDATE_TIME = 'aclupdate'
+# the version of the derived data for a sample version. See _DERIVED_DATA_VERSION.
+_FLD_DERIVED_VER = 'derivedver'
 
 _FLD_NODE_NAME = 'name'
 _FLD_NODE_TYPE = 'type'
@@ -135,6 +170,15 @@ _FLD_NODE_META_OUTER_KEY = 'ok'
 _FLD_NODE_META_KEY = 'k'
 _FLD_NODE_META_SOURCE_KEY = 'sk'
 _FLD_NODE_META_VALUE = 'v'
+_FLD_NODE_LATITUDE = 'lat'
+_FLD_NODE_LONGITUDE = 'lon'
+_FLD_NODE_CONTENT = 'content'
+# whether the node document is for the latest version of the sample, so searches of the latest
+# versions can skip older versions via an index. True when the version is saved and set to
+# false when the next version is saved. If a save fails partway through the flag may be true
+# for an older version, so it must be combined with a check of the sample document, but it is
+# never false for the latest version.
+_FLD_NODE_LATEST = 'latest'
 
 
 _FLD_ACLS = 'acls'
@@ -160,11 +204,190 @@ _FLD_LINK_CREATED_BY = 'createby'
 _FLD_LINK_EXPIRED = 'expired'
 _FLD_LINK_EXPIRED_BY = 'expireby'
 
+# the number of extant links from a workspace object version or sample version.
+_FLD_LINK_COUNT = 'count'
+
+# controlled metadata documents. There is one document per node content document, metadata key,
+# and value key, so a node that is unchanged in a new version adds no metadata documents.
+# Searches find the node documents, and therefore the sample versions, with the content key.
+# The metadata outer key, key, and value fields are the same as in the node content document
+# metadata list.
+_FLD_META_CONTENT = 'content'
+_FLD_META_CANONICAL_VALUE = 'cv'
+_FLD_META_CANONICAL_UNITS = 'cu'
+
+# how many times to try a data link transaction that fails due to a write conflict.
+_LINK_WRITE_ATTEMPTS = 5
+# the base time in seconds for the randomized exponential backoff between attempts.
+_LINK_WRITE_BACKOFF_SEC = 0.01
+
 # see https://www.arangodb.com/2018/07/time-traveling-with-graph-databases/
 _ARANGO_MAX_INTEGER = 2**53 - 1
 
 _JOB_ID = 'consistencyjob'
 
+# the number of unversioned sample versions the consistency checker corrects per batch, and the
+# number of sample versions it regenerates the derived data for per batch.
+_CHECKER_BATCH_SIZE = 1000
+
+# The version of the data derived from sample versions for searches. Increment this when the
+# derived data changes so the consistency checker regenerates it for existing versions.
+# 1: controlled metadata documents, including values in canonical units and the latest version
+#    flag, version full text search terms, node locations, and the sample save time, from the
+#    first version.
+# 2: controlled metadata documents per node content document rather than per node document, and
+#    the latest version flag on the node documents. Node documents saved before node content
+#    was content addressed get a content document.
+_DERIVED_DATA_VERSION = 2
+
+_T = _TypeVar('_T')
+
+# Server side javascript implementations of the data link transactions. These must be kept in sync
+# with the python implementations, including the document key formats.
+
+# functions shared between the javascript transactions.
+_JS_LINK_FUNCS = f'''
+    const db = require('@arangodb').db;
+    const links = db._collection(params.linkcol);
+    const counts = db._collection(params.countcol);
+
+    function getDoc(col, key) {{
+        try {{
+            return col.document(key);
+        }} catch (e) {{
+            if (e.errorNum !== 1202) {{  // document not found
+                throw e;
+            }}
+            return null;
+        }}
+    }}
+
+    // see _lock_link_counts
+    function lockCounts(keys) {{
+        const ret = {{}};
+        keys.forEach(function (key) {{
+            const doc = getDoc(counts, key);
+            ret[key] = doc ? doc.{_FLD_LINK_COUNT} : 0;
+            counts.insert({{_key: key, {_FLD_LINK_COUNT}: ret[key]}}, {{overwrite: true}});
+        }});
+        return ret;
+    }}
+
+    function saveCounts(changed) {{
+        Object.keys(changed).forEach(function (key) {{
+            counts.insert({{_key: key, {_FLD_LINK_COUNT}: changed[key]}}, {{overwrite: true}});
+        }});
+    }}
+
+    // see _create_link_count_key_from_upa and _create_link_count_key_from_sample_ver
+    function wsCountKey(doc) {{
+        return 'ws_' + doc.{_FLD_LINK_WORKSPACE_ID} + '_' + doc.{_FLD_LINK_OBJECT_ID} + '_' +
+            doc.{_FLD_LINK_OBJECT_VERSION};
+    }}
+
+    function svCountKey(doc) {{
+        return 'sv_' + doc.{_FLD_LINK_SAMPLE_UUID_VERSION};
+    }}
+
+    // see _create_link_key_from_link_doc. Python adds a trailing .0 to integral floats.
+    function expire(doc, expired, expiredBy) {{
+        const created = doc.{_FLD_LINK_CREATED};
+        const ts = Number.isInteger(created) ? created.toFixed(1) : String(created);
+        const oldkey = doc._key;
+        doc.{_FLD_LINK_EXPIRED} = expired;
+        doc.{_FLD_LINK_EXPIRED_BY} = expiredBy;
+        doc._key = oldkey + '_' + ts;
+        delete doc._id;
+        delete doc._rev;
+        links.insert(doc);
+        links.remove(oldkey);
+    }}
+'''
+
+_JS_CREATE_DATA_LINK = f'''
+function (params) {{
+    {_JS_LINK_FUNCS}
+    const newdoc = params.doc;
+    if (!getDoc(db._collection(params.nodecol), params.nodeid)) {{
+        return {{error: 'nonode'}};
+    }}
+    const wskey = wsCountKey(newdoc);
+    const svkey = svCountKey(newdoc);
+    // see create_data_link re locking
+    const c = lockCounts([wskey, svkey]);
+    const old = getDoc(links, newdoc._key);
+    const changed = {{}};
+    if (old) {{
+        if (!params.update) {{
+            return {{error: 'exists'}};
+        }}
+        const samesv = old.{_FLD_LINK_SAMPLE_ID} === newdoc.{_FLD_LINK_SAMPLE_ID} &&
+            old.{_FLD_LINK_SAMPLE_INT_VERSION} === newdoc.{_FLD_LINK_SAMPLE_INT_VERSION};
+        if (samesv && old.{_FLD_LINK_SAMPLE_NODE} === newdoc.{_FLD_LINK_SAMPLE_NODE}) {{
+            return {{noop: true}};
+        }}
+        if (!samesv) {{
+            if (c[svkey] >= params.maxlinks) {{
+                return {{error: 'toomanysv'}};
+            }}
+            const oldsvkey = svCountKey(old);
+            Object.assign(c, lockCounts([oldsvkey]));
+            changed[svkey] = c[svkey] + 1;
+            changed[oldsvkey] = c[oldsvkey] - 1;
+        }}
+        // see create_data_link re the millisecond gap
+        expire(old, newdoc.{_FLD_LINK_CREATED} - 0.001, newdoc.{_FLD_LINK_CREATED_BY});
+        links.insert(newdoc, {{overwrite: true}});
+        saveCounts(changed);
+        return {{oldid: old.{_FLD_LINK_ID}}};
+    }}
+    if (c[wskey] >= params.maxlinks) {{
+        return {{error: 'toomanyws'}};
+    }}
+    if (c[svkey] >= params.maxlinks) {{
+        return {{error: 'toomanysv'}};
+    }}
+    changed[wskey] = c[wskey] + 1;
+    changed[svkey] = c[svkey] + 1;
+    links.insert(newdoc);
+    saveCounts(changed);
+    return {{oldid: null}};
+}}
+'''
+
+_JS_EXPIRE_DATA_LINK = f'''
+function (params) {{
+    {_JS_LINK_FUNCS}
+    let doc = null;
+    if (params.id) {{
+        const docs = db._query(
+            'FOR d IN @@col FILTER d.{_FLD_LINK_ID} == @id LIMIT 2 RETURN d',
+            {{'@col': params.linkcol, id: params.id}}).toArray();
+        if (docs.length > 1) {{
+            return {{error: 'multiple'}};
+        }}
+        if (docs.length === 1 && docs[0].{_FLD_LINK_EXPIRED} === params.maxint) {{
+            doc = docs[0];
+        }}
+    }} else {{
+        doc = getDoc(links, params.key);
+    }}
+    if (!doc) {{
+        return {{error: 'nolink'}};
+    }}
+    if (params.expired < doc.{_FLD_LINK_CREATED}) {{
+        return {{error: 'early', created: doc.{_FLD_LINK_CREATED}}};
+    }}
+    const wskey = wsCountKey(doc);
+    const svkey = svCountKey(doc);
+    // see create_data_link re locking
+    const c = lockCounts([wskey, svkey]);
+    expire(doc, params.expired, params.expiredby);
+    saveCounts({{[wskey]: c[wskey] - 1, [svkey]: c[svkey] - 1}});
+    return {{doc: doc}};
+}}
+'''
+
 # schema version checking constants.
 
 # the current version of the database schema.
@@ -176,6 +399,23 @@ _FLD_SCHEMA_UPDATE = 'inupdate'
 # the version of the schema. Value is _SCHEMA_VERSION.
 _FLD_SCHEMA_VERSION = 'schemaver'
 
+# consistency checker lease constants. The lease document is stored in the schema collection.
+
+# the value for the lease key.
+_CHECKER_LEASE_VALUE = 'checkerlease'
+# the ID of the storage instance holding the lease. Value is a string.
+_FLD_LEASE_HOLDER = 'holder'
+# when the lease expires, in epoch seconds of the database server clock. Value is a float.
+_FLD_LEASE_EXPIRES = 'expires'
+# the lease lasts this many checker intervals, and is renewed every interval by the holder.
+_CHECKER_LEASE_INTERVALS = 3
+
+
+class _LinkWriteConflictError(Exception):
+    # Thrown when a data link transaction collides with another transaction. Never leaves this
+    # module.
+    pass
+
 
 class ArangoSampleStorage:
     '''
@@ -192,7 +432,12 @@ class ArangoSampleStorage:
             node_edge_collection: str,
             workspace_object_version_shadow_collection: str,
             data_link_collection: str,
+            data_link_count_collection: str,
+            metadata_collection: str,
+            node_content_collection: str,
             schema_collection: str,
+            version_cache: Optional[SampleVersionCache] = None,
+            js_link_transactions: bool = False,
             # See https://kbase.slack.com/archives/CNRT78G66/p1583967289053500 for justification
             max_links: int = 10000,
             now: Callable[[], datetime.datetime] = lambda: datetime.datetime.now(
@@ -216,8 +461,22 @@ class ArangoSampleStorage:
             KBase Relation Engine stores shadow object versions.
         :param data_link_collection: the name of the collection in which edges from workspace
             object version to sample nodes will be stored, indicating data links.
+        :param data_link_count_collection: the name of the collection in which the counts of
+            extant data links from workspace object versions and sample versions will be stored.
+        :param metadata_collection: the name of the collection in which controlled metadata will
+            be stored, one document per node content document, metadata key, and value key, for
+            searching.
+        :param node_content_collection: the name of the collection in which the metadata of
+            sample nodes will be stored. Identical node content is stored once and shared
+            between sample versions.
         :schema_collection: the name of the collection in which information about the database
             schema will be stored.
+        :param version_cache: a cache for sample versions. If not provided, sample versions are
+            always fetched from the database.
+        :param js_link_transactions: True to create, update, and expire single data links with
+            a server side javascript transaction, which runs in one request to the database.
+            False, the default, to use a REST streaming transaction, which takes several
+            requests. The javascript transactions are experimental.
         '''
         # Don't publicize these params, for testing only
         # :param max_links: The maximum links any one sample version or workspace object version
@@ -227,6 +486,8 @@ class ArangoSampleStorage:
         self._db = _not_falsy(db, 'db')
         self._now = _not_falsy(now, 'now')
         self._max_links = max_links
+        self._version_cache = version_cache
+        self._js_link_transactions = js_link_transactions
 
         self._col_sample = _init_collection(
             db, sample_collection, 'sample collection', 'sample_collection')
@@ -246,22 +507,62 @@ class ArangoSampleStorage:
             'workspace_object_version_shadow_collection')
         self._col_data_link = _init_collection(
             db, data_link_collection, 'data link collection', 'data_link_collection', edge=True)
+        self._col_data_link_count = _init_collection(
+            db,
+            data_link_count_collection,
+            'data link count collection',
+            'data_link_count_collection')
+        self._col_meta = _init_collection(
+            db, metadata_collection, 'metadata collection', 'metadata_collection')
+        self._col_node_content = _init_collection(
+            db, node_content_collection, 'node content collection', 'node_content_collection')
         self._col_schema = _init_collection(
             db, schema_collection, 'schema collection', 'schema_collection')
         self._ensure_indexes()
         self._check_schema()
+        self._init_link_counts()
         self._deletion_delay = datetime.timedelta(hours=1)  # make configurable?
+        # None means check all documents.
+        self._checker_watermark: Optional[float] = None
+        self._checker_id = str(_uuid.uuid4())
+        self._checker_lease_sec = 60 * _CHECKER_LEASE_INTERVALS
         self._check_db_updated()
         self._scheduler = self._build_scheduler()
 
     def _ensure_indexes(self):
         try:
+            # list the samples a user can read. Each ACL field has its own index, which
+            # list_samples queries separately. The owner and public read indexes also serve the
+            # save time sort, since a user may own or be able to read many samples.
+            acls = _FLD_ACLS + '.'
+            self._col_sample.add_persistent_index([acls + _FLD_OWNER, _FLD_SAVE_TIME, _FLD_ID])
+            self._col_sample.add_persistent_index([acls + _FLD_ADMIN + '[*]'])
+            self._col_sample.add_persistent_index([acls + _FLD_WRITE + '[*]'])
+            self._col_sample.add_persistent_index([acls + _FLD_READ + '[*]'])
+            self._col_sample.add_persistent_index(
+                [acls + _FLD_PUBLIC_READ, _FLD_SAVE_TIME, _FLD_ID])
             self._col_node_edge.add_persistent_index([_FLD_UUID_VER])
             self._col_ver_edge.add_persistent_index([_FLD_UUID_VER])
             self._col_version.add_persistent_index([_FLD_UUID_VER])
-            self._col_version.add_persistent_index([_FLD_VER])  # partial index would be useful
+            # find unversioned docs for the consistency checker. Arango has no partial indexes
+            # and sparse indexes only skip null values, so the save time is included in the
+            # index to allow range scans of unversioned docs saved after a watermark.
+            self._col_version.add_persistent_index([_FLD_VER, _FLD_SAVE_TIME])
+            # find versions with outdated derived data for the consistency checker. The index
+            # is not sparse so versions saved before the field was added are included.
+            self._col_version.add_persistent_index([_FLD_DERIVED_VER])
+            # full text search. An array index acts as an inverted index from terms to versions.
+            self._col_version.add_persistent_index([_FLD_TERMS + '[*]'])
             self._col_nodes.add_persistent_index([_FLD_UUID_VER])
-            self._col_nodes.add_persistent_index([_FLD_VER])  # partial index would be useful
+            self._col_nodes.add_persistent_index([_FLD_VER, _FLD_SAVE_TIME])
+            # find nodes within a radius of a point
+            self._col_nodes.add_geo_index([_FLD_NODE_LATITUDE, _FLD_NODE_LONGITUDE])
+            # find nodes within a bounding box. Most nodes have no location, hence sparse.
+            self._col_nodes.add_persistent_index(
+                [_FLD_NODE_LATITUDE, _FLD_NODE_LONGITUDE], sparse=True)
+            # find the nodes, and so the sample versions, with the content found by a metadata
+            # search, optionally only for the latest versions of samples
+            self._col_nodes.add_persistent_index([_FLD_NODE_CONTENT, _FLD_NODE_LATEST])
             # find links by ID
             self._col_data_link.add_persistent_index([_FLD_LINK_ID])
             # find links from objects
@@ -271,6 +572,16 @@ class ArangoSampleStorage:
             self._col_data_link.add_persistent_index([_FLD_LINK_SAMPLE_UUID_VERSION])
             # find links from samples
             self._col_data_link.add_persistent_index([_FLD_LINK_SAMPLE_ID])
+            # search metadata values by equality, range, or prefix
+            self._col_meta.add_persistent_index(
+                [_FLD_NODE_META_OUTER_KEY, _FLD_NODE_META_KEY, _FLD_NODE_META_VALUE])
+            # find metadata for node content, when searching on more than one key
+            self._col_meta.add_persistent_index(
+                [_FLD_META_CONTENT, _FLD_NODE_META_OUTER_KEY, _FLD_NODE_META_KEY])
+            # search metadata values with units by range in canonical units
+            self._col_meta.add_persistent_index(
+                [_FLD_NODE_META_OUTER_KEY, _FLD_NODE_META_KEY, _FLD_META_CANONICAL_UNITS,
+                 _FLD_META_CANONICAL_VALUE])
         except _arango.exceptions.IndexCreateError as e:
             # this is a real pain to test.
             raise _SampleStorageError('Connection to database failed: ' + str(e)) from e
@@ -288,7 +599,16 @@ class ArangoSampleStorage:
         # ok, the schema version document is already there, this isn't the first time this
         # database as been used. Now check the document is ok.
         try:
-            if col.count() != 1:
+            # the consistency checker lease document is also stored in this collection
+            cur = self._db.aql.execute(
+                f'''
+                FOR d IN @@col
+                    FILTER d.{_FLD_ARANGO_KEY} != @lease
+                    COLLECT WITH COUNT INTO count
+                    RETURN count
+                ''',
+                bind_vars={'@col': col.name, 'lease': _CHECKER_LEASE_VALUE})
+            if cur.next() != 1:
                 raise _StorageInitError(
                     'Multiple config objects found in the database. ' +
                     'This should not happen, something is very wrong.')
@@ -305,31 +625,115 @@ class ArangoSampleStorage:
             # this is a real pain to test
             raise _SampleStorageError('Connection to database failed: ' + str(e)) from e
 
-    def _check_db_updated(self):
-        self._check_col_updated(self._col_version)
-        self._check_col_updated(self._col_nodes)
-
-    def _check_col_updated(self, col):
-        # this should rarely find unupdated documents so don't worry too much about performance
+    def _init_link_counts(self):
+        # Fills the link count collection from the extant links if it's empty, which is the case
+        # for a new database or a database created before link counts were stored.
+        # If the counts are ever lost or corrupted, empty the collection and restart the server.
+        # Only the first server to start does any work, the others see the filled collection.
+        countcol = self._col_data_link_count.name
+        tdb = self._db.begin_transaction(
+            read=[self._col_data_link.name, countcol],
+            exclusive=countcol)
         try:
-            cur = col.find({_FLD_VER: _VAL_NO_VER})
-            for doc in cur:
-                id_ = UUID(doc[_FLD_ID])
-                uver = UUID(doc[_FLD_UUID_VER])
-                ts = self._timestamp_to_datetime(doc[_FLD_SAVE_TIME])
-                sampledoc = self._get_sample_doc(id_, exception=False)
-                if not sampledoc:
-                    # the sample document was never saved for this version doc
-                    self._delete_version_and_node_docs(uver, ts)
+            tdlcc = tdb.collection(countcol)
+            if tdlcc.count():
+                return
+            bind_vars = {'@col': self._col_data_link.name, 'max': _ARANGO_MAX_INTEGER}
+            q = f'''
+                FOR d IN @@col
+                    FILTER d.{_FLD_LINK_EXPIRED} == @max
+                    COLLECT wsid = d.{_FLD_LINK_WORKSPACE_ID}, objid = d.{_FLD_LINK_OBJECT_ID},
+                        ver = d.{_FLD_LINK_OBJECT_VERSION} WITH COUNT INTO linkcount
+                    RETURN {{wsid, objid, ver, linkcount}}
+                '''
+            counts = {}
+            for d in tdb.aql.execute(q, bind_vars=bind_vars):
+                counts[self._create_link_count_key_from_upa(
+                    UPA(wsid=d['wsid'], objid=d['objid'], version=d['ver']))] = d['linkcount']
+            q = f'''
+                FOR d IN @@col
+                    FILTER d.{_FLD_LINK_EXPIRED} == @max
+                    COLLECT sver = d.{_FLD_LINK_SAMPLE_UUID_VERSION} WITH COUNT INTO linkcount
+                    RETURN {{sver, linkcount}}
+                '''
+            for d in tdb.aql.execute(q, bind_vars=bind_vars):
+                counts[self._create_link_count_key_from_sample_ver(
+                    UUID(d['sver']))] = d['linkcount']
+            self._save_link_counts(tdb, counts)
+            self._commit_transaction(tdb)
+        except (_arango.exceptions.AQLQueryExecuteError,
+                _arango.exceptions.DocumentCountError) as e:
+            # this is a real pain to test
+            raise _SampleStorageError('Connection to database failed: ' + str(e)) from e
+        finally:
+            self._abort_transaction(tdb)
+
+    def _check_db_updated(self) -> _Dict[str, _Any]:
+        # Finds sample versions where the integer version was never set and either sets it or
+        # deletes the version, see the notes at the start of the file.
+        # Only documents saved after the watermark are checked. The next watermark is the
+        # current time minus the deletion delay, the time it's assumed another process may take
+        # to finish saving a sample. Any unversioned document saved before then is corrected
+        # in this run, and documents that are still pending were saved after it.
+        start = _time.monotonic()
+        now = self._now()
+        watermark = self._checker_watermark
+        vers = self._find_unversioned(watermark)
+        stats: _Dict[str, _Any] = {
+            'checked': len(vers), 'updated': 0, 'deleted': 0, 'pending': 0}
+        uuidvers = sorted(vers)
+        for i in range(0, len(uuidvers), _CHECKER_BATCH_SIZE):
+            updates, deletes = {}, []
+            batch = uuidvers[i: i + _CHECKER_BATCH_SIZE]
+            sampledocs = self._get_docs(self._col_sample, sorted({vers[v][0] for v in batch}))
+            for uuidver in batch:
+                id_, saved = vers[uuidver]
+                version = None
+                if id_ in sampledocs:
+                    version = self._get_int_version_from_sample_doc(sampledocs[id_], uuidver)
+                if version:
+                    updates[uuidver] = version
+                elif now - self._timestamp_to_datetime(saved) > self._deletion_delay:
+                    # the sample document was never saved or updated for this version
+                    deletes.append(uuidver)
                 else:
-                    version = self._get_int_version_from_sample_doc(sampledoc, str(uver))
-                    if version:
-                        self._update_version_and_node_docs_with_find(id_, uver, version)
-                    else:
-                        self._delete_version_and_node_docs(uver, ts)
-        except _arango.exceptions.DocumentGetError as e:
-            # this is a real pain to test.
+                    stats['pending'] += 1
+            self._update_versions_with_query(updates)
+            self._delete_versions_with_query(deletes)
+            stats['updated'] += len(updates)
+            stats['deleted'] += len(deletes)
+        self._checker_watermark = (now - self._deletion_delay).timestamp()
+        stats['duration_sec'] = _time.monotonic() - start
+        _logging.getLogger(__name__).info(
+            'Consistency check from watermark %s in %.3fs: %s unversioned sample versions, ' +
+            '%s updated, %s deleted, %s pending',
+            watermark, stats['duration_sec'], stats['checked'], stats['updated'],
+            stats['deleted'], stats['pending'])
+        return stats
+
+    def _find_unversioned(self, watermark: Optional[float]) -> _Dict[str, Tuple[str, float]]:
+        # returns uuid version -> (sample ID, save time). A node document may exist without a
+        # version document if the save failed partway through.
+        # null sorts before all numbers in AQL, so a null watermark matches all documents.
+        aql = f'''
+            FOR d IN @@col
+                FILTER d.{_FLD_VER} == @nover AND d.{_FLD_SAVE_TIME} >= @watermark
+                COLLECT id = d.{_FLD_ID}, uuidver = d.{_FLD_UUID_VER},
+                    saved = d.{_FLD_SAVE_TIME}
+                RETURN {{id, uuidver, saved}}
+            '''
+        ret = {}
+        try:
+            for col in [self._col_version, self._col_nodes]:
+                cur = self._db.aql.execute(
+                    aql,
+                    bind_vars={'@col': col.name, 'nover': _VAL_NO_VER, 'watermark': watermark},
+                    batch_size=_CHECKER_BATCH_SIZE)
+                for d in cur:
+                    ret[d['uuidver']] = (d['id'], d['saved'])
+        except _arango.exceptions.AQLQueryExecuteError as e:  # this is a real pain to test
             raise _SampleStorageError('Connection to database failed: ' + str(e)) from e
+        return ret
 
     def _get_int_version_from_sample_doc(self, sampledoc, uuidverstr):
         for i, v in enumerate(sampledoc[_FLD_VERSIONS]):
@@ -337,43 +741,241 @@ class ArangoSampleStorage:
                 return i + 1
         return None
 
-    def _delete_version_and_node_docs(self, uuidver, savedate):
-        if self._now() - savedate > self._deletion_delay:
-            print('deleting docs', self._now(), savedate, self._deletion_delay)
-            try:
-                # TODO logging
-                # delete edge docs first to ensure we don't orphan them
-                self._col_ver_edge.delete_match({_FLD_UUID_VER: str(uuidver)})
-                self._col_version.delete_match({_FLD_UUID_VER: str(uuidver)})
-                self._col_node_edge.delete_match({_FLD_UUID_VER: str(uuidver)})
-                self._col_nodes.delete_match({_FLD_UUID_VER: str(uuidver)})
-            except _arango.exceptions.DocumentDeleteError as e:
-                # this is a real pain to test.
-                raise _SampleStorageError('Connection to database failed: ' + str(e)) from e
+    def _update_versions_with_query(self, versions: _Dict[str, int]):
+        # takes a map of uuid version -> integer version.
+        # update the node docs first, since the version doc is the last to be updated when
+        # saving a sample
+        if not versions:
+            return
+        aql = f'''
+            FOR u IN @updates
+                FOR d IN @@col
+                    FILTER d.{_FLD_UUID_VER} == u.uuidver
+                    UPDATE d WITH {{{_FLD_VER}: u.ver}} IN @@col
+            '''
+        updates = [{'uuidver': k, 'ver': v} for k, v in versions.items()]
+        self._execute_for_versions(aql, [self._col_nodes, self._col_version], {'updates': updates})
+
+    def _delete_versions_with_query(self, uuidvers: List[str]):
+        # delete edge docs first to ensure we don't orphan them
+        if not uuidvers:
+            return
+        aql = f'''
+            FOR d IN @@col
+                FILTER d.{_FLD_UUID_VER} IN @uuidvers
+                REMOVE d IN @@col
+            '''
+        self._execute_for_versions(
+            aql,
+            [self._col_ver_edge, self._col_version, self._col_node_edge, self._col_nodes],
+            {'uuidvers': uuidvers})
+
+    def _execute_for_versions(self, aql: str, cols, bind_vars: _Dict[str, _Any]):
+        try:
+            for col in cols:
+                self._db.aql.execute(aql, bind_vars=dict(bind_vars, **{'@col': col.name}))
+        except _arango.exceptions.AQLQueryExecuteError as e:  # this is a real pain to test
+            raise _SampleStorageError('Connection to database failed: ' + str(e)) from e
 
     def _build_scheduler(self):
         schd = _BackgroundScheduler()
-        schd.add_job(self._check_db_updated, 'interval', seconds=1, id=_JOB_ID)
+        schd.add_job(self._run_consistency_checker, 'interval', seconds=1, id=_JOB_ID)
         schd.start(paused=True)
         return schd
 
+    def _run_consistency_checker(self):
+        # only one storage instance per database, the holder of the lease, runs the checker.
+        if self._acquire_checker_lease():
+            self._check_db_updated()
+            self._update_derived_data()
+
+    def _update_derived_data(self) -> int:
+        # Regenerates the derived data for sample versions with an outdated derived data version
+        # and returns the number of versions updated. Unversioned versions are skipped until
+        # the integer version is set. The derived data is written before the version is marked,
+        # so a failed run is repeated by the next run.
+        # Every version in a batch is marked, even if the DB is corrupt and its nodes are
+        # missing, so the loop always terminates.
+        start = _time.monotonic()
+        count = 0
+        while True:
+            batch = self._find_outdated_derived_data()
+            if not batch:
+                break
+            contentdocs: List[dict] = []
+            nodeupdates: List[dict] = []
+            oldmetakeys: List[str] = []
+            verupdates: List[dict] = []
+            sampleupdates: List[dict] = []
+            for d in batch:
+                v = d['version']
+                if v[_FLD_VER] == 1 and d['sample'] and d['sample'].get(_FLD_SAVE_TIME) is None:
+                    sampleupdates.append({_FLD_ARANGO_KEY: v[_FLD_ID],
+                                          _FLD_SAVE_TIME: v[_FLD_SAVE_TIME]})
+                verupdate = {_FLD_ARANGO_KEY: v[_FLD_ARANGO_KEY],
+                             _FLD_DERIVED_VER: _DERIVED_DATA_VERSION}
+                if d['nodes']:
+                    sample = SavedSample(
+                        UUID(v[_FLD_ID]),
+                        UserID(v[_FLD_USER]),
+                        self._node_docs_to_nodes(d['nodes']),
+                        self._timestamp_to_datetime(v[_FLD_SAVE_TIME]),
+                        v[_FLD_NAME],
+                        v[_FLD_VER])
+                    uuidver = UUID(v[_FLD_UUID_VER])
+                    latest = bool(d['sample']) and (
+                        d['sample'][_FLD_VERSIONS][-1] == v[_FLD_UUID_VER])
+                    c, n = self._create_node_derived_data_updates(sample, uuidver, latest)
+                    contentdocs.extend(c)
+                    nodeupdates.extend(n)
+                    oldmetakeys.extend(self._create_node_meta_keys(sample, uuidver))
+                    verupdate[_FLD_TERMS] = get_sample_search_terms(sample)
+                verupdates.append(verupdate)
+            self._insert_node_content(contentdocs, upsert_meta=True)
+            if nodeupdates:
+                self._update_many(self._col_nodes, nodeupdates)
+            if oldmetakeys:
+                # remove metadata documents saved per node document, prior to derived data
+                # version 2. Searches ignore them, since they have no content key.
+                self._execute_for_versions(
+                    'FOR k IN @keys REMOVE k IN @@col OPTIONS {ignoreErrors: true}',
+                    [self._col_meta],
+                    {'keys': oldmetakeys})
+            if sampleupdates:
+                self._update_many(self._col_sample, sampleupdates)
+            self._update_many(self._col_version, verupdates)
+            count += len(batch)
+        _logging.getLogger(__name__).info(
+            'Regenerated derived data for %s sample versions in %.3fs',
+            count, _time.monotonic() - start)
+        return count
+
+    def _create_node_derived_data_updates(
+            self, sample: SavedSample, versionid: UUID, latest: bool
+            ) -> Tuple[List[dict], List[dict]]:
+        # returns the content documents for the nodes, including for node documents saved before
+        # node content was content addressed, and the updates for the node documents.
+        contentdocs = []
+        nodeupdates = []
+        for n in sample.nodes:
+            cdoc = self._create_node_content_doc(n)
+            ndoc = {_FLD_ARANGO_KEY: self._get_node_id(sample.id, versionid, n.name),
+                    _FLD_NODE_CONTENT: cdoc[_FLD_ARANGO_KEY],
+                    _FLD_NODE_LATEST: latest}
+            loc = get_node_location(n)
+            if loc:
+                ndoc[_FLD_NODE_LATITUDE], ndoc[_FLD_NODE_LONGITUDE] = loc
+            contentdocs.append(cdoc)
+            nodeupdates.append(ndoc)
+        return contentdocs, nodeupdates
+
+    def _create_node_meta_keys(self, sample: SavedSample, versionid: UUID) -> List[str]:
+        # the keys of the metadata documents saved per node document, prior to derived data
+        # version 2
+        return [self._create_meta_key(self._get_node_id(sample.id, versionid, n.name), m)
+                for n in sample.nodes for m in self._meta_to_list(n.controlled_metadata)]
+
+    def _find_outdated_derived_data(self) -> List[dict]:
+        # returns up to a batch of version documents with outdated derived data, each with its
+        # sample and node documents. null sorts before all numbers in AQL, so versions without a
+        # derived data version are included.
+        aql = f'''
+            FOR v IN @@version_col
+                FILTER v.{_FLD_DERIVED_VER} < @derivedver
+                FILTER v.{_FLD_VER} > 0
+                LIMIT @batch
+                LET sample = DOCUMENT(@@sample_col, v.{_FLD_ID})
+                LET nodes = (
+                    FOR n IN @@node_col
+                        FILTER n.{_FLD_NODE_UUID_VER} == v.{_FLD_UUID_VER}
+                        RETURN {self._node_content_aql('n')}
+                    )
+                RETURN {{version: v, sample: sample, nodes: nodes}}
+            '''
+        try:
+            return list(self._db.aql.execute(aql, bind_vars={
+                '@sample_col': self._col_sample.name,
+                '@version_col': self._col_version.name,
+                '@node_col': self._col_nodes.name,
+                '@node_content_col': self._col_node_content.name,
+                'derivedver': _DERIVED_DATA_VERSION,
+                'batch': _CHECKER_BATCH_SIZE}))
+        except _arango.exceptions.AQLQueryExecuteError as e:  # this is a real pain to test
+            raise _SampleStorageError('Connection to database failed: ' + str(e)) from e
+
+    def _acquire_checker_lease(self) -> bool:
+        # Takes the lease if it's unheld or expired, or renews it if this instance holds it.
+        # The database server clock is used so clock skew between servers doesn't matter.
+        # If the checker takes longer than the lease, another instance may run it concurrently,
+        # which is safe but wasteful.
+        aql = f'''
+            LET now = DATE_NOW() / 1000
+            UPSERT {{{_FLD_ARANGO_KEY}: @lease}}
+                INSERT {{{_FLD_ARANGO_KEY}: @lease, {_FLD_LEASE_HOLDER}: @holder,
+                         {_FLD_LEASE_EXPIRES}: now + @leasesec}}
+                UPDATE OLD.{_FLD_LEASE_HOLDER} == @holder || OLD.{_FLD_LEASE_EXPIRES} < now ?
+                    {{{_FLD_LEASE_HOLDER}: @holder, {_FLD_LEASE_EXPIRES}: now + @leasesec}} : {{}}
+                IN @@col
+                RETURN NEW.{_FLD_LEASE_HOLDER} == @holder
+            '''
+        try:
+            return self._db.aql.execute(aql, bind_vars={
+                '@col': self._col_schema.name,
+                'lease': _CHECKER_LEASE_VALUE,
+                'holder': self._checker_id,
+                'leasesec': self._checker_lease_sec}).next()
+        except _arango.exceptions.AQLQueryExecuteError as e:
+            # write-write conflict or unique constraint violation codes, another instance
+            # changed the lease at the same time
+            if e.error_code in (1200, 1210):
+                return False
+            # this is a real pain to test
+            raise _SampleStorageError('Connection to database failed: ' + str(e)) from e
+
+    def _release_checker_lease(self):
+        aql = f'''
+            FOR d IN @@col
+                FILTER d.{_FLD_ARANGO_KEY} == @lease AND d.{_FLD_LEASE_HOLDER} == @holder
+                REMOVE d IN @@col
+            '''
+        try:
+            self._db.aql.execute(aql, bind_vars={
+                '@col': self._col_schema.name,
+                'lease': _CHECKER_LEASE_VALUE,
+                'holder': self._checker_id})
+        except _arango.exceptions.AQLQueryExecuteError as e:
+            if e.error_code != 1200:  # another instance took the lease at the same time
+                # this is a real pain to test
+                raise _SampleStorageError('Connection to database failed: ' + str(e)) from e
+
     def start_consistency_checker(self, interval_sec=60):
         '''
         Start the database consistency checker. In production use the consistency checker
         should always be on.
 
+        Only one storage instance using the database runs the checker at any one time. The
+        instance holds a lease that it renews when it runs the checker. If the instance stops
+        renewing the lease, another instance takes over when the lease expires after three
+        intervals.
+
         :param interval_ms: How frequently to run the scheduler in seconds. Defaults to one minute.
         '''
         if interval_sec < 1:
             raise ValueError('interval_sec must be > 0')
+        # the first run checks all documents, in case documents were changed while the
+        # checker was stopped.
+        self._checker_watermark = None
+        self._checker_lease_sec = interval_sec * _CHECKER_LEASE_INTERVALS
         self._scheduler.reschedule_job(_JOB_ID, trigger='interval', seconds=interval_sec)
         self._scheduler.resume()
 
     def stop_consistency_checker(self):
         '''
-        Stop the consistency checker.
+        Stop the consistency checker. If this instance holds the checker lease, the lease is
+        released so another instance can take over.
         '''
         self._scheduler.pause()
+        self._release_checker_lease()
 
     def save_sample(self, sample: SavedSample) -> bool:
         '''
@@ -401,18 +1003,7 @@ class ArangoSampleStorage:
         self._save_version_and_node_docs(sample, versionid)
 
         # create sample document, adding uuid to version list
-        tosave = {_FLD_ARANGO_KEY: str(sample.id),
-                  # yes, this is redundant. It'll match the ver & node collectons though
-                  _FLD_ID: str(sample.id),  # TODO test this is saved
-                  _FLD_VERSIONS: [str(versionid)],
-                  _FLD_ACL_UPDATE_TIME: sample.savetime.timestamp(),
-                  _FLD_ACLS: {_FLD_OWNER: sample.user.id,
-                              _FLD_ADMIN: [],
-                              _FLD_WRITE: [],
-                              _FLD_READ: [],
-                              _FLD_PUBLIC_READ: False
-                              }
-                  }
+        tosave = self._create_sample_doc(sample, versionid)
         try:
             self._col_sample.insert(tosave)
         except _arango.exceptions.DocumentInsertError as e:
@@ -424,17 +1015,85 @@ class ArangoSampleStorage:
         self._update_version_and_node_docs(sample, versionid, 1)
         return True
 
+    def _create_sample_doc(self, sample: SavedSample, versionid: UUID) -> dict:
+        return {_FLD_ARANGO_KEY: str(sample.id),
+                # yes, this is redundant. It'll match the ver & node collectons though
+                _FLD_ID: str(sample.id),  # TODO test this is saved
+                _FLD_VERSIONS: [str(versionid)],
+                _FLD_SAVE_TIME: sample.savetime.timestamp(),
+                _FLD_ACL_UPDATE_TIME: sample.savetime.timestamp(),
+                _FLD_ACLS: {_FLD_OWNER: sample.user.id,
+                            _FLD_ADMIN: [],
+                            _FLD_WRITE: [],
+                            _FLD_READ: [],
+                            _FLD_PUBLIC_READ: False
+                            }
+                }
+
+    def save_samples(self, samples: List[SavedSample]):
+        '''
+        Save many new samples at once. The version in the sample objects, if any, is ignored.
+        Each document type is written to the database for all the samples in a single request.
+
+        The timestamps in the samples are expected to be accurate - the database may become
+        corrupted if this is not the case.
+
+        The IDs of the samples must not already exist in the database. Unlike save_sample(), this
+        is not checked, and so the IDs should be generated by the caller, e.g. random UUIDs.
+
+        :param samples: The samples to save.
+        :raises SampleStorageError: if the samples fail to save.
+        '''
+        _not_falsy(samples, 'samples')
+        _not_falsy_in_iterable(samples, 'samples')
+        if len({s.id for s in samples}) != len(samples):
+            raise ValueError('samples contains duplicate IDs')
+        versionids = [_uuid.uuid4() for _ in samples]
+        contentdocs: List[dict] = []
+        nodedocs: List[dict] = []
+        nodeedgedocs: List[dict] = []
+        verdocs: List[dict] = []
+        veredgedocs: List[dict] = []
+        for sample, versionid in zip(samples, versionids):
+            c, n, ne, v, ve = self._create_version_and_node_docs(sample, versionid)
+            contentdocs.extend(c)
+            nodedocs.extend(n)
+            nodeedgedocs.extend(ne)
+            verdocs.append(v)
+            veredgedocs.append(ve)
+        # see the save process at the top of the file. If the save fails part way through the
+        # reaper will clean up
+        self._insert_node_content(contentdocs)
+        self._insert_many(self._col_nodes, nodedocs)
+        self._insert_many(self._col_node_edge, nodeedgedocs)
+        self._insert_many(self._col_version, verdocs)
+        self._insert_many(self._col_ver_edge, veredgedocs)
+        self._insert_many(self._col_sample, [self._create_sample_doc(s, v)
+                                             for s, v in zip(samples, versionids)])
+        nodeupdates: List[dict] = []
+        verupdates: List[dict] = []
+        for sample, versionid in zip(samples, versionids):
+            n, v = self._create_version_and_node_updates(sample, versionid, 1)
+            nodeupdates.extend(n)
+            verupdates.append(v)
+        self._update_many(self._col_nodes, nodeupdates)
+        self._update_many(self._col_version, verupdates)
+
     def _update_version_and_node_docs(self, sample: SavedSample, versionid: UUID, version: int):
+        nodeupdates, verupdate = self._create_version_and_node_updates(sample, versionid, version)
+        self._update_many(self._col_nodes, nodeupdates)
+        self._update(self._col_version, verupdate)
+
+    def _create_version_and_node_updates(
+            self, sample: SavedSample, versionid: UUID, version: int) -> Tuple[List[dict], dict]:
         nodeupdates: List[dict] = []
         for n in sample.nodes:
             ndoc = {_FLD_ARANGO_KEY: self._get_node_id(sample.id, versionid, n.name),
                     _FLD_NODE_VER: version,
                     }
             nodeupdates.append(ndoc)
-        self._update_many(self._col_nodes, nodeupdates)
-
         verdocid = self._get_version_id(sample.id, versionid)
-        self._update(self._col_version, {_FLD_ARANGO_KEY: verdocid, _FLD_VER: version})
+        return nodeupdates, {_FLD_ARANGO_KEY: verdocid, _FLD_VER: version}
 
     def _update_version_and_node_docs_with_find(self, id_: UUID, versionid: UUID, version: int):
         try:
@@ -447,12 +1106,29 @@ class ArangoSampleStorage:
         self._update(self._col_version, {_FLD_ARANGO_KEY: verdocid, _FLD_VER: version})
 
     def _save_version_and_node_docs(self, sample: SavedSample, versionid: UUID):
+        contentdocs, nodedocs, nodeedgedocs, verdoc, veredgedoc = (
+            self._create_version_and_node_docs(sample, versionid))
+        self._insert_node_content(contentdocs)
+        self._insert_many(self._col_nodes, nodedocs)
+        # TODO this actually isn't tested by anything since we're not doing traversals yet, but
+        # it will be
+        self._insert_many(self._col_node_edge, nodeedgedocs)
+        self._insert(self._col_version, verdoc)
+        # TODO this actually isn't tested by anything since we're not doing traversals yet, but
+        # it will be
+        self._insert(self._col_ver_edge, veredgedoc)
+
+    def _create_version_and_node_docs(
+            self, sample: SavedSample, versionid: UUID
+            ) -> Tuple[List[dict], List[dict], List[dict], dict, dict]:
         verdocid = self._get_version_id(sample.id, versionid)
 
+        contentdocs: List[dict] = []
         nodedocs: List[dict] = []
         nodeedgedocs: List[dict] = []
         for index, n in enumerate(sample.nodes):
             key = self._get_node_id(sample.id, versionid, n.name)
+            cdoc = self._create_node_content_doc(n)
             ndoc = {_FLD_ARANGO_KEY: key,
                     _FLD_NODE_SAMPLE_ID: str(sample.id),
                     _FLD_NODE_UUID_VER: str(versionid),
@@ -462,10 +1138,12 @@ class ArangoSampleStorage:
                     _FLD_NODE_TYPE: n.type.name,
                     _FLD_NODE_PARENT: n.parent,
                     _FLD_NODE_INDEX: index,
-                    _FLD_NODE_CONTROLLED_METADATA: self._meta_to_list(n.controlled_metadata),
-                    _FLD_NODE_UNCONTROLLED_METADATA: self._meta_to_list(n.user_metadata),
-                    _FLD_NODE_SOURCE_METADATA: self._source_meta_to_list(n.source_metadata),
+                    _FLD_NODE_CONTENT: cdoc[_FLD_ARANGO_KEY],
+                    _FLD_NODE_LATEST: True,
                     }
+            loc = get_node_location(n)
+            if loc:
+                ndoc[_FLD_NODE_LATITUDE], ndoc[_FLD_NODE_LONGITUDE] = loc
             if n.type == _SubSampleType.BIOLOGICAL_REPLICATE:
                 to = f'{self._col_version.name}/{verdocid}'
             else:
@@ -476,40 +1154,121 @@ class ArangoSampleStorage:
                      _FLD_ARANGO_FROM: f'{self._col_nodes.name}/{key}',
                      _FLD_ARANGO_TO: to
                      }
+            contentdocs.append(cdoc)
             nodedocs.append(ndoc)
             nodeedgedocs.append(nedoc)
-        self._insert_many(self._col_nodes, nodedocs)
-        # TODO this actually isn't tested by anything since we're not doing traversals yet, but
-        # it will be
-        self._insert_many(self._col_node_edge, nodeedgedocs)
 
-        # save version document
         verdoc = {_FLD_ARANGO_KEY: verdocid,
                   _FLD_ID: str(sample.id),
                   _FLD_USER: sample.user.id,
                   _FLD_VER: _VAL_NO_VER,
                   _FLD_UUID_VER: str(versionid),
                   _FLD_SAVE_TIME: sample.savetime.timestamp(),
-                  _FLD_NAME: sample.name
+                  _FLD_NAME: sample.name,
+                  _FLD_TERMS: get_sample_search_terms(sample),
+                  _FLD_DERIVED_VER: _DERIVED_DATA_VERSION,
                   # TODO description
                   }
-        self._insert(self._col_version, verdoc)
-
-        # TODO this actually isn't tested by anything since we're not doing traversals yet, but
-        # it will be
         veredgedoc = {_FLD_ARANGO_KEY: verdocid,
                       _FLD_UUID_VER: str(versionid),
                       _FLD_ARANGO_FROM: f'{self._col_version.name}/{verdocid}',
                       _FLD_ARANGO_TO: f'{self._col_sample.name}/{sample.id}',
                       }
-        self._insert(self._col_ver_edge, veredgedoc)
+        return contentdocs, nodedocs, nodeedgedocs, verdoc, veredgedoc
+
+    def _create_node_content_doc(self, n: _SampleNode) -> dict:
+        cmeta = self._meta_to_list(n.controlled_metadata)
+        ucmeta = self._meta_to_list(n.user_metadata)
+        smeta = self._source_meta_to_list(n.source_metadata)
+        # Metadata order is not significant, so it is sorted for the hash. Source metadata is a
+        # list and keeps its order.
+        content = _json.dumps(
+            [n.name, n.type.name, n.parent, self._sort_meta_list(cmeta),
+             self._sort_meta_list(ucmeta), smeta],
+            sort_keys=True)
+        return {_FLD_ARANGO_KEY: _hashlib.sha256(content.encode('utf-8')).hexdigest(),
+                _FLD_NODE_CONTROLLED_METADATA: cmeta,
+                _FLD_NODE_UNCONTROLLED_METADATA: ucmeta,
+                _FLD_NODE_SOURCE_METADATA: smeta,
+                }
+
+    def _sort_meta_list(self, m: List[_Dict[str, _Any]]) -> List[_Dict[str, _Any]]:
+        return sorted(m, key=lambda x: (x[_FLD_NODE_META_OUTER_KEY], x[_FLD_NODE_META_KEY]))
+
+    def _insert_node_content(self, docs: List[dict], upsert_meta: bool = False):
+        # Only content that isn't already stored is sent to the database, along with its
+        # controlled metadata documents. The metadata documents are saved first, so if a content
+        # document exists its metadata documents do too. Another save may store the same content
+        # concurrently, so unique constraint violations are ignored.
+        # If upsert_meta is true, the metadata documents for all the content are saved,
+        # replacing any existing documents, e.g. when regenerating derived data.
+        if not docs:
+            return
+        aql = '''
+            FOR k IN @keys
+                FILTER DOCUMENT(@@col, k) != null
+                RETURN k
+            '''
+        try:
+            cur = self._db.aql.execute(aql, bind_vars={
+                '@col': self._col_node_content.name,
+                'keys': list({d[_FLD_ARANGO_KEY] for d in docs})})
+            exists = set(cur)
+        except _arango.exceptions.AQLQueryExecuteError as e:  # this is a real pain to test
+            raise _SampleStorageError('Connection to database failed: ' + str(e)) from e
+        todo = {d[_FLD_ARANGO_KEY]: d for d in docs if d[_FLD_ARANGO_KEY] not in exists}
+        if upsert_meta:
+            unique = {d[_FLD_ARANGO_KEY]: d for d in docs}
+            self._insert_many(
+                self._col_meta, [m for d in unique.values() for m in self._create_meta_docs(d)],
+                upsert=True)
+        else:
+            self._insert_many_if_absent(
+                self._col_meta, [m for d in todo.values() for m in self._create_meta_docs(d)])
+        self._insert_many_if_absent(self._col_node_content, list(todo.values()))
+
+    def _insert_many_if_absent(self, col, docs: List[dict]):
+        # inserts documents whose keys are derived from their content, so existing documents
+        # with the same key are identical and unique constraint violations are ignored
+        if not docs:
+            return
+        try:
+            res = col.insert_many(docs)
+        except _arango.exceptions.DocumentInsertError as e:  # this is a real pain to test
+            raise _SampleStorageError('Connection to database failed: ' + str(e)) from e
+        for r in res:
+            # insert_many returns errors rather than throwing them
+            if isinstance(r, _arango.exceptions.DocumentInsertError) and r.error_code != 1210:
+                raise _SampleStorageError('Connection to database failed: ' + str(r)) from r
+
+    def _create_meta_docs(self, contentdoc: dict) -> List[dict]:
+        # The metadata in the node content documents can only be indexed for equality
+        # comparisons:
+        # https://www.arangodb.com/docs/stable/indexing-index-basics.html#indexing-array-values
+        # so the controlled metadata is denormalized into a separate collection for searches.
+        # The metadata can't be queried on traversals from the nodes.
+        # Values with units are also stored in canonical units so ranges can be searched
+        # regardless of the units the values were saved in.
+        cmeta = contentdoc[_FLD_NODE_CONTROLLED_METADATA]
+        units = {m[_FLD_NODE_META_OUTER_KEY]: m[_FLD_NODE_META_VALUE]
+                 for m in cmeta if m[_FLD_NODE_META_KEY] == _UNITS_KEY}
+        docs = []
+        for m in cmeta:
+            doc = {_FLD_ARANGO_KEY: self._create_meta_key(contentdoc[_FLD_ARANGO_KEY], m),
+                   _FLD_META_CONTENT: contentdoc[_FLD_ARANGO_KEY],
+                   **m}
+            if m[_FLD_NODE_META_KEY] == _UNITS_VALUE_KEY:
+                canon = _get_canonical_value(
+                    m[_FLD_NODE_META_VALUE], units.get(m[_FLD_NODE_META_OUTER_KEY]))
+                if canon:
+                    doc[_FLD_META_CANONICAL_VALUE], doc[_FLD_META_CANONICAL_UNITS] = canon
+            docs.append(doc)
+        return docs
+
+    def _create_meta_key(self, prefix: str, meta: _Dict[str, _Any]) -> str:
+        return prefix + '_' + self._md5(_json.dumps(
+            [meta[_FLD_NODE_META_OUTER_KEY], meta[_FLD_NODE_META_KEY]]))
 
-    # TODO may need to make a meta collection. See below.
-    # Can only use equality comparisons on arrays:
-    # https://www.arangodb.com/docs/stable/indexing-index-basics.html#indexing-array-values
-    # Maybe need a doc for each metadata value, which implies going through the whole
-    # save / version update routine the other docs go through
-    # But that means you can't query for metadata on traversals
     def _meta_to_list(self, m: _Dict[str, _Dict[str, _PrimitiveType]]) -> List[_Dict[str, _Any]]:
         ret = []
         for k in m:
@@ -549,9 +1308,11 @@ class ArangoSampleStorage:
         except _arango.exceptions.DocumentInsertError as e:  # this is a real pain to test
             raise _SampleStorageError('Connection to database failed: ' + str(e)) from e
 
-    def _insert_many(self, col, docs):
+    def _insert_many(self, col, docs, upsert=False):
+        if not docs:
+            return
         try:
-            col.insert_many(docs, silent=True)
+            col.insert_many(docs, silent=True, overwrite=upsert)
         except _arango.exceptions.DocumentInsertError as e:  # this is a real pain to test
             raise _SampleStorageError('Connection to database failed: ' + str(e)) from e
 
@@ -625,7 +1386,8 @@ class ArangoSampleStorage:
                 bind_vars['version_count'] = prior_version
             cur = self._db.aql.execute(aql, bind_vars=bind_vars)
             if not cur.empty():
-                version = len(cur.next()[_FLD_VERSIONS])
+                versions = cur.next()[_FLD_VERSIONS]
+                version = len(versions)
             else:
                 sampledoc = _cast(dict, self._get_sample_doc(sample.id))
                 version = len(sampledoc[_FLD_VERSIONS])
@@ -641,6 +1403,15 @@ class ArangoSampleStorage:
             raise _SampleStorageError('Connection to database failed: ' + str(e)) from e
 
         self._update_version_and_node_docs(sample, versionid, version)
+        # the new version's node documents were saved as the latest version
+        self._execute_for_versions(
+            f'''
+            FOR n IN @@col
+                FILTER n.{_FLD_NODE_UUID_VER} == @uuidver
+                UPDATE n WITH {{{_FLD_NODE_LATEST}: false}} IN @@col
+            ''',
+            [self._col_nodes],
+            {'uuidver': versions[-2]})
         return version
 
     def get_sample(self, id_: UUID, version: int = None) -> SavedSample:
@@ -653,14 +1424,548 @@ class ArangoSampleStorage:
         :raises NoSuchSampleVersionError: if the sample version does not exist.
         :raises SampleStorageError: if the sample could not be retrieved.
         '''
-        doc, verdoc, version = self._get_sample_and_version_doc(id_, version)
+        return self.get_sample_and_acls(id_, version)[0]
 
-        nodes = self._get_nodes(id_, UUID(verdoc[_FLD_NODE_UUID_VER]), version)
-        dt = self._timestamp_to_datetime(verdoc[_FLD_SAVE_TIME])
+    def get_sample_and_acls(
+            self, id_: UUID, version: int = None) -> Tuple[SavedSample, SampleACL]:
+        '''
+        Get a sample and the sample's ACLs from the database. The sample document, version
+        document, and node documents are fetched in a single query.
+        :param id_: the ID of the sample.
+        :param version: The version of the sample to retrieve. Defaults to the latest version.
+        :returns: a tuple of the sample and the sample ACLs.
+        :raises NoSuchSampleError: if the sample does not exist.
+        :raises NoSuchSampleVersionError: if the sample version does not exist.
+        :raises SampleStorageError: if the sample could not be retrieved.
+        '''
+        acls, sample = self.get_samples_and_acls([(_not_falsy(id_, 'id_'), version)])[0]
+        if isinstance(sample, _NoDataException):
+            raise sample
+        return sample, _cast(SampleACL, acls)
+
+    def get_changed_nodes(
+            self, id_: UUID, version_a: int, version_b: int
+            ) -> Tuple[List[_SampleNode], List[_SampleNode]]:
+        '''
+        Get the nodes that differ between two versions of a sample. Nodes are matched by name.
+        A node differs if it is missing from the other version or its type, parent, or
+        metadata differ.
+
+        The nodes are compared in the database so that only the nodes that differ are returned.
+        Nodes with the same content share a content document and are never returned. Nodes with
+        the same metadata in a different order may be returned.
+
+        :param id_: the ID of the sample.
+        :param version_a: the first version of the sample.
+        :param version_b: the second version of the sample.
+        :returns: a tuple of the differing nodes from the first version and the differing nodes
+            from the second version, each in the order of the nodes in their version.
+        :raises NoSuchSampleError: if the sample does not exist.
+        :raises NoSuchSampleVersionError: if either sample version does not exist.
+        :raises SampleStorageError: if the nodes could not be retrieved.
+        '''
+        for v, name in [(version_a, 'version_a'), (version_b, 'version_b')]:
+            if not v or v < 1:
+                raise ValueError(f'{name} must be > 0')
+        vers = _cast(dict, self._get_sample_doc(id_))[_FLD_VERSIONS]
+        for v in [version_a, version_b]:
+            if v > len(vers):
+                raise _NoSuchSampleVersionError(f'{id_} ver {v}')
+        vera, verb = vers[version_a - 1], vers[version_b - 1]
+        differs = ' OR '.join(f'o.{f} != n.{f}' for f in [
+            _FLD_NODE_TYPE, _FLD_NODE_PARENT, _FLD_NODE_CONTROLLED_METADATA,
+            _FLD_NODE_UNCONTROLLED_METADATA, _FLD_NODE_SOURCE_METADATA])
+        # Nodes in the other version are fetched by key, which is derived from the node name.
+        # Node documents saved before node content was content addressed have no content key
+        # and are compared field by field.
+        q = f'''
+            FOR p IN @pairs
+                LET nodes = (
+                    FOR nd IN @@nodes
+                        FILTER nd.{_FLD_NODE_UUID_VER} == p.ver
+                        LET od = DOCUMENT(
+                            @nodecol, CONCAT(p.otherprefix, MD5(nd.{_FLD_NODE_NAME})))
+                        FILTER od == null OR od.{_FLD_NODE_CONTENT} == null
+                            OR od.{_FLD_NODE_CONTENT} != nd.{_FLD_NODE_CONTENT}
+                        LET n = {self._node_content_aql('nd')}
+                        LET o = {self._node_content_aql('od')}
+                        FILTER o == null OR {differs}
+                        SORT n.{_FLD_NODE_INDEX}
+                        RETURN n
+                    )
+                RETURN nodes
+            '''
+        bind_vars = {'@nodes': self._col_nodes.name,
+                     '@node_content_col': self._col_node_content.name,
+                     'nodecol': self._col_nodes.name,
+                     'pairs': [{'ver': vera, 'otherprefix': f'{id_}_{verb}_'},
+                               {'ver': verb, 'otherprefix': f'{id_}_{vera}_'}]}
+        try:
+            a, b = self._db.aql.execute(q, bind_vars=bind_vars)
+        except _arango.exceptions.AQLQueryExecuteError as e:  # this is a pain to test
+            raise _SampleStorageError('Connection to database failed: ' + str(e)) from e
+        return ([self._node_doc_to_node(n) for n in a], [self._node_doc_to_node(n) for n in b])
+
+    def get_samples_and_acls(
+            self, addresses: List[Tuple[UUID, Optional[int]]]
+            ) -> List[Tuple[Optional[SampleACL], _Union[SavedSample, _NoDataException]]]:
+        '''
+        Get many samples and their ACLs from the database in a single query.
+        :param addresses: the IDs and versions of the samples to retrieve. A version of None
+            retrieves the latest version of the sample.
+        :returns: a list of results in the same order as the addresses. Each result is a tuple
+            of the sample ACLs, or None if the sample does not exist, and either the sample or
+            a NoSuchSampleError or NoSuchSampleVersionError.
+        :raises SampleStorageError: if the samples could not be retrieved.
+        '''
+        _not_falsy(addresses, 'addresses')
+        for i, (id_, version) in enumerate(addresses):
+            _not_falsy(id_, f'Index {i} of addresses id_')
+        ret: List[Tuple[Optional[SampleACL], _Union[SavedSample, _NoDataException]]] = []
+        for (id_, version), res in zip(addresses, self._get_sample_version_and_node_docs(
+                addresses, self._version_cache is not None)):
+            doc = res['sample']
+            if not doc:
+                ret.append((None, _NoSuchSampleError(str(id_))))
+                continue
+            acls = self._doc_to_acls(doc)
+            maxver = len(doc[_FLD_VERSIONS])
+            version = version if version else maxver
+            if version > maxver:
+                ret.append((acls, _NoSuchSampleVersionError(f'{id_} ver {version}')))
+            else:
+                ret.append((acls, self._get_sample_from_cache_or_docs(id_, doc, res, version)))
+        return ret
+
+    def search_samples(
+            self,
+            conditions: List[MetadataCondition],
+            user: Optional[UserID],
+            check_acls: bool = True,
+            limit: int = 1000,
+            after: Optional[SampleAddress] = None) -> List[SampleAddress]:
+        '''
+        Find sample versions that match a set of controlled metadata conditions. A sample version
+        matches if every condition is matched by at least one of its nodes. The results are
+        sorted by the sample ID and then by the version.
+
+        :param conditions: the conditions to match.
+        :param user: the user running the search or None for an anonymous user. Only samples
+            the user can read are returned.
+        :param check_acls: False to return all samples regardless of the user's permissions.
+        :param limit: the maximum number of sample versions to return.
+        :param after: the last sample version on the previous page of results. Only sample
+            versions that sort after this version are returned.
+        :returns: the addresses of the matching sample versions.
+        :raises SampleStorageError: if the search fails.
+        '''
+        _not_falsy(conditions, 'conditions')
+        _not_falsy_in_iterable(conditions, 'conditions')
+        if limit < 1:
+            raise ValueError('limit must be > 0')
+        bind_vars: _Dict[str, _Any] = {
+            '@meta': self._col_meta.name,
+            '@nodes': self._col_nodes.name,
+            'vercol': self._col_version.name,
+            'samplecol': self._col_sample.name,
+            'user': user.id if user else None,
+            'checkacls': check_acls,
+            # null sorts before all arrays in AQL
+            'after': [str(after.sampleid), after.version] if after else None,
+            'limit': limit,
+        }
+        # The first condition drives the query via the key / value index, and the matching node
+        # content leads to the nodes via the content index. The remaining conditions are checked
+        # per sample version via the uuid version index.
+        subqueries = ''
+        for i, c in enumerate(conditions[1:], 1):
+            subqueries += _meta_version_condition_aql('uuidver', c, i, bind_vars)
+        aql = f'''
+            FOR m IN @@meta
+                {_meta_condition_aql('m', conditions[0], 0, bind_vars)}
+                FILTER m.{_FLD_META_CONTENT} != null
+                FOR n IN @@nodes
+                    FILTER n.{_FLD_NODE_CONTENT} == m.{_FLD_META_CONTENT}
+                COLLECT id = n.{_FLD_NODE_SAMPLE_ID}, uuidver = n.{_FLD_NODE_UUID_VER}
+                LET ver = DOCUMENT(@vercol, CONCAT(id, '_', uuidver)).{_FLD_VER}
+                FILTER ver > 0
+                FILTER [id, ver] > @after
+                {subqueries}
+                {_acl_filter_aql('id')}
+                SORT id, ver
+                LIMIT @limit
+                RETURN [id, ver]
+            '''
+        try:
+            cur = self._db.aql.execute(aql, bind_vars=bind_vars)
+            return [SampleAddress(UUID(id_), ver) for id_, ver in cur]
+        except _arango.exceptions.AQLQueryExecuteError as e:  # this is a real pain to test
+            raise _SampleStorageError('Connection to database failed: ' + str(e)) from e
+
+    def count_metadata_values(
+            self,
+            key: str,
+            value_key: str,
+            user: Optional[UserID],
+            conditions: Optional[List[MetadataCondition]] = None,
+            check_acls: bool = True,
+            limit: int = 100) -> List[Tuple[_PrimitiveType, int]]:
+        '''
+        Count the samples with each value of a controlled metadata key. Only the latest version of
+        each sample is counted, and a sample is counted once per value regardless of how many of
+        its nodes have the value. The results are sorted by descending count and then by value.
+
+        :param key: the metadata key.
+        :param value_key: the key of the value in the metadata value.
+        :param user: the user requesting the counts or None for an anonymous user. Only samples
+            the user can read are counted.
+        :param conditions: conditions the latest version of a sample must match to be counted,
+            as for search_samples.
+        :param check_acls: False to count all samples regardless of the user's permissions.
+        :param limit: the maximum number of values to return.
+        :returns: tuples of the values and the number of samples with each value.
+        :raises SampleStorageError: if the count fails.
+        '''
+        _check_string(key, 'key')
+        _check_string(value_key, 'value_key')
+        _not_falsy_in_iterable(conditions if conditions else [], 'conditions')
+        if limit < 1:
+            raise ValueError('limit must be > 0')
+        bind_vars: _Dict[str, _Any] = {
+            '@meta': self._col_meta.name,
+            '@nodes': self._col_nodes.name,
+            'samplecol': self._col_sample.name,
+            'facetkey': key,
+            'facetvalkey': value_key,
+            'user': user.id if user else None,
+            'checkacls': check_acls,
+            'limit': limit,
+        }
+        # The key / value index drives the query, and the content / latest index on the nodes
+        # means only the nodes for the latest versions of samples are read. Counters maintained
+        # at save time can't take the user's permissions into account, so the counts are
+        # aggregated at query time.
+        subqueries = ''
+        for i, c in enumerate(conditions if conditions else []):
+            subqueries += _meta_version_condition_aql(
+                f'n.{_FLD_NODE_UUID_VER}', c, i, bind_vars)
+        aql = f'''
+            FOR m IN @@meta
+                FILTER m.{_FLD_NODE_META_OUTER_KEY} == @facetkey AND
+                    m.{_FLD_NODE_META_KEY} == @facetvalkey AND m.{_FLD_META_CONTENT} != null
+                FOR n IN @@nodes
+                    FILTER n.{_FLD_NODE_CONTENT} == m.{_FLD_META_CONTENT} AND
+                        n.{_FLD_NODE_LATEST} == true
+                LET s = DOCUMENT(@samplecol, n.{_FLD_NODE_SAMPLE_ID})
+                FILTER LAST(s.{_FLD_VERSIONS}) == n.{_FLD_NODE_UUID_VER}
+                {_acl_filter_aql(f'n.{_FLD_NODE_SAMPLE_ID}', 's')}
+                {subqueries}
+                COLLECT value = m.{_FLD_NODE_META_VALUE}, id = n.{_FLD_NODE_SAMPLE_ID}
+                COLLECT v = value WITH COUNT INTO count
+                SORT count DESC, v
+                LIMIT @limit
+                RETURN [v, count]
+            '''
+        try:
+            cur = self._db.aql.execute(aql, bind_vars=bind_vars)
+            return [(v, count) for v, count in cur]
+        except _arango.exceptions.AQLQueryExecuteError as e:  # this is a real pain to test
+            raise _SampleStorageError('Connection to database failed: ' + str(e)) from e
+
+    def search_samples_by_text(
+            self,
+            terms: List[str],
+            user: Optional[UserID],
+            check_acls: bool = True,
+            limit: int = 1000,
+            after: Optional[Tuple[int, SampleAddress]] = None
+            ) -> List[Tuple[SampleAddress, int]]:
+        '''
+        Find sample versions that contain any of a set of full text search terms, as produced
+        by SampleService.core.search.get_search_terms. The score of a sample version is the
+        number of terms it contains. The results are sorted by descending score, then by sample
+        ID, and then by version.
+
+        The score does not take into account how often a term occurs in a sample version or
+        whether it occurs in the name or the metadata, so many sample versions may have the same
+        score. Sample versions with the same score are in ID order, not relevance order.
+
+        :param terms: the terms to find.
+        :param user: the user running the search or None for an anonymous user. Only samples
+            the user can read are returned.
+        :param check_acls: False to return all samples regardless of the user's permissions.
+        :param limit: the maximum number of sample versions to return.
+        :param after: the score and address of the last sample version on the previous page of
+            results. Only sample versions that sort after this version are returned.
+        :returns: tuples of the addresses and scores of the matching sample versions.
+        :raises SampleStorageError: if the search fails.
+        '''
+        _not_falsy(terms, 'terms')
+        _not_falsy_in_iterable(terms, 'terms')
+        if limit < 1:
+            raise ValueError('limit must be > 0')
+        bind_vars: _Dict[str, _Any] = {
+            '@version': self._col_version.name,
+            'samplecol': self._col_sample.name,
+            # duplicate terms would inflate the scores
+            'terms': sorted(set(terms)),
+            'user': user.id if user else None,
+            'checkacls': check_acls,
+            'afterscore': after[0] if after else None,
+            'after': [str(after[1].sampleid), after[1].version] if after else None,
+            'limit': limit,
+        }
+        # Each term is looked up in the term index separately, so a version's score is the
+        # number of times it's found. Ranking requires collecting every matching version, so
+        # very common terms are expensive.
+        aql = f'''
+            FOR t IN @terms
+                FOR v IN @@version
+                    FILTER t IN v.{_FLD_TERMS}[*]
+                    FILTER v.{_FLD_VER} > 0
+                    COLLECT id = v.{_FLD_ID}, ver = v.{_FLD_VER} WITH COUNT INTO score
+                    FILTER @afterscore == null OR score < @afterscore OR
+                        (score == @afterscore AND [id, ver] > @after)
+                    {_acl_filter_aql('id')}
+                    SORT score DESC, id, ver
+                    LIMIT @limit
+                    RETURN [id, ver, score]
+            '''
+        try:
+            cur = self._db.aql.execute(aql, bind_vars=bind_vars)
+            return [(SampleAddress(UUID(id_), ver), score) for id_, ver, score in cur]
+        except _arango.exceptions.AQLQueryExecuteError as e:  # this is a real pain to test
+            raise _SampleStorageError('Connection to database failed: ' + str(e)) from e
+
+    def search_samples_by_location(
+            self,
+            condition: LocationCondition,
+            user: Optional[UserID],
+            check_acls: bool = True,
+            limit: int = 1000,
+            after: Optional[SampleAddress] = None) -> List[SampleAddress]:
+        '''
+        Find sample versions with at least one node located in an area. The results are
+        sorted by the sample ID and then by the version.
+
+        :param condition: the area to search.
+        :param user: the user running the search or None for an anonymous user. Only samples
+            the user can read are returned.
+        :param check_acls: False to return all samples regardless of the user's permissions.
+        :param limit: the maximum number of sample versions to return.
+        :param after: the last sample version on the previous page of results. Only sample
+            versions that sort after this version are returned.
+        :returns: the addresses of the matching sample versions.
+        :raises SampleStorageError: if the search fails.
+        '''
+        _not_falsy(condition, 'condition')
+        if limit < 1:
+            raise ValueError('limit must be > 0')
+        bind_vars: _Dict[str, _Any] = {
+            '@nodes': self._col_nodes.name,
+            'samplecol': self._col_sample.name,
+            'user': user.id if user else None,
+            'checkacls': check_acls,
+            # null sorts before all arrays in AQL
+            'after': [str(after.sampleid), after.version] if after else None,
+            'limit': limit,
+        }
+        lat = f'n.{_FLD_NODE_LATITUDE}'
+        lon = f'n.{_FLD_NODE_LONGITUDE}'
+        if condition.bounding_box:
+            # uses the sparse lat / lon index. Nodes without a location have null coordinates,
+            # which never match a numeric range.
+            minlat, minlon, maxlat, maxlon = condition.bounding_box
+            bind_vars.update(
+                {'minlat': minlat, 'minlon': minlon, 'maxlat': maxlat, 'maxlon': maxlon})
+            # a box with the minimum longitude greater than the maximum crosses the antimeridian
+            lonop = 'OR' if minlon > maxlon else 'AND'
+            geofilter = (f'FILTER {lat} >= @minlat AND {lat} <= @maxlat AND ' +
+                         f'({lon} >= @minlon {lonop} {lon} <= @maxlon)')
+        else:
+            # uses the geo index. GEO_DISTANCE takes coordinates as [longitude, latitude].
+            # The geo index skips nodes without a location, but if the optimizer doesn't use it
+            # GEO_DISTANCE returns null for them and null <= radius is true, hence the guard.
+            clat, clon = _cast(Tuple[float, float], condition.center)
+            bind_vars.update({'center': [clon, clat], 'radius': condition.radius})
+            geofilter = (f'FILTER GEO_DISTANCE(@center, [{lon}, {lat}]) <= @radius\n' +
+                         f'FILTER {lat} != null AND {lon} != null')
+        aql = f'''
+            FOR n IN @@nodes
+                {geofilter}
+                FILTER n.{_FLD_NODE_VER} > 0
+                COLLECT id = n.{_FLD_NODE_SAMPLE_ID}, ver = n.{_FLD_NODE_VER}
+                FILTER [id, ver] > @after
+                {_acl_filter_aql('id')}
+                SORT id, ver
+                LIMIT @limit
+                RETURN [id, ver]
+            '''
+        try:
+            cur = self._db.aql.execute(aql, bind_vars=bind_vars)
+            return [SampleAddress(UUID(id_), ver) for id_, ver in cur]
+        except _arango.exceptions.AQLQueryExecuteError as e:  # this is a real pain to test
+            raise _SampleStorageError('Connection to database failed: ' + str(e)) from e
 
+    def list_samples(
+            self,
+            user: Optional[UserID],
+            limit: int = 1000,
+            after: Optional[Tuple[datetime.datetime, UUID]] = None
+            ) -> List[Tuple[SampleAddress, datetime.datetime]]:
+        '''
+        List the samples a user owns, administrates, can write or read, and the public samples.
+        The samples are sorted by the time the first version of the sample was saved, newest
+        first, and then by the sample ID, descending.
+
+        :param user: the user, or None for an anonymous user, in which case only public samples
+            are listed.
+        :param limit: the maximum number of samples to return.
+        :param after: the save time of the first version and the ID of the last sample on the
+            previous page of results. Only samples that sort after this sample are returned.
+        :returns: tuples of the address of the latest version of each sample and the time the
+            first version of the sample was saved.
+        :raises SampleStorageError: if the listing fails.
+        '''
+        if limit < 1:
+            raise ValueError('limit must be > 0')
+        if after:
+            _check_timestamp(after[0], 'after save time')
+            _not_falsy(after[1], 'after sample ID')
+        aql, bind_vars = self._list_samples_query(user, limit, after)
+        try:
+            cur = self._db.aql.execute(aql, bind_vars=bind_vars)
+            return [(SampleAddress(UUID(id_), ver), self._timestamp_to_datetime(saved))
+                    for id_, ver, saved in cur]
+        except _arango.exceptions.AQLQueryExecuteError as e:  # this is a real pain to test
+            raise _SampleStorageError('Connection to database failed: ' + str(e)) from e
+
+    def _list_samples_query(
+            self,
+            user: Optional[UserID],
+            limit: int,
+            after: Optional[Tuple[datetime.datetime, UUID]]
+            ) -> Tuple[str, _Dict[str, _Any]]:
+        # Each ACL field is queried separately so every branch of the query is driven by that
+        # field's index, rather than checking the OR of the ACL fields against every sample in
+        # save time order. Each branch returns at most one page, and the union of the branches
+        # is sorted to get the page.
+        # Samples saved before the save time was added to the sample document are not listed
+        # until the consistency checker has added it.
+        bind_vars: _Dict[str, _Any] = {
+            '@samples': self._col_sample.name,
+            'limit': limit,
+        }
+        acls = f's.{_FLD_ACLS}'
+        branches = [f'{acls}.{_FLD_PUBLIC_READ} == true']
+        if user:
+            bind_vars['user'] = user.id
+            branches = [f'{acls}.{_FLD_OWNER} == @user',
+                        f'@user IN {acls}.{_FLD_ADMIN}[*]',
+                        f'@user IN {acls}.{_FLD_WRITE}[*]',
+                        f'@user IN {acls}.{_FLD_READ}[*]'] + branches
+        saved = f's.{_FLD_SAVE_TIME}'
+        afterfilter = ''
+        if after:
+            bind_vars['aftersaved'] = after[0].timestamp()
+            bind_vars['afterid'] = str(after[1])
+            afterfilter = (f'FILTER {saved} <= @aftersaved\n' +
+                           f'FILTER {saved} < @aftersaved OR s.{_FLD_ID} < @afterid')
+        subqueries = [f'''(
+                FOR s IN @@samples
+                    FILTER {b}
+                    FILTER {saved} != null
+                    {afterfilter}
+                    SORT {saved} DESC, s.{_FLD_ID} DESC
+                    LIMIT @limit
+                    RETURN [{saved}, s.{_FLD_ID}, LENGTH(s.{_FLD_VERSIONS})]
+                )''' for b in branches]
+        candidates = (subqueries[0] if len(subqueries) == 1
+                      else 'UNION_DISTINCT(' + ', '.join(subqueries) + ')')
+        aql = f'''
+            FOR s IN {candidates}
+                SORT s[0] DESC, s[1] DESC
+                LIMIT @limit
+                RETURN [s[1], s[2], s[0]]
+            '''
+        return aql, bind_vars
+
+    def _get_sample_from_cache_or_docs(
+            self, id_: UUID, doc: dict, res: dict, version: int) -> SavedSample:
+        if not self._version_cache:
+            return self._docs_to_sample(id_, doc, res['version'], res['nodes'], version)
+        uuidver = UUID(doc[_FLD_VERSIONS][version - 1])
+        sample = self._version_cache.get(uuidver)
+        if not sample:
+            if res['cached']:
+                # the version was evicted from the cache after the query ran
+                res = self._get_sample_version_and_node_docs([(id_, version)], False)[0]
+            sample = self._docs_to_sample(id_, doc, res['version'], res['nodes'], version)
+            # _docs_to_sample ensures the integer version is set, so the version is immutable
+            self._version_cache.put(uuidver, sample)
+        return sample
+
+    def _docs_to_sample(
+            self,
+            id_: UUID,
+            doc: dict,
+            verdoc: Optional[dict],
+            nodedocs: List[dict],
+            version: int) -> SavedSample:
+        uuidver = UUID(doc[_FLD_VERSIONS][version - 1])
+        if not verdoc:
+            raise _SampleStorageError(f'Corrupt DB: Missing version {uuidver} for sample {id_}')
+        if not nodedocs:
+            raise _SampleStorageError(
+                f'Corrupt DB: Missing nodes for version {uuidver} of sample {id_}')
+        if verdoc[_FLD_VER] == _VAL_NO_VER or any(
+                n[_FLD_VER] == _VAL_NO_VER for n in nodedocs):
+            # since the version id came from the sample doc, the implication
+            # is that the db or server lost connection before the version could be updated
+            # and the reaper hasn't caught it yet, so we go ahead and fix it.
+            self._update_version_and_node_docs_with_find(id_, uuidver, version)
+        nodes = self._node_docs_to_nodes(nodedocs)
+        dt = self._timestamp_to_datetime(verdoc[_FLD_SAVE_TIME])
         return SavedSample(
             UUID(doc[_FLD_ID]), UserID(verdoc[_FLD_USER]), nodes, dt, verdoc[_FLD_NAME], version)
 
+    # Fetches the sample, version, and node docs for all the addresses in one round trip.
+    # If use_cache is True, the version and node docs are not fetched for versions that are in
+    # the version cache.
+    # The results are in the same order as the addresses.
+    def _get_sample_version_and_node_docs(
+            self, addresses: List[Tuple[UUID, Optional[int]]], use_cache: bool) -> List[dict]:
+        q = f'''
+            FOR a IN @addrs
+                LET s = DOCUMENT(@@sample_col, a.id)
+                LET uuidver = s ? s.{_FLD_VERSIONS}[
+                    (a.ver ? a.ver : LENGTH(s.{_FLD_VERSIONS})) - 1] : null
+                LET cached = uuidver IN a.cached
+                LET v = uuidver AND NOT cached ?
+                    DOCUMENT(@@version_col, CONCAT(a.id, '_', uuidver)) : null
+                LET nodes = uuidver AND NOT cached ? (
+                    FOR n IN @@node_col
+                        FILTER n.{_FLD_NODE_UUID_VER} == uuidver
+                        RETURN {self._node_content_aql('n')}
+                    ) : []
+                RETURN {{sample: s, version: v, nodes: nodes, cached: cached}}
+            '''
+        cache = _cast(SampleVersionCache, self._version_cache)
+        bind_vars = {'@sample_col': self._col_sample.name,
+                     '@version_col': self._col_version.name,
+                     '@node_col': self._col_nodes.name,
+                     '@node_content_col': self._col_node_content.name,
+                     'addrs': [{'id': str(id_),
+                                'ver': ver,
+                                'cached': [str(v) for v in cache.get_version_ids(id_)]
+                                if use_cache else []
+                                }
+                               for id_, ver in addresses]}
+        try:
+            return list(self._db.aql.execute(q, bind_vars=bind_vars))
+        except _arango.exceptions.AQLQueryExecuteError as e:  # this is a pain to test
+            raise _SampleStorageError('Connection to database failed: ' + str(e)) from e
+
     def _get_sample_and_version_doc(
             self, id_: UUID, version: Optional[int] = None) -> Tuple[dict, dict, int]:
         doc, uuidversion, version = self._get_sample_doc_and_versions(id_, version)
@@ -706,39 +2011,38 @@ class ArangoSampleStorage:
             raise _SampleStorageError(f'Corrupt DB: Missing version {ver} for sample {id_}')
         return doc
 
-    # assumes ver came from the sample doc in the db.
-    def _get_nodes(self, id_: UUID, ver: UUID, version: int) -> List[_SampleNode]:
-        # this class controls the version ID, and since it's a UUID we can assume it's unique
-        # across all versions of all samples
-        try:
-            nodedocs = self._col_nodes.find({_FLD_NODE_UUID_VER: str(ver)})
-            if not nodedocs:
-                raise _SampleStorageError(
-                    f'Corrupt DB: Missing nodes for version {ver} of sample {id_}')
-            index_to_node = {}
-            for n in nodedocs:
-                if n[_FLD_VER] == _VAL_NO_VER:
-                    # since it's assumed the version id came from the sample doc, the implication
-                    # is that the db or server lost connection before the version could be updated
-                    # and the reaper hasn't caught it yet, so we go ahead and fix it.
-                    self._update_version_and_node_docs_with_find(id_, ver, version)
-                index_to_node[n[_FLD_NODE_INDEX]] = _SampleNode(
-                    n[_FLD_NODE_NAME],
-                    _SubSampleType[n[_FLD_NODE_TYPE]],
-                    n[_FLD_NODE_PARENT],
-                    self._list_to_meta(n[_FLD_NODE_CONTROLLED_METADATA]),
-                    self._list_to_meta(n[_FLD_NODE_UNCONTROLLED_METADATA]),
-                    # allow for compatatibility with old samples without a source meta field
-                    self._list_to_source_meta(n.get(_FLD_NODE_SOURCE_METADATA)),
-                    )
-        except _arango.exceptions.DocumentGetError as e:  # this is a pain to test
-            raise _SampleStorageError('Connection to database failed: ' + str(e)) from e
+    def _node_content_aql(self, var: str) -> str:
+        # Returns an AQL expression that adds the node content to the node document in var,
+        # which may be null. Node documents saved before node content was content addressed
+        # contain the content. Requires the @@node_content_col bind variable.
+        fields = ', '.join(f"'{f}'" for f in [
+            _FLD_NODE_CONTROLLED_METADATA,
+            _FLD_NODE_UNCONTROLLED_METADATA,
+            _FLD_NODE_SOURCE_METADATA])
+        return (f'({var}.{_FLD_NODE_CONTENT} ? MERGE({var}, KEEP(DOCUMENT(@@node_content_col, '
+                f'{var}.{_FLD_NODE_CONTENT}), {fields})) : {var})')
+
+    def _node_docs_to_nodes(self, nodedocs: List[_Any]) -> List[_SampleNode]:
+        index_to_node = {}
+        for n in nodedocs:
+            index_to_node[n[_FLD_NODE_INDEX]] = self._node_doc_to_node(n)
         # could check for keyerror here if nodes were deleted, but db is corrupt either way
         # so YAGNI.
         # Could add a node count to the version... but how about we just assume the db works
         nodes = [index_to_node[i] for i in range(len(index_to_node))]
         return nodes
 
+    def _node_doc_to_node(self, n: _Any) -> _SampleNode:
+        return _SampleNode(
+            n[_FLD_NODE_NAME],
+            _SubSampleType[n[_FLD_NODE_TYPE]],
+            n[_FLD_NODE_PARENT],
+            self._list_to_meta(n[_FLD_NODE_CONTROLLED_METADATA]),
+            self._list_to_meta(n[_FLD_NODE_UNCONTROLLED_METADATA]),
+            # allow for compatatibility with old samples without a source meta field
+            self._list_to_source_meta(n.get(_FLD_NODE_SOURCE_METADATA)),
+            )
+
     def _get_sample_doc(self, id_: UUID, exception: bool = True) -> Optional[dict]:
         doc = self._get_doc(self._col_sample, str(_not_falsy(id_, 'id_')))
         if not doc:
@@ -762,7 +2066,9 @@ class ArangoSampleStorage:
         :raises SampleStorageError: if the sample could not be retrieved.
         '''
         # return no class for now, might need later
-        doc = _cast(dict, self._get_sample_doc(id_))
+        return self._doc_to_acls(_cast(dict, self._get_sample_doc(id_)))
+
+    def _doc_to_acls(self, doc: dict) -> SampleACL:
         acls = doc[_FLD_ACLS]
         return SampleACL(
             UserID(acls[_FLD_OWNER]),
@@ -974,12 +2280,11 @@ class ArangoSampleStorage:
         '''
         # may want to link non-ws data at some point, would need a data source ID? YAGNI for now
 
-        # Using the REST streaming api for the transaction. Might be faster with javascript
-        # server side implementation, but this is easier to read, easier to understand, and easier
-        # to implement. Switch to js if performance becomes an issue.
+        # By default the transaction is a server side javascript transaction, which runs in one
+        # request to the database. The REST streaming api implementation is easier to read and
+        # understand and can be selected in the constructor - the two must be kept in sync.
 
-        # Might want a bulk method for peformance improvement, should take measurements at some
-        # point.
+        # See create_data_links for a bulk version of this method.
 
         # For the current link from the DUID, the _key is the DUID. This ensures there's only 1
         # extant link per DUID. For expired links, the expiration time is added to the _key.
@@ -998,20 +2303,73 @@ class ArangoSampleStorage:
         _, versiondoc, _ = self._get_sample_and_version_doc(sna.sampleid, sna.version)
         samplever = UUID(versiondoc[_FLD_UUID_VER])
         nodeid = self._get_node_id(sna.sampleid, samplever, sna.node)
+        if self._js_link_transactions:
+            return self._retry_on_link_write_conflict(
+                lambda: self._create_data_link_js(link, samplever, nodeid, update))
         if not self._get_doc(self._col_nodes, nodeid):
             raise _NoSuchSampleNodeError(f'{sna.sampleid} ver {sna.version} {sna.node}')
 
-        # makes a db specifically for this transaction
-        tdb = self._db.begin_transaction(
-            read=self._col_data_link.name,
-            # Need exclusive as we're counting docs and making decisions based on that number
-            # Write only checks for write collisions on specific docs, so count could change
-            # during transaction
-            exclusive=self._col_data_link.name)
+        # The counts of extant links from the workspace object and sample version are kept in
+        # count documents which are updated in the same transaction as the links, so checking
+        # the link limits is a document read rather than a count of the links.
+
+        # Rather than locking the entire data link collection, the transaction write locks the
+        # count documents for the workspace object and sample versions involved, which act as
+        # guards - any other transaction changing links from the same object or to the same
+        # sample version must write the same documents, and the database fails one of the
+        # transactions with a write conflict, after which it is retried.
+        # Since the DUID is part of the workspace object, the object guard also guards the link
+        # documents for the DUID.
+        return self._retry_on_link_write_conflict(
+            lambda: self._create_data_link_in_transaction(link, samplever, update))
+
+    def _create_data_link_js(
+            self, link: DataLink, samplever: UUID, nodeid: str, update: bool) -> Optional[UUID]:
+        # the javascript checks the node exists in the transaction, saving a request
+        res = self._execute_link_js(_JS_CREATE_DATA_LINK, {
+            'nodecol': self._col_nodes.name,
+            'nodeid': nodeid,
+            'doc': self._create_link_doc(link, samplever),
+            'update': update,
+            'maxlinks': self._max_links})
+        err = res.get('error')
+        if err == 'nonode':
+            sna = link.sample_node_address
+            raise _NoSuchSampleNodeError(f'{sna.sampleid} ver {sna.version} {sna.node}')
+        if err == 'exists':
+            raise _DataLinkExistsError(str(link.duid))
+        if err == 'toomanyws':
+            self._check_link_count_from_ws_object(self._max_links, link)
+        if err == 'toomanysv':
+            self._check_link_count_from_sample_ver(self._max_links, link)
+        return UUID(res['oldid']) if res.get('oldid') else None
+
+    def _execute_link_js(self, command: str, params: dict) -> dict:
+        params = dict(params, linkcol=self._col_data_link.name,
+                      countcol=self._col_data_link_count.name)
+        try:
+            return self._db.execute_transaction(
+                command,
+                params=params,
+                read=[self._col_data_link.name, self._col_data_link_count.name,
+                      self._col_nodes.name],
+                write=[self._col_data_link.name, self._col_data_link_count.name])
+        except _arango.exceptions.TransactionExecuteError as e:
+            if e.error_code == 1200:  # write-write conflict on a link guard, see create_data_link
+                raise _LinkWriteConflictError() from e
+            raise _SampleStorageError('Connection to database failed: ' + str(e)) from e
 
+    def _create_data_link_in_transaction(
+            self, link: DataLink, samplever: UUID, update: bool) -> Optional[UUID]:
+        # makes a db specifically for this transaction
+        tdb = self._begin_link_transaction()
         try:
             # makes a collection specifically for this transaction
             tdlc = tdb.collection(self._col_data_link.name)
+            wskey = self._create_link_count_key_from_upa(link.duid.upa)
+            svkey = self._create_link_count_key_from_sample_ver(samplever)
+            # lock the guards before reading the link so the link can't change underneath us
+            counts = self._lock_link_counts(tdb, [wskey, svkey])
             oldlinkdoc = self._get_doc(tdlc, self._create_link_key(link))
             if oldlinkdoc:
                 if not update:  # maybe want to move this after the noop check? or add noop option
@@ -1023,8 +2381,8 @@ class ArangoSampleStorage:
                     # the alternative seems to be worse
 
                 # See the notes in the expire method, many are relevant here.
-                # However, since this is an exclusive lock and at this point we know the old
-                # linkdoc exists, there's no need to check for key collisions on insert.
+                # However, since the guard for the DUID is locked and at this point we know the
+                # old linkdoc exists, there's no need to check for key collisions on insert.
                 # The entire transaction may fail, but not the individual inserts.
                 oldlinkdoc[_FLD_LINK_EXPIRED_BY] = link.created_by.id
                 # I'm not a fan of this, but a millisecond gap seems safe and most systems
@@ -1035,31 +2393,286 @@ class ArangoSampleStorage:
 
                 # since we're replacing a link we don't need to worry about counting links from
                 # ws object. Not true for the sample, which could be different.
-                oldsna = oldlink.sample_node_address
-                if sna.sampleid != oldsna.sampleid or sna.version != oldsna.version:
+                if self._link_count_from_sample_ver_changes(link, oldlinkdoc):
                     # it doesn't matter if only the node is different since the traversal from
                     # sample -> workspace objects starts at a version, so the count/version
                     # of extant links won't change
                     # Could support starting at a node later
-                    self._check_link_count_from_sample_ver(tdb, samplever, link)
+                    self._check_link_count_from_sample_ver(counts[svkey], link)
+                    oldsvkey = self._create_link_count_key_from_sample_ver(
+                        UUID(oldlinkdoc[_FLD_LINK_SAMPLE_UUID_VERSION]))
+                    counts.update(self._lock_link_counts(tdb, [oldsvkey]))
+                    counts[svkey] += 1
+                    counts[oldsvkey] -= 1
+                else:
+                    counts = {}
                 self._insert(tdlc, oldlinkdoc)
             else:
                 # might be able to get rid of these limits if it turns out the link queries
                 # can be done without a traversal, which means the links can be looked up with
                 # an index
                 # but then paging is needed, so need to implement that
-                self._check_link_count_from_ws_object(tdb, link)
-                self._check_link_count_from_sample_ver(tdb, samplever, link)
+                self._check_link_count_from_ws_object(counts[wskey], link)
+                self._check_link_count_from_sample_ver(counts[svkey], link)
+                counts[wskey] += 1
+                counts[svkey] += 1
 
             ldoc = self._create_link_doc(link, samplever)
             self._insert(tdlc, ldoc, upsert=bool(oldlinkdoc))
-            # since transaction is exclusive write, conflicts can't happen
+            self._save_link_counts(tdb, counts)
             # presumably any failures are unrecoverable...? conn / db down, etc
             self._commit_transaction(tdb)
         finally:
             self._abort_transaction(tdb)
         return UUID(oldlinkdoc[_FLD_LINK_ID]) if oldlinkdoc else None
 
+    def create_data_links(
+            self, links: List[DataLink], update: bool = False
+            ) -> List[_Union[Tuple[bool, Optional[UUID]], SampleError]]:
+        '''
+        Link many data units in the workspace to samples. The link counts for all the links are
+        read in a single call and the links are saved in a single transaction.
+
+        The same rules and caveats as for create_data_link() apply to each link. In particular,
+        the link IDs must be unique and the creation times are expected to be later than the
+        expire times of any other links for the data unit IDs.
+
+        Links that cannot be created do not prevent the other links from being created.
+
+        :param links: the links to save, none of which can be expired. No two links may be from
+            the same data unit.
+        :param update: if the link from a data unit already exists and is linked to a different
+            sample, update the link. If it is linked to the same sample take no action.
+        :returns: a list of results in the same order as the links. Each result is either
+            a tuple of a boolean that is False if the link was not created because an equivalent
+            link already exists, and the ID of the link that was expired as part of the update
+            process, if any; or the error that prevented the link from being created - one of
+            NoSuchSampleError, NoSuchSampleVersionError, NoSuchSampleNodeError,
+            DataLinkExistsError, or TooManyDataLinksError.
+        :raises SampleStorageError: if the links could not be saved.
+        '''
+        _not_falsy(links, 'links')
+        _not_falsy_in_iterable(links, 'links')
+        for i, link in enumerate(links):
+            if link.expired:
+                raise ValueError(f'Index {i} of links is expired')
+        keys = [self._create_link_key(link) for link in links]
+        if len(set(keys)) != len(keys):
+            raise ValueError('links contains duplicate data unit IDs')
+        results: List[_Union[Tuple[bool, Optional[UUID]], SampleError, None]] = [None] * len(
+            links)
+        samplevers = self._get_uuid_versions_for_links(links, results)
+        # see notes in create_data_link re locking. The results are copied for each attempt so
+        # a retry starts from a clean slate.
+        return self._retry_on_link_write_conflict(
+            lambda: self._create_data_links_in_transaction(
+                links, keys, samplevers, list(results), update))
+
+    def _create_data_links_in_transaction(
+            self,
+            links: List[DataLink],
+            keys: List[str],
+            samplevers: List[Optional[UUID]],
+            results: List[_Union[Tuple[bool, Optional[UUID]], SampleError, None]],
+            update: bool
+            ) -> List[_Union[Tuple[bool, Optional[UUID]], SampleError]]:
+        tdb = self._begin_link_transaction()
+        try:
+            tdlc = tdb.collection(self._col_data_link.name)
+            guards = set()
+            for link, sver in zip(links, samplevers):
+                if sver:
+                    guards.add(self._create_link_count_key_from_upa(link.duid.upa))
+                    guards.add(self._create_link_count_key_from_sample_ver(sver))
+            counts = self._lock_link_counts(tdb, sorted(guards))
+            olddocs = self._get_docs(tdlc, keys)
+            tocheck = []
+            for i, link in enumerate(links):
+                if results[i]:
+                    continue
+                olddoc = olddocs.get(keys[i])
+                if olddoc:
+                    if not update:
+                        results[i] = _DataLinkExistsError(str(link.duid))
+                        continue
+                    if link.is_equivalent(self._doc_to_link(olddoc)):
+                        results[i] = (False, None)
+                        continue
+                tocheck.append((i, link, _cast(UUID, samplevers[i]), olddoc))
+            # links may be moving away from sample versions that aren't locked yet
+            oldsvkeys = {self._create_link_count_key_from_sample_ver(
+                UUID(olddoc[_FLD_LINK_SAMPLE_UUID_VERSION])) for _, _, _, olddoc in tocheck
+                if olddoc}
+            counts.update(self._lock_link_counts(tdb, sorted(oldsvkeys - guards)))
+            newdocs, upsertdocs, expireddocs, counts = self._check_link_counts_and_create_docs(
+                tocheck, counts, results)
+            self._insert_many(tdlc, expireddocs)
+            self._insert_many(tdlc, newdocs)
+            self._insert_many(tdlc, upsertdocs, upsert=True)
+            self._save_link_counts(tdb, counts)
+            self._commit_transaction(tdb)
+        finally:
+            self._abort_transaction(tdb)
+        return _cast(List[_Union[Tuple[bool, Optional[UUID]], SampleError]], results)
+
+    def _get_uuid_versions_for_links(
+            self,
+            links: List[DataLink],
+            results: List[_Union[Tuple[bool, Optional[UUID]], SampleError, None]]
+            ) -> List[Optional[UUID]]:
+        # gets the uuid version for each link's sample version, and sets an error in the
+        # results for any link where the sample, version, or node doesn't exist.
+        addr2ver: _Dict[Tuple[UUID, int], _Union[UUID, SampleError]] = {}
+        for link in links:
+            sna = link.sample_node_address
+            addr = (sna.sampleid, sna.version)
+            if addr not in addr2ver:
+                try:
+                    _, versiondoc, _ = self._get_sample_and_version_doc(*addr)
+                    addr2ver[addr] = UUID(versiondoc[_FLD_UUID_VER])
+                except (_NoSuchSampleError, _NoSuchSampleVersionError) as e:
+                    addr2ver[addr] = e
+        samplevers: List[Optional[UUID]] = []
+        nodeids = []
+        for i, link in enumerate(links):
+            sna = link.sample_node_address
+            ver = addr2ver[(sna.sampleid, sna.version)]
+            if isinstance(ver, SampleError):
+                results[i] = ver
+                samplevers.append(None)
+            else:
+                samplevers.append(ver)
+                nodeids.append(self._get_node_id(sna.sampleid, ver, sna.node))
+        nodes = self._get_docs(self._col_nodes, nodeids)
+        for i, (link, sver) in enumerate(zip(links, samplevers)):
+            sna = link.sample_node_address
+            if sver and self._get_node_id(sna.sampleid, sver, sna.node) not in nodes:
+                results[i] = _NoSuchSampleNodeError(
+                    f'{sna.sampleid} ver {sna.version} {sna.node}')
+        return samplevers
+
+    def _get_docs(self, col, keys: List[str]) -> _Dict[str, dict]:
+        if not keys:
+            return {}
+        try:
+            return {d[_FLD_ARANGO_KEY]: d for d in col.get_many(keys)}
+        except _arango.exceptions.DocumentGetError as e:  # this is a pain to test
+            raise _SampleStorageError('Connection to database failed: ' + str(e)) from e
+
+    def _check_link_counts_and_create_docs(
+            self,
+            tocheck: List[Tuple[int, DataLink, UUID, Optional[dict]]],
+            counts: _Dict[str, int],
+            results: List[_Union[Tuple[bool, Optional[UUID]], SampleError, None]]
+            ) -> Tuple[List[dict], List[dict], List[dict], _Dict[str, int]]:
+        # For links that replace an existing link, the count of links from the ws object
+        # doesn't change, and nor does the count from the sample version if the link stays
+        # with the same version. See create_data_link.
+        # counts must contain the counts for all the objects and sample versions involved.
+        # Returns the link docs and the updated link counts.
+        changed = set()
+        newdocs, upsertdocs, expireddocs = [], [], []
+        for i, link, samplever, olddoc in tocheck:
+            upa = link.duid.upa
+            wskey = self._create_link_count_key_from_upa(upa)
+            svkey = self._create_link_count_key_from_sample_ver(samplever)
+            countsv = self._link_count_from_sample_ver_changes(link, olddoc)
+            if not olddoc and counts[wskey] >= self._max_links:
+                results[i] = _TooManyDataLinksError(
+                    f'More than {self._max_links} links from workspace object {upa}')
+                continue
+            if countsv and counts[svkey] >= self._max_links:
+                sna = link.sample_node_address
+                results[i] = _TooManyDataLinksError(
+                    f'More than {self._max_links} links from sample {sna.sampleid} ' +
+                    f'version {sna.version}')
+                continue
+            if not olddoc:
+                counts[wskey] += 1
+                changed.add(wskey)
+            if countsv:
+                counts[svkey] += 1
+                changed.add(svkey)
+            ldoc = self._create_link_doc(link, samplever)
+            if olddoc:
+                if countsv:
+                    oldsvkey = self._create_link_count_key_from_sample_ver(
+                        UUID(olddoc[_FLD_LINK_SAMPLE_UUID_VERSION]))
+                    counts[oldsvkey] -= 1
+                    changed.add(oldsvkey)
+                # see notes in create_data_link
+                oldid = olddoc[_FLD_LINK_ID]
+                olddoc[_FLD_LINK_EXPIRED_BY] = link.created_by.id
+                olddoc[_FLD_LINK_EXPIRED] = link.created.timestamp() - 0.001
+                olddoc[_FLD_ARANGO_KEY] = self._create_link_key_from_link_doc(olddoc)
+                expireddocs.append(olddoc)
+                upsertdocs.append(ldoc)
+                results[i] = (True, UUID(oldid))
+            else:
+                newdocs.append(ldoc)
+                results[i] = (True, None)
+        return newdocs, upsertdocs, expireddocs, {k: counts[k] for k in changed}
+
+    def _link_count_from_sample_ver_changes(self, link: DataLink, olddoc: Optional[dict]):
+        if not olddoc:
+            return True
+        sna = link.sample_node_address
+        return (str(sna.sampleid) != olddoc[_FLD_LINK_SAMPLE_ID] or
+                sna.version != olddoc[_FLD_LINK_SAMPLE_INT_VERSION])
+
+    def _create_link_count_key_from_upa(self, upa: UPA) -> str:
+        return f'ws_{upa.wsid}_{upa.objid}_{upa.version}'
+
+    def _create_link_count_key_from_sample_ver(self, samplever: UUID) -> str:
+        return f'sv_{samplever}'
+
+    def _get_link_counts(self, db, keys: List[str]) -> _Dict[str, int]:
+        # returns 0 for keys with no count document
+        docs = self._get_docs(db.collection(self._col_data_link_count.name), keys)
+        return {k: docs[k][_FLD_LINK_COUNT] if k in docs else 0 for k in keys}
+
+    def _lock_link_counts(self, db, keys: List[str]) -> _Dict[str, int]:
+        # Gets the link counts and writes them back unchanged, which write locks the count
+        # documents until the transaction completes. If another transaction has written or is
+        # writing any of the documents, a write conflict error is raised.
+        counts = self._get_link_counts(db, keys)
+        self._save_link_counts(db, counts)
+        return counts
+
+    def _save_link_counts(self, db, counts: _Dict[str, int]):
+        if not counts:
+            return
+        docs = [{_FLD_ARANGO_KEY: k, _FLD_LINK_COUNT: c} for k, c in counts.items()]
+        try:
+            # not silent, since errors for individual documents are only reported in the results
+            res = db.collection(self._col_data_link_count.name).insert_many(docs, overwrite=True)
+        except _arango.exceptions.DocumentInsertError as e:  # this is a pain to test
+            raise _SampleStorageError('Connection to database failed: ' + str(e)) from e
+        for r in res:
+            if isinstance(r, _arango.exceptions.DocumentInsertError):
+                if r.error_code == 1200:  # write-write conflict code
+                    raise _LinkWriteConflictError(str(r)) from r
+                # this is a pain to test
+                raise _SampleStorageError('Connection to database failed: ' + str(r)) from r
+
+    def _begin_link_transaction(self):
+        # Write conflicts on the link count documents are used to guard link changes, see
+        # create_data_link.
+        return self._db.begin_transaction(
+            read=[self._col_data_link.name, self._col_data_link_count.name],
+            write=[self._col_data_link.name, self._col_data_link_count.name])
+
+    def _retry_on_link_write_conflict(self, func: Callable[[], _T]) -> _T:
+        for attempt in range(_LINK_WRITE_ATTEMPTS):
+            try:
+                return func()
+            except _LinkWriteConflictError:
+                if attempt < _LINK_WRITE_ATTEMPTS - 1:
+                    _time.sleep(_random.uniform(0, _LINK_WRITE_BACKOFF_SEC * 2 ** attempt))
+        raise _ConcurrencyError(
+            'Too many concurrent changes to data links from the same workspace object or to ' +
+            'the same sample version. Please retry.')
+
     def _commit_transaction(self, transaction_db):
         try:
             transaction_db.commit_transaction()
@@ -1068,7 +2681,8 @@ class ArangoSampleStorage:
             raise _SampleStorageError('Connection to database failed: ' + str(e)) from e
 
     def _abort_transaction(self, transaction_db):
-        if transaction_db.transaction_status() != 'committed':
+        # the database may have already aborted the transaction, e.g. on a write conflict
+        if transaction_db.transaction_status() == 'running':
             try:
                 transaction_db.abort_transaction()
             except _arango.exceptions.TransactionAbortError as e:  # dunno how to test this
@@ -1076,76 +2690,18 @@ class ArangoSampleStorage:
                 # connection is hosed
                 raise _SampleStorageError('Connection to database failed: ' + str(e)) from e
 
-    def _check_link_count_from_ws_object(self, db, link: DataLink):
-        if self._count_links_from_ws_object(
-                db, link.duid.upa, link.created, link.expired) >= self._max_links:
+    def _check_link_count_from_ws_object(self, count: int, link: DataLink):
+        if count >= self._max_links:
             raise _TooManyDataLinksError(
                 f'More than {self._max_links} links from workspace object {link.duid.upa}')
 
-    def _count_links_from_ws_object(
-            self,
-            db,
-            upa: UPA,
-            created: datetime.datetime,
-            expired: Optional[datetime.datetime]):
-        wsc = self._count_links(
-            db,
-            f'''
-                    FILTER d.{_FLD_LINK_WORKSPACE_ID} == @wsid
-                    FILTER d.{_FLD_LINK_OBJECT_ID} == @objid
-                    FILTER d.{_FLD_LINK_OBJECT_VERSION} == @ver''',
-            {'wsid': upa.wsid, 'objid': upa.objid, 'ver': upa.version},
-            created,
-            expired)
-        return wsc
-
-    def _check_link_count_from_sample_ver(self, db, samplever: UUID, link: DataLink):
-        if self._count_links_from_sample_ver(
-                db, samplever, link.created, link.expired) >= self._max_links:
+    def _check_link_count_from_sample_ver(self, count: int, link: DataLink):
+        if count >= self._max_links:
             sna = link.sample_node_address
             raise _TooManyDataLinksError(
                 f'More than {self._max_links} links from sample {sna.sampleid} ' +
                 f'version {sna.version}')
 
-    def _count_links_from_sample_ver(
-            self,
-            db,
-            version: UUID,
-            created: datetime.datetime,
-            expired: Optional[datetime.datetime]):
-        sv = self._count_links(
-            db,
-            f'''
-                    FILTER d.{_FLD_LINK_SAMPLE_UUID_VERSION} == @sver''',
-            {'sver': str(version)},
-            created,
-            expired)
-        return sv
-
-    def _count_links(self, db, filters: str, bind_vars, created, expired):
-        bind_vars['@col'] = self._col_data_link.name
-        bind_vars['created'] = created.timestamp()
-        bind_vars['expired'] = expired.timestamp() if expired else _ARANGO_MAX_INTEGER
-        # might need to include created / expired in compound indexes if we get a ton of expired
-        # links. Might not work in a NOT though. Alternate formulation is
-        # (d.creatd >= @created AND d.created <= @expired) OR
-        # (d.expired >= @created AND d.expired <= @expired)
-        q = ('''
-                FOR d in @@col
-             ''' +
-             filters +
-             f'''
-                    FILTER NOT (d.{_FLD_LINK_EXPIRED} < @created OR
-                        d.{_FLD_LINK_CREATED} > @expired)
-                    COLLECT WITH COUNT INTO linkcount
-                    RETURN linkcount
-             ''')
-        try:
-            cur = db.aql.execute(q, bind_vars=bind_vars)
-            return cur.next()
-        except _arango.exceptions.AQLQueryExecuteError as e:  # this is a pain to test
-            raise _SampleStorageError('Connection to database failed: ' + str(e)) from e
-
     def _create_link_key(self, link: DataLink):
         cr = f'_{link.created.timestamp()}' if link.expired else ''
         upa = link.duid.upa
@@ -1240,6 +2796,9 @@ class ArangoSampleStorage:
         _not_falsy(expired_by, 'expired_by')
         if not bool(id_) ^ bool(duid):  # xor
             raise ValueError('exactly one of id_ or duid must be provided')
+        if self._js_link_transactions:
+            return self._retry_on_link_write_conflict(
+                lambda: self._expire_data_link_js(expired, expired_by, id_, duid))
         if id_:
             linkdoc = self._get_link_doc_from_link_id(id_)
             txtid = str(id_)
@@ -1254,6 +2813,32 @@ class ArangoSampleStorage:
 
         return self._expire_data_link_pt2(linkdoc, expired, expired_by, txtid)
 
+    def _expire_data_link_js(
+            self,
+            expired: datetime.datetime,
+            expired_by: UserID,
+            id_: Optional[UUID],
+            duid: Optional[DataUnitID]) -> DataLink:
+        # the javascript finds and checks the link in the transaction, so there's no race
+        # between the check and the expiration
+        params: _Dict[str, _Any] = {
+            'maxint': _ARANGO_MAX_INTEGER,
+            'expired': expired.timestamp(),
+            'expiredby': expired_by.id}
+        if id_:
+            params['id'] = str(id_)
+        else:
+            params['key'] = self._create_link_key_from_duid(_cast(DataUnitID, duid))
+        res = self._execute_link_js(_JS_EXPIRE_DATA_LINK, params)
+        err = res.get('error')
+        if err == 'multiple':
+            raise _SampleStorageError(f'More than one data link found for ID {id_}')
+        if err == 'nolink':
+            raise _NoSuchLinkError(str(id_) if id_ else str(duid))
+        if err == 'early':
+            raise ValueError(f'expired is < link created time: {res["created"]}')
+        return self._doc_to_link(res['doc'])
+
     # this split is here in order to test the race condition where a link is expired after the
     # check above.
     def _expire_data_link_pt2(self, linkdoc, expired, expired_by, txtid) -> DataLink:
@@ -1269,14 +2854,19 @@ class ArangoSampleStorage:
         # of a transaction may fail, and so the DB may be left in an inconsistent state.
         # TODO DATALINK do we want to add failure checking / recovery code for this transaction?
 
+        # see notes in create_data_link re locking.
+        return self._retry_on_link_write_conflict(
+            lambda: self._expire_data_link_in_transaction(linkdoc, oldkey, txtid))
+
+    def _expire_data_link_in_transaction(self, linkdoc, oldkey, txtid) -> DataLink:
         # makes a db specifically for this transaction
-        tdb = self._db.begin_transaction(
-            read=self._col_data_link.name,
-            write=self._col_data_link.name)
+        tdb = self._begin_link_transaction()
 
         # TODO DATALINK Transactions in arango can allow some ops to succeed and others to fail.
         # What do?
         try:
+            deltas = self._get_link_count_deltas_for_expire([linkdoc])
+            counts = self._lock_link_counts(tdb, sorted(deltas))
             # makes a collection specifically for this transaction
             tdlc = tdb.collection(self._col_data_link.name)
             try:
@@ -1303,11 +2893,118 @@ class ArangoSampleStorage:
 
                 # this is really hard to test - maybe impossible?
                 raise _SampleStorageError('Connection to database failed: ' + str(e)) from e
+            self._save_link_counts(tdb, {k: counts[k] + d for k, d in deltas.items()})
             self._commit_transaction(tdb)
             return self._doc_to_link(linkdoc)
         finally:
             self._abort_transaction(tdb)
 
+    def expire_data_links(
+            self,
+            expired: datetime.datetime,
+            expired_by: UserID,
+            ids: List[UUID]) -> List[DataLink]:
+        '''
+        Expire many data links at once. All the links are expired in a single transaction.
+
+        It is assumed, but not enforced, that the expired time is not in the future.
+
+        :param expired: the expiration time.
+        :param expired_by: the user expiring the links.
+        :param ids: the IDs of the links to expire.
+        :returns: the updated links, in the same order as the IDs.
+        :raises NoSuchLinkError: if any of the links do not exist or are already expired, in
+            which case no links are expired.
+        '''
+        _check_timestamp(expired, 'expired')
+        _not_falsy(expired_by, 'expired_by')
+        _not_falsy(ids, 'ids')
+        _not_falsy_in_iterable(ids, 'ids')
+        if len(set(ids)) != len(ids):
+            raise ValueError('ids contains duplicates')
+        # Unlike expiring a single link, an exclusive transaction is used here, so no other
+        # link may be created or expired while the links are rekeyed. This means
+        # the key collision checks in _expire_data_link_pt2 aren't needed.
+        # See the notes there re transactions and rekeying.
+        tdb = self._db.begin_transaction(
+            read=[self._col_data_link.name, self._col_data_link_count.name],
+            exclusive=[self._col_data_link.name, self._col_data_link_count.name])
+        try:
+            tdlc = tdb.collection(self._col_data_link.name)
+            docs = self._get_link_docs_from_link_ids(tdb, ids)
+            for id_, linkdoc in zip(ids, docs):
+                if linkdoc[_FLD_LINK_EXPIRED] != _ARANGO_MAX_INTEGER:
+                    raise _NoSuchLinkError(str(id_))
+                if expired.timestamp() < linkdoc[_FLD_LINK_CREATED]:
+                    raise ValueError(
+                        f'expired is < link created time: {linkdoc[_FLD_LINK_CREATED]}')
+            oldkeys = []
+            for linkdoc in docs:
+                oldkeys.append(linkdoc[_FLD_ARANGO_KEY])
+                linkdoc[_FLD_LINK_EXPIRED] = expired.timestamp()
+                linkdoc[_FLD_LINK_EXPIRED_BY] = expired_by.id
+                linkdoc[_FLD_ARANGO_KEY] = self._create_link_key_from_link_doc(linkdoc)
+            self._insert_many(tdlc, docs)
+            try:
+                tdlc.delete_many(oldkeys, silent=True)
+            except _arango.exceptions.DocumentDeleteError as e:  # this is a pain to test
+                raise _SampleStorageError('Connection to database failed: ' + str(e)) from e
+            deltas = self._get_link_count_deltas_for_expire(docs)
+            counts = self._get_link_counts(tdb, list(deltas))
+            self._save_link_counts(tdb, {k: counts[k] + d for k, d in deltas.items()})
+            self._commit_transaction(tdb)
+        finally:
+            self._abort_transaction(tdb)
+        return [self._doc_to_link(d) for d in docs]
+
+    def _get_link_count_deltas_for_expire(self, linkdocs: List[dict]) -> _Dict[str, int]:
+        deltas: _Dict[str, int] = defaultdict(int)
+        for d in linkdocs:
+            deltas[self._create_link_count_key_from_upa(UPA(
+                wsid=d[_FLD_LINK_WORKSPACE_ID],
+                objid=d[_FLD_LINK_OBJECT_ID],
+                version=d[_FLD_LINK_OBJECT_VERSION]))] -= 1
+            deltas[self._create_link_count_key_from_sample_ver(
+                UUID(d[_FLD_LINK_SAMPLE_UUID_VERSION]))] -= 1
+        return deltas
+
+    def _get_link_docs_from_link_ids(self, db, ids: List[UUID]) -> List[dict]:
+        # returns the docs in the same order as the IDs.
+        # if delete/hide samples added may need some more logic here
+        q = f'''
+            FOR d IN @@col
+                FILTER d.{_FLD_LINK_ID} IN @ids
+                RETURN d
+            '''
+        bind_vars = {'@col': self._col_data_link.name, 'ids': [str(i) for i in ids]}
+        try:
+            id2doc: _Dict[str, dict] = {}
+            for d in db.aql.execute(q, bind_vars=bind_vars):
+                if d[_FLD_LINK_ID] in id2doc:
+                    raise _SampleStorageError(
+                        f'More than one data link found for ID {d[_FLD_LINK_ID]}')
+                id2doc[d[_FLD_LINK_ID]] = d
+        except _arango.exceptions.AQLQueryExecuteError as e:  # this is a pain to test
+            raise _SampleStorageError('Connection to database failed: ' + str(e)) from e
+        ret = []
+        for id_ in ids:
+            if str(id_) not in id2doc:
+                raise _NoSuchLinkError(str(id_))
+            ret.append(id2doc[str(id_)])
+        return ret
+
+    def get_data_links(self, ids: List[UUID]) -> List[DataLink]:
+        '''
+        Get many links by their IDs. Expired links are included.
+
+        :param ids: the link IDs.
+        :returns: the links, in the same order as the IDs.
+        :raises NoSuchLinkError: if any of the links do not exist.
+        '''
+        _not_falsy(ids, 'ids')
+        _not_falsy_in_iterable(ids, 'ids')
+        return [self._doc_to_link(d) for d in self._get_link_docs_from_link_ids(self._db, ids)]
+
     def get_data_link(self, id_: UUID = None, duid: DataUnitID = None) -> DataLink:
         '''
         Get a link by its ID or Data Unit ID. The latter can only retrieve non-expired links.
@@ -1352,14 +3049,20 @@ class ArangoSampleStorage:
             self,
             sample: SampleAddress,
             readable_wsids: Optional[List[int]],
-            timestamp: datetime.datetime) -> List[DataLink]:
+            timestamp: datetime.datetime,
+            limit: Optional[int] = None,
+            after: Optional[Tuple[datetime.datetime, UUID]] = None) -> List[DataLink]:
         '''
-        Get the links from a sample at a particular time.
+        Get the links from a sample at a particular time. The links are sorted by their created
+        time and then their ID.
 
         :param sample: the sample of interest.
         :param readable_wsids: IDs of workspaces for which the user has read permissions.
             Pass None to return links to objects in all workspaces.
         :param timestamp: the time to use to determine which links are active.
+        :param limit: the maximum number of links to return. Default is no limit.
+        :param after: a tuple of the created time and ID of a link. Only links that sort after
+            this link are returned. Used for paging through the links.
         :returns: a list of links.
         :raises NoSuchSampleError: if the sample does not exist.
         :raises NoSuchSampleVersionError: if the sample version does not exist.
@@ -1368,6 +3071,7 @@ class ArangoSampleStorage:
         _not_falsy(sample, 'sample')
         _check_timestamp(timestamp, 'timestamp')
         _not_falsy_in_iterable(readable_wsids, 'readable_wsids', allow_none=True)
+        _check_link_paging(limit, after)
         if readable_wsids is not None and not readable_wsids:
             return []
         # need to get the version doc to ensure the documents have been updated appropriately
@@ -1382,12 +3086,14 @@ class ArangoSampleStorage:
         if readable_wsids:
             bind_vars['wsids'] = readable_wsids
             wsidfilter = f'FILTER d.{_FLD_LINK_WORKSPACE_ID} IN @wsids'
+        paging = _link_paging_aql(bind_vars, limit, after)
         q = f'''
             FOR d in @@col
                 FILTER d.{_FLD_LINK_SAMPLE_UUID_VERSION} == @samplever
                 {wsidfilter}
                 FILTER d.{_FLD_LINK_CREATED} <= @ts
                 FILTER d.{_FLD_LINK_EXPIRED} >= @ts
+                {paging}
                 RETURN d
             '''
         # may need an index on version + created and expired? Assume for now links aren't
@@ -1405,17 +3111,33 @@ class ArangoSampleStorage:
             raise _SampleStorageError('Connection to database failed: ' + str(e)) from e
         return duids  # a maxium of 10k can be returned based on the link creation function
 
-    def get_links_from_data(self, upa: UPA, timestamp: datetime.datetime) -> List[DataLink]:
+    def get_links_from_data(
+            self,
+            upa: UPA,
+            timestamp: datetime.datetime,
+            limit: Optional[int] = None,
+            after: Optional[Tuple[datetime.datetime, UUID]] = None) -> List[DataLink]:
         '''
         Get links originating from a data object. The data object is not checked for existence.
+        The links are sorted by their created time and then their ID.
 
         :param upa: the address of the data object.
         :param timestamp: the time to use to determine which links are active.
+        :param limit: the maximum number of links to return. Default is no limit.
+        :param after: a tuple of the created time and ID of a link. Only links that sort after
+            this link are returned. Used for paging through the links.
         :returns: a list of links.
         '''
         # the UPA makes it workspace specific, may need to make it generic later. YAGNI for now.
         _not_falsy(upa, 'upa')
         _check_timestamp(timestamp, 'timestamp')
+        _check_link_paging(limit, after)
+        bind_vars = {'@col': self._col_data_link.name,
+                     'wsid': upa.wsid,
+                     'objid': upa.objid,
+                     'ver': upa.version,
+                     'ts': timestamp.timestamp()}
+        paging = _link_paging_aql(bind_vars, limit, after)
         q = f'''
             FOR d in @@col
                 FILTER d.{_FLD_LINK_WORKSPACE_ID} == @wsid
@@ -1423,17 +3145,52 @@ class ArangoSampleStorage:
                 FILTER d.{_FLD_LINK_OBJECT_VERSION} == @ver
                 FILTER d.{_FLD_LINK_CREATED} <= @ts
                 FILTER d.{_FLD_LINK_EXPIRED} >= @ts
+                {paging}
                 RETURN d
             '''
-        bind_vars = {'@col': self._col_data_link.name,
-                     'wsid': upa.wsid,
-                     'objid': upa.objid,
-                     'ver': upa.version,
-                     'ts': timestamp.timestamp()}
         # may need an index on upa + created and expired? Assume for now links aren't
         # expired very often.
         return self._find_links_via_aql(q, bind_vars)
 
+    def get_links_from_data_bulk(
+            self,
+            upas: _Sequence[UPA],
+            timestamp: datetime.datetime) -> _Dict[UPA, List[DataLink]]:
+        '''
+        Get links originating from many data objects at once. The data objects are not checked
+        for existence. The links for each object are sorted by their created time and then
+        their ID.
+
+        :param upas: the addresses of the data objects.
+        :param timestamp: the time to use to determine which links are active.
+        :returns: a mapping of each distinct UPA to its links. UPAs with no links map to an
+            empty list.
+        '''
+        _not_falsy_in_iterable(upas, 'upas')
+        _check_timestamp(timestamp, 'timestamp')
+        ret: _Dict[UPA, List[DataLink]] = {upa: [] for upa in upas}
+        if not ret:
+            return ret
+        bind_vars = {'@col': self._col_data_link.name,
+                     'upas': [[u.wsid, u.objid, u.version] for u in ret],
+                     'ts': timestamp.timestamp()}
+        # looping over the UPAs allows the wsid / objid / version index to be used for each UPA,
+        # which doesn't happen when filtering on [wsid, objid, ver] IN @upas
+        q = f'''
+            FOR u IN @upas
+                FOR d in @@col
+                    FILTER d.{_FLD_LINK_WORKSPACE_ID} == u[0]
+                    FILTER d.{_FLD_LINK_OBJECT_ID} == u[1]
+                    FILTER d.{_FLD_LINK_OBJECT_VERSION} == u[2]
+                    FILTER d.{_FLD_LINK_CREATED} <= @ts
+                    FILTER d.{_FLD_LINK_EXPIRED} >= @ts
+                    SORT d.{_FLD_LINK_CREATED}, d.{_FLD_LINK_ID}
+                    RETURN d
+            '''
+        for link in self._find_links_via_aql(q, bind_vars):
+            ret[link.duid.upa].append(link)
+        return ret
+
     def has_data_link(self, upa: UPA, sample: UUID) -> bool:
         '''
         Check if a link exists or has ever existed between an object and a sample. The sample and
@@ -1469,6 +3226,113 @@ class ArangoSampleStorage:
         return bool(self._find_links_via_aql(q, bind_vars))
 
 
+def _acl_filter_aql(id_var: str, sample_var: Optional[str] = None) -> str:
+    # Returns an AQL filter that passes samples with the ID in the variable id_var that the
+    # user in the bind variable user can read, or all samples if the bind variable checkacls
+    # is false. The bind variable samplecol must contain the sample collection name.
+    # If the sample document has already been fetched, pass the variable containing it in
+    # sample_var to avoid fetching it again.
+    sample = sample_var if sample_var else f'DOCUMENT(@samplecol, {id_var})'
+    return f'''
+        LET acls = {sample}.{_FLD_ACLS}
+        FILTER NOT @checkacls OR acls.{_FLD_PUBLIC_READ} == true OR
+            acls.{_FLD_OWNER} == @user OR @user IN acls.{_FLD_ADMIN} OR
+            @user IN acls.{_FLD_WRITE} OR @user IN acls.{_FLD_READ}'''
+
+
+def _meta_version_condition_aql(
+        uuidver: str, condition: MetadataCondition, index: int, bind_vars: _Dict[str, _Any]
+        ) -> str:
+    # Adds the condition's bind variables to bind_vars and returns an AQL filter for whether any
+    # node in the sample version with the UUID version in the variable uuidver has controlled
+    # metadata that matches the condition.
+    i = index
+    return f'''
+        FILTER LENGTH(
+            FOR n{i} IN @@nodes
+                FILTER n{i}.{_FLD_NODE_UUID_VER} == {uuidver} AND n{i}.{_FLD_NODE_CONTENT} != null
+                FOR m{i} IN @@meta
+                    FILTER m{i}.{_FLD_META_CONTENT} == n{i}.{_FLD_NODE_CONTENT}
+                    {_meta_condition_aql(f'm{i}', condition, i, bind_vars)}
+                    LIMIT 1
+                    RETURN 1
+            ) > 0'''
+
+
+def _meta_condition_aql(
+        var: str, condition: MetadataCondition, index: int, bind_vars: _Dict[str, _Any]) -> str:
+    # Adds the condition's bind variables to bind_vars and returns the AQL filter for the
+    # metadata document in the variable var.
+    # In AQL, null < booleans < numbers < strings, so type bounds keep range conditions on
+    # numbers and prefix conditions on strings, and allow the value index to be used.
+    i = index
+    bind_vars[f'key{i}'] = condition.key
+    bind_vars[f'valkey{i}'] = condition.value_key
+    aql = (f'FILTER {var}.{_FLD_NODE_META_OUTER_KEY} == @key{i} AND ' +
+           f'{var}.{_FLD_NODE_META_KEY} == @valkey{i} AND ')
+    if condition.units:
+        mn, mx, units = condition.get_canonical_range()
+        bind_vars[f'units{i}'] = units
+        aql += f'{var}.{_FLD_META_CANONICAL_UNITS} == @units{i}'
+        v = f'{var}.{_FLD_META_CANONICAL_VALUE}'
+        for name, bound, op in [('min', mn, '>='), ('max', mx, '<=')]:
+            if bound is not None:
+                bind_vars[f'{name}{i}'] = bound
+                aql += f' AND {v} {op} @{name}{i}'
+        return aql
+    v = f'{var}.{_FLD_NODE_META_VALUE}'
+    if condition.equals is not None:
+        bind_vars[f'eq{i}'] = condition.equals
+        return aql + f'{v} == @eq{i}'
+    if condition.prefix is not None:
+        # Arango compares strings with an ICU collation, where U+FFFF sorts after all other
+        # characters, so all strings with the prefix sort before the prefix followed by U+FFFF.
+        # Incrementing the last character of the prefix doesn't work, as ICU sorts punctuation
+        # before digits and letters, e.g. '201:' sorts before '2019'. STARTS_WITH ensures the
+        # results are exact.
+        p = condition.prefix
+        bind_vars[f'prefix{i}'] = p
+        bind_vars[f'prefixend{i}'] = p + '\uffff'
+        return aql + f'{v} >= @prefix{i} AND {v} < @prefixend{i} AND STARTS_WITH({v}, @prefix{i})'
+    if condition.minimum is not None:
+        bind_vars[f'min{i}'] = condition.minimum
+        aql += f'{v} >= @min{i}'
+    else:
+        aql += f'{v} > true'
+    if condition.maximum is not None:
+        bind_vars[f'max{i}'] = condition.maximum
+        return aql + f' AND {v} <= @max{i}'
+    return aql + f" AND {v} < ''"
+
+
+def _check_link_paging(limit: Optional[int], after: Optional[Tuple[datetime.datetime, UUID]]):
+    if limit is not None and limit < 1:
+        raise ValueError('limit must be > 0')
+    if after:
+        _check_timestamp(after[0], 'after created time')
+        _not_falsy(after[1], 'after link ID')
+
+
+def _link_paging_aql(
+        bind_vars: _Dict[str, _Any],
+        limit: Optional[int],
+        after: Optional[Tuple[datetime.datetime, UUID]]) -> str:
+    # Adds any paging bind variables to bind_vars and returns the paging AQL.
+    # Links are sorted by created time and then ID. The ID is unique, so the sort is stable
+    # and the last link on a page marks the start of the next page.
+    aql = ''
+    if after:
+        bind_vars['aftercreated'] = after[0].timestamp()
+        bind_vars['afterid'] = str(after[1])
+        aql += (f'FILTER d.{_FLD_LINK_CREATED} > @aftercreated OR ' +
+                f'(d.{_FLD_LINK_CREATED} == @aftercreated AND d.{_FLD_LINK_ID} > @afterid)\n')
+    aql += f'SORT d.{_FLD_LINK_CREATED}, d.{_FLD_LINK_ID}'
+    if limit:
+        bind_vars['limit'] = limit
+        aql += '\nLIMIT @limit'
+    return aql
+
+
 # if an edge is inserted into a non-edge collection _from and _to are silently dropped
 def _init_collection(database, collection, collection_name, collection_variable_name, edge=False):
     c = database.collection(_check_string(collection, collection_variable_name))
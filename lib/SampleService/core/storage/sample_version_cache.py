@@ -0,0 +1,140 @@
+'''
+An in memory cache for sample versions.
+
+Once the integer version of a sample version has been set in the database the version
+is immutable, and so a fully built sample can be cached indefinitely, keyed by the UUID of the
+version. Note that the UUID version is internal to the database layer and so this cache
+must not be used outside of that layer.
+'''
+
+import threading as _threading
+from collections import OrderedDict as _OrderedDict, defaultdict as _defaultdict
+from uuid import UUID
+from typing import Any as _Any, Dict as _Dict, List, Optional, Set as _Set
+
+from SampleService.core.sample import SavedSample
+
+# approximate per object overhead in bytes for the size estimate.
+_OVERHEAD = 50
+
+
+class SampleVersionCache:
+    '''
+    A least recently used cache of sample versions, bounded by the approximate size of the
+    cached samples in memory.
+
+    :ivar max_bytes: the maximum approximate size of the cache in bytes.
+    :ivar hits: the number of times a requested sample version was found in the cache.
+    :ivar misses: the number of times a requested sample version was not found in the cache.
+    :ivar evictions: the number of sample versions evicted from the cache to make room for
+        other sample versions.
+    '''
+
+    def __init__(self, max_bytes: int):
+        '''
+        Create the cache.
+
+        :param max_bytes: the maximum approximate size of the cache in bytes. Sample versions
+            larger than this will not be cached.
+        '''
+        if max_bytes < 1:
+            raise ValueError('max_bytes must be > 0')
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = _threading.Lock()
+        self._cache: _OrderedDict = _OrderedDict()  # uuid version -> (sample, size)
+        self._sample_to_versions: _Dict[UUID, _Set[UUID]] = _defaultdict(set)
+        self._size = 0
+
+    def get(self, version_id: UUID) -> Optional[SavedSample]:
+        '''
+        Get a sample version from the cache.
+
+        :param version_id: the UUID of the sample version.
+        :returns: the sample or None if the version is not in the cache.
+        '''
+        with self._lock:
+            entry = self._cache.get(version_id)
+            if not entry:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._cache.move_to_end(version_id)
+            return entry[0]
+
+    def put(self, version_id: UUID, sample: SavedSample):
+        '''
+        Add a sample version to the cache. The sample version must have been updated with its
+        integer version in the database.
+
+        :param version_id: the UUID of the sample version.
+        :param sample: the sample.
+        '''
+        if not version_id:
+            raise ValueError('version_id cannot be a value that evaluates to false')
+        if not sample:
+            raise ValueError('sample cannot be a value that evaluates to false')
+        size = _estimate_size(sample)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if version_id in self._cache:
+                self._cache.move_to_end(version_id)
+                return
+            self._cache[version_id] = (sample, size)
+            self._sample_to_versions[sample.id].add(version_id)
+            self._size += size
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._cache)))
+                self.evictions += 1
+
+    def _remove(self, version_id: UUID):
+        sample, size = self._cache.pop(version_id)
+        self._size -= size
+        vers = self._sample_to_versions[sample.id]
+        vers.discard(version_id)
+        if not vers:
+            del self._sample_to_versions[sample.id]
+
+    def get_version_ids(self, sample_id: UUID) -> List[UUID]:
+        '''
+        Get the UUIDs of the versions of a sample that are currently in the cache. This method
+        does not affect the cache statistics or the order of eviction.
+
+        :param sample_id: the ID of the sample.
+        :returns: the UUIDs of the cached versions.
+        '''
+        with self._lock:
+            return list(self._sample_to_versions.get(sample_id, ()))
+
+    @property
+    def size(self) -> int:
+        '''
+        The approximate size of the cache contents in bytes.
+        '''
+        return self._size
+
+    def __len__(self):
+        return len(self._cache)
+
+
+def _estimate_size(sample: SavedSample) -> int:
+    size = _OVERHEAD + len(sample.name or '')
+    for n in sample.nodes:
+        size += _OVERHEAD + len(n.name) + len(n.parent or '')
+        size += _estimate_meta_size(n.controlled_metadata)
+        size += _estimate_meta_size(n.user_metadata)
+        for sm in n.source_metadata:
+            size += _OVERHEAD + len(sm.key) + len(sm.sourcekey)
+            size += _estimate_value_size(sm.sourcevalue)
+    return size
+
+
+def _estimate_meta_size(meta: _Dict[str, _Dict[str, _Any]]) -> int:
+    return sum(_OVERHEAD + len(k) + _estimate_value_size(v) for k, v in meta.items())
+
+
+def _estimate_value_size(value: _Dict[str, _Any]) -> int:
+    return sum(_OVERHEAD + len(k) + (len(v) if type(v) == str else 8) for k, v in value.items())
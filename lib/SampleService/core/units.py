@@ -0,0 +1,47 @@
+'''
+Contains the unit registry for the Sample service and functions for converting metadata values
+to canonical units.
+'''
+
+import os
+from typing import Optional, Tuple
+
+from pint import UnitRegistry as _UnitRegistry
+
+from SampleService.core.core_types import PrimitiveType
+
+UNIT_REGISTRY = _UnitRegistry()
+''' The unit registry for the service. Quantities from other registries cannot be mixed. '''
+UNIT_REGISTRY.load_definitions(
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        'validator',
+        'unit_definitions.txt'
+    )
+)
+
+# Conversions to base units introduce floating point noise, e.g. 3 ft -> 0.9143999999999999 m.
+# Rounding makes conversions of equal quantities compare equal.
+_SIGNIFICANT_DIGITS = 12
+
+
+def get_canonical_value(
+        value: PrimitiveType,
+        units: Optional[PrimitiveType]
+        ) -> Optional[Tuple[float, str]]:
+    '''
+    Convert a value in a set of units to the equivalent value in the SI base units.
+    Equivalent quantities, e.g. 1 m and 100 cm, have the same canonical value and units.
+
+    :param value: the value. Must be an integer or float.
+    :param units: the units of the value, e.g. 'cm' or 'mg/L'.
+    :returns: a tuple of the canonical value and units, or None if the value is not a number or
+        the units cannot be parsed.
+    '''
+    if type(value) not in (int, float) or type(units) != str or not units.strip():
+        return None
+    try:
+        q = UNIT_REGISTRY.Quantity(value, UNIT_REGISTRY.parse_units(units)).to_base_units()
+    except Exception:  # pint has no common error class and raises many builtin errors as well
+        return None
+    return float(f'{q.magnitude:.{_SIGNIFICANT_DIGITS}g}'), str(q.units)
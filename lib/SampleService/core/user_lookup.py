@@ -3,9 +3,14 @@
 # this is tested in the integration tests to avoid starting up the auth server again, as
 # it takes a few seconds
 
+import hashlib as _hashlib
 import logging
 import requests
-from typing import List, Sequence, Tuple
+import threading as _threading
+import time as _time
+from typing import List, Optional, Sequence, Tuple, Callable
+
+from cacheout.lru import LRUCache as _LRUCache
 
 from SampleService.core.arg_checkers import not_falsy as _not_falsy
 from SampleService.core.arg_checkers import not_falsy_in_iterable as _no_falsy_in_iterable
@@ -14,18 +19,43 @@ from SampleService.core.user import UserID
 
 
 class KBaseUserLookup:
-    ''' A client for contacting the KBase authentication server to verify user names. '''
+    '''
+    A client for contacting the KBase authentication server to verify user names.
+
+    :ivar admin_cache_hits: the number of times a token's administration permissions were
+        found in the cache.
+    :ivar admin_cache_misses: the number of times a token's administration permissions were
+        not found in the cache and were fetched from the authentication service.
+    '''
 
     def __init__(
             self,
             auth_url: str,
             auth_token: str,
             full_admin_roles: List[str] = None,
-            read_admin_roles: List[str] = None):
+            read_admin_roles: List[str] = None,
+            cache_max_size: int = 10000,
+            cache_valid_user_expiration: int = 3600,
+            cache_admin_expiration: int = 60,
+            # don't publicize, testing only
+            cache_timer: Optional[Callable[[], float]] = None):
         '''
         Create the client.
         :param auth_url: The root url of the authentication service.
         :param auth_token: A valid token for the authentication service.
+        :param full_admin_roles: The auth service roles that indicate the user has full
+            administration rights for the sample service.
+        :param read_admin_roles: The auth service roles that indicate the user has read
+            administration rights for the sample service.
+        :param cache_max_size: the maximum number of known valid usernames to cache, and
+            separately, the maximum number of tokens for which to cache administration
+            permissions.
+        :param cache_valid_user_expiration: the time, in seconds, a username that the
+            authentication service reported as valid is cached. 0 disables the cache.
+        :param cache_admin_expiration: the time, in seconds, the administration permissions
+            and username for a token are cached. 0 disables the cache. Keep this short, as
+            role changes in the authentication service are not visible until the cache entry
+            expires.
         :raises InvalidTokenError: if the token is invalid
         '''
         self._url = _not_falsy(auth_url, 'auth_url')
@@ -36,6 +66,23 @@ class KBaseUserLookup:
         self._token = _not_falsy(auth_token, 'auth_token')
         self._full_roles = set(full_admin_roles) if full_admin_roles else set()
         self._read_roles = set(read_admin_roles) if read_admin_roles else set()
+        if cache_max_size < 1:
+            raise ValueError('cache_max_size must be > 0')
+        if cache_valid_user_expiration < 0:
+            raise ValueError('cache_valid_user_expiration must be >= 0')
+        if cache_admin_expiration < 0:
+            raise ValueError('cache_admin_expiration must be >= 0')
+        timer = cache_timer if cache_timer is not None else _time.time
+        # cacheout treats a ttl of 0 as no expiration, so don't build the caches at all
+        self._valid_cache = _LRUCache(
+            maxsize=cache_max_size, ttl=cache_valid_user_expiration, timer=timer
+            ) if cache_valid_user_expiration else None
+        self._admin_cache = _LRUCache(
+            maxsize=cache_max_size, ttl=cache_admin_expiration, timer=timer
+            ) if cache_admin_expiration else None
+        self._admin_stats_lock = _threading.Lock()
+        self.admin_cache_hits = 0
+        self.admin_cache_misses = 0
 
         # Auth 0.4.1 needs to be deployed before this will work
         # r = requests.get(self._url, headers={'Accept': 'application/json'})
@@ -77,7 +124,9 @@ class KBaseUserLookup:
 
     def invalid_users(self, usernames: Sequence[UserID]) -> List[UserID]:
         '''
-        Check whether users exist in the authentication service.
+        Check whether users exist in the authentication service. Users that the authentication
+        service has previously reported as valid are cached and not sent to the service again
+        until the cache entry expires.
 
         :param users: the users to check.
         :returns: A list of users that have legal usernames but do not exist in the authentication
@@ -91,29 +140,64 @@ class KBaseUserLookup:
             return []
         _no_falsy_in_iterable(usernames, 'usernames')
 
-        r = requests.get(self._user_url + ','.join([u.id for u in usernames]),
+        vc = self._valid_cache
+        unknown = list(dict.fromkeys(
+            [u.id for u in usernames if vc is None or not vc.has(u.id)]))
+        if not unknown:
+            return []
+        r = requests.get(self._user_url + ','.join(unknown),
                          headers={'Authorization': self._token})
         self._check_error(r)
         good_users = r.json()
-        # TODO ACL cache
-        return [u for u in usernames if u.id not in good_users]
+        if vc is not None:
+            vc.set_many({u: True for u in good_users})
+        unknown_set = set(unknown)
+        return [u for u in usernames if u.id in unknown_set and u.id not in good_users]
 
     def is_admin(self, token: str) -> Tuple[AdminPermission, str]:
         '''
-        Check whether a user is a service administrator.
+        Check whether a user is a service administrator. The result is cached per token.
 
         :param token: The user's token.
         :returns: A tuple consisting of an enum indicating the user's administration permissions,
           if any, and the username.
         '''
-        # TODO ACL cache admin users
         # TODO CODE should regex the token to check for \n etc., but the SDK has already checked it
         _not_falsy(token, 'token')
+        if self._admin_cache is None:
+            return self._fetch_admin(token)
+        key = _token_key(token)
+        ret = self._admin_cache.get(key)
+        with self._admin_stats_lock:
+            if ret:
+                self.admin_cache_hits += 1
+            else:
+                self.admin_cache_misses += 1
+        if not ret:
+            ret = self._fetch_admin(token)
+            self._admin_cache.set(key, ret)
+        return ret
+
+    def _fetch_admin(self, token: str) -> Tuple[AdminPermission, str]:
         r = requests.get(self._me_url, headers={'Authorization': token})
         self._check_error(r)
         j = r.json()
         return self._get_role(j['customroles']), j['user']
 
+    def invalidate_admin_cache(self, token: str = None):
+        '''
+        Remove cached administration permissions.
+
+        :param token: the token for which to remove the cached permissions. If not provided,
+            the permissions for all tokens are removed.
+        '''
+        if self._admin_cache is None:
+            return
+        if token:
+            self._admin_cache.delete(_token_key(token))
+        else:
+            self._admin_cache.clear()
+
     def _get_role(self, roles):
         r = set(roles)
         if r & self._full_roles:
@@ -123,6 +207,11 @@ class KBaseUserLookup:
         return AdminPermission.NONE
 
 
+def _token_key(token: str) -> str:
+    # don't keep the tokens themselves in memory longer than necessary
+    return _hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
 class AuthenticationError(Exception):
     ''' An error thrown from the authentication service. '''
 
@@ -13,14 +13,13 @@ thrown.
 If an exception is not thrown, and a falsy value is returned, the validation succeeds.
 '''
 
-import os
 import ranges
 from typing import Dict, Any, Callable, Optional, cast as _cast, Set as _Set
-from pint import UnitRegistry as _UnitRegistry
 from pint import DimensionalityError as _DimensionalityError
 from pint import UndefinedUnitError as _UndefinedUnitError
 from pint import DefinitionSyntaxError as _DefinitionSyntaxError
 from SampleService.core.core_types import PrimitiveType
+from SampleService.core.units import UNIT_REGISTRY as _UNIT_REG
 from installed_clients.OntologyAPIClient import OntologyAPI
 
 
@@ -165,15 +164,6 @@ def _get_keys(d):
     return keys
 
 
-_UNIT_REG = _UnitRegistry()
-_UNIT_REG.load_definitions(
-    os.path.join(
-        os.path.dirname(os.path.abspath(__file__)),
-        "unit_definitions.txt"
-    )
-)
-
-
 def units(d: Dict[str, Any]) -> Callable[[str, Dict[str, PrimitiveType]], Optional[str]]:
     '''
     Build a validation callable that checks that values are equivalent to a provided example
@@ -2,13 +2,19 @@
 Methods for accessing workspace data.
 '''
 
+import re as _re
+import time as _time
 from enum import IntEnum
-from typing import List, Optional, Dict as _Dict, Set as _Set
+from typing import Callable, List, Optional, Sequence, Union, Dict as _Dict, Set as _Set
+
+from cacheout.lru import LRUCache as _LRUCache
 
 from installed_clients.WorkspaceClient import Workspace
 from installed_clients.baseclient import ServerError as _ServerError
 from SampleService.core.arg_checkers import not_falsy as _not_falsy
 from SampleService.core.arg_checkers import check_string as _check_string
+from SampleService.core.arg_checkers import not_falsy_in_iterable as _no_falsy_in_iterable
+from SampleService.core.errors import SampleError as _SampleError
 from SampleService.core.errors import IllegalParameterError as _IllegalParameterError
 from SampleService.core.errors import UnauthorizedError as _UnauthorizedError
 from SampleService.core.errors import NoSuchWorkspaceDataError as _NoSuchWorkspaceDataError
@@ -33,6 +39,9 @@ _PERM_TO_PERM_SET: _Dict[WorkspaceAccessType, _Set[str]] = {
     WorkspaceAccessType.ADMIN: {'a'}
     }
 
+# the maximum number of workspaces or objects to send to the workspace in one request
+_MAX_WS_REQUEST = 1000
+
 _PERM_TO_PERM_TEXT = {WorkspaceAccessType.READ: 'read',
                       WorkspaceAccessType.WRITE: 'write to',
                       WorkspaceAccessType.ADMIN: 'administrate'
@@ -147,9 +156,19 @@ class DataUnitID:
 class WS:
     '''
     The workspace class.
+
+    Workspace permissions, the workspaces a user can read, and the existence of objects are
+    cached for a short time. As such, changes to workspace permissions and deletion of
+    workspaces or objects may not be visible until the cache entries expire.
     '''
 
-    def __init__(self, client: Workspace):
+    def __init__(
+            self,
+            client: Workspace,
+            cache_max_size: int = 10000,
+            cache_expiration: int = 60,
+            # don't publicize, testing only
+            cache_timer: Optional[Callable[[], float]] = None):
         '''
         Create the workspace class.
 
@@ -157,8 +176,22 @@ class WS:
         catch any exceptions encountered.
 
         :param client: An SDK workspace client with administrator read permissions.
+        :param cache_max_size: the maximum number of entries in each of the workspace
+            permission, user workspace, and object existence caches.
+        :param cache_expiration: the time, in seconds, workspace responses are cached.
+            0 disables the caches.
         '''
         self._ws = _not_falsy(client, 'client')
+        if cache_max_size < 1:
+            raise ValueError('cache_max_size must be > 0')
+        if cache_expiration < 0:
+            raise ValueError('cache_expiration must be >= 0')
+        timer = cache_timer if cache_timer is not None else _time.time
+        # cacheout treats a ttl of 0 as no expiration, so don't build the caches at all
+        self._perm_cache, self._user_ws_cache, self._obj_cache = [
+            _LRUCache(maxsize=cache_max_size, ttl=cache_expiration, timer=timer)
+            if cache_expiration else None
+            for _ in range(3)]
         # check token is a valid admin token
         self._ws.administer({'command': 'listModRequests'})
 
@@ -185,49 +218,148 @@ class WS:
         :raises UnauthorizedError: if the user doesn't have the requested permission.
         :raises NoSuchWorkspaceDataError: if the workspace or UPA doesn't exist.
         '''
-        _not_falsy(perm, 'perm')
         if workspace_id is not None:
-            wsid = workspace_id
-            name = 'workspace'
-            target = str(workspace_id)
-            upa = None
+            err = self.has_permissions(user, perm, workspace_ids=[workspace_id])[0]
         elif upa:
-            wsid = upa.wsid
-            name = 'upa'
-            target = str(upa)
+            err = self.has_permissions(user, perm, upas=[upa])[0]
         else:
             raise ValueError('Either an UPA or a workpace ID must be supplied')
-        if wsid < 1:
-            raise _IllegalParameterError(f'{wsid} is not a valid workspace ID')
+        if err:
+            raise err
 
-        try:
-            p = self._ws.administer({'command': 'getPermissionsMass',
-                                     'params': {'workspaces': [{'id': wsid}]}
-                                     }
-                                    )['perms'][0]
-        except _ServerError as se:
-            # this is pretty ugly, need error codes
-            if 'No workspace' in se.args[0] or 'is deleted' in se.args[0]:
-                raise _NoSuchWorkspaceDataError(se.args[0]) from se
+    def has_permissions(
+            self,
+            user: Optional[UserID],
+            perm: WorkspaceAccessType,
+            workspace_ids: Sequence[int] = None,
+            upas: Sequence[UPA] = None) -> List[Optional[_SampleError]]:
+        '''
+        Check if a user can access many workspace resources at once. Exactly one of
+        workspace_ids or upas must be supplied - if both are supplied workspace_ids takes
+        precedence.
+
+        Permissions for all the workspaces are fetched in one call to the workspace service,
+        and the existence of all the objects in one more call, for up to 1000 distinct
+        workspaces or objects. Further calls may be needed if any of the workspaces do not
+        exist.
+
+        Beware - passing a NONE permission will not return errors unless the object or workspace
+        does not exist.
+
+        The user is not checked for existence.
+
+        :param user: The user's user name, or None for an anonymous user.
+        :param perm: The requested permission
+        :param workspace_ids: The IDs of the workspaces.
+        :param upas: workspace service UPAs.
+        :returns: a list of results in the same order as the input. Each result is None if the
+            user has the requested permission for the resource, or the error has_permission
+            would throw - an UnauthorizedError or NoSuchWorkspaceDataError - otherwise.
+        :raises IllegalParameterError: if any of the wsids are illegal.
+        '''
+        _not_falsy(perm, 'perm')
+        if workspace_ids is not None:
+            targets = [(wsid, 'workspace', str(wsid)) for wsid in workspace_ids]
+            upas = None
+        elif upas is not None:
+            _no_falsy_in_iterable(upas, 'upas')
+            targets = [(upa.wsid, 'upa', str(upa)) for upa in upas]
+        else:
+            raise ValueError('Either UPAs or workspace IDs must be supplied')
+        for wsid, _, _ in targets:
+            if wsid < 1:
+                raise _IllegalParameterError(f'{wsid} is not a valid workspace ID')
+
+        perms = self._get_perms([wsid for wsid, _, _ in targets])
+        ret: List[Optional[_SampleError]] = []
+        for wsid, name, target in targets:
+            p = perms[wsid]
+            if isinstance(p, _SampleError):
+                ret.append(p)
+                continue
+            publicaccess = p.get('*') == 'r' and perm == WorkspaceAccessType.READ
+            hasaccess = p.get(user.id) in _PERM_TO_PERM_SET[perm] if user else False
+            # could optimize a bit if NONE and upa but not worth the code complication most likely
+            if (perm != WorkspaceAccessType.NONE and not hasaccess and not publicaccess):
+                u = f'User {user}' if user else 'Anonymous users'
+                ret.append(_UnauthorizedError(
+                    f'{u} cannot {_PERM_TO_PERM_TEXT[perm]} {name} {target}'))
             else:
-                raise
-        publicaccess = p.get('*') == 'r' and perm == WorkspaceAccessType.READ
-        hasaccess = p.get(user.id) in _PERM_TO_PERM_SET[perm] if user else False
-        # could optimize a bit if NONE and upa but not worth the code complication most likely
-        if (perm != WorkspaceAccessType.NONE and not hasaccess and not publicaccess):
-            u = f'User {user}' if user else 'Anonymous users'
-            raise _UnauthorizedError(f'{u} cannot {_PERM_TO_PERM_TEXT[perm]} {name} {target}')
-        if upa:
-            # Allow any server errors to percolate upwards
-            # theoretically the workspace could've been deleted between the last call and this
+                ret.append(None)
+        if upas:
+            # theoretically a workspace could've been deleted between the last call and this
             # one, but that'll just result in a different error and is extremely unlikely to
             # happen, so don't worry about it
+            missing = self._get_missing_objects([u for u, e in zip(upas, ret) if not e])
+            ret = [_NoSuchWorkspaceDataError(f'Object {u} does not exist')
+                   if not e and u in missing else e
+                   for u, e in zip(upas, ret)]
+        return ret
+
+    def _get_perms(self, wsids: List[int]) -> _Dict[int, Union[_Dict[str, str], _SampleError]]:
+        # caches the entire permission map for each workspace, which covers all users
+        ret: _Dict[int, Union[_Dict[str, str], _SampleError]] = {}
+        todo = []
+        for wsid in dict.fromkeys(wsids):
+            p = self._perm_cache.get(wsid) if self._perm_cache is not None else None
+            if p is not None:
+                ret[wsid] = p
+            else:
+                todo.append(wsid)
+        for i in range(0, len(todo), _MAX_WS_REQUEST):
+            ret.update(self._get_perms_from_ws(todo[i: i + _MAX_WS_REQUEST]))
+        return ret
+
+    def _get_perms_from_ws(
+            self, wsids: List[int]) -> _Dict[int, Union[_Dict[str, str], _SampleError]]:
+        ret: _Dict[int, Union[_Dict[str, str], _SampleError]] = {}
+        while wsids:
+            try:
+                perms = self._ws.administer({'command': 'getPermissionsMass',
+                                             'params': {'workspaces': [{'id': w} for w in wsids]}
+                                             }
+                                            )['perms']
+            except _ServerError as se:
+                # this is pretty ugly, need error codes
+                if 'No workspace' not in se.args[0] and 'is deleted' not in se.args[0]:
+                    raise
+                err = _NoSuchWorkspaceDataError(se.args[0])
+                err.__cause__ = se
+                wsid = _get_wsid_from_error(se.args[0])
+                if len(wsids) == 1:
+                    wsid = wsids[0]
+                elif wsid not in wsids:
+                    # can't tell which workspace is missing, so check them one at a time
+                    for w in wsids:
+                        ret.update(self._get_perms_from_ws([w]))
+                    return ret
+                ret[wsid] = err
+                wsids = [w for w in wsids if w != wsid]
+                continue
+            for wsid, p in zip(wsids, perms):
+                ret[wsid] = p
+                if self._perm_cache is not None:
+                    self._perm_cache.set(wsid, p)
+            wsids = []
+        return ret
+
+    def _get_missing_objects(self, upas: List[UPA]) -> _Set[UPA]:
+        todo = [u for u in dict.fromkeys(upas)
+                if self._obj_cache is None or not self._obj_cache.has(u)]
+        missing = set()
+        for i in range(0, len(todo), _MAX_WS_REQUEST):
+            chunk = todo[i: i + _MAX_WS_REQUEST]
+            # Allow any server errors to percolate upwards
             ret = self._ws.administer({'command': 'getObjectInfo',
-                                       'params': {'objects': [{'ref': str(upa)}],
+                                       'params': {'objects': [{'ref': str(u)} for u in chunk],
                                                   'ignoreErrors': 1}
                                        })
-            if not ret['infos'][0]:
-                raise _NoSuchWorkspaceDataError(f'Object {upa} does not exist')
+            for upa, info in zip(chunk, ret['infos']):
+                if not info:
+                    missing.add(upa)
+                elif self._obj_cache is not None:
+                    self._obj_cache.set(upa, True)
+        return missing
 
     def get_user_workspaces(self, user: Optional[UserID]) -> List[int]:
         '''
@@ -239,6 +371,10 @@ class WS:
         :raises NoSuchUserError: if the user does not exist.
         '''
         # May also want write / admin / no public ws
+        key = user.id if user else None
+        cached = self._user_ws_cache.get(key) if self._user_ws_cache is not None else None
+        if cached is not None:
+            return list(cached)
         try:
             if user:
                 ids = self._ws.administer({'command': 'listWorkspaceIDs',
@@ -252,4 +388,13 @@ class WS:
                 raise _NoSuchUserError(se.args[0]) from se
             else:
                 raise
-        return sorted(ids['workspaces'] + ids['pub'])
+        ret = sorted(ids['workspaces'] + ids['pub'])
+        if self._user_ws_cache is not None:
+            self._user_ws_cache.set(key, tuple(ret))
+        return ret
+
+
+def _get_wsid_from_error(message: str) -> Optional[int]:
+    # this is pretty ugly, need error codes
+    m = _re.search(r'(?:No workspace with id|Workspace) (\d+)', message)
+    return int(m.group(1)) if m else None
@@ -0,0 +1,229 @@
+'''
+A concurrent benchmark for creating data links in ArangoDB.
+
+Creates links from several threads and reports the throughput for four workloads:
+
+* distinct - each thread links objects in its own workspace to its own sample, so no two
+  threads touch the same link guards.
+* exclusive - the distinct workload, but each link is created the way the storage code created
+  links before the link guards were added: in a stream transaction with an exclusive lock on the
+  data link collection, counting the links from the object and to the sample version with
+  queries.
+* serialized - the distinct workload, but with every link creation serialized by a lock in this
+  process. This is only an approximation of the exclusive workload; it does not include the
+  cost of the exclusive lock or the count queries in the database.
+* shared - all threads link data units in the same workspace object to the same sample, so all
+  threads contend for the same link guards.
+
+The benchmark creates and then drops its own collections, prefixed with the --prefix argument,
+in an existing database. Do not run it against a production database.
+
+If --results-file is provided, a row with the results is appended to the file, which is
+expected to end with the results table in design/link_creation_benchmark.md.
+
+Usage example:
+PYTHONPATH=lib python scripts/link_creation_benchmark.py --arango-url http://localhost:8529 \\
+    --database benchmark --user root --password pwd --threads 8 --links 200 \\
+    --link-transactions stream --results-file design/link_creation_benchmark.md
+'''
+
+import argparse
+import collections
+import datetime
+import sys
+import threading
+import time
+import uuid
+
+import arango
+
+from SampleService.core.data_link import DataLink
+from SampleService.core.sample import SampleAddress, SampleNode, SampleNodeAddress, SavedSample
+from SampleService.core.storage.arango_sample_storage import (
+    ArangoSampleStorage,
+    _ARANGO_MAX_INTEGER,
+    _FLD_LINK_CREATED,
+    _FLD_LINK_EXPIRED,
+    _FLD_LINK_OBJECT_ID,
+    _FLD_LINK_OBJECT_VERSION,
+    _FLD_LINK_SAMPLE_UUID_VERSION,
+    _FLD_LINK_WORKSPACE_ID,
+    _FLD_UUID_VER,
+)
+from SampleService.core.user import UserID
+from SampleService.core.workspace import DataUnitID, UPA
+
+_COLLECTIONS = [
+    ('samples', False),
+    ('versions', False),
+    ('ver_edge', True),
+    ('nodes', False),
+    ('node_edge', True),
+    ('ws_obj_ver', False),
+    ('data_link', True),
+    ('data_link_count', False),
+    ('meta', False),
+    ('node_content', False),
+    ('schema', False),
+]
+
+
+def _parse_args(args):
+    parser = argparse.ArgumentParser(description='Benchmark concurrent data link creation.')
+    parser.add_argument('--arango-url', required=True, help='The ArangoDB URL.')
+    parser.add_argument('--database', required=True, help='The database to use.')
+    parser.add_argument('--user', required=True, help='The database user.')
+    parser.add_argument('--password', required=True, help='The database password.')
+    parser.add_argument('--prefix', default='linkbench_',
+                        help='The prefix for the benchmark collection names.')
+    parser.add_argument('--threads', type=int, default=8, help='The number of threads.')
+    parser.add_argument('--links', type=int, default=100,
+                        help='The number of links each thread creates per workload.')
+    parser.add_argument('--link-transactions', choices=['js', 'stream'], default='stream',
+                        help='The type of transaction to use to create links.')
+    parser.add_argument('--results-file',
+                        help='A markdown file to append a row of results to.')
+    return parser.parse_args(args)
+
+
+def _now():
+    return datetime.datetime.now(tz=datetime.timezone.utc)
+
+
+def _run(threads, links, func):
+    # counts failed links by error type. Failed links are not retried, so e.g. the
+    # ConcurrencyErrors in the shared workload are links where the write conflict retries in the
+    # storage code ran out
+    errors = collections.Counter()
+    examples = {}
+
+    def work(thread):
+        for i in range(links):
+            try:
+                func(thread, i)
+            except Exception as e:  # record and keep going with the next link
+                errors[type(e).__name__] += 1
+                examples.setdefault(type(e).__name__, e)
+
+    workers = [threading.Thread(target=work, args=(t,)) for t in range(threads)]
+    start = time.monotonic()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.monotonic() - start
+    return threads * links / elapsed, errors, examples
+
+
+def _count_links(db, col, filters, bind_vars, created):
+    # the count query the storage code used before the link count documents were added
+    cur = db.aql.execute(
+        f'''
+        FOR d in @@col
+            {filters}
+            FILTER NOT (d.{_FLD_LINK_EXPIRED} < @created OR d.{_FLD_LINK_CREATED} > @expired)
+            COLLECT WITH COUNT INTO linkcount
+            RETURN linkcount
+        ''',
+        bind_vars=dict(bind_vars, **{
+            '@col': col, 'created': created, 'expired': _ARANGO_MAX_INTEGER}))
+    return next(cur)
+
+
+def main(args):
+    a = _parse_args(args)
+    db = arango.ArangoClient(hosts=a.arango_url).db(
+        a.database, username=a.user, password=a.password, verify=True)
+    names = [a.prefix + name for name, _ in _COLLECTIONS]
+    for name, (_, edge) in zip(names, _COLLECTIONS):
+        db.create_collection(name, edge=edge)
+    try:
+        ss = ArangoSampleStorage(
+            db, *names, js_link_transactions=a.link_transactions == 'js', max_links=1000000)
+        user = UserID('benchmark')
+        samples = []
+        for _ in range(a.threads + 1):
+            sid = uuid.uuid4()
+            ss.save_sample(SavedSample(sid, user, [SampleNode('node')], _now()))
+            samples.append(SampleNodeAddress(SampleAddress(sid, 1), 'node'))
+        samplevers = [
+            uuid.UUID(ss._get_sample_and_version_doc(s.sampleid, 1)[1][_FLD_UUID_VER])
+            for s in samples]
+        linkcol = ss._col_data_link.name
+        lock = threading.Lock()
+
+        def distinct(wsid_offset, thread, i):
+            ss.create_data_link(DataLink(
+                uuid.uuid4(),
+                DataUnitID(UPA(wsid=wsid_offset + thread + 1, objid=i + 1, version=1)),
+                samples[thread],
+                _now(),
+                user))
+
+        def exclusive(thread, i):
+            link = DataLink(
+                uuid.uuid4(),
+                DataUnitID(UPA(wsid=a.threads + thread + 1, objid=i + 1, version=1)),
+                samples[thread],
+                _now(),
+                user)
+            upa = link.duid.upa
+            created = link.created.timestamp()
+            tdb = db.begin_transaction(read=linkcol, exclusive=linkcol)
+            try:
+                tdlc = tdb.collection(linkcol)
+                ldoc = ss._create_link_doc(link, samplevers[thread])
+                if tdlc.get(ldoc['_key']):
+                    raise ValueError(f'link exists: {link.duid}')
+                wsfilter = (f'FILTER d.{_FLD_LINK_WORKSPACE_ID} == @wsid ' +
+                            f'FILTER d.{_FLD_LINK_OBJECT_ID} == @objid ' +
+                            f'FILTER d.{_FLD_LINK_OBJECT_VERSION} == @ver')
+                wsbind = {'wsid': upa.wsid, 'objid': upa.objid, 'ver': upa.version}
+                if _count_links(tdb, linkcol, wsfilter, wsbind, created) >= ss._max_links:
+                    raise ValueError(f'too many links from {upa}')
+                svfilter = f'FILTER d.{_FLD_LINK_SAMPLE_UUID_VERSION} == @sver'
+                svbind = {'sver': str(samplevers[thread])}
+                if _count_links(tdb, linkcol, svfilter, svbind, created) >= ss._max_links:
+                    raise ValueError(f'too many links to {link.sample_node_address}')
+                tdlc.insert(ldoc)
+                tdb.commit_transaction()
+            finally:
+                if tdb.transaction_status() == 'running':
+                    tdb.abort_transaction()
+
+        def serialized(thread, i):
+            with lock:
+                distinct(2 * a.threads, thread, i)
+
+        def shared(thread, i):
+            ss.create_data_link(DataLink(
+                uuid.uuid4(),
+                DataUnitID(UPA(wsid=3 * a.threads + 1, objid=1, version=1), f'{thread}_{i}'),
+                samples[-1],
+                _now(),
+                user))
+
+        print(f'{a.threads} threads, {a.links} links per thread, ' +
+              f'{a.link_transactions} transactions')
+        row = [_now().date().isoformat(), db.version(), a.link_transactions, str(a.threads),
+               str(a.links)]
+        for name, func in [('distinct', lambda t, i: distinct(0, t, i)),
+                           ('exclusive', exclusive),
+                           ('serialized', serialized),
+                           ('shared', shared)]:
+            rate, errors, examples = _run(a.threads, a.links, func)
+            failed = ', '.join(f'{c} {n}' for n, c in sorted(errors.items()))
+            print(f'{name}: {rate:.1f} links/s' + (f', failed links: {failed}' if errors else ''))
+            for n, e in sorted(examples.items()):
+                print(f'    {n}: {e}')
+            row.append(f'{rate:.1f}' + (f' ({failed})' if errors else ''))
+        if a.results_file:
+            with open(a.results_file, 'a') as f:
+                f.write('| ' + ' | '.join(row) + ' |\n')
+    finally:
+        for name in names:
+            db.delete_collection(name)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -15,6 +15,7 @@ import yaml
 from configparser import ConfigParser
 from pytest import fixture, raises
 from threading import Thread
+from unittest.mock import patch, call
 
 from kafka import KafkaConsumer
 from kafka.errors import NoBrokersAvailable
@@ -59,6 +60,9 @@ TEST_COL_VER_EDGE = 'ver_to_sample'
 TEST_COL_NODES = 'nodes'
 TEST_COL_NODE_EDGE = 'node_edges'
 TEST_COL_DATA_LINK = 'data_link'
+TEST_COL_DATA_LINK_COUNT = 'data_link_count'
+TEST_COL_META = 'meta'
+TEST_COL_NODE_CONTENT = 'node_content'
 TEST_COL_WS_OBJ_VER = 'ws_obj_ver_shadow'
 TEST_COL_SCHEMA = 'schema'
 TEST_USER = 'user1'
@@ -113,6 +117,8 @@ def create_deploy_cfg(auth_port, arango_port, workspace_port, kafka_port):
 
     cfg[ss]['workspace-url'] = f'http://localhost:{workspace_port}'
     cfg[ss]['workspace-read-admin-token'] = TOKEN_WS_READ_ADMIN
+    # the workspace DB is cleared between tests and workspace IDs are reused
+    cfg[ss]['workspace-cache-expiration-sec'] = '0'
 
     cfg[ss]['kafka-bootstrap-servers'] = f'localhost:{kafka_port}'
     cfg[ss]['kafka-topic'] = KAFKA_TOPIC
@@ -123,6 +129,9 @@ def create_deploy_cfg(auth_port, arango_port, workspace_port, kafka_port):
     cfg[ss]['node-collection'] = TEST_COL_NODES
     cfg[ss]['node-edge-collection'] = TEST_COL_NODE_EDGE
     cfg[ss]['data-link-collection'] = TEST_COL_DATA_LINK
+    cfg[ss]['data-link-count-collection'] = TEST_COL_DATA_LINK_COUNT
+    cfg[ss]['metadata-collection'] = TEST_COL_META
+    cfg[ss]['node-content-collection'] = TEST_COL_NODE_CONTENT
     cfg[ss]['workspace-object-version-shadow-collection'] = TEST_COL_WS_OBJ_VER
     cfg[ss]['schema-collection'] = TEST_COL_SCHEMA
 
@@ -142,7 +151,19 @@ def create_deploy_cfg(auth_port, arango_port, workspace_port, kafka_port):
                                               'parameters': {'keys': 'spcky', 'max-len': 2}
                                               }],
                               'key_metadata': {'h': 'i', 'j': 'k'}
-                              }
+                              },
+            'latitude': {'validators': [{'module': 'SampleService.core.validator.builtin',
+                                         'callable_builder': 'number',
+                                         'parameters': {'keys': 'value', 'required': True,
+                                                        'gte': -90, 'lte': 90}
+                                         }]
+                         },
+            'longitude': {'validators': [{'module': 'SampleService.core.validator.builtin',
+                                          'callable_builder': 'number',
+                                          'parameters': {'keys': 'value', 'required': True,
+                                                         'gte': -180, 'lte': 180}
+                                          }]
+                          }
         },
         'prefix_validators': {
             'pre': {'validators': [{'module': 'core.config_test_vals',
@@ -320,6 +341,9 @@ def clear_db_and_recreate(arango):
     db.create_collection(TEST_COL_NODES)
     db.create_collection(TEST_COL_NODE_EDGE, edge=True)
     db.create_collection(TEST_COL_DATA_LINK, edge=True)
+    db.create_collection(TEST_COL_DATA_LINK_COUNT)
+    db.create_collection(TEST_COL_META)
+    db.create_collection(TEST_COL_NODE_CONTENT)
     db.create_collection(TEST_COL_WS_OBJ_VER)
     db.create_collection(TEST_COL_SCHEMA)
     return db
@@ -393,6 +417,12 @@ def test_init_fail():
     cfg['node-edge-collection'] = 'crap'
     init_fail(cfg, MissingParameterError('config param data-link-collection'))
     cfg['data-link-collection'] = 'crap'
+    init_fail(cfg, MissingParameterError('config param data-link-count-collection'))
+    cfg['data-link-count-collection'] = 'crap'
+    init_fail(cfg, MissingParameterError('config param metadata-collection'))
+    cfg['metadata-collection'] = 'crap'
+    init_fail(cfg, MissingParameterError('config param node-content-collection'))
+    cfg['node-content-collection'] = 'crap'
     init_fail(cfg, MissingParameterError(
         'config param workspace-object-version-shadow-collection'))
     cfg['workspace-object-version-shadow-collection'] = 'crap'
@@ -855,6 +885,500 @@ def test_get_sample_as_admin(sample_port):
     }
 
 
+def test_get_samples(sample_port):
+    url = f'http://localhost:{sample_port}'
+    id1 = _create_generic_sample(url, TOKEN1)
+    id2 = _create_generic_sample(url, TOKEN2)
+    noid = str(uuid.UUID('1234567890abcdef1234567890abcdef'))
+
+    ret = requests.post(url, headers=get_authorized_headers(TOKEN1), json={
+        'method': 'SampleService.get_samples',
+        'version': '1.1',
+        'id': '42',
+        'params': [{'samples': [{'id': id1}, {'id': id1, 'version': 2}, {'id': id2},
+                                {'id': noid, 'version': 1}]}]
+    })
+    # print(ret.text)
+    assert ret.ok is True
+    res = ret.json()['result'][0]['samples']
+    assert_ms_epoch_close_to_now(res[0]['sample']['save_date'])
+    del res[0]['sample']['save_date']
+    assert res == [
+        {'sample': {'id': id1,
+                    'version': 1,
+                    'user': 'user1',
+                    'name': 'mysample',
+                    'node_tree': [{'id': 'root',
+                                   'parent': None,
+                                   'type': 'BioReplicate',
+                                   'meta_controlled': {},
+                                   'meta_user': {},
+                                   'source_meta': [],
+                                   },
+                                  {'id': 'foo',
+                                   'parent': 'root',
+                                   'type': 'TechReplicate',
+                                   'meta_controlled': {},
+                                   'meta_user': {},
+                                   'source_meta': [],
+                                   }
+                                  ]
+                    },
+         'error': None},
+        {'sample': None,
+         'error': f'Sample service error code 50020 No such sample version: {id1} ver 2'},
+        {'sample': None,
+         'error': 'Sample service error code 20000 Unauthorized: User user1 cannot read ' +
+                  f'sample {id2}'},
+        {'sample': None,
+         'error': f'Sample service error code 50010 No such sample: {noid}'}
+    ]
+
+
+def test_get_samples_fail_bad_params(sample_port):
+    url = f'http://localhost:{sample_port}'
+
+    ret = requests.post(url, headers=get_authorized_headers(TOKEN1), json={
+        'method': 'SampleService.get_samples',
+        'version': '1.1',
+        'id': '42',
+        'params': [{'samples': [{'id': 'foo'}]}]
+    })
+    # print(ret.text)
+    assert ret.status_code == 500
+    assert ret.json()['error']['message'] == (
+        'Sample service error code 30001 Illegal input parameter: ' +
+        'Sample address at index 0: id foo must be a UUID string')
+
+
+def test_search_samples(sample_port):
+    url = f'http://localhost:{sample_port}'
+    id_ = _create_sample(url, TOKEN1, {
+        'name': 'mysample',
+        'node_tree': [{'id': 'root', 'type': 'BioReplicate',
+                       'meta_controlled': {'foo': {'bar': 'baz'}}}]
+        }, 1)
+    _create_sample(url, TOKEN1, {
+        'name': 'mysample',
+        'id': id_,
+        'node_tree': [{'id': 'root', 'type': 'BioReplicate',
+                       'meta_controlled': {'foo': {'bar': 'bat'}}}]
+        }, 2)
+
+    def search(token, params):
+        ret = requests.post(url, headers=get_authorized_headers(token), json={
+            'method': 'SampleService.search_samples',
+            'version': '1.1',
+            'id': '42',
+            'params': [params]
+        })
+        # print(ret.text)
+        assert ret.ok is True
+        return ret.json()['result'][0]
+
+    assert search(TOKEN1, {'conditions': [{'key': 'foo', 'value_key': 'bar', 'equals': 'baz'}]}
+                  ) == {'samples': [{'id': id_, 'version': 1}], 'continuation_token': None}
+    assert search(TOKEN2, {'conditions': [{'key': 'foo', 'value_key': 'bar', 'equals': 'baz'}]}
+                  ) == {'samples': [], 'continuation_token': None}
+    # token3 has read admin
+    assert search(TOKEN3, {
+        'conditions': [{'key': 'foo', 'value_key': 'bar', 'equals': 'baz'}],
+        'as_admin': 1}) == {'samples': [{'id': id_, 'version': 1}], 'continuation_token': None}
+
+    cond = [{'key': 'foo', 'value_key': 'bar', 'prefix': 'ba'}]
+    res = search(TOKEN1, {'conditions': cond, 'page_size': 1})
+    assert res['samples'] == [{'id': id_, 'version': 1}]
+    res = search(TOKEN1, {'conditions': cond, 'page_size': 1,
+                          'continuation_token': res['continuation_token']})
+    assert res['samples'] == [{'id': id_, 'version': 2}]
+    assert search(TOKEN1, {'conditions': cond, 'page_size': 1,
+                           'continuation_token': res['continuation_token']}
+                  ) == {'samples': [], 'continuation_token': None}
+
+
+def test_search_samples_fail_bad_params(sample_port):
+    _request_fail(sample_port, 'search_samples', TOKEN1, {'conditions': [{'key': 'foo'}]},
+                  'Sample service error code 30001 Illegal input parameter: Condition at ' +
+                  'index 0: Exactly one of an equality, range, or prefix condition must be ' +
+                  'provided for metadata key foo')
+    _request_fail(sample_port, 'search_samples', TOKEN1, {
+        'conditions': [{'key': 'foo', 'equals': 'bar'}], 'page_size': 10001},
+        'Sample service error code 30001 Illegal input parameter: page_size must be an ' +
+        'integer from 1 to 10000')
+
+
+def test_get_metadata_facets(sample_port):
+    url = f'http://localhost:{sample_port}'
+    id_ = _create_sample(url, TOKEN1, {
+        'name': 'mysample',
+        'node_tree': [{'id': 'root', 'type': 'BioReplicate',
+                       'meta_controlled': {'foo': {'value': 'soil'}}}]
+        }, 1)
+    _create_sample(url, TOKEN1, {
+        'name': 'mysample',
+        'id': id_,
+        'node_tree': [{'id': 'root', 'type': 'BioReplicate',
+                       'meta_controlled': {'foo': {'value': 'sand'}}}]
+        }, 2)
+    _create_sample(url, TOKEN1, {
+        'name': 'mysample2',
+        'node_tree': [{'id': 'root', 'type': 'BioReplicate',
+                       'meta_controlled': {'foo': {'value': 'sand'},
+                                           'latitude': {'value': 44.4605}}}]
+        }, 1)
+
+    def facets(token, params):
+        ret = requests.post(url, headers=get_authorized_headers(token), json={
+            'method': 'SampleService.get_metadata_facets',
+            'version': '1.1',
+            'id': '42',
+            'params': [params]
+        })
+        # print(ret.text)
+        assert ret.ok is True
+        return ret.json()['result'][0]
+
+    assert facets(TOKEN1, {'keys': ['foo', 'latitude']}) == {'facets': {
+        'foo': [{'value': 'sand', 'count': 2}],
+        'latitude': [{'value': 44.4605, 'count': 1}]}}
+    assert facets(TOKEN1, {'keys': ['foo'], 'conditions': [
+        {'key': 'latitude', 'max': 45}]}) == {'facets': {'foo': [{'value': 'sand', 'count': 1}]}}
+    assert facets(TOKEN2, {'keys': ['foo']}) == {'facets': {'foo': []}}
+    # token3 has read admin
+    assert facets(TOKEN3, {'keys': ['foo'], 'as_admin': 1}) == {'facets': {
+        'foo': [{'value': 'sand', 'count': 2}]}}
+
+
+def test_get_metadata_facets_fail_bad_params(sample_port):
+    _request_fail(sample_port, 'get_metadata_facets', TOKEN1, {'keys': ['a'] * 11},
+                  'Sample service error code 30001 Illegal input parameter: No more than 10 ' +
+                  'metadata keys may be supplied')
+    _request_fail(sample_port, 'get_metadata_facets', TOKEN1, {'limit': 1},
+                  'Sample service error code 30000 Missing input parameter: keys')
+
+
+def test_get_sample_diff(sample_port):
+    url = f'http://localhost:{sample_port}'
+    id_ = _create_sample(url, TOKEN1, {
+        'name': 'mysample',
+        'node_tree': [{'id': 'root', 'type': 'BioReplicate',
+                       'meta_controlled': {'foo': {'value': 'soil'}},
+                       'meta_user': {'site': {'name': 'Old Faithful'}}},
+                      {'id': 'gone', 'type': 'SubSample', 'parent': 'root'}]
+        }, 1)
+    _create_sample(url, TOKEN1, {
+        'name': 'mysample',
+        'id': id_,
+        'node_tree': [{'id': 'root', 'type': 'BioReplicate',
+                       'meta_controlled': {'foo': {'value': 'sand'}},
+                       'meta_user': {'site': {'name': 'Old Faithful'}}},
+                      {'id': 'new', 'type': 'TechReplicate', 'parent': 'root'}]
+        }, 2)
+
+    def diff(token, params):
+        ret = requests.post(url, headers=get_authorized_headers(token), json={
+            'method': 'SampleService.get_sample_diff',
+            'version': '1.1',
+            'id': '42',
+            'params': [params]
+        })
+        # print(ret.text)
+        assert ret.ok is True
+        return ret.json()['result'][0]
+
+    expected = {
+        'added_nodes': [{'id': 'new',
+                         'type': 'TechReplicate',
+                         'parent': 'root',
+                         'meta_controlled': {},
+                         'meta_user': {},
+                         'source_meta': []}],
+        'removed_nodes': ['gone'],
+        'changed_nodes': [{
+            'id': 'root',
+            'meta_controlled': {'added': {},
+                                'removed': {},
+                                'changed': {'foo': {'old': {'value': 'soil'},
+                                                    'new': {'value': 'sand'}}}},
+            'meta_user': {'added': {}, 'removed': {}, 'changed': {}},
+            'source_meta': {'added': {}, 'removed': {}, 'changed': {}},
+            }]
+        }
+    assert diff(TOKEN1, {'id': id_, 'version_a': 1, 'version_b': 2}) == expected
+    # token3 has read admin
+    assert diff(TOKEN3, {'id': id_, 'version_a': 1, 'version_b': 2, 'as_admin': 1}) == expected
+    assert diff(TOKEN1, {'id': id_, 'version_a': 2, 'version_b': 2}) == {
+        'added_nodes': [], 'removed_nodes': [], 'changed_nodes': []}
+
+
+def test_get_sample_diff_fail(sample_port):
+    url = f'http://localhost:{sample_port}'
+    id_ = _create_generic_sample(url, TOKEN1)
+
+    _request_fail(sample_port, 'get_sample_diff', TOKEN1, {'id': id_, 'version_a': 1},
+                  'Sample service error code 30000 Missing input parameter: version_b')
+    _request_fail(sample_port, 'get_sample_diff', TOKEN1,
+                  {'id': id_, 'version_a': 1, 'version_b': 2},
+                  f'Sample service error code 50020 No such sample version: {id_} ver 2')
+    _request_fail(sample_port, 'get_sample_diff', TOKEN2,
+                  {'id': id_, 'version_a': 1, 'version_b': 1},
+                  'Sample service error code 20000 Unauthorized: User user2 cannot read ' +
+                  f'sample {id_}')
+
+
+def test_search_samples_by_text(sample_port):
+    url = f'http://localhost:{sample_port}'
+    id_ = _create_sample(url, TOKEN1, {
+        'name': 'Yellowstone soil',
+        'node_tree': [{'id': 'root', 'type': 'BioReplicate',
+                       'meta_user': {'site': {'name': 'Old Faithful'}}}]
+        }, 1)
+    _create_sample(url, TOKEN1, {
+        'name': 'Yellowstone sand',
+        'id': id_,
+        'node_tree': [{'id': 'root', 'type': 'BioReplicate'}]
+        }, 2)
+
+    def search(token, params):
+        ret = requests.post(url, headers=get_authorized_headers(token), json={
+            'method': 'SampleService.search_samples_by_text',
+            'version': '1.1',
+            'id': '42',
+            'params': [params]
+        })
+        # print(ret.text)
+        assert ret.ok is True
+        return ret.json()['result'][0]
+
+    assert search(TOKEN1, {'text': 'SOIL faithful'}) == {
+        'samples': [{'id': id_, 'version': 1, 'score': 2}], 'continuation_token': None}
+    assert search(TOKEN2, {'text': 'soil'}) == {'samples': [], 'continuation_token': None}
+    # token3 has read admin
+    assert search(TOKEN3, {'text': 'soil', 'as_admin': 1}) == {
+        'samples': [{'id': id_, 'version': 1, 'score': 1}], 'continuation_token': None}
+
+    res = search(TOKEN1, {'text': 'yellowstone sand', 'page_size': 1})
+    assert res['samples'] == [{'id': id_, 'version': 2, 'score': 2}]
+    res = search(TOKEN1, {'text': 'yellowstone sand', 'page_size': 1,
+                          'continuation_token': res['continuation_token']})
+    assert res['samples'] == [{'id': id_, 'version': 1, 'score': 1}]
+    assert search(TOKEN1, {'text': 'yellowstone sand', 'page_size': 1,
+                           'continuation_token': res['continuation_token']}
+                  ) == {'samples': [], 'continuation_token': None}
+
+
+def test_search_samples_by_text_fail_bad_params(sample_port):
+    _request_fail(sample_port, 'search_samples_by_text', TOKEN1, {'text': ' ! '},
+                  'Sample service error code 30001 Illegal input parameter: The search text ' +
+                  'must contain at least one word')
+    _request_fail(sample_port, 'search_samples_by_text', TOKEN1, {'page_size': 1},
+                  'Sample service error code 30000 Missing input parameter: text')
+
+
+def test_search_samples_by_location(sample_port):
+    url = f'http://localhost:{sample_port}'
+    id_ = _create_sample(url, TOKEN1, {
+        'name': 'Old Faithful',
+        'node_tree': [{'id': 'root', 'type': 'BioReplicate',
+                       'meta_controlled': {'latitude': {'value': 44.4605},
+                                           'longitude': {'value': -110.8281}}}]
+        }, 1)
+    _create_sample(url, TOKEN1, {
+        'name': 'Castle Geyser',
+        'id': id_,
+        'node_tree': [{'id': 'root', 'type': 'BioReplicate',
+                       'meta_controlled': {'latitude': {'value': 44.4635},
+                                           'longitude': {'value': -110.8358}}}]
+        }, 2)
+
+    def search(token, params):
+        ret = requests.post(url, headers=get_authorized_headers(token), json={
+            'method': 'SampleService.search_samples_by_location',
+            'version': '1.1',
+            'id': '42',
+            'params': [params]
+        })
+        # print(ret.text)
+        assert ret.ok is True
+        return ret.json()['result'][0]
+
+    bb = {'min_latitude': 44, 'min_longitude': -111, 'max_latitude': 45, 'max_longitude': -110}
+    assert search(TOKEN1, {'bounding_box': bb}) == {
+        'samples': [{'id': id_, 'version': 1}, {'id': id_, 'version': 2}],
+        'continuation_token': None}
+    # Old Faithful to Castle Geyser is about 700m
+    assert search(TOKEN1, {'center': {'latitude': 44.4605, 'longitude': -110.8281},
+                           'radius': 100}) == {
+        'samples': [{'id': id_, 'version': 1}], 'continuation_token': None}
+    assert search(TOKEN2, {'bounding_box': bb}) == {'samples': [], 'continuation_token': None}
+    # token3 has read admin
+    assert search(TOKEN3, {'center': {'latitude': 44.4605, 'longitude': -110.8281},
+                           'radius': 1000, 'as_admin': 1}) == {
+        'samples': [{'id': id_, 'version': 1}, {'id': id_, 'version': 2}],
+        'continuation_token': None}
+
+    res = search(TOKEN1, {'bounding_box': bb, 'page_size': 1})
+    assert res['samples'] == [{'id': id_, 'version': 1}]
+    res = search(TOKEN1, {'bounding_box': bb, 'page_size': 1,
+                          'continuation_token': res['continuation_token']})
+    assert res['samples'] == [{'id': id_, 'version': 2}]
+    assert search(TOKEN1, {'bounding_box': bb, 'page_size': 1,
+                           'continuation_token': res['continuation_token']}
+                  ) == {'samples': [], 'continuation_token': None}
+
+
+def test_search_samples_by_location_fail_bad_params(sample_port):
+    _request_fail(sample_port, 'search_samples_by_location', TOKEN1, {'radius': 1},
+                  'Sample service error code 30001 Illegal input parameter: The center must ' +
+                  'have 2 coordinates')
+    _request_fail(sample_port, 'search_samples_by_location', TOKEN1, {'page_size': 1},
+                  'Sample service error code 30001 Illegal input parameter: Exactly one of a ' +
+                  'bounding box or a center and radius must be provided for a location ' +
+                  'condition')
+
+
+def test_list_samples(sample_port):
+    url = f'http://localhost:{sample_port}'
+    id1 = _create_sample(url, TOKEN1, {
+        'name': 'mysample', 'node_tree': [{'id': 'root', 'type': 'BioReplicate'}]}, 1)
+    _create_sample(url, TOKEN1, {
+        'name': 'mysample', 'id': id1,
+        'node_tree': [{'id': 'root', 'type': 'BioReplicate'}]}, 2)
+    id2 = _create_sample(url, TOKEN2, {
+        'name': 'mysample2', 'node_tree': [{'id': 'root', 'type': 'BioReplicate'}]}, 1)
+    id3 = _create_sample(url, TOKEN2, {
+        'name': 'mysample3', 'node_tree': [{'id': 'root', 'type': 'BioReplicate'}]}, 1)
+    _replace_acls(url, id3, TOKEN2, {'read': [USER1]})
+
+    def list_(token, params):
+        ret = requests.post(url, headers=get_authorized_headers(token), json={
+            'method': 'SampleService.list_samples',
+            'version': '1.1',
+            'id': '42',
+            'params': [params]
+        })
+        # print(ret.text)
+        assert ret.ok is True
+        return ret.json()['result'][0]
+
+    assert list_(TOKEN1, {}) == {
+        'samples': [{'id': id3, 'version': 1}, {'id': id1, 'version': 2}],
+        'continuation_token': None}
+    assert list_(TOKEN2, {}) == {
+        'samples': [{'id': id3, 'version': 1}, {'id': id2, 'version': 1}],
+        'continuation_token': None}
+    assert list_(TOKEN3, {}) == {'samples': [], 'continuation_token': None}
+
+    res = list_(TOKEN1, {'page_size': 1})
+    assert res['samples'] == [{'id': id3, 'version': 1}]
+    res = list_(TOKEN1, {'page_size': 1, 'continuation_token': res['continuation_token']})
+    assert res['samples'] == [{'id': id1, 'version': 2}]
+    assert list_(TOKEN1, {'page_size': 1, 'continuation_token': res['continuation_token']}
+                 ) == {'samples': [], 'continuation_token': None}
+
+
+def test_list_samples_fail_bad_params(sample_port):
+    _request_fail(sample_port, 'list_samples', TOKEN1, {'page_size': 0},
+                  'Sample service error code 30001 Illegal input parameter: page_size must be ' +
+                  'an integer from 1 to 10000')
+    _request_fail(sample_port, 'list_samples', TOKEN1, {'continuation_token': 'foo'},
+                  'Sample service error code 30001 Illegal input parameter: Invalid ' +
+                  'continuation_token: foo')
+
+
+def test_create_samples(sample_port):
+    url = f'http://localhost:{sample_port}'
+
+    ret = requests.post(url, headers=get_authorized_headers(TOKEN1), json={
+        'method': 'SampleService.create_samples',
+        'version': '1.1',
+        'id': '67',
+        'params': [{'samples': [
+            {'name': 'mysample',
+             'node_tree': [{'id': 'root', 'type': 'BioReplicate'}]
+             },
+            {'name': 'mysample2',
+             'node_tree': [{'id': 'root2',
+                            'type': 'BioReplicate',
+                            'meta_user': {'a': {'b': 'c'}}
+                            }]
+             }
+        ]}]
+    })
+    # print(ret.text)
+    assert ret.ok is True
+    addrs = ret.json()['result'][0]['addresses']
+    assert len(addrs) == 2
+    assert addrs[0]['version'] == 1
+    assert addrs[1]['version'] == 1
+    assert addrs[0]['id'] != addrs[1]['id']
+
+    ret = requests.post(url, headers=get_authorized_headers(TOKEN1), json={
+        'method': 'SampleService.get_samples',
+        'version': '1.1',
+        'id': '42',
+        'params': [{'samples': addrs}]
+    })
+    # print(ret.text)
+    assert ret.ok is True
+    res = ret.json()['result'][0]['samples']
+    for r in res:
+        assert r['error'] is None
+        assert_ms_epoch_close_to_now(r['sample']['save_date'])
+        del r['sample']['save_date']
+    assert res == [
+        {'sample': {'id': addrs[0]['id'],
+                    'version': 1,
+                    'user': 'user1',
+                    'name': 'mysample',
+                    'node_tree': [{'id': 'root',
+                                   'parent': None,
+                                   'type': 'BioReplicate',
+                                   'meta_controlled': {},
+                                   'meta_user': {},
+                                   'source_meta': [],
+                                   }]
+                    },
+         'error': None},
+        {'sample': {'id': addrs[1]['id'],
+                    'version': 1,
+                    'user': 'user1',
+                    'name': 'mysample2',
+                    'node_tree': [{'id': 'root2',
+                                   'parent': None,
+                                   'type': 'BioReplicate',
+                                   'meta_controlled': {},
+                                   'meta_user': {'a': {'b': 'c'}},
+                                   'source_meta': [],
+                                   }]
+                    },
+         'error': None}
+    ]
+
+
+def test_create_samples_fail_bad_params(sample_port):
+    url = f'http://localhost:{sample_port}'
+
+    ret = requests.post(url, headers=get_authorized_headers(TOKEN1), json={
+        'method': 'SampleService.create_samples',
+        'version': '1.1',
+        'id': '67',
+        'params': [{'samples': [
+            {'node_tree': [{'id': 'root', 'type': 'BioReplicate'}]},
+            {'node_tree': [{'id': 'root', 'type': 'BioReplicate',
+                            'meta_controlled': {'stringlentest': {'foooo': 'barrrr'}}
+                            }]
+             }
+        ]}]
+    })
+    # print(ret.text)
+    assert ret.status_code == 500
+    assert ret.json()['error']['message'] == (
+        'Sample service error code 30010 Metadata validation failed: Sample at index 1: ' +
+        'Node at index 0: Key stringlentest: Metadata value at key foooo is longer than max ' +
+        'length of 5')
+
+
 def test_create_sample_fail_no_nodes(sample_port):
     url = f'http://localhost:{sample_port}'
 
@@ -2065,7 +2589,7 @@ def test_create_links_and_get_links_from_sample_basic(sample_port, workspace, ka
     assert ret.ok is True
 
     assert len(ret.json()['result']) == 1
-    assert len(ret.json()['result'][0]) == 2
+    assert len(ret.json()['result'][0]) == 3
     assert_ms_epoch_close_to_now(ret.json()['result'][0]['effective_time'])
     res = ret.json()['result'][0]['links']
     expected_links = [
@@ -2112,7 +2636,7 @@ def test_create_links_and_get_links_from_sample_basic(sample_port, workspace, ka
     assert ret.ok is True
 
     assert len(ret.json()['result']) == 1
-    assert len(ret.json()['result'][0]) == 2
+    assert len(ret.json()['result'][0]) == 3
     assert_ms_epoch_close_to_now(ret.json()['result'][0]['effective_time'])
     res = ret.json()['result'][0]['links']
     assert_ms_epoch_close_to_now(res[0]['created'])
@@ -2142,7 +2666,7 @@ def test_create_links_and_get_links_from_sample_basic(sample_port, workspace, ka
     assert ret.ok is True
 
     assert len(ret.json()['result']) == 1
-    assert len(ret.json()['result'][0]) == 2
+    assert len(ret.json()['result'][0]) == 3
     assert_ms_epoch_close_to_now(ret.json()['result'][0]['effective_time'])
     assert ret.json()['result'][0]['links'] == []
 
@@ -2219,13 +2743,13 @@ def test_update_and_get_links_from_sample(sample_port, workspace, kafka):
 
     assert len(ret.json()['result']) == 1
     res = ret.json()['result'][0]
-    assert len(res) == 2
+    assert len(res) == 3
     assert_ms_epoch_close_to_now(res['effective_time'])
     del res['effective_time']
     created = res['links'][0]['created']
     assert_ms_epoch_close_to_now(created)
     del res['links'][0]['created']
-    assert res == {'links': [
+    assert res == {'continuation_token': None, 'links': [
         {
             'linkid': lid2,
             'id': id1,
@@ -2260,6 +2784,7 @@ def test_update_and_get_links_from_sample(sample_port, workspace, kafka):
     del res['links'][0]['expired']
     assert res == {
         'effective_time': round(oldlinkactive.timestamp() * 1000),
+        'continuation_token': None,
         'links': [
             {
                 'linkid': lid1,
@@ -2284,6 +2809,93 @@ def test_update_and_get_links_from_sample(sample_port, workspace, kafka):
         ])
 
 
+def test_create_data_links(sample_port, workspace):
+    url = f'http://localhost:{sample_port}'
+    wsurl = f'http://localhost:{workspace.port}'
+    wscli = Workspace(wsurl, token=TOKEN3)
+
+    # create workspace & objects
+    wscli.create_workspace({'workspace': 'foo'})
+    wscli.save_objects({'id': 1, 'objects': [
+        {'name': 'bar', 'data': {}, 'type': 'Trivial.Object-1.0'},
+        ]})
+
+    id1 = _create_sample(
+        url,
+        TOKEN3,
+        {'name': 'mysample',
+         'node_tree': [{'id': 'root', 'type': 'BioReplicate'},
+                       {'id': 'foo', 'type': 'TechReplicate', 'parent': 'root'}
+                       ]
+         },
+        1
+        )
+    id2 = _create_sample(
+        url, TOKEN4, {'name': 'myothersample',
+                      'node_tree': [{'id': 'root2', 'type': 'BioReplicate'}]}, 1)
+
+    _create_link(url, TOKEN3, USER3,
+                 {'id': id1, 'version': 1, 'node': 'foo', 'upa': '1/1/1', 'dataid': 'c0'})
+
+    ret = requests.post(url, headers=get_authorized_headers(TOKEN3), json={
+        'method': 'SampleService.create_data_links',
+        'version': '1.1',
+        'id': '42',
+        'params': [{'update': 1, 'links': [
+            {'id': id1, 'version': 1, 'node': 'foo', 'upa': '1/1/1', 'dataid': 'c0'},
+            {'id': id1, 'version': 1, 'node': 'root', 'upa': '1/1/1', 'dataid': 'c1'},
+            {'id': id1, 'version': 1, 'node': 'bar', 'upa': '1/1/1', 'dataid': 'c2'},
+            {'id': id2, 'version': 1, 'node': 'root2', 'upa': '1/1/1', 'dataid': 'c3'},
+            ]}]
+    })
+    # print(ret.text)
+    assert ret.ok is True
+    res = ret.json()['result'][0]['results']
+    link = res[1]['new_link']
+    uuid.UUID(link['linkid'])  # check the ID is a valid UUID
+    del link['linkid']
+    assert_ms_epoch_close_to_now(link['created'])
+    del link['created']
+    assert res == [
+        {'status': 'noop', 'new_link': None, 'error': None},
+        {'status': 'created',
+         'new_link': {
+             'id': id1,
+             'version': 1,
+             'node': 'root',
+             'upa': '1/1/1',
+             'dataid': 'c1',
+             'createdby': USER3,
+             'expiredby': None,
+             'expired': None
+             },
+         'error': None},
+        {'status': 'error',
+         'new_link': None,
+         'error': 'Sample service error code 50030 No such sample node: ' +
+                  f'{id1} ver 1 bar'},
+        {'status': 'error',
+         'new_link': None,
+         'error': 'Sample service error code 20000 Unauthorized: User user3 cannot ' +
+                  f'administrate sample {id2}'},
+    ]
+
+
+def test_create_data_links_fail_bad_params(sample_port):
+    url = f'http://localhost:{sample_port}'
+
+    ret = requests.post(url, headers=get_authorized_headers(TOKEN3), json={
+        'method': 'SampleService.create_data_links',
+        'version': '1.1',
+        'id': '42',
+        'params': [{'links': [{'id': str(uuid.uuid4()), 'version': 1, 'node': 'foo'}]}]
+    })
+    # print(ret.text)
+    assert ret.status_code == 500
+    assert ret.json()['error']['message'] == (
+        'Sample service error code 30000 Missing input parameter: Link at index 0: upa')
+
+
 def test_create_data_link_as_admin(sample_port, workspace):
 
     url = f'http://localhost:{sample_port}'
@@ -2341,7 +2953,7 @@ def test_create_data_link_as_admin(sample_port, workspace):
     assert ret.ok is True
 
     assert len(ret.json()['result']) == 1
-    assert len(ret.json()['result'][0]) == 2
+    assert len(ret.json()['result'][0]) == 3
     assert_ms_epoch_close_to_now(ret.json()['result'][0]['effective_time'])
     res = ret.json()['result'][0]['links']
     expected_links = [
@@ -2514,10 +3126,55 @@ def _get_links_from_sample(url, token, params, print_resp=False):
     assert ret.ok is True
 
     assert len(ret.json()['result']) == 1
-    assert len(ret.json()['result'][0]) == 2
+    assert len(ret.json()['result'][0]) == 3
     return ret.json()['result'][0]
 
 
+def test_get_links_from_sample_paging(sample_port, workspace):
+    url = f'http://localhost:{sample_port}'
+    wsurl = f'http://localhost:{workspace.port}'
+    wscli = Workspace(wsurl, token=TOKEN3)
+
+    # create workspace & objects
+    wscli.create_workspace({'workspace': 'foo'})
+    wscli.save_objects({'id': 1, 'objects': [
+        {'name': 'bar', 'data': {}, 'type': 'Trivial.Object-1.0'},
+        {'name': 'baz', 'data': {}, 'type': 'Trivial.Object-1.0'},
+        {'name': 'bat', 'data': {}, 'type': 'Trivial.Object-1.0'},
+        ]})
+
+    id_ = _create_generic_sample(url, TOKEN3)
+
+    lids = [_create_link(url, TOKEN3, USER3,
+                         {'id': id_, 'version': 1, 'node': 'foo', 'upa': f'1/{i}/1'})
+            for i in range(1, 4)]
+
+    ret = _get_links_from_sample(url, TOKEN3, {'id': id_, 'version': 1, 'page_size': 2})
+    assert [link['linkid'] for link in ret['links']] == lids[:2]
+    assert ret['continuation_token'] is not None
+    et = ret['effective_time']
+
+    # links created after the first page shouldn't show up in later pages
+    _create_link(url, TOKEN3, USER3,
+                 {'id': id_, 'version': 1, 'node': 'root', 'upa': '1/1/1', 'dataid': 'x'})
+
+    ret = _get_links_from_sample(url, TOKEN3, {
+        'id': id_, 'version': 1, 'page_size': 2, 'effective_time': et,
+        'continuation_token': ret['continuation_token']})
+    assert [link['linkid'] for link in ret['links']] == lids[2:]
+    assert ret['continuation_token'] is None
+    assert ret['effective_time'] == et
+
+    ret = _get_links_from_sample(url, TOKEN3, {'id': id_, 'version': 1, 'page_size': 4})
+    assert len(ret['links']) == 4
+    assert ret['continuation_token'] is not None
+
+    ret = _get_links_from_sample(url, TOKEN3, {
+        'id': id_, 'version': 1, 'continuation_token': ret['continuation_token']})
+    assert ret['links'] == []
+    assert ret['continuation_token'] is None
+
+
 def test_get_links_from_sample_as_admin(sample_port, workspace):
     url = f'http://localhost:{sample_port}'
     wsurl = f'http://localhost:{workspace.port}'
@@ -2546,7 +3203,7 @@ def test_get_links_from_sample_as_admin(sample_port, workspace):
     assert ret.ok is True
 
     assert len(ret.json()['result']) == 1
-    assert len(ret.json()['result'][0]) == 2
+    assert len(ret.json()['result'][0]) == 3
     assert_ms_epoch_close_to_now(ret.json()['result'][0]['effective_time'])
     assert len(ret.json()['result'][0]['links']) == 1
     link = ret.json()['result'][0]['links'][0]
@@ -2598,7 +3255,7 @@ def test_get_links_from_sample_public_read(sample_port, workspace):
         assert ret.ok is True
 
         assert len(ret.json()['result']) == 1
-        assert len(ret.json()['result'][0]) == 2
+        assert len(ret.json()['result'][0]) == 3
         assert_ms_epoch_close_to_now(ret.json()['result'][0]['effective_time'])
         assert len(ret.json()['result'][0]['links']) == 1
         link = ret.json()['result'][0]['links'][0]
@@ -2739,6 +3396,14 @@ def test_get_links_from_sample_fail(sample_port):
         sample_port, TOKEN3, {'id': id_, 'version': 1, 'effective_time': 'foo'},
         "Sample service error code 30001 Illegal input parameter: key 'effective_time' " +
         "value of 'foo' is not a valid epoch millisecond timestamp")
+    _get_link_from_sample_fail(
+        sample_port, TOKEN3, {'id': id_, 'version': 1, 'page_size': 10001},
+        'Sample service error code 30001 Illegal input parameter: ' +
+        'page_size must be an integer from 1 to 10000')
+    _get_link_from_sample_fail(
+        sample_port, TOKEN3, {'id': id_, 'version': 1, 'continuation_token': 'foo'},
+        'Sample service error code 30001 Illegal input parameter: ' +
+        'Invalid continuation_token: foo')
     _get_link_from_sample_fail(
         sample_port, TOKEN4, {'id': id_, 'version': 1},
         f'Sample service error code 20000 Unauthorized: User user4 cannot read sample {id_}')
@@ -2843,7 +3508,7 @@ def _expire_data_link(sample_port, workspace, dataid, kafka):
     assert ret.ok is True
 
     assert len(ret.json()['result']) == 1
-    assert len(ret.json()['result'][0]) == 2
+    assert len(ret.json()['result'][0]) == 3
     assert_ms_epoch_close_to_now(ret.json()['result'][0]['effective_time'])
     links = ret.json()['result'][0]['links']
     assert len(links) == 2
@@ -2956,7 +3621,7 @@ def _expire_data_link_as_admin(sample_port, workspace, user, expected_user, kafk
     assert ret.ok is True
 
     assert len(ret.json()['result']) == 1
-    assert len(ret.json()['result'][0]) == 2
+    assert len(ret.json()['result'][0]) == 3
     assert_ms_epoch_close_to_now(ret.json()['result'][0]['effective_time'])
     links = ret.json()['result'][0]['links']
     assert len(links) == 1
@@ -3067,6 +3732,176 @@ def _expire_data_link_fail(sample_port, token, params, expected):
     _request_fail(sample_port, 'expire_data_link', token, params, expected)
 
 
+def test_expire_data_links(sample_port, workspace, kafka):
+    _clear_kafka_messages(kafka)
+
+    url = f'http://localhost:{sample_port}'
+    wsurl = f'http://localhost:{workspace.port}'
+    wscli = Workspace(wsurl, token=TOKEN3)
+
+    # create workspace & objects
+    wscli.create_workspace({'workspace': 'foo'})
+    wscli.save_objects({'id': 1, 'objects': [
+        {'name': 'bar', 'data': {}, 'type': 'Trivial.Object-1.0'},
+        {'name': 'baz', 'data': {}, 'type': 'Trivial.Object-1.0'},
+        ]})
+    wscli.set_permissions({'id': 1, 'new_permission': 'w', 'users': [USER4]})
+
+    # create samples
+    id1 = _create_sample(
+        url,
+        TOKEN3,
+        {'name': 'mysample',
+         'node_tree': [{'id': 'root', 'type': 'BioReplicate'},
+                       {'id': 'foo', 'type': 'TechReplicate', 'parent': 'root'},
+                       ]
+         },
+        1
+        )
+    _replace_acls(url, id1, TOKEN3, {'admin': [USER4]})
+
+    # create links
+    lid1 = _create_link(url, TOKEN3, USER3,
+                        {'id': id1, 'version': 1, 'node': 'foo', 'upa': '1/1/1'})
+    lid2 = _create_link(url, TOKEN3, USER3,
+                        {'id': id1, 'version': 1, 'node': 'root', 'upa': '1/1/1', 'dataid': 'a'})
+    lid3 = _create_link(url, TOKEN3, USER3,
+                        {'id': id1, 'version': 1, 'node': 'foo', 'upa': '1/2/1'})
+
+    # expire links
+    ret = requests.post(url, headers=get_authorized_headers(TOKEN4), json={
+        'method': 'SampleService.expire_data_links',
+        'version': '1.1',
+        'id': '42',
+        'params': [{'link_ids': [lid3, lid1]}]
+    })
+    # print(ret.text)
+    assert ret.ok is True
+
+    assert len(ret.json()['result']) == 1
+    links = ret.json()['result'][0]['expired_links']
+    assert len(links) == 2
+    for link in links:
+        assert_ms_epoch_close_to_now(link['created'])
+        assert_ms_epoch_close_to_now(link['expired'])
+        del link['created']
+        del link['expired']
+    assert links == [
+        {'linkid': lid3,
+         'id': id1,
+         'version': 1,
+         'node': 'foo',
+         'upa': '1/2/1',
+         'dataid': None,
+         'createdby': USER3,
+         'expiredby': USER4,
+         },
+        {'linkid': lid1,
+         'id': id1,
+         'version': 1,
+         'node': 'foo',
+         'upa': '1/1/1',
+         'dataid': None,
+         'createdby': USER3,
+         'expiredby': USER4,
+         },
+    ]
+
+    # expire the remaining link via the sample
+    ret = requests.post(url, headers=get_authorized_headers(TOKEN4), json={
+        'method': 'SampleService.expire_data_links',
+        'version': '1.1',
+        'id': '42',
+        'params': [{'id': id1, 'version': 1}]
+    })
+    # print(ret.text)
+    assert ret.ok is True
+    links = ret.json()['result'][0]['expired_links']
+    assert [link['linkid'] for link in links] == [lid2]
+
+    # no links left to expire
+    ret = requests.post(url, headers=get_authorized_headers(TOKEN4), json={
+        'method': 'SampleService.expire_data_links',
+        'version': '1.1',
+        'id': '42',
+        'params': [{'upa': '1/1/1'}]
+    })
+    # print(ret.text)
+    assert ret.ok is True
+    assert ret.json()['result'][0] == {'expired_links': []}
+
+    _check_kafka_messages(
+        kafka,
+        [
+            {'event_type': 'NEW_SAMPLE', 'sample_id': id1, 'sample_ver': 1},
+            {'event_type': 'ACL_CHANGE', 'sample_id': id1},
+            {'event_type': 'NEW_LINK', 'link_id': lid1},
+            {'event_type': 'NEW_LINK', 'link_id': lid2},
+            {'event_type': 'NEW_LINK', 'link_id': lid3},
+            {'event_type': 'EXPIRED_LINK', 'link_id': lid3},
+            {'event_type': 'EXPIRED_LINK', 'link_id': lid1},
+            {'event_type': 'EXPIRED_LINK', 'link_id': lid2},
+        ])
+
+
+def test_expire_data_links_fail(sample_port, workspace):
+    url = f'http://localhost:{sample_port}'
+    wsurl = f'http://localhost:{workspace.port}'
+    wscli = Workspace(wsurl, token=TOKEN3)
+
+    # create workspace & objects
+    wscli.create_workspace({'workspace': 'foo'})
+    wscli.save_objects({'id': 1, 'objects': [
+        {'name': 'bar', 'data': {}, 'type': 'Trivial.Object-1.0'},
+        ]})
+    wscli.set_permissions({'id': 1, 'new_permission': 'w', 'users': [USER4]})
+
+    # create samples
+    id1 = _create_sample(
+        url,
+        TOKEN3,
+        {'name': 'mysample',
+         'node_tree': [{'id': 'root', 'type': 'BioReplicate'},
+                       {'id': 'foo', 'type': 'TechReplicate', 'parent': 'root'},
+                       ]
+         },
+        1
+        )
+
+    # create links
+    lid1 = _create_link(url, TOKEN3, USER3,
+                        {'id': id1, 'version': 1, 'node': 'foo', 'upa': '1/1/1'})
+
+    _expire_data_links_fail(
+        sample_port, TOKEN3, {},
+        'Sample service error code 30001 Illegal input parameter: ' +
+        'Exactly one of upa, id, or link_ids must be provided')
+    _expire_data_links_fail(
+        sample_port, TOKEN3, {'link_ids': []},
+        'Sample service error code 30001 Illegal input parameter: ' +
+        'At least one link ID must be supplied')
+    _expire_data_links_fail(
+        sample_port, TOKEN3, {'link_ids': [lid1, lid1]},
+        'Sample service error code 30001 Illegal input parameter: ' +
+        'link_ids contains duplicate IDs')
+    _expire_data_links_fail(
+        sample_port, TOKEN3, {'link_ids': [lid1, '1234567890abcdef1234567890abcdef']},
+        'Sample service error code 50050 No such data link: ' +
+        '12345678-90ab-cdef-1234-567890abcdef')
+    _expire_data_links_fail(
+        sample_port, TOKEN4, {'upa': '1/1/1'},
+        'Sample service error code 20000 Unauthorized: User user4 cannot ' +
+        f'administrate sample {id1}')
+    _expire_data_links_fail(
+        sample_port, TOKEN3, {'upa': '1/1/1', 'as_admin': 1},
+        'Sample service error code 20000 Unauthorized: User user3 does not have ' +
+        'the necessary administration privileges to run method expire_data_links')
+
+
+def _expire_data_links_fail(sample_port, token, params, expected):
+    _request_fail(sample_port, 'expire_data_links', token, params, expected)
+
+
 def _request_fail(sample_port, method, token, params, expected):
     url = f'http://localhost:{sample_port}'
     ret = requests.post(url, headers=get_authorized_headers(token), json={
@@ -3216,10 +4051,39 @@ def _get_links_from_data(url, token, params, print_resp=False):
         print(ret.text)
     assert ret.ok is True
     assert len(ret.json()['result']) == 1
-    assert len(ret.json()['result'][0]) == 2
+    assert len(ret.json()['result'][0]) == 3
     return ret.json()['result'][0]
 
 
+def test_get_links_from_data_paging(sample_port, workspace):
+    url = f'http://localhost:{sample_port}'
+    wsurl = f'http://localhost:{workspace.port}'
+    wscli = Workspace(wsurl, token=TOKEN3)
+
+    # create workspace & objects
+    wscli.create_workspace({'workspace': 'foo'})
+    wscli.save_objects({'id': 1, 'objects': [
+        {'name': 'bar', 'data': {}, 'type': 'Trivial.Object-1.0'},
+        ]})
+
+    id_ = _create_generic_sample(url, TOKEN3)
+
+    lids = [_create_link(url, TOKEN3, USER3,
+                         {'id': id_, 'version': 1, 'node': 'foo', 'upa': '1/1/1', 'dataid': d})
+            for d in ['a', 'b', 'c']]
+
+    ret = _get_links_from_data(url, TOKEN3, {'upa': '1/1/1', 'page_size': 2})
+    assert [link['linkid'] for link in ret['links']] == lids[:2]
+    assert ret['continuation_token'] is not None
+    et = ret['effective_time']
+
+    ret = _get_links_from_data(url, TOKEN3, {
+        'upa': '1/1/1', 'page_size': 2, 'continuation_token': ret['continuation_token']})
+    assert [link['linkid'] for link in ret['links']] == lids[2:]
+    assert ret['continuation_token'] is None
+    assert ret['effective_time'] == et
+
+
 def test_get_links_from_data_expired(sample_port, workspace):
     url = f'http://localhost:{sample_port}'
     wsurl = f'http://localhost:{workspace.port}'
@@ -3274,13 +4138,13 @@ def test_get_links_from_data_expired(sample_port, workspace):
 
     assert len(ret.json()['result']) == 1
     res = ret.json()['result'][0]
-    assert len(res) == 2
+    assert len(res) == 3
     assert_ms_epoch_close_to_now(res['effective_time'])
     del res['effective_time']
     created = res['links'][0]['created']
     assert_ms_epoch_close_to_now(created)
     del res['links'][0]['created']
-    assert res == {'links': [
+    assert res == {'continuation_token': None, 'links': [
         {
             'linkid': lid2,
             'id': id1,
@@ -3314,6 +4178,7 @@ def test_get_links_from_data_expired(sample_port, workspace):
     del res['links'][0]['expired']
     assert res == {
         'effective_time': round(oldlinkactive.timestamp() * 1000),
+        'continuation_token': None,
         'links': [
             {
                 'linkid': lid1,
@@ -3406,7 +4271,7 @@ def test_get_links_from_data_as_admin(sample_port, workspace):
     assert ret.ok is True
 
     assert len(ret.json()['result']) == 1
-    assert len(ret.json()['result'][0]) == 2
+    assert len(ret.json()['result'][0]) == 3
     assert_ms_epoch_close_to_now(ret.json()['result'][0]['effective_time'])
     assert len(ret.json()['result'][0]['links']) == 1
     link = ret.json()['result'][0]['links'][0]
@@ -3442,6 +4307,14 @@ def test_get_links_from_data_fail(sample_port, workspace):
         sample_port, TOKEN3, {'upa': '1/1/1', 'effective_time': 'foo'},
         "Sample service error code 30001 Illegal input parameter: key 'effective_time' " +
         "value of 'foo' is not a valid epoch millisecond timestamp")
+    _get_link_from_data_fail(
+        sample_port, TOKEN3, {'upa': '1/1/1', 'page_size': 0},
+        'Sample service error code 30001 Illegal input parameter: ' +
+        'page_size must be an integer from 1 to 10000')
+    _get_link_from_data_fail(
+        sample_port, TOKEN3, {'upa': '1/1/1', 'continuation_token': 'foo'},
+        'Sample service error code 30001 Illegal input parameter: ' +
+        'Invalid continuation_token: foo')
     _get_link_from_data_fail(
         sample_port, TOKEN4, {'upa': '1/1/1'},
         'Sample service error code 20000 Unauthorized: User user4 cannot read upa 1/1/1')
@@ -3491,6 +4364,104 @@ def _get_link_from_data_fail(sample_port, token, params, expected):
     assert ret.json()['error']['message'] == expected
 
 
+def test_get_links_from_data_bulk(sample_port, workspace):
+    url = f'http://localhost:{sample_port}'
+    wsurl = f'http://localhost:{workspace.port}'
+    wscli = Workspace(wsurl, token=TOKEN3)
+
+    # create workspaces & objects
+    wscli.create_workspace({'workspace': 'foo'})
+    wscli.save_objects({'id': 1, 'objects': [
+        {'name': 'bar', 'data': {}, 'type': 'Trivial.Object-1.0'},
+        {'name': 'baz', 'data': {}, 'type': 'Trivial.Object-1.0'},
+        ]})
+    wscli.set_permissions({'id': 1, 'new_permission': 'w', 'users': [USER4]})
+    wscli.create_workspace({'workspace': 'private'})
+    wscli.save_objects({'id': 2, 'objects': [
+        {'name': 'bar', 'data': {}, 'type': 'Trivial.Object-1.0'},
+        ]})
+
+    id1 = _create_sample(
+        url,
+        TOKEN3,
+        {'name': 'mysample',
+         'node_tree': [{'id': 'root', 'type': 'BioReplicate'},
+                       {'id': 'foo', 'type': 'TechReplicate', 'parent': 'root'}
+                       ]
+         },
+        1
+        )
+
+    lid1 = _create_link(
+        url, TOKEN3, USER3, {'id': id1, 'version': 1, 'node': 'foo', 'upa': '1/2/1'})
+    lid2 = _create_link(
+        url, TOKEN3, USER3,
+        {'id': id1, 'version': 1, 'node': 'root', 'upa': '1/1/1', 'dataid': 'column1'})
+    _create_link(url, TOKEN3, USER3, {'id': id1, 'version': 1, 'node': 'foo', 'upa': '2/1/1'})
+
+    ret = requests.post(url, headers=get_authorized_headers(TOKEN4), json={
+        'method': 'SampleService.get_data_links_from_data_bulk',
+        'version': '1.1',
+        'id': '42',
+        'params': [{'upas': ['1/1/1', '2/1/1', '1/3/1', '1/2/1', '1/1/1']}]
+    })
+    # print(ret.text)
+    assert ret.ok is True
+    assert len(ret.json()['result']) == 1
+    res = ret.json()['result'][0]
+    assert len(res) == 2
+    assert_ms_epoch_close_to_now(res['effective_time'])
+    for r in res['results']:
+        for link in r['links'] or []:
+            assert_ms_epoch_close_to_now(link['created'])
+            del link['created']
+
+    def link(lid, node, upa, dataid=None):
+        return {'linkid': lid, 'id': id1, 'version': 1, 'node': node, 'upa': upa,
+                'dataid': dataid, 'createdby': USER3, 'expiredby': None, 'expired': None}
+
+    l2 = link(lid2, 'root', '1/1/1', 'column1')
+    assert res['results'] == [
+        {'upa': '1/1/1', 'links': [l2], 'error': None},
+        {'upa': '2/1/1', 'links': None, 'error':
+            'Sample service error code 20000 Unauthorized: User user4 cannot read upa 2/1/1'},
+        {'upa': '1/3/1', 'links': None, 'error':
+            'Sample service error code 50040 No such workspace data: Object 1/3/1 does not exist'},
+        {'upa': '1/2/1', 'links': [link(lid1, 'foo', '1/2/1')], 'error': None},
+        {'upa': '1/1/1', 'links': [l2], 'error': None},
+    ]
+
+
+def test_get_links_from_data_bulk_fail(sample_port, workspace):
+    _get_links_from_data_bulk_fail(
+        sample_port, TOKEN3, {},
+        'Sample service error code 30000 Missing input parameter: upas')
+    _get_links_from_data_bulk_fail(
+        sample_port, TOKEN3, {'upas': ['1/1/1', '1/1']},
+        'Sample service error code 30001 Illegal input parameter: ' +
+        'UPA at index 1: 1/1 is not a valid UPA')
+    _get_links_from_data_bulk_fail(
+        sample_port, TOKEN3, {'upas': ['1/1/1'] * 1001},
+        'Sample service error code 30001 Illegal input parameter: ' +
+        'No more than 1000 UPAs may be requested at once')
+    _get_links_from_data_bulk_fail(
+        sample_port, TOKEN4, {'upas': ['1/1/1'], 'as_admin': 1},
+        'Sample service error code 20000 Unauthorized: User user4 does not have the necessary ' +
+        'administration privileges to run method get_data_links_from_data_bulk')
+
+
+def _get_links_from_data_bulk_fail(sample_port, token, params, expected):
+    url = f'http://localhost:{sample_port}'
+    ret = requests.post(url, headers=get_authorized_headers(token), json={
+        'method': 'SampleService.get_data_links_from_data_bulk',
+        'version': '1.1',
+        'id': '42',
+        'params': [params]
+    })
+    assert ret.status_code == 500
+    assert ret.json()['error']['message'] == expected
+
+
 def test_get_sample_via_data(sample_port, workspace):
 
     url = f'http://localhost:{sample_port}'
@@ -4066,6 +5037,78 @@ def test_user_lookup_bad_users(sample_port, auth):
          UserID(USER3)]) == [UserID('nouserhere'), UserID('whooptydoo')]
 
 
+def test_user_lookup_cache(sample_port, auth):
+    url = f'http://localhost:{auth.port}/testmode/'
+    now = [1000]
+    ul = KBaseUserLookup(url, TOKEN1, cache_valid_user_expiration=10, cache_timer=lambda: now[0])
+    uurl = url + 'api/V2/users?list='
+    h = {'Authorization': TOKEN1}
+
+    with patch('SampleService.core.user_lookup.requests.get', wraps=requests.get) as get:
+        assert ul.invalid_users([UserID(USER1), UserID('nouserhere'), UserID(USER1)]) == [
+            UserID('nouserhere')]
+        # invalid users are never cached
+        assert ul.invalid_users([UserID(USER2), UserID(USER1), UserID('nouserhere')]) == [
+            UserID('nouserhere')]
+        assert ul.invalid_users([UserID(USER2), UserID(USER1)]) == []
+        now[0] = 1009
+        assert ul.invalid_users([UserID(USER1)]) == []
+        now[0] = 1010
+        assert ul.invalid_users([UserID(USER1), UserID(USER2)]) == []
+
+        assert get.call_args_list == [
+            call(uurl + f'{USER1},nouserhere', headers=h),
+            call(uurl + f'{USER2},nouserhere', headers=h),
+            call(uurl + f'{USER1},{USER2}', headers=h),
+        ]
+
+
+def test_user_lookup_cache_max_size(sample_port, auth):
+    url = f'http://localhost:{auth.port}/testmode/'
+    ul = KBaseUserLookup(url, TOKEN1, cache_max_size=2)
+    uurl = url + 'api/V2/users?list='
+    h = {'Authorization': TOKEN1}
+
+    with patch('SampleService.core.user_lookup.requests.get', wraps=requests.get) as get:
+        assert ul.invalid_users([UserID(USER1), UserID(USER2)]) == []
+        assert ul.invalid_users([UserID(USER3)]) == []
+        assert ul.invalid_users([UserID(USER1), UserID(USER2), UserID(USER3)]) == []
+
+        assert get.call_args_list == [
+            call(uurl + f'{USER1},{USER2}', headers=h),
+            call(uurl + f'{USER3}', headers=h),
+            call(uurl + f'{USER1}', headers=h),
+        ]
+
+
+def test_user_lookup_cache_disabled(sample_port, auth):
+    url = f'http://localhost:{auth.port}/testmode/'
+    ul = KBaseUserLookup(url, TOKEN1, cache_valid_user_expiration=0)
+    uurl = url + 'api/V2/users?list='
+    h = {'Authorization': TOKEN1}
+
+    with patch('SampleService.core.user_lookup.requests.get', wraps=requests.get) as get:
+        assert ul.invalid_users([UserID(USER1)]) == []
+        assert ul.invalid_users([UserID(USER1)]) == []
+
+        assert get.call_args_list == [call(uurl + USER1, headers=h), call(uurl + USER1, headers=h)]
+
+
+def test_user_lookup_build_fail_bad_cache_args(sample_port, auth):
+    url = f'http://localhost:{auth.port}/testmode/'
+    with raises(Exception) as got:
+        KBaseUserLookup(url, TOKEN1, cache_max_size=0)
+    assert_exception_correct(got.value, ValueError('cache_max_size must be > 0'))
+
+    with raises(Exception) as got:
+        KBaseUserLookup(url, TOKEN1, cache_valid_user_expiration=-1)
+    assert_exception_correct(got.value, ValueError('cache_valid_user_expiration must be >= 0'))
+
+    with raises(Exception) as got:
+        KBaseUserLookup(url, TOKEN1, cache_admin_expiration=-1)
+    assert_exception_correct(got.value, ValueError('cache_admin_expiration must be >= 0'))
+
+
 def test_user_lookup_fail_bad_args(sample_port, auth):
     ul = KBaseUserLookup(f'http://localhost:{auth.port}/testmode/', TOKEN1)
     _user_lookup_fail(ul, None, ValueError('usernames cannot be None'))
@@ -4114,6 +5157,68 @@ def _check_is_admin(port, results, full_roles=None, read_roles=None):
         assert ul.is_admin(t) == (r, u)
 
 
+def test_is_admin_cache(sample_port, auth):
+    url = f'http://localhost:{auth.port}/testmode/'
+    now = [1000]
+    ul = KBaseUserLookup(url, TOKEN_SERVICE, ['fulladmin1'], cache_admin_expiration=10,
+                         cache_timer=lambda: now[0])
+    murl = url + 'api/V2/me'
+    f = AdminPermission.FULL
+    n = AdminPermission.NONE
+
+    with patch('SampleService.core.user_lookup.requests.get', wraps=requests.get) as get:
+        assert ul.is_admin(TOKEN1) == (f, USER1)
+        assert ul.is_admin(TOKEN2) == (n, USER2)
+        assert ul.is_admin(TOKEN1) == (f, USER1)
+        assert ul.is_admin(TOKEN2) == (n, USER2)
+        assert (ul.admin_cache_hits, ul.admin_cache_misses) == (2, 2)
+
+        ul.invalidate_admin_cache(TOKEN1)
+        assert ul.is_admin(TOKEN1) == (f, USER1)
+        assert ul.is_admin(TOKEN2) == (n, USER2)
+        assert (ul.admin_cache_hits, ul.admin_cache_misses) == (3, 3)
+
+        ul.invalidate_admin_cache()
+        assert ul.is_admin(TOKEN2) == (n, USER2)
+        now[0] = 1009
+        assert ul.is_admin(TOKEN2) == (n, USER2)
+        now[0] = 1010
+        assert ul.is_admin(TOKEN2) == (n, USER2)
+        assert (ul.admin_cache_hits, ul.admin_cache_misses) == (4, 5)
+
+        assert get.call_args_list == [
+            call(murl, headers={'Authorization': TOKEN1}),
+            call(murl, headers={'Authorization': TOKEN2}),
+            call(murl, headers={'Authorization': TOKEN1}),
+            call(murl, headers={'Authorization': TOKEN2}),
+            call(murl, headers={'Authorization': TOKEN2}),
+        ]
+
+
+def test_is_admin_cache_bad_token(sample_port, auth):
+    ul = KBaseUserLookup(f'http://localhost:{auth.port}/testmode/', TOKEN_SERVICE)
+
+    # invalid tokens are not cached
+    for _ in range(2):
+        _is_admin_fail(ul, 'bad token here', InvalidTokenError(
+            'KBase auth server reported token is invalid.'))
+    assert (ul.admin_cache_hits, ul.admin_cache_misses) == (0, 2)
+
+
+def test_is_admin_cache_disabled(sample_port, auth):
+    url = f'http://localhost:{auth.port}/testmode/'
+    ul = KBaseUserLookup(url, TOKEN_SERVICE, cache_admin_expiration=0)
+
+    with patch('SampleService.core.user_lookup.requests.get', wraps=requests.get) as get:
+        assert ul.is_admin(TOKEN1) == (AdminPermission.NONE, USER1)
+        assert ul.is_admin(TOKEN1) == (AdminPermission.NONE, USER1)
+        ul.invalidate_admin_cache(TOKEN1)
+        ul.invalidate_admin_cache()
+
+        assert get.call_count == 2
+    assert (ul.admin_cache_hits, ul.admin_cache_misses) == (0, 0)
+
+
 def test_is_admin_fail_bad_input(sample_port, auth):
     ul = KBaseUserLookup(f'http://localhost:{auth.port}/testmode/', TOKEN_SERVICE)
 
@@ -4214,6 +5319,31 @@ def _workspace_wrapper_has_permission_fail(ws_port, user, wsid, upa, expected):
     assert_exception_correct(got.value, expected)
 
 
+def test_workspace_wrapper_has_permissions(sample_port, workspace):
+    url = f'http://localhost:{workspace.port}'
+    wscli = Workspace(url, token=TOKEN_WS_READ_ADMIN)
+    ws = WS(wscli)
+
+    wscli2 = Workspace(url, token=TOKEN2)
+    wscli2.create_workspace({'workspace': 'foo'})
+    wscli2.save_objects({'id': 1,
+                         'objects': [{'name': 'bar', 'type': 'Trivial.Object-1.0', 'data': {}}]})
+    wscli2.create_workspace({'workspace': 'bar'})
+    wscli2.set_permissions({'id': 2, 'users': [USER1], 'new_permission': 'r'})
+    wscli2.create_workspace({'workspace': 'baz'})
+    wscli2.delete_workspace({'id': 3})
+
+    res = ws.has_permissions(UserID(USER1), WorkspaceAccessType.READ, upas=[
+        UPA('2/1/1'), UPA('1/1/1'), UPA('4/1/1'), UPA('3/1/1')])
+    assert_exception_correct(res[0], NoSuchWorkspaceDataError('Object 2/1/1 does not exist'))
+    assert_exception_correct(res[1], UnauthorizedError('User user1 cannot read upa 1/1/1'))
+    assert_exception_correct(res[2], NoSuchWorkspaceDataError('No workspace with id 4 exists'))
+    assert_exception_correct(res[3], NoSuchWorkspaceDataError('Workspace 3 is deleted'))
+    assert len(res) == 4
+
+    assert ws.has_permissions(UserID(USER2), WorkspaceAccessType.ADMIN, [1, 2]) == [None, None]
+
+
 def test_workspace_wrapper_get_workspaces(sample_port, workspace):
     url = f'http://localhost:{workspace.port}'
     wscli = Workspace(url, token=TOKEN_WS_READ_ADMIN)
@@ -4400,3 +5530,38 @@ def _kafka_notifier_expired_link_fail(notifier, sample, expected):
     with raises(Exception) as got:
         notifier.notify_expired_link(sample)
     assert_exception_correct(got.value, expected)
+
+
+def test_kafka_notifier_expired_links(sample_port, kafka):
+    kn = KafkaNotifier(f'localhost:{kafka.port}', 'topictopic')
+    try:
+        id1 = uuid.uuid4()
+        id2 = uuid.uuid4()
+
+        kn.notify_expired_links([id1, id2])
+
+        _check_kafka_messages(
+            kafka,
+            [{'event_type': 'EXPIRED_LINK', 'link_id': str(id1)},
+             {'event_type': 'EXPIRED_LINK', 'link_id': str(id2)}],
+            'topictopic')
+    finally:
+        kn.close()
+
+
+def test_kafka_notifier_expired_links_fail(sample_port, kafka):
+    kn = KafkaNotifier(f'localhost:{kafka.port}', 'mytopic')
+
+    _kafka_notifier_expired_links_fail(kn, None, ValueError('link_ids cannot be None'))
+    _kafka_notifier_expired_links_fail(kn, [uuid.uuid4(), None], ValueError(
+        'Index 1 of iterable link_ids cannot be a value that evaluates to false'))
+
+    kn.close()
+    _kafka_notifier_expired_links_fail(kn, [uuid.uuid4()], ValueError(
+        'client is closed'))
+
+
+def _kafka_notifier_expired_links_fail(notifier, link_ids, expected):
+    with raises(Exception) as got:
+        notifier.notify_expired_links(link_ids)
+    assert_exception_correct(got.value, expected)
@@ -16,10 +16,30 @@ from SampleService.core.api_translation import (
     get_datetime_from_epochmilliseconds_in_object,
     links_to_dicts,
     get_upa_from_object,
+    get_upas_from_object,
     get_data_unit_id_from_object,
     get_user_from_object,
     get_admin_request_from_object,
-    acl_delta_from_dict
+    acl_delta_from_dict,
+    get_sample_addresses_from_object,
+    sample_results_to_dicts,
+    create_samples_params,
+    create_data_links_params,
+    expire_data_links_params,
+    get_link_paging_from_object,
+    create_link_continuation_token,
+    data_link_results_to_dicts,
+    data_links_bulk_results_to_dicts,
+    search_samples_params,
+    create_search_continuation_token,
+    search_samples_by_text_params,
+    search_samples_by_location_params,
+    get_metadata_facets_params,
+    get_sample_diff_params,
+    sample_diff_to_dict,
+    list_samples_params,
+    create_list_samples_continuation_token,
+    create_text_search_continuation_token,
 )
 from SampleService.core.data_link import DataLink
 from SampleService.core.sample import (
@@ -31,12 +51,16 @@ from SampleService.core.sample import (
     SavedSample,
     SourceMetadata,
 )
+from SampleService.core.sample_diff import SampleDiff
 from SampleService.core.acls import SampleACL, SampleACLOwnerless, SampleACLDelta
+from SampleService.core.search import LocationCondition, MetadataCondition
 from SampleService.core.errors import (
     IllegalParameterError,
     MissingParameterError,
     UnauthorizedError,
-    NoSuchUserError
+    NoSuchUserError,
+    NoSuchSampleError,
+    DataLinkExistsError,
 )
 from SampleService.core.acls import AdminPermission
 from SampleService.core.user_lookup import KBaseUserLookup
@@ -329,6 +353,52 @@ def test_create_sample_params_fail_bad_input():
         IllegalParameterError('prior_version must be an integer if supplied'))
 
 
+def test_create_samples_params():
+    params = {'samples': [
+        {'node_tree': [{'id': 'foo', 'type': 'BioReplicate'}]},
+        {'node_tree': [{'id': 'bar', 'type': 'BioReplicate', 'meta_user': {'a': {'b': 1}}},
+                       {'id': 'baz', 'type': 'SubSample', 'parent': 'bar'}],
+         'name': 'myname'}
+        ]}
+
+    assert create_samples_params(params) == [
+        Sample([SampleNode('foo')]),
+        Sample([SampleNode('bar', user_metadata={'a': {'b': 1}}),
+                SampleNode('baz', SubSampleType.SUB_SAMPLE, 'bar')],
+               'myname')
+    ]
+
+
+def test_create_samples_params_fail_bad_input():
+    n = [{'id': 'foo', 'type': 'BioReplicate'}]
+    _create_samples_params_fail(None, ValueError('params cannot be None'))
+    _create_samples_params_fail(
+        {}, IllegalParameterError('params must contain samples key that maps to a list'))
+    _create_samples_params_fail(
+        {'samples': {'node_tree': n}},
+        IllegalParameterError('params must contain samples key that maps to a list'))
+    _create_samples_params_fail(
+        {'samples': [{'node_tree': n}, n]},
+        IllegalParameterError('Sample at index 1 is not a structure'))
+    _create_samples_params_fail(
+        {'samples': [{'node_tree': n}, {'node_tree': n, 'id': 'foo'}]},
+        IllegalParameterError(
+            'Sample at index 1 has an ID. Only new samples may be created in bulk'))
+    _create_samples_params_fail(
+        {'samples': [{'node_tree': n}, {'node_tree': [{'id': 'foo', 'type': 'x'}]}]},
+        IllegalParameterError(
+            'Sample at index 1: Node at index 0 has an invalid sample type: x'))
+    _create_samples_params_fail(
+        {'samples': [{'node_tree': []}]},
+        MissingParameterError('Sample at index 0: At least one node per sample is required'))
+
+
+def _create_samples_params_fail(params, expected):
+    with raises(Exception) as got:
+        create_samples_params(params)
+    assert_exception_correct(got.value, expected)
+
+
 def create_sample_params_meta_fail(m, expected):
     create_sample_params_fail(
         {'sample': {'node_tree': [
@@ -429,6 +499,8 @@ def test_get_version_from_object():
     assert get_version_from_object({'version': None}) is None
     assert get_version_from_object({'version': 3}, True) == 3
     assert get_version_from_object({'version': 1}) == 1
+    assert get_version_from_object({'version': 1, 'v': 2}, key='v') == 2
+    assert get_version_from_object({'version': 1}, key='v') is None
 
 
 def test_get_version_from_object_fail_bad_args():
@@ -442,11 +514,15 @@ def test_get_version_from_object_fail_bad_args():
         {'version': 0}, True, IllegalParameterError('Illegal version argument: 0'))
     get_version_from_object_fail(
         {'version': -3}, False, IllegalParameterError('Illegal version argument: -3'))
+    get_version_from_object_fail(
+        {'version': 1}, True, MissingParameterError('v'), key='v')
+    get_version_from_object_fail(
+        {'v': 0}, False, IllegalParameterError('Illegal v argument: 0'), key='v')
 
 
-def get_version_from_object_fail(params, required, expected):
+def get_version_from_object_fail(params, required, expected, key='version'):
     with raises(Exception) as got:
-        get_version_from_object(params, required)
+        get_version_from_object(params, required, key=key)
     assert_exception_correct(got.value, expected)
 
 
@@ -491,6 +567,41 @@ def get_sample_address_from_object_fail(params, required, expected):
     assert_exception_correct(got.value, expected)
 
 
+def test_get_sample_addresses_from_object():
+    assert get_sample_addresses_from_object({'samples': [
+        {'id': 'f5bd78c3-823e-40b2-9f93-20e78680e41e'},
+        {'id': 'f5bd78c3-823e-40b2-9f93-20e78680e41f', 'version': 3}
+        ]}) == [(UUID('f5bd78c3-823e-40b2-9f93-20e78680e41e'), None),
+                (UUID('f5bd78c3-823e-40b2-9f93-20e78680e41f'), 3)]
+
+
+def test_get_sample_addresses_from_object_fail_bad_args():
+    id_ = 'f5bd78c3-823e-40b2-9f93-20e78680e41e'
+    _get_sample_addresses_from_object_fail(None, ValueError('params cannot be None'))
+    _get_sample_addresses_from_object_fail({}, MissingParameterError('samples'))
+    _get_sample_addresses_from_object_fail({'samples': []}, MissingParameterError('samples'))
+    _get_sample_addresses_from_object_fail(
+        {'samples': {'id': id_}}, IllegalParameterError('samples must be a list'))
+    _get_sample_addresses_from_object_fail(
+        {'samples': [{'id': id_}, id_]},
+        IllegalParameterError('Sample address at index 1 is not a structure'))
+    _get_sample_addresses_from_object_fail(
+        {'samples': [{'id': id_}, {'version': 1}]},
+        MissingParameterError('Sample address at index 1: id'))
+    _get_sample_addresses_from_object_fail(
+        {'samples': [{'id': 'foo'}]},
+        IllegalParameterError('Sample address at index 0: id foo must be a UUID string'))
+    _get_sample_addresses_from_object_fail(
+        {'samples': [{'id': id_}, {'id': id_, 'version': 0}]},
+        IllegalParameterError('Sample address at index 1: Illegal version argument: 0'))
+
+
+def _get_sample_addresses_from_object_fail(params, expected):
+    with raises(Exception) as got:
+        get_sample_addresses_from_object(params)
+    assert_exception_correct(got.value, expected)
+
+
 def test_sample_to_dict_minimal():
 
     expected = {'node_tree': [{'id': 'foo',
@@ -574,6 +685,41 @@ def test_sample_to_dict_fail():
         got.value, ValueError('sample cannot be a value that evaluates to false'))
 
 
+def test_sample_results_to_dicts():
+    id_ = UUID('f5bd78c3-823e-40b2-9f93-20e78680e41e')
+    s = sample_results_to_dicts([
+        SavedSample(id_, UserID('user2'), [SampleNode('foo')], dt(87.8971), 'bar', 2),
+        NoSuchSampleError('f5bd78c3-823e-40b2-9f93-20e78680e41f')])
+
+    assert s == [
+        {'sample': {'node_tree': [{'id': 'foo',
+                                   'type': 'BioReplicate',
+                                   'meta_controlled': {},
+                                   'meta_user': {},
+                                   'source_meta': [],
+                                   'parent': None
+                                   }],
+                    'id': 'f5bd78c3-823e-40b2-9f93-20e78680e41e',
+                    'user': 'user2',
+                    'save_date': 87897,
+                    'name': 'bar',
+                    'version': 2,
+                    },
+         'error': None},
+        {'sample': None,
+         'error': 'Sample service error code 50010 No such sample: ' +
+                  'f5bd78c3-823e-40b2-9f93-20e78680e41f'}
+    ]
+
+    json.dumps(s)
+
+
+def test_sample_results_to_dicts_fail_bad_args():
+    with raises(Exception) as got:
+        sample_results_to_dicts(None)
+    assert_exception_correct(got.value, ValueError('results cannot be None'))
+
+
 def test_acls_to_dict_minimal():
     assert acls_to_dict(SampleACL(UserID('user'), dt(1))) == {
         'owner': 'user',
@@ -938,6 +1084,104 @@ def _create_data_link_params_fail(params, expected):
     assert_exception_correct(got.value, expected)
 
 
+def test_create_data_links_params():
+    params = {
+        'links': [
+            {'id': '706fe9e1-70ef-4feb-bbd9-32295104a119',
+             'version': 78,
+             'node': 'mynode',
+             'upa': '6/7/29',
+             'dataid': 'mydata',
+             'update': 0  # should be ignored
+             },
+            {'id': '706fe9e1-70ef-4feb-bbd9-32295104a11a',
+             'version': 1,
+             'node': 'm',
+             'upa': '1/1/1'
+             }
+        ],
+        'update': 1
+    }
+
+    assert create_data_links_params(params) == (
+        [(DataUnitID(UPA('6/7/29'), 'mydata'),
+          SampleNodeAddress(
+              SampleAddress(UUID('706fe9e1-70ef-4feb-bbd9-32295104a119'), 78), 'mynode')),
+         (DataUnitID(UPA('1/1/1')),
+          SampleNodeAddress(
+              SampleAddress(UUID('706fe9e1-70ef-4feb-bbd9-32295104a11a'), 1), 'm'))
+         ],
+        True
+    )
+
+    assert create_data_links_params({'links': []}) == ([], False)
+
+
+def test_create_data_links_params_fail_bad_args():
+    link = {'id': '706fe9e1-70ef-4feb-bbd9-32295104a119', 'version': 1, 'node': 'm',
+            'upa': '1/1/1'}
+    err = IllegalParameterError('params must contain links key that maps to a list')
+    _create_data_links_params_fail(None, ValueError('params cannot be None'))
+    _create_data_links_params_fail({}, err)
+    _create_data_links_params_fail({'links': link}, err)
+    _create_data_links_params_fail({'links': [link, ['a']]}, IllegalParameterError(
+        'Link at index 1 is not a structure'))
+    _create_data_links_params_fail(
+        {'links': [link, {'id': link['id'], 'version': 1, 'node': 'm'}]},
+        MissingParameterError('Link at index 1: upa'))
+    _create_data_links_params_fail(
+        {'links': [{'id': link['id'], 'version': 1, 'node': 'm', 'upa': '1/0/1'}]},
+        IllegalParameterError('Link at index 0: 1/0/1 is not a valid UPA'))
+
+
+def _create_data_links_params_fail(params, expected):
+    with raises(Exception) as got:
+        create_data_links_params(params)
+    assert_exception_correct(got.value, expected)
+
+
+def test_expire_data_links_params():
+    assert expire_data_links_params({'upa': '1/2/3'}) == (UPA('1/2/3'), None, None)
+    assert expire_data_links_params(
+        {'id': '706fe9e1-70ef-4feb-bbd9-32295104a119', 'version': 3, 'upa': None}) == (
+            None, SampleAddress(UUID('706fe9e1-70ef-4feb-bbd9-32295104a119'), 3), None)
+    assert expire_data_links_params(
+        {'link_ids': ['706fe9e1-70ef-4feb-bbd9-32295104a119',
+                      '706fe9e1-70ef-4feb-bbd9-32295104a11a']}) == (
+            None,
+            None,
+            [UUID('706fe9e1-70ef-4feb-bbd9-32295104a119'),
+             UUID('706fe9e1-70ef-4feb-bbd9-32295104a11a')])
+    assert expire_data_links_params({'link_ids': []}) == (None, None, [])
+
+
+def test_expire_data_links_params_fail_bad_args():
+    id_ = '706fe9e1-70ef-4feb-bbd9-32295104a119'
+    err = IllegalParameterError('Exactly one of upa, id, or link_ids must be provided')
+    _expire_data_links_params_fail(None, ValueError('params cannot be None'))
+    _expire_data_links_params_fail({}, err)
+    _expire_data_links_params_fail({'upa': '1/1/1', 'id': id_, 'version': 1}, err)
+    _expire_data_links_params_fail({'upa': '1/1/1', 'link_ids': [id_]}, err)
+    _expire_data_links_params_fail({'id': id_, 'version': 1, 'link_ids': [id_]}, err)
+    _expire_data_links_params_fail({'upa': '1/0/1'}, IllegalParameterError(
+        '1/0/1 is not a valid UPA'))
+    _expire_data_links_params_fail({'id': id_}, MissingParameterError('version'))
+    _expire_data_links_params_fail({'id': 'foo', 'version': 1}, IllegalParameterError(
+        'id foo must be a UUID string'))
+    _expire_data_links_params_fail({'link_ids': id_}, IllegalParameterError(
+        'link_ids must be a list'))
+    _expire_data_links_params_fail({'link_ids': [id_, None]}, MissingParameterError(
+        'Link ID at index 1'))
+    _expire_data_links_params_fail({'link_ids': [id_, 'foo']}, IllegalParameterError(
+        'Link ID at index 1 foo must be a UUID string'))
+
+
+def _expire_data_links_params_fail(params, expected):
+    with raises(Exception) as got:
+        expire_data_links_params(params)
+    assert_exception_correct(got.value, expected)
+
+
 def test_get_data_unit_id_from_object():
     assert get_data_unit_id_from_object({'upa': '1/1/1'}) == DataUnitID(UPA('1/1/1'))
     assert get_data_unit_id_from_object({'upa': '8/3/2'}) == DataUnitID(UPA('8/3/2'))
@@ -983,6 +1227,29 @@ def _get_upa_from_object_fail(params, expected):
     assert_exception_correct(got.value, expected)
 
 
+def test_get_upas_from_object():
+    assert get_upas_from_object({'upas': ['1/1/1']}) == [UPA('1/1/1')]
+    assert get_upas_from_object({'upas': ['8/3/2', '1/1/1', '8/3/2']}) == [
+        UPA('8/3/2'), UPA('1/1/1'), UPA('8/3/2')]
+
+
+def test_get_upas_from_object_fail_bad_args():
+    _get_upas_from_object_fail(None, ValueError('params cannot be None'))
+    _get_upas_from_object_fail({}, MissingParameterError('upas'))
+    _get_upas_from_object_fail({'upas': []}, MissingParameterError('upas'))
+    _get_upas_from_object_fail({'upas': '1/1/1'}, IllegalParameterError('upas must be a list'))
+    _get_upas_from_object_fail({'upas': ['1/1/1', 82]}, IllegalParameterError(
+        'UPA at index 1 is not a string'))
+    _get_upas_from_object_fail({'upas': ['1/1/1', '1/0/1']}, IllegalParameterError(
+        'UPA at index 1: 1/0/1 is not a valid UPA'))
+
+
+def _get_upas_from_object_fail(params, expected):
+    with raises(Exception) as got:
+        get_upas_from_object(params)
+    assert_exception_correct(got.value, expected)
+
+
 def test_get_datetime_from_epochmilliseconds_in_object():
     gt = get_datetime_from_epochmilliseconds_in_object
     assert gt({}, 'foo') is None
@@ -1081,3 +1348,590 @@ def _links_to_dicts_fail(links, expected):
     with raises(Exception) as got:
         links_to_dicts(links)
     assert_exception_correct(got.value, expected)
+
+
+def test_data_link_results_to_dicts():
+    results = [
+        DataLink(
+            UUID('f5bd78c3-823e-40b2-9f93-20e78680e41a'),
+            DataUnitID(UPA('4/9/10')),
+            SampleNodeAddress(
+                SampleAddress(UUID('f5bd78c3-823e-40b2-9f93-20e78680e41b'), 4), 'bar'),
+            dt(1),
+            UserID('userc'),
+        ),
+        None,
+        DataLinkExistsError('4/9/11')
+    ]
+    assert data_link_results_to_dicts(results) == [
+        {'status': 'created',
+         'new_link': {
+            'linkid': 'f5bd78c3-823e-40b2-9f93-20e78680e41a',
+            'upa': '4/9/10',
+            'dataid': None,
+            'id': 'f5bd78c3-823e-40b2-9f93-20e78680e41b',
+            'version': 4,
+            'node': 'bar',
+            'created': 1000,
+            'createdby': 'userc',
+            'expired': None,
+            'expiredby': None
+            },
+         'error': None},
+        {'status': 'noop', 'new_link': None, 'error': None},
+        {'status': 'error',
+         'new_link': None,
+         'error': 'Sample service error code 60000 Data link exists for data ID: 4/9/11'}
+    ]
+
+
+def test_data_link_results_to_dicts_fail_bad_args():
+    for r in [None, []]:
+        with raises(Exception) as got:
+            data_link_results_to_dicts(r)
+        assert_exception_correct(got.value, ValueError(
+            'results cannot be a value that evaluates to false'))
+
+
+def test_data_links_bulk_results_to_dicts():
+    link = DataLink(
+        UUID('f5bd78c3-823e-40b2-9f93-20e78680e41a'),
+        DataUnitID(UPA('4/9/10'), 'foo'),
+        SampleNodeAddress(
+            SampleAddress(UUID('f5bd78c3-823e-40b2-9f93-20e78680e41b'), 4), 'bar'),
+        dt(1),
+        UserID('userc'),
+    )
+    res = data_links_bulk_results_to_dicts(
+        [UPA('4/9/10'), UPA('1/1/1'), UPA('2/1/1')],
+        [[link], [], UnauthorizedError('User u cannot read upa 2/1/1')])
+    assert res == [
+        {'upa': '4/9/10',
+         'links': [{
+            'linkid': 'f5bd78c3-823e-40b2-9f93-20e78680e41a',
+            'upa': '4/9/10',
+            'dataid': 'foo',
+            'id': 'f5bd78c3-823e-40b2-9f93-20e78680e41b',
+            'version': 4,
+            'node': 'bar',
+            'created': 1000,
+            'createdby': 'userc',
+            'expired': None,
+            'expiredby': None
+            }],
+         'error': None},
+        {'upa': '1/1/1', 'links': [], 'error': None},
+        {'upa': '2/1/1',
+         'links': None,
+         'error': 'Sample service error code 20000 Unauthorized: User u cannot read upa 2/1/1'}
+    ]
+
+
+def test_data_links_bulk_results_to_dicts_fail_bad_args():
+    _data_links_bulk_results_to_dicts_fail(None, [[]], ValueError('upas cannot be None'))
+    _data_links_bulk_results_to_dicts_fail([None], [[]], ValueError(
+        'Index 0 of iterable upas cannot be a value that evaluates to false'))
+    _data_links_bulk_results_to_dicts_fail([UPA('1/1/1')], None, ValueError(
+        'results cannot be a value that evaluates to false'))
+    _data_links_bulk_results_to_dicts_fail([UPA('1/1/1')], [[], []], ValueError(
+        'upas and results must be the same length'))
+
+
+def _data_links_bulk_results_to_dicts_fail(upas, results, expected):
+    with raises(Exception) as got:
+        data_links_bulk_results_to_dicts(upas, results)
+    assert_exception_correct(got.value, expected)
+
+
+def test_create_link_continuation_token_and_get_link_paging_from_object():
+    links = [
+        DataLink(
+            UUID('f5bd78c3-823e-40b2-9f93-20e78680e41a'),
+            DataUnitID(UPA('4/9/10')),
+            SampleNodeAddress(
+                SampleAddress(UUID('f5bd78c3-823e-40b2-9f93-20e78680e41b'), 4), 'bar'),
+            dt(1),
+            UserID('userc'),
+        ),
+        DataLink(
+            UUID('f5bd78c3-823e-40b2-9f93-20e78680e41e'),
+            DataUnitID(UPA('1/2/3'), 'foo'),
+            SampleNodeAddress(
+                SampleAddress(UUID('f5bd78c3-823e-40b2-9f93-20e78680e41f'), 6), 'foo'),
+            dt(2.567891),
+            UserID('usera'),
+        )
+    ]
+
+    assert create_link_continuation_token(dt(40), links, None) is None
+    assert create_link_continuation_token(dt(40), links, 3) is None
+    assert create_link_continuation_token(dt(40), [], 3) is None
+
+    token = create_link_continuation_token(dt(40.123456), links, 2)
+    assert type(token) == str
+
+    expected = (dt(40.123456), 2, (dt(2.567891), UUID('f5bd78c3-823e-40b2-9f93-20e78680e41e')))
+    assert get_link_paging_from_object(
+        {'page_size': 2, 'continuation_token': token}, None) == expected
+    assert get_link_paging_from_object(
+        {'page_size': 2, 'continuation_token': token}, dt(40.1232)) == expected
+    assert get_link_paging_from_object({'continuation_token': token}, None) == (
+        dt(40.123456), None, (dt(2.567891), UUID('f5bd78c3-823e-40b2-9f93-20e78680e41e')))
+
+
+def test_get_link_paging_from_object_no_token():
+    assert get_link_paging_from_object({}, None) == (None, None, None)
+    assert get_link_paging_from_object({'page_size': None}, dt(6)) == (dt(6), None, None)
+    assert get_link_paging_from_object({'page_size': 1}, dt(6)) == (dt(6), 1, None)
+    assert get_link_paging_from_object({'page_size': 10000}, None) == (None, 10000, None)
+
+
+def test_get_link_paging_from_object_fail_bad_args():
+    links = [
+        DataLink(
+            UUID('f5bd78c3-823e-40b2-9f93-20e78680e41a'),
+            DataUnitID(UPA('4/9/10')),
+            SampleNodeAddress(
+                SampleAddress(UUID('f5bd78c3-823e-40b2-9f93-20e78680e41b'), 4), 'bar'),
+            dt(1),
+            UserID('userc'),
+        )
+    ]
+    token = create_link_continuation_token(dt(40), links, 1)
+    ps = IllegalParameterError('page_size must be an integer from 1 to 10000')
+
+    _get_link_paging_from_object_fail(None, None, ValueError('params cannot be None'))
+    _get_link_paging_from_object_fail({'page_size': 0}, None, ps)
+    _get_link_paging_from_object_fail({'page_size': 10001}, None, ps)
+    _get_link_paging_from_object_fail({'page_size': '1'}, None, ps)
+    _get_link_paging_from_object_fail({'page_size': 1.0}, None, ps)
+    _get_link_paging_from_object_fail({'continuation_token': 1}, None, IllegalParameterError(
+        'continuation_token must be a string'))
+    for t in ['foo', 'Wzld', 'WzEsIDJd', 'WzEsIDIsICJmb28iXQ==']:  # [9], [1, 2], [1, 2, "foo"]
+        _get_link_paging_from_object_fail({'continuation_token': t}, None, IllegalParameterError(
+            f'Invalid continuation_token: {t}'))
+    _get_link_paging_from_object_fail(
+        {'continuation_token': token}, dt(40.001), IllegalParameterError(
+            'effective_time does not match the effective time in the continuation_token'))
+
+
+def _get_link_paging_from_object_fail(params, effective_time, expected):
+    with raises(Exception) as got:
+        get_link_paging_from_object(params, effective_time)
+    assert_exception_correct(got.value, expected)
+
+
+def test_create_link_continuation_token_fail_bad_args():
+    with raises(Exception) as got:
+        create_link_continuation_token(None, [], 1)
+    assert_exception_correct(got.value, ValueError(
+        'effective_time cannot be a value that evaluates to false'))
+
+
+def test_search_samples_params():
+    assert search_samples_params({'conditions': [
+        {'key': 'depth', 'min': 3, 'max': 7.5},
+        {'key': 'depth', 'value_key': 'units', 'equals': 'm'},
+        {'key': 'material', 'prefix': 'soil', 'equals': None},
+        {'key': 'wet', 'equals': False},
+        {'key': 'depth', 'max': 6, 'units': 'ft'},
+        ]}) == ([
+            MetadataCondition('depth', 'value', minimum=3, maximum=7.5),
+            MetadataCondition('depth', 'units', equals='m'),
+            MetadataCondition('material', 'value', prefix='soil'),
+            MetadataCondition('wet', 'value', equals=False),
+            MetadataCondition('depth', 'value', maximum=6, units='ft'),
+            ], 1000, None)
+
+    assert search_samples_params({'conditions': [{'key': 'a', 'min': 1}],
+                                  'page_size': 10000}) == (
+        [MetadataCondition('a', 'value', minimum=1)], 10000, None)
+
+
+def test_create_search_continuation_token_and_search_samples_params():
+    addresses = [SampleAddress(UUID('f5bd78c3-823e-40b2-9f93-20e78680e41a'), 3),
+                 SampleAddress(UUID('f5bd78c3-823e-40b2-9f93-20e78680e41b'), 1)]
+
+    assert create_search_continuation_token(addresses, 3) is None
+    assert create_search_continuation_token([], 3) is None
+
+    token = create_search_continuation_token(addresses, 2)
+    assert type(token) == str
+
+    assert search_samples_params({'conditions': [{'key': 'a', 'max': 1}],
+                                  'page_size': 2,
+                                  'continuation_token': token}) == (
+        [MetadataCondition('a', 'value', maximum=1)],
+        2,
+        SampleAddress(UUID('f5bd78c3-823e-40b2-9f93-20e78680e41b'), 1))
+
+
+def test_search_samples_params_fail_bad_args():
+    c = [{'key': 'a', 'equals': 'b'}]
+    ps = IllegalParameterError('page_size must be an integer from 1 to 10000')
+
+    _search_samples_params_fail(None, ValueError('params cannot be None'))
+    _search_samples_params_fail({}, MissingParameterError('conditions'))
+    _search_samples_params_fail({'conditions': []}, MissingParameterError('conditions'))
+    _search_samples_params_fail({'conditions': {'a': 'b'}}, IllegalParameterError(
+        'conditions must be a list'))
+    _search_samples_params_fail({'conditions': c + ['a']}, IllegalParameterError(
+        'Condition at index 1 is not a structure'))
+    _search_samples_params_fail({'conditions': c + [{'equals': 'b'}]}, MissingParameterError(
+        'Condition at index 1: key'))
+    _search_samples_params_fail({'conditions': [{'key': 'a', 'value_key': ''}]},
+                                MissingParameterError('Condition at index 0: value_key'))
+    _search_samples_params_fail({'conditions': [{'key': 'a'}]}, IllegalParameterError(
+        'Condition at index 0: Exactly one of an equality, range, or prefix condition must be ' +
+        'provided for metadata key a'))
+    _search_samples_params_fail({'conditions': [{'key': 'a', 'equals': 1, 'prefix': 'b'}]},
+                                IllegalParameterError(
+        'Condition at index 0: Exactly one of an equality, range, or prefix condition must be ' +
+        'provided for metadata key a'))
+    _search_samples_params_fail({'conditions': [{'key': 'a', 'equals': ['b']}]},
+                                IllegalParameterError(
+        'Condition at index 0: The equality condition for metadata key a must be a string, ' +
+        'number, or boolean'))
+    _search_samples_params_fail({'conditions': [{'key': 'a', 'min': '1'}]}, IllegalParameterError(
+        'Condition at index 0: The range condition for metadata key a must have numeric bounds'))
+    _search_samples_params_fail({'conditions': [{'key': 'a', 'min': 2, 'max': 1}]},
+                                IllegalParameterError(
+        'Condition at index 0: The range condition for metadata key a has a minimum greater ' +
+        'than the maximum'))
+    _search_samples_params_fail({'conditions': [{'key': 'a', 'min': 1, 'units': 'foo'}]},
+                                IllegalParameterError(
+        "Condition at index 0: Unable to parse units 'foo' for metadata key a"))
+    _search_samples_params_fail({'conditions': [{'key': 'a', 'prefix': ''}]},
+                                IllegalParameterError(
+        'Condition at index 0: The prefix condition for metadata key a must be a non-empty ' +
+        'string'))
+    _search_samples_params_fail({'conditions': c, 'page_size': 0}, ps)
+    _search_samples_params_fail({'conditions': c, 'page_size': 10001}, ps)
+    _search_samples_params_fail({'conditions': c, 'page_size': 1.0}, ps)
+    _search_samples_params_fail({'conditions': c, 'continuation_token': 1},
+                                IllegalParameterError('continuation_token must be a string'))
+    for t in ['foo', 'Wzld', 'WzEsIDJd',
+              'WyJmNWJkNzhjMy04MjNlLTQwYjItOWY5My0yMGU3ODY4MGU0MWEiLCAwXQ==',  # [id, 0]
+              'WyJmNWJkNzhjMy04MjNlLTQwYjItOWY5My0yMGU3ODY4MGU0MWEiXQ==']:  # [id]
+        _search_samples_params_fail({'conditions': c, 'continuation_token': t},
+                                    IllegalParameterError(f'Invalid continuation_token: {t}'))
+
+
+def _search_samples_params_fail(params, expected):
+    with raises(Exception) as got:
+        search_samples_params(params)
+    assert_exception_correct(got.value, expected)
+
+
+def test_create_search_continuation_token_fail_bad_args():
+    with raises(Exception) as got:
+        create_search_continuation_token(None, 1)
+    assert_exception_correct(got.value, ValueError('addresses cannot be None'))
+
+
+def test_search_samples_by_location_params():
+    assert search_samples_by_location_params({'bounding_box': {
+        'min_latitude': 40, 'min_longitude': -112.5, 'max_latitude': 45, 'max_longitude': -109}
+        }) == (LocationCondition(bounding_box=(40, -112.5, 45, -109)), 1000, None)
+
+    token = create_search_continuation_token(
+        [SampleAddress(UUID('f5bd78c3-823e-40b2-9f93-20e78680e41b'), 1)], 1)
+    assert search_samples_by_location_params({
+        'center': {'latitude': 44.46, 'longitude': -110.83},
+        'radius': 5000,
+        'page_size': 1,
+        'continuation_token': token
+        }) == (LocationCondition(center=(44.46, -110.83), radius=5000),
+               1,
+               SampleAddress(UUID('f5bd78c3-823e-40b2-9f93-20e78680e41b'), 1))
+
+
+def test_search_samples_by_location_params_fail_bad_args():
+    bb = {'min_latitude': 40, 'min_longitude': -112, 'max_latitude': 45, 'max_longitude': -109}
+    one = IllegalParameterError('Exactly one of a bounding box or a center and radius must be ' +
+                                'provided for a location condition')
+
+    _search_samples_by_location_params_fail(None, ValueError('params cannot be None'))
+    _search_samples_by_location_params_fail({}, one)
+    _search_samples_by_location_params_fail({'bounding_box': bb, 'radius': 1}, one)
+    _search_samples_by_location_params_fail({'bounding_box': [1, 2, 3, 4]},
+                                            IllegalParameterError(
+        'bounding_box must be a structure'))
+    _search_samples_by_location_params_fail({'center': [1, 2], 'radius': 1},
+                                            IllegalParameterError('center must be a structure'))
+    _search_samples_by_location_params_fail({'bounding_box': {'min_latitude': 40}},
+                                            IllegalParameterError(
+        'The bounding box minimum longitude must be a number from -180 to 180'))
+    _search_samples_by_location_params_fail({'center': {'latitude': 44}, 'radius': 1},
+                                            IllegalParameterError(
+        'The center longitude must be a number from -180 to 180'))
+    _search_samples_by_location_params_fail(
+        {'center': {'latitude': 44, 'longitude': 1}, 'radius': 0},
+        IllegalParameterError('The radius must be a number greater than 0'))
+    _search_samples_by_location_params_fail({'bounding_box': bb, 'page_size': 0},
+                                            IllegalParameterError(
+        'page_size must be an integer from 1 to 10000'))
+    _search_samples_by_location_params_fail({'bounding_box': bb, 'continuation_token': 'foo'},
+                                            IllegalParameterError(
+        'Invalid continuation_token: foo'))
+
+
+def _search_samples_by_location_params_fail(params, expected):
+    with raises(Exception) as got:
+        search_samples_by_location_params(params)
+    assert_exception_correct(got.value, expected)
+
+
+def test_get_metadata_facets_params():
+    assert get_metadata_facets_params({'keys': ['biome', 'k' * 256]}) == (
+        ['biome', 'k' * 256], [], 100)
+    assert get_metadata_facets_params({
+        'keys': ['biome'],
+        'conditions': [{'key': 'depth', 'min': 3}, {'key': 'wet', 'equals': True}],
+        'limit': 1000}) == (
+            ['biome'],
+            [MetadataCondition('depth', 'value', minimum=3),
+             MetadataCondition('wet', 'value', equals=True)],
+            1000)
+
+
+def test_get_metadata_facets_params_fail_bad_args():
+    k = ['biome']
+    _get_metadata_facets_params_fail(None, ValueError('params cannot be None'))
+    _get_metadata_facets_params_fail({}, MissingParameterError('keys'))
+    _get_metadata_facets_params_fail({'keys': []}, MissingParameterError('keys'))
+    _get_metadata_facets_params_fail({'keys': 'biome'}, IllegalParameterError(
+        'keys must be a list'))
+    _get_metadata_facets_params_fail({'keys': ['a', 1]}, IllegalParameterError(
+        'Key at index 1 must be a string'))
+    _get_metadata_facets_params_fail({'keys': ['a', '  ']}, MissingParameterError(
+        'key at index 1'))
+    _get_metadata_facets_params_fail({'keys': ['k' * 257]}, IllegalParameterError(
+        'key at index 0 exceeds maximum length of 256'))
+    _get_metadata_facets_params_fail({'keys': k, 'conditions': {}}, IllegalParameterError(
+        'conditions must be a list'))
+    _get_metadata_facets_params_fail({'keys': k, 'conditions': [{'key': 'a'}]},
+                                     IllegalParameterError(
+        'Condition at index 0: Exactly one of an equality, range, or prefix condition must be ' +
+        'provided for metadata key a'))
+    for limit in [0, 1001, 1.0]:
+        _get_metadata_facets_params_fail({'keys': k, 'limit': limit}, IllegalParameterError(
+            'limit must be an integer from 1 to 1000'))
+
+
+def _get_metadata_facets_params_fail(params, expected):
+    with raises(Exception) as got:
+        get_metadata_facets_params(params)
+    assert_exception_correct(got.value, expected)
+
+
+def test_get_sample_diff_params():
+    assert get_sample_diff_params({
+        'id': 'f5bd78c3-823e-40b2-9f93-20e78680e41e', 'version_a': 1, 'version_b': 3}) == (
+            UUID('f5bd78c3-823e-40b2-9f93-20e78680e41e'), 1, 3)
+    assert get_sample_diff_params({
+        'id': 'f5bd78c3-823e-40b2-9f93-20e78680e41e', 'version_a': 4, 'version_b': 2}) == (
+            UUID('f5bd78c3-823e-40b2-9f93-20e78680e41e'), 4, 2)
+
+
+def test_get_sample_diff_params_fail_bad_args():
+    id_ = 'f5bd78c3-823e-40b2-9f93-20e78680e41e'
+    _get_sample_diff_params_fail(None, ValueError('params cannot be None'))
+    _get_sample_diff_params_fail(
+        {'version_a': 1, 'version_b': 2}, MissingParameterError('id'))
+    _get_sample_diff_params_fail(
+        {'id': 'foo', 'version_a': 1, 'version_b': 2},
+        IllegalParameterError('id foo must be a UUID string'))
+    _get_sample_diff_params_fail({'id': id_, 'version_b': 2}, MissingParameterError('version_a'))
+    _get_sample_diff_params_fail({'id': id_, 'version_a': 1}, MissingParameterError('version_b'))
+    _get_sample_diff_params_fail(
+        {'id': id_, 'version_a': 0, 'version_b': 2},
+        IllegalParameterError('Illegal version_a argument: 0'))
+    _get_sample_diff_params_fail(
+        {'id': id_, 'version_a': 1, 'version_b': '2'},
+        IllegalParameterError('Illegal version_b argument: 2'))
+
+
+def _get_sample_diff_params_fail(params, expected):
+    with raises(Exception) as got:
+        get_sample_diff_params(params)
+    assert_exception_correct(got.value, expected)
+
+
+def test_sample_diff_to_dict_empty():
+    assert sample_diff_to_dict(SampleDiff([], [])) == {
+        'added_nodes': [], 'removed_nodes': [], 'changed_nodes': []}
+
+
+def test_sample_diff_to_dict():
+    old = [
+        SampleNode('root', SubSampleType.BIOLOGICAL_REPLICATE),
+        SampleNode('gone', SubSampleType.SUB_SAMPLE, 'root'),
+        SampleNode('meta', SubSampleType.SUB_SAMPLE, 'root',
+                   {'a': {'x': 1}, 'b': {'x': 2}},
+                   {'u': {'y': 'foo'}, 'v': {'y': 'bar'}},
+                   [SourceMetadata('a', 'sa', {'x': 'one'}),
+                    SourceMetadata('b', 'sb', {'x': 'two'})]),
+        SampleNode('moved', SubSampleType.SUB_SAMPLE, 'root'),
+    ]
+    new = [
+        SampleNode('root', SubSampleType.BIOLOGICAL_REPLICATE),
+        SampleNode('meta', SubSampleType.SUB_SAMPLE, 'root',
+                   {'a': {'x': 3}, 'c': {'x': 4}},
+                   {'u': {'y': 'foo'}, 'w': {'y': 'baz'}},
+                   [SourceMetadata('a', 'sa2', {'x': 'one'}),
+                    SourceMetadata('c', 'sc', {'x': 'four'})]),
+        SampleNode('moved', SubSampleType.TECHNICAL_REPLICATE, 'meta'),
+        SampleNode('new', SubSampleType.SUB_SAMPLE, 'moved', {'a': {'x': 5}}, {'u': {'y': 'n'}},
+                   [SourceMetadata('a', 'sa', {'x': 'five'})]),
+    ]
+    assert sample_diff_to_dict(SampleDiff(old, new)) == {
+        'added_nodes': [{'id': 'new',
+                         'type': 'SubSample',
+                         'parent': 'moved',
+                         'meta_controlled': {'a': {'x': 5}},
+                         'meta_user': {'u': {'y': 'n'}},
+                         'source_meta': [{'key': 'a', 'skey': 'sa', 'svalue': {'x': 'five'}}]
+                         }],
+        'removed_nodes': ['gone'],
+        'changed_nodes': [
+            {'id': 'meta',
+             'meta_controlled': {'added': {'c': {'x': 4}},
+                                 'removed': {'b': {'x': 2}},
+                                 'changed': {'a': {'old': {'x': 1}, 'new': {'x': 3}}}
+                                 },
+             'meta_user': {'added': {'w': {'y': 'baz'}},
+                           'removed': {'v': {'y': 'bar'}},
+                           'changed': {}
+                           },
+             'source_meta': {
+                 'added': {'c': {'key': 'c', 'skey': 'sc', 'svalue': {'x': 'four'}}},
+                 'removed': {'b': {'key': 'b', 'skey': 'sb', 'svalue': {'x': 'two'}}},
+                 'changed': {'a': {'old': {'key': 'a', 'skey': 'sa', 'svalue': {'x': 'one'}},
+                                   'new': {'key': 'a', 'skey': 'sa2', 'svalue': {'x': 'one'}}
+                                   }}
+                 }
+             },
+            {'id': 'moved',
+             'type': {'old': 'SubSample', 'new': 'TechReplicate'},
+             'parent': {'old': 'root', 'new': 'meta'},
+             'meta_controlled': {'added': {}, 'removed': {}, 'changed': {}},
+             'meta_user': {'added': {}, 'removed': {}, 'changed': {}},
+             'source_meta': {'added': {}, 'removed': {}, 'changed': {}},
+             },
+        ]
+    }
+
+
+def test_sample_diff_to_dict_fail():
+    with raises(Exception) as got:
+        sample_diff_to_dict(None)
+    assert_exception_correct(got.value, ValueError(
+        'diff cannot be a value that evaluates to false'))
+
+
+def test_list_samples_params():
+    assert list_samples_params({}) == (1000, None)
+    assert list_samples_params({'page_size': 10000}) == (10000, None)
+
+
+def test_create_list_samples_continuation_token_and_list_samples_params():
+    results = [(SampleAddress(UUID('f5bd78c3-823e-40b2-9f93-20e78680e41b'), 3), dt(6)),
+               (SampleAddress(UUID('f5bd78c3-823e-40b2-9f93-20e78680e41a'), 1), dt(5.5))]
+
+    assert create_list_samples_continuation_token(results, 3) is None
+    assert create_list_samples_continuation_token([], 3) is None
+
+    token = create_list_samples_continuation_token(results, 2)
+    assert type(token) == str
+
+    assert list_samples_params({'page_size': 2, 'continuation_token': token}) == (
+        2, (dt(5.5), UUID('f5bd78c3-823e-40b2-9f93-20e78680e41a')))
+
+
+def test_list_samples_params_fail_bad_args():
+    _list_samples_params_fail(None, ValueError('params cannot be None'))
+    for ps in [0, 10001, '1']:
+        _list_samples_params_fail({'page_size': ps}, IllegalParameterError(
+            'page_size must be an integer from 1 to 10000'))
+    _list_samples_params_fail({'continuation_token': 1}, IllegalParameterError(
+        'continuation_token must be a string'))
+    for t in ['foo', 'WzEsIDJd',  # [1, 2]
+              'WyJmNWJkNzhjMy04MjNlLTQwYjItOWY5My0yMGU3ODY4MGU0MWEiXQ==']:  # [id]
+        _list_samples_params_fail({'continuation_token': t},
+                                  IllegalParameterError(f'Invalid continuation_token: {t}'))
+
+
+def _list_samples_params_fail(params, expected):
+    with raises(Exception) as got:
+        list_samples_params(params)
+    assert_exception_correct(got.value, expected)
+
+
+def test_create_list_samples_continuation_token_fail_bad_args():
+    with raises(Exception) as got:
+        create_list_samples_continuation_token(None, 1)
+    assert_exception_correct(got.value, ValueError('results cannot be None'))
+
+
+def test_search_samples_by_text_params():
+    assert search_samples_by_text_params({'text': '  soil Yellowstone '}) == (
+        'soil Yellowstone', 1000, None)
+    assert search_samples_by_text_params({'text': 'a' * 1000, 'page_size': 1}) == (
+        'a' * 1000, 1, None)
+
+
+def test_create_text_search_continuation_token_and_search_samples_by_text_params():
+    results = [(SampleAddress(UUID('f5bd78c3-823e-40b2-9f93-20e78680e41a'), 3), 2),
+               (SampleAddress(UUID('f5bd78c3-823e-40b2-9f93-20e78680e41b'), 1), 1)]
+
+    assert create_text_search_continuation_token(results, 3) is None
+    assert create_text_search_continuation_token([], 3) is None
+
+    token = create_text_search_continuation_token(results, 2)
+    assert type(token) == str
+
+    assert search_samples_by_text_params(
+        {'text': 'soil', 'page_size': 2, 'continuation_token': token}) == (
+            'soil', 2, (1, SampleAddress(UUID('f5bd78c3-823e-40b2-9f93-20e78680e41b'), 1)))
+
+
+def test_search_samples_by_text_params_fail_bad_args():
+    ps = IllegalParameterError('page_size must be an integer from 1 to 10000')
+
+    _search_samples_by_text_params_fail(None, ValueError('params cannot be None'))
+    _search_samples_by_text_params_fail({}, MissingParameterError('text'))
+    _search_samples_by_text_params_fail({'text': '   '}, MissingParameterError('text'))
+    _search_samples_by_text_params_fail({'text': ['soil']}, IllegalParameterError(
+        'text must be a string'))
+    _search_samples_by_text_params_fail({'text': 'a' * 1001}, IllegalParameterError(
+        'text exceeds maximum length of 1000'))
+    _search_samples_by_text_params_fail({'text': 'soil\tsand'}, IllegalParameterError(
+        'text contains control characters'))
+    _search_samples_by_text_params_fail({'text': 's', 'page_size': 0}, ps)
+    _search_samples_by_text_params_fail({'text': 's', 'page_size': 10001}, ps)
+    _search_samples_by_text_params_fail({'text': 's', 'continuation_token': 1},
+                                        IllegalParameterError(
+        'continuation_token must be a string'))
+    for t in ['foo', 'Wzld',
+              # ["f5bd78c3-823e-40b2-9f93-20e78680e41a", 1]
+              'WyJmNWJkNzhjMy04MjNlLTQwYjItOWY5My0yMGU3ODY4MGU0MWEiLCAxXQ==',
+              # ["1", "f5bd78c3-823e-40b2-9f93-20e78680e41a", 1]
+              'WyIxIiwgImY1YmQ3OGMzLTgyM2UtNDBiMi05ZjkzLTIwZTc4NjgwZTQxYSIsIDFd',
+              # [1, "f5bd78c3-823e-40b2-9f93-20e78680e41a", 0]
+              'WzEsICJmNWJkNzhjMy04MjNlLTQwYjItOWY5My0yMGU3ODY4MGU0MWEiLCAwXQ==']:
+        _search_samples_by_text_params_fail({'text': 's', 'continuation_token': t},
+                                            IllegalParameterError(
+            f'Invalid continuation_token: {t}'))
+
+
+def _search_samples_by_text_params_fail(params, expected):
+    with raises(Exception) as got:
+        search_samples_by_text_params(params)
+    assert_exception_correct(got.value, expected)
+
+
+def test_create_text_search_continuation_token_fail_bad_args():
+    with raises(Exception) as got:
+        create_text_search_continuation_token(None, 1)
+    assert_exception_correct(got.value, ValueError('results cannot be None'))
@@ -10,7 +10,8 @@ from jsonschema.exceptions import ValidationError
 
 from core import test_utils
 from core.test_utils import assert_exception_correct
-from SampleService.core.config import get_validators, split_value
+from SampleService.core.config import (
+    get_validators, split_value, get_int_value, get_choice_value)
 from SampleService.core.errors import IllegalParameterError
 
 
@@ -51,6 +52,51 @@ def _split_value_fail(d, k, expected):
     assert_exception_correct(got.value, expected)
 
 
+def test_get_int_value():
+    assert get_int_value({}, 'k', 42) == 42
+    assert get_int_value({'k': None}, 'k', 42) == 42
+    assert get_int_value({'k': '      '}, 'k', 42) == 42
+    assert get_int_value({'k': '   0  '}, 'k', 42) == 0
+    assert get_int_value({'k': '   24  '}, 'k', 42) == 24
+
+
+def test_get_int_value_fail():
+    _get_int_value_fail(None, 'k', ValueError('d cannot be None'))
+    _get_int_value_fail({'k': 'foo\tbar'}, 'k', IllegalParameterError(
+        'config param k contains control characters'))
+    _get_int_value_fail({'k': '1.5'}, 'k', ValueError(
+        'config param k must be a non-negative integer, got 1.5'))
+    _get_int_value_fail({'k': '-1'}, 'k', ValueError(
+        'config param k must be a non-negative integer, got -1'))
+
+
+def _get_int_value_fail(d, k, expected):
+    with raises(Exception) as got:
+        get_int_value(d, k, 42)
+    assert_exception_correct(got.value, expected)
+
+
+def test_get_choice_value():
+    assert get_choice_value({}, 'k', ['a', 'b'], 'a') == 'a'
+    assert get_choice_value({'k': None}, 'k', ['a', 'b'], 'a') == 'a'
+    assert get_choice_value({'k': '      '}, 'k', ['a', 'b'], 'a') == 'a'
+    assert get_choice_value({'k': '   b  '}, 'k', ['a', 'b'], 'a') == 'b'
+
+
+def test_get_choice_value_fail():
+    _get_choice_value_fail(None, 'k', ValueError('d cannot be None'))
+    _get_choice_value_fail({'k': 'foo\tbar'}, 'k', IllegalParameterError(
+        'config param k contains control characters'))
+    _get_choice_value_fail({'k': 'c'}, 'k', ValueError(
+        'config param k must be one of a, b, got c'))
+
+
+def _get_choice_value_fail(d, k, expected):
+    with raises(Exception) as got:
+        get_choice_value(d, k, ['a', 'b'], 'a')
+    assert_exception_correct(got.value, expected)
+
+
 def test_config_get_validators(temp_dir):
     cfg = {
         'validators': {
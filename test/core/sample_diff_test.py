@@ -0,0 +1,153 @@
+from pytest import raises
+from core.test_utils import assert_exception_correct
+from SampleService.core.sample import SampleNode, SourceMetadata, SubSampleType
+from SampleService.core.sample_diff import MetadataDiff, NodeDiff, SampleDiff
+
+BIOREP = SubSampleType.BIOLOGICAL_REPLICATE
+TECHREP = SubSampleType.TECHNICAL_REPLICATE
+SUB = SubSampleType.SUB_SAMPLE
+
+
+def test_metadata_diff():
+    md = MetadataDiff(
+        {'a': {'x': 1}, 'c': {'x': 3}, 'd': {'x': 4}, 'f': {'y': 'v'}},
+        {'b': {'x': 2}, 'c': {'x': 3}, 'd': {'x': 5}, 'e': {'x': 6}, 'f': {'y': 'v', 'z': 1}})
+    assert md.added == {'b': {'x': 2}, 'e': {'x': 6}}
+    assert list(md.added) == ['b', 'e']
+    assert md.removed == {'a': {'x': 1}}
+    assert md.changed == {'d': ({'x': 4}, {'x': 5}), 'f': ({'y': 'v'}, {'y': 'v', 'z': 1})}
+    assert list(md.changed) == ['d', 'f']
+    assert md.is_empty() is False
+
+
+def test_metadata_diff_empty():
+    md = MetadataDiff({'a': {'x': 1}}, {'a': {'x': 1}})
+    assert md.added == {}
+    assert md.removed == {}
+    assert md.changed == {}
+    assert md.is_empty() is True
+
+    assert MetadataDiff({}, {}).is_empty() is True
+
+
+def test_metadata_diff_eq():
+    assert MetadataDiff({'a': {'x': 1}}, {}) == MetadataDiff({'a': {'x': 1}}, {})
+    assert MetadataDiff({'a': {'x': 1}}, {}) != MetadataDiff({}, {'a': {'x': 1}})
+    assert MetadataDiff({'a': {'x': 1}}, {}) != MetadataDiff({'a': {'x': 2}}, {})
+    assert MetadataDiff({}, {}) != {}
+
+
+def test_node_diff():
+    nd = NodeDiff(
+        SampleNode('n', SUB, 'p1', {'a': {'x': 1}}, {'u': {'y': 2}},
+                   [SourceMetadata('a', 'sa', {'x': 'one'})]),
+        SampleNode('n', TECHREP, 'p2', {'a': {'x': 2}}, {'v': {'y': 2}},
+                   [SourceMetadata('a', 'sa2', {'x': 'one'})])
+        )
+    assert nd.name == 'n'
+    assert nd.type == (SUB, TECHREP)
+    assert nd.parent == ('p1', 'p2')
+    assert nd.controlled_metadata == MetadataDiff({'a': {'x': 1}}, {'a': {'x': 2}})
+    assert nd.user_metadata == MetadataDiff({'u': {'y': 2}}, {'v': {'y': 2}})
+    assert nd.source_metadata.added == {}
+    assert nd.source_metadata.removed == {}
+    assert nd.source_metadata.changed == {
+        'a': (SourceMetadata('a', 'sa', {'x': 'one'}), SourceMetadata('a', 'sa2', {'x': 'one'}))}
+    assert nd.is_empty() is False
+
+
+def test_node_diff_partial():
+    nd = NodeDiff(
+        SampleNode('n', BIOREP, user_metadata={'u': {'y': 2}}),
+        SampleNode('n', BIOREP, user_metadata={'u': {'y': 2}},
+                   controlled_metadata={'a': {'x': 1}},
+                   source_metadata=[SourceMetadata('a', 'sa', {'x': 'one'})]))
+    assert nd.name == 'n'
+    assert nd.type is None
+    assert nd.parent is None
+    assert nd.controlled_metadata == MetadataDiff({}, {'a': {'x': 1}})
+    assert nd.user_metadata.is_empty() is True
+    assert nd.source_metadata == MetadataDiff(
+        {}, {'a': SourceMetadata('a', 'sa', {'x': 'one'})})
+    assert nd.is_empty() is False
+
+
+def test_node_diff_empty():
+    n = SampleNode('n', SUB, 'p', {'a': {'x': 1}}, {'u': {'y': 2}},
+                   [SourceMetadata('a', 'sa', {'x': 'one'})])
+    nd = NodeDiff(n, n)
+    assert nd.type is None
+    assert nd.parent is None
+    assert nd.is_empty() is True
+
+    # metadata order doesn't matter
+    nd = NodeDiff(SampleNode('n', BIOREP, controlled_metadata={'a': {'x': 1}, 'b': {'x': 2}}),
+                  SampleNode('n', BIOREP, controlled_metadata={'b': {'x': 2}, 'a': {'x': 1}}))
+    assert nd.is_empty() is True
+
+
+def test_node_diff_fail():
+    with raises(Exception) as got:
+        NodeDiff(SampleNode('n', BIOREP), SampleNode('m', BIOREP))
+    assert_exception_correct(got.value, ValueError('Node names differ: n and m'))
+
+
+def test_node_diff_eq():
+    a = SampleNode('n', BIOREP)
+    b = SampleNode('n', BIOREP, user_metadata={'u': {'y': 2}})
+    assert NodeDiff(a, b) == NodeDiff(a, b)
+    assert NodeDiff(a, b) != NodeDiff(b, a)
+    assert NodeDiff(a, b) != NodeDiff(SampleNode('m', BIOREP), SampleNode('m', BIOREP))
+    assert NodeDiff(a, a) != MetadataDiff({}, {})
+
+
+def test_sample_diff():
+    old = [SampleNode('root', BIOREP),
+           SampleNode('gone', SUB, 'root'),
+           SampleNode('changed', SUB, 'root', {'a': {'x': 1}}),
+           SampleNode('same', SUB, 'root'),
+           SampleNode('gone2', TECHREP, 'root')]
+    new = [SampleNode('root', BIOREP),
+           SampleNode('new', SUB, 'root'),
+           SampleNode('same', SUB, 'root'),
+           SampleNode('changed', SUB, 'root', {'a': {'x': 2}}),
+           SampleNode('new2', TECHREP, 'root')]
+    sd = SampleDiff(old, new)
+    assert sd.added_nodes == [SampleNode('new', SUB, 'root'), SampleNode('new2', TECHREP, 'root')]
+    assert sd.removed_nodes == ['gone', 'gone2']
+    assert sd.changed_nodes == [NodeDiff(old[2], new[3])]
+
+
+def test_sample_diff_empty():
+    sd = SampleDiff([], [])
+    assert sd.added_nodes == []
+    assert sd.removed_nodes == []
+    assert sd.changed_nodes == []
+
+    n = [SampleNode('root', BIOREP, user_metadata={'a': {'x': 1}})]
+    assert SampleDiff(n, n) == SampleDiff([], [])
+
+
+def test_sample_diff_fail():
+    n = SampleNode('root', BIOREP)
+    _sample_diff_fail([n, None], [], ValueError('Index 1 of iterable old_nodes cannot be a value '
+                                                'that evaluates to false'))
+    _sample_diff_fail([], [None], ValueError('Index 0 of iterable new_nodes cannot be a value '
+                                             'that evaluates to false'))
+    _sample_diff_fail(None, [], ValueError('old_nodes cannot be None'))
+    _sample_diff_fail([], None, ValueError('new_nodes cannot be None'))
+
+
+def _sample_diff_fail(old, new, expected):
+    with raises(Exception) as got:
+        SampleDiff(old, new)
+    assert_exception_correct(got.value, expected)
+
+
+def test_sample_diff_eq():
+    a = [SampleNode('root', BIOREP)]
+    b = [SampleNode('root', BIOREP, user_metadata={'a': {'x': 1}})]
+    assert SampleDiff(a, b) == SampleDiff(a, b)
+    assert SampleDiff(a, b) != SampleDiff(b, a)
+    assert SampleDiff(a, []) != SampleDiff([], a)
+    assert SampleDiff(a, []) != []
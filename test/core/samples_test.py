@@ -13,12 +13,18 @@ from SampleService.core.errors import (
     UnauthorizedError,
     NoSuchUserError,
     MetadataValidationError,
-    NoSuchLinkError
+    NoSuchLinkError,
+    NoSuchSampleError,
+    NoSuchSampleVersionError,
+    NoSuchWorkspaceDataError,
+    DataLinkExistsError,
 )
 from SampleService.core.notification import KafkaNotifier
 from SampleService.core.sample import Sample, SampleNode, SavedSample, SampleAddress
 from SampleService.core.sample import SampleNodeAddress
+from SampleService.core.sample_diff import SampleDiff
 from SampleService.core.samples import Samples
+from SampleService.core.search import LocationCondition, MetadataCondition
 from SampleService.core.storage.errors import OwnerChangedError
 from SampleService.core.user import UserID
 from SampleService.core.user_lookup import KBaseUserLookup
@@ -320,6 +326,101 @@ def _save_sample_fail(samples, sample, user, id_, prior_version, expected):
     assert_exception_correct(got.value, expected)
 
 
+def test_create_samples():
+    storage = create_autospec(ArangoSampleStorage, spec_set=True, instance=True)
+    lu = create_autospec(KBaseUserLookup, spec_set=True, instance=True)
+    meta = create_autospec(MetadataValidatorSet, spec_set=True, instance=True)
+    ws = create_autospec(WS, spec_set=True, instance=True)
+    kafka = create_autospec(KafkaNotifier, spec_set=True, instance=True)
+    ids = iter([UUID('1234567890abcdef1234567890abcdef'), UUID('1234567890abcdef1234567890abcdea')])
+    s = Samples(storage, lu, meta, ws, kafka, now=nw, uuid_gen=lambda: next(ids))
+
+    assert s.create_samples(
+        [Sample([SampleNode('foo', controlled_metadata={'key1': {'val': 'foo'}})]),
+         Sample([SampleNode('bar'), SampleNode('baz', controlled_metadata={'k': {'v': 1}})],
+                'myname')
+         ],
+        UserID('auser')) == [(UUID('1234567890abcdef1234567890abcdef'), 1),
+                             (UUID('1234567890abcdef1234567890abcdea'), 1)]
+
+    assert storage.save_samples.call_args_list == [
+        (([SavedSample(UUID('1234567890abcdef1234567890abcdef'),
+                       UserID('auser'),
+                       [SampleNode('foo', controlled_metadata={'key1': {'val': 'foo'}})],
+                       dt(6)),
+           SavedSample(UUID('1234567890abcdef1234567890abcdea'),
+                       UserID('auser'),
+                       [SampleNode('bar'),
+                        SampleNode('baz', controlled_metadata={'k': {'v': 1}})],
+                       dt(6),
+                       'myname')
+           ],), {})]
+
+    assert meta.validate_metadata.call_args_list == [
+        (({'key1': {'val': 'foo'}},), {}),
+        (({},), {}),
+        (({'k': {'v': 1}},), {})
+    ]
+
+    assert kafka.notify_new_sample_version.call_args_list == [
+        ((UUID('1234567890abcdef1234567890abcdef'), 1), {}),
+        ((UUID('1234567890abcdef1234567890abcdea'), 1), {})
+    ]
+
+
+def test_create_samples_fail_bad_args():
+    storage = create_autospec(ArangoSampleStorage, spec_set=True, instance=True)
+    lu = create_autospec(KBaseUserLookup, spec_set=True, instance=True)
+    meta = create_autospec(MetadataValidatorSet, spec_set=True, instance=True)
+    ws = create_autospec(WS, spec_set=True, instance=True)
+    samples = Samples(
+        storage, lu, meta, ws, now=nw, uuid_gen=lambda: UUID('1234567890abcdef1234567890abcdef'))
+
+    s = Sample([SampleNode('foo')])
+    u = UserID('u')
+
+    _create_samples_fail(samples, None, u, IllegalParameterError(
+        'At least one sample must be supplied'))
+    _create_samples_fail(samples, [], u, IllegalParameterError(
+        'At least one sample must be supplied'))
+    _create_samples_fail(samples, [s] * 1001, u, IllegalParameterError(
+        'No more than 1000 samples may be created at once'))
+    _create_samples_fail(samples, [s], None, ValueError(
+        'user cannot be a value that evaluates to false'))
+    _create_samples_fail(samples, [s, None], u, ValueError(
+        'sample at index 1 cannot be a value that evaluates to false'))
+
+    assert storage.save_samples.call_args_list == []
+
+
+def test_create_samples_fail_metadata_validator_exception():
+    storage = create_autospec(ArangoSampleStorage, spec_set=True, instance=True)
+    lu = create_autospec(KBaseUserLookup, spec_set=True, instance=True)
+    meta = create_autospec(MetadataValidatorSet, spec_set=True, instance=True)
+    ws = create_autospec(WS, spec_set=True, instance=True)
+
+    meta.validate_metadata.side_effect = [None, None, MetadataValidationError('key2: u suk lol')]
+    s = Samples(storage, lu, meta, ws, now=nw,
+                uuid_gen=lambda: UUID('1234567890abcdef1234567890abcdef'))
+
+    _create_samples_fail(
+        s,
+        [Sample([SampleNode('foo')]),
+         Sample([SampleNode('foo'),
+                 SampleNode('foo2', controlled_metadata={'key2': {'val': 'bar'}})])
+         ],
+        UserID('auser'),
+        MetadataValidationError('Sample at index 1: Node at index 1: key2: u suk lol'))
+
+    assert storage.save_samples.call_args_list == []
+
+
+def _create_samples_fail(samples, sample_list, user, expected):
+    with raises(Exception) as got:
+        samples.create_samples(sample_list, user)
+    assert_exception_correct(got.value, expected)
+
+
 def test_get_sample():
     # sample versions other than 4 don't really make sense but the mock doesn't care
     _get_sample(UserID('someuser'), None, False)
@@ -339,15 +440,7 @@ def _get_sample(user, version, as_admin, public_read=False):
     samples = Samples(
         storage, lu, meta, ws, uuid_gen=lambda: UUID('1234567890abcdef1234567890abcdef'))
 
-    storage.get_sample_acls.return_value = SampleACL(
-        u('someuser'),
-        dt(1),
-        [u('otheruser')],
-        [u('anotheruser'), u('ur mum')],
-        [u('Fungus J. Pustule Jr.'), u('x')],
-        public_read=public_read)
-
-    storage.get_sample.return_value = SavedSample(
+    sample = SavedSample(
         UUID('1234567890abcdef1234567890abcdea'),
         UserID('anotheruser'),
         [SampleNode('foo')],
@@ -355,6 +448,15 @@ def _get_sample(user, version, as_admin, public_read=False):
         'bar',
         4)
 
+    storage.get_sample.return_value = sample
+    storage.get_sample_and_acls.return_value = (sample, SampleACL(
+        u('someuser'),
+        dt(1),
+        [u('otheruser')],
+        [u('anotheruser'), u('ur mum')],
+        [u('Fungus J. Pustule Jr.'), u('x')],
+        public_read=public_read))
+
     assert samples.get_sample(
         UUID('1234567890abcdef1234567890abcdea'), user, version, as_admin) == SavedSample(
             UUID('1234567890abcdef1234567890abcdea'),
@@ -363,63 +465,531 @@ def _get_sample(user, version, as_admin, public_read=False):
             datetime.datetime.fromtimestamp(42, tz=datetime.timezone.utc),
             'bar',
             4)
+    assert storage.get_sample_acls.call_args_list == []
     if not as_admin:
-        assert storage.get_sample_acls.call_args_list == [
-            ((UUID('1234567890abcdef1234567890abcdea'),), {})]
+        assert storage.get_sample_and_acls.call_args_list == [
+            ((UUID('1234567890abcdef1234567890abcdea'), version), {})]
+        assert storage.get_sample.call_args_list == []
     else:
+        assert storage.get_sample_and_acls.call_args_list == []
+        assert storage.get_sample.call_args_list == [
+            ((UUID('1234567890abcdef1234567890abcdea'), version), {})]
+
+
+def test_get_sample_fail_bad_args():
+    storage = create_autospec(ArangoSampleStorage, spec_set=True, instance=True)
+    lu = create_autospec(KBaseUserLookup, spec_set=True, instance=True)
+    meta = create_autospec(MetadataValidatorSet, spec_set=True, instance=True)
+    ws = create_autospec(WS, spec_set=True, instance=True)
+    samples = Samples(
+        storage, lu, meta, ws, now=nw, uuid_gen=lambda: UUID('1234567890abcdef1234567890abcdef'))
+    id_ = UUID('1234567890abcdef1234567890abcdef')
+
+    _get_sample_fail(samples, None, UserID('foo'), 1, ValueError(
+        'id_ cannot be a value that evaluates to false'))
+    _get_sample_fail(samples, id_, UserID('a'), 0, IllegalParameterError('Version must be > 0'))
+
+
+def test_get_sample_fail_unauthorized():
+    _get_sample_fail_unauthorized(UserID('y'), UnauthorizedError(
+        'User y cannot read sample 12345678-90ab-cdef-1234-567890abcdef'))
+    _get_sample_fail_unauthorized(None, UnauthorizedError(
+        'Anonymous users cannot read sample 12345678-90ab-cdef-1234-567890abcdef'))
+
+
+def _get_sample_fail_unauthorized(user, expected):
+    storage = create_autospec(ArangoSampleStorage, spec_set=True, instance=True)
+    lu = create_autospec(KBaseUserLookup, spec_set=True, instance=True)
+    meta = create_autospec(MetadataValidatorSet, spec_set=True, instance=True)
+    ws = create_autospec(WS, spec_set=True, instance=True)
+    samples = Samples(
+        storage, lu, meta, ws, now=nw, uuid_gen=lambda: UUID('1234567890abcdef1234567890abcdef'))
+
+    storage.get_sample_and_acls.return_value = (
+        SavedSample(
+            UUID('1234567890abcdef1234567890abcdef'),
+            UserID('someuser'),
+            [SampleNode('foo')],
+            dt(42),
+            'bar',
+            3),
+        SampleACL(
+            u('someuser'),
+            dt(1),
+            [u('otheruser')],
+            [u('anotheruser'), u('ur mum')],
+            [u('Fungus J. Pustule Jr.'), u('x')]))
+
+    _get_sample_fail(
+        samples, UUID('1234567890abcdef1234567890abcdef'), user, 3, expected)
+
+    assert storage.get_sample_and_acls.call_args_list == [
+        ((UUID('1234567890abcdef1234567890abcdef'), 3), {})]
+
+
+def test_get_sample_fail_no_version():
+    _get_sample_fail_no_version(UserID('x'), NoSuchSampleVersionError(
+        '12345678-90ab-cdef-1234-567890abcdef ver 3'))
+    _get_sample_fail_no_version(UserID('y'), UnauthorizedError(
+        'User y cannot read sample 12345678-90ab-cdef-1234-567890abcdef'))
+
+
+def _get_sample_fail_no_version(user, expected):
+    storage = create_autospec(ArangoSampleStorage, spec_set=True, instance=True)
+    lu = create_autospec(KBaseUserLookup, spec_set=True, instance=True)
+    meta = create_autospec(MetadataValidatorSet, spec_set=True, instance=True)
+    ws = create_autospec(WS, spec_set=True, instance=True)
+    samples = Samples(
+        storage, lu, meta, ws, now=nw, uuid_gen=lambda: UUID('1234567890abcdef1234567890abcdef'))
+
+    storage.get_sample_and_acls.side_effect = NoSuchSampleVersionError(
+        '12345678-90ab-cdef-1234-567890abcdef ver 3')
+    storage.get_sample_acls.return_value = SampleACL(
+        u('someuser'),
+        dt(1),
+        [u('otheruser')],
+        [u('anotheruser'), u('ur mum')],
+        [u('Fungus J. Pustule Jr.'), u('x')])
+
+    _get_sample_fail(
+        samples, UUID('1234567890abcdef1234567890abcdef'), user, 3, expected)
+
+    assert storage.get_sample_acls.call_args_list == [
+        ((UUID('1234567890abcdef1234567890abcdef'),), {})]
+
+
+def _get_sample_fail(samples, id_, user, version, expected):
+    with raises(Exception) as got:
+        samples.get_sample(id_, user, version)
+    assert_exception_correct(got.value, expected)
+
+
+def test_get_sample_diff():
+    _get_sample_diff(UserID('someuser'), False)
+    _get_sample_diff(UserID('x'), False)
+    _get_sample_diff(UserID('notinacl'), False, True)  # public read
+    _get_sample_diff(None, False, True)  # public read & anon
+    _get_sample_diff(UserID('notinacl'), True)
+
+
+def _get_sample_diff(user, as_admin, public_read=False):
+    storage = create_autospec(ArangoSampleStorage, spec_set=True, instance=True)
+    lu = create_autospec(KBaseUserLookup, spec_set=True, instance=True)
+    meta = create_autospec(MetadataValidatorSet, spec_set=True, instance=True)
+    ws = create_autospec(WS, spec_set=True, instance=True)
+    samples = Samples(storage, lu, meta, ws)
+    id_ = UUID('1234567890abcdef1234567890abcdef')
+
+    storage.get_sample_acls.return_value = SampleACL(
+        u('someuser'),
+        dt(1),
+        [u('otheruser')],
+        [u('anotheruser')],
+        [u('x')],
+        public_read=public_read)
+    old = [SampleNode('root', user_metadata={'a': {'x': 1}}), SampleNode('gone')]
+    new = [SampleNode('root', user_metadata={'a': {'x': 2}}), SampleNode('new')]
+    storage.get_changed_nodes.return_value = (old, new)
+
+    assert samples.get_sample_diff(id_, user, 1, 3, as_admin=as_admin) == SampleDiff(old, new)
+
+    if as_admin:
         assert storage.get_sample_acls.call_args_list == []
+    else:
+        assert storage.get_sample_acls.call_args_list == [((id_,), {})]
+    assert storage.get_changed_nodes.call_args_list == [((id_, 1, 3), {})]
+
+
+def test_get_sample_diff_fail_bad_args():
+    storage = create_autospec(ArangoSampleStorage, spec_set=True, instance=True)
+    lu = create_autospec(KBaseUserLookup, spec_set=True, instance=True)
+    meta = create_autospec(MetadataValidatorSet, spec_set=True, instance=True)
+    ws = create_autospec(WS, spec_set=True, instance=True)
+    samples = Samples(storage, lu, meta, ws)
+    id_ = UUID('1234567890abcdef1234567890abcdef')
+    u_ = UserID('a')
+
+    _get_sample_diff_fail(samples, None, u_, 1, 2, ValueError(
+        'id_ cannot be a value that evaluates to false'))
+    err = IllegalParameterError('Version must be > 0')
+    _get_sample_diff_fail(samples, id_, u_, 0, 2, err)
+    _get_sample_diff_fail(samples, id_, u_, None, 2, err)
+    _get_sample_diff_fail(samples, id_, u_, 1, 0, err)
+    _get_sample_diff_fail(samples, id_, u_, 1, None, err)
+
 
-    assert storage.get_sample.call_args_list == [
-        ((UUID('1234567890abcdef1234567890abcdea'), version), {})]
+def test_get_sample_diff_fail_unauthorized():
+    storage = create_autospec(ArangoSampleStorage, spec_set=True, instance=True)
+    lu = create_autospec(KBaseUserLookup, spec_set=True, instance=True)
+    meta = create_autospec(MetadataValidatorSet, spec_set=True, instance=True)
+    ws = create_autospec(WS, spec_set=True, instance=True)
+    samples = Samples(storage, lu, meta, ws)
+    id_ = UUID('1234567890abcdef1234567890abcdef')
+
+    storage.get_sample_acls.return_value = SampleACL(u('someuser'), dt(1), read=[u('x')])
+
+    _get_sample_diff_fail(samples, id_, UserID('y'), 1, 2, UnauthorizedError(
+        'User y cannot read sample 12345678-90ab-cdef-1234-567890abcdef'))
+    _get_sample_diff_fail(samples, id_, None, 1, 2, UnauthorizedError(
+        'Anonymous users cannot read sample 12345678-90ab-cdef-1234-567890abcdef'))
+    assert storage.get_changed_nodes.call_args_list == []
+
+
+def test_get_sample_diff_fail_no_version():
+    storage = create_autospec(ArangoSampleStorage, spec_set=True, instance=True)
+    lu = create_autospec(KBaseUserLookup, spec_set=True, instance=True)
+    meta = create_autospec(MetadataValidatorSet, spec_set=True, instance=True)
+    ws = create_autospec(WS, spec_set=True, instance=True)
+    samples = Samples(storage, lu, meta, ws)
+    id_ = UUID('1234567890abcdef1234567890abcdef')
+
+    storage.get_sample_acls.return_value = SampleACL(u('someuser'), dt(1), read=[u('x')])
+    storage.get_changed_nodes.side_effect = NoSuchSampleVersionError(
+        '12345678-90ab-cdef-1234-567890abcdef ver 3')
+
+    _get_sample_diff_fail(samples, id_, UserID('x'), 1, 3, NoSuchSampleVersionError(
+        '12345678-90ab-cdef-1234-567890abcdef ver 3'))
+
+
+def _get_sample_diff_fail(samples, id_, user, vera, verb, expected):
+    with raises(Exception) as got:
+        samples.get_sample_diff(id_, user, vera, verb)
+    assert_exception_correct(got.value, expected)
+
+
+def test_get_samples():
+    _get_samples(UserID('someuser'), False)
+    _get_samples(UserID('x'), False)
+    _get_samples(None, True)
+
+
+def _get_samples(user, as_admin):
+    storage = create_autospec(ArangoSampleStorage, spec_set=True, instance=True)
+    lu = create_autospec(KBaseUserLookup, spec_set=True, instance=True)
+    meta = create_autospec(MetadataValidatorSet, spec_set=True, instance=True)
+    ws = create_autospec(WS, spec_set=True, instance=True)
+    samples = Samples(
+        storage, lu, meta, ws, uuid_gen=lambda: UUID('1234567890abcdef1234567890abcdef'))
+
+    acls = SampleACL(u('someuser'), dt(1), read=[u('x')])
+    s1 = SavedSample(UUID('1234567890abcdef1234567890abcdea'), u('someuser'),
+                     [SampleNode('foo')], dt(42), 'bar', 4)
+    s2 = SavedSample(UUID('1234567890abcdef1234567890abcdeb'), u('someuser'),
+                     [SampleNode('baz')], dt(43), 'bat', 1)
+
+    storage.get_samples_and_acls.return_value = [(acls, s1), (acls, s2)]
+
+    addresses = [(UUID('1234567890abcdef1234567890abcdea'), None),
+                 (UUID('1234567890abcdef1234567890abcdeb'), 1)]
+
+    assert samples.get_samples(addresses, user, as_admin) == [s1, s2]
+
+    assert storage.get_samples_and_acls.call_args_list == [((addresses,), {})]
+
+
+def test_get_samples_with_errors():
+    storage = create_autospec(ArangoSampleStorage, spec_set=True, instance=True)
+    lu = create_autospec(KBaseUserLookup, spec_set=True, instance=True)
+    meta = create_autospec(MetadataValidatorSet, spec_set=True, instance=True)
+    ws = create_autospec(WS, spec_set=True, instance=True)
+    samples = Samples(
+        storage, lu, meta, ws, uuid_gen=lambda: UUID('1234567890abcdef1234567890abcdef'))
+
+    readable = SampleACL(u('someuser'), dt(1), read=[u('x')])
+    unreadable = SampleACL(u('someuser'), dt(1))
+    s1 = SavedSample(UUID('1234567890abcdef1234567890abcdea'), u('someuser'),
+                     [SampleNode('foo')], dt(42), 'bar', 4)
+
+    storage.get_samples_and_acls.return_value = [
+        (readable, s1),
+        (None, NoSuchSampleError('12345678-90ab-cdef-1234-567890abcdeb')),
+        (readable, NoSuchSampleVersionError('12345678-90ab-cdef-1234-567890abcdec ver 3')),
+        (unreadable, NoSuchSampleVersionError('12345678-90ab-cdef-1234-567890abcded ver 3')),
+        (unreadable, s1),
+    ]
+
+    addresses = [(UUID('1234567890abcdef1234567890abcdea'), None),
+                 (UUID('1234567890abcdef1234567890abcdeb'), None),
+                 (UUID('1234567890abcdef1234567890abcdec'), 3),
+                 (UUID('1234567890abcdef1234567890abcded'), 3),
+                 (UUID('1234567890abcdef1234567890abcdea'), 4)]
+
+    res = samples.get_samples(addresses, UserID('x'))
+
+    assert res[0] == s1
+    assert_exception_correct(res[1], NoSuchSampleError('12345678-90ab-cdef-1234-567890abcdeb'))
+    assert_exception_correct(res[2], NoSuchSampleVersionError(
+        '12345678-90ab-cdef-1234-567890abcdec ver 3'))
+    assert_exception_correct(res[3], UnauthorizedError(
+        'User x cannot read sample 12345678-90ab-cdef-1234-567890abcded'))
+    assert_exception_correct(res[4], UnauthorizedError(
+        'User x cannot read sample 12345678-90ab-cdef-1234-567890abcdea'))
+    assert len(res) == 5
+
+
+def test_get_samples_fail_bad_args():
+    storage = create_autospec(ArangoSampleStorage, spec_set=True, instance=True)
+    lu = create_autospec(KBaseUserLookup, spec_set=True, instance=True)
+    meta = create_autospec(MetadataValidatorSet, spec_set=True, instance=True)
+    ws = create_autospec(WS, spec_set=True, instance=True)
+    samples = Samples(
+        storage, lu, meta, ws, uuid_gen=lambda: UUID('1234567890abcdef1234567890abcdef'))
+    id_ = UUID('1234567890abcdef1234567890abcdef')
+
+    _get_samples_fail(samples, None, IllegalParameterError(
+        'At least one sample address must be supplied'))
+    _get_samples_fail(samples, [], IllegalParameterError(
+        'At least one sample address must be supplied'))
+    _get_samples_fail(samples, [(id_, 1)] * 1001, IllegalParameterError(
+        'No more than 1000 samples may be requested at once'))
+    _get_samples_fail(samples, [(id_, 1), (None, 1)], ValueError(
+        'id_ at index 1 cannot be a value that evaluates to false'))
+    _get_samples_fail(samples, [(id_, None), (id_, 0)], IllegalParameterError(
+        'Version at index 1 must be > 0'))
+
+
+def _get_samples_fail(samples, addresses, expected):
+    with raises(Exception) as got:
+        samples.get_samples(addresses, UserID('x'))
+    assert_exception_correct(got.value, expected)
+
+
+def test_search_samples():
+    storage = create_autospec(ArangoSampleStorage, spec_set=True, instance=True)
+    lu = create_autospec(KBaseUserLookup, spec_set=True, instance=True)
+    meta = create_autospec(MetadataValidatorSet, spec_set=True, instance=True)
+    ws = create_autospec(WS, spec_set=True, instance=True)
+    samples = Samples(
+        storage, lu, meta, ws, uuid_gen=lambda: UUID('1234567890abcdef1234567890abcdef'))
+
+    c1 = MetadataCondition('depth', 'value', minimum=3)
+    c2 = MetadataCondition('material', 'value', prefix='soil')
+    res = [SampleAddress(UUID('1234567890abcdef1234567890abcdea'), 2)]
+    storage.search_samples.return_value = res
+
+    assert samples.search_samples([c1, c2], UserID('x')) == res
+    assert samples.search_samples(
+        [c1], None, as_admin=True, limit=10000, after=SampleAddress(
+            UUID('1234567890abcdef1234567890abcdeb'), 1)) == res
+
+    assert storage.search_samples.call_args_list == [
+        (([c1, c2], UserID('x')), {'check_acls': True, 'limit': 1000, 'after': None}),
+        (([c1], None), {'check_acls': False, 'limit': 10000, 'after': SampleAddress(
+            UUID('1234567890abcdef1234567890abcdeb'), 1)}),
+    ]
+
+
+def test_search_samples_fail_bad_args():
+    storage = create_autospec(ArangoSampleStorage, spec_set=True, instance=True)
+    lu = create_autospec(KBaseUserLookup, spec_set=True, instance=True)
+    meta = create_autospec(MetadataValidatorSet, spec_set=True, instance=True)
+    ws = create_autospec(WS, spec_set=True, instance=True)
+    samples = Samples(
+        storage, lu, meta, ws, uuid_gen=lambda: UUID('1234567890abcdef1234567890abcdef'))
+    c = MetadataCondition('depth', 'value', minimum=3)
+
+    _search_samples_fail(samples, None, 1, IllegalParameterError(
+        'At least one search condition must be supplied'))
+    _search_samples_fail(samples, [], 1, IllegalParameterError(
+        'At least one search condition must be supplied'))
+    _search_samples_fail(samples, [c] * 11, 1, IllegalParameterError(
+        'No more than 10 search conditions may be supplied'))
+    _search_samples_fail(samples, [c, None], 1, ValueError(
+        'condition at index 1 cannot be a value that evaluates to false'))
+    for limit in [0, 10001]:
+        _search_samples_fail(samples, [c], limit, IllegalParameterError(
+            'limit must be between 1 and 10000'))
+
+
+def _search_samples_fail(samples, conditions, limit, expected):
+    with raises(Exception) as got:
+        samples.search_samples(conditions, UserID('x'), limit=limit)
+    assert_exception_correct(got.value, expected)
+
+
+def test_search_samples_by_text():
+    storage = create_autospec(ArangoSampleStorage, spec_set=True, instance=True)
+    lu = create_autospec(KBaseUserLookup, spec_set=True, instance=True)
+    meta = create_autospec(MetadataValidatorSet, spec_set=True, instance=True)
+    ws = create_autospec(WS, spec_set=True, instance=True)
+    samples = Samples(
+        storage, lu, meta, ws, uuid_gen=lambda: UUID('1234567890abcdef1234567890abcdef'))
+
+    res = [(SampleAddress(UUID('1234567890abcdef1234567890abcdea'), 2), 3)]
+    storage.search_samples_by_text.return_value = res
+    after = (2, SampleAddress(UUID('1234567890abcdef1234567890abcdeb'), 1))
+
+    assert samples.search_samples_by_text('Soil yellowstone, SOIL 2019', UserID('x')) == res
+    assert samples.search_samples_by_text(
+        ' '.join(str(i) for i in range(20)), None, as_admin=True, limit=10000, after=after
+        ) == res
+
+    assert storage.search_samples_by_text.call_args_list == [
+        ((['2019', 'soil', 'yellowstone'], UserID('x')),
+         {'check_acls': True, 'limit': 1000, 'after': None}),
+        ((sorted(str(i) for i in range(20)), None),
+         {'check_acls': False, 'limit': 10000, 'after': after}),
+    ]
+
+
+def test_search_samples_by_text_fail_bad_args():
+    storage = create_autospec(ArangoSampleStorage, spec_set=True, instance=True)
+    lu = create_autospec(KBaseUserLookup, spec_set=True, instance=True)
+    meta = create_autospec(MetadataValidatorSet, spec_set=True, instance=True)
+    ws = create_autospec(WS, spec_set=True, instance=True)
+    samples = Samples(
+        storage, lu, meta, ws, uuid_gen=lambda: UUID('1234567890abcdef1234567890abcdef'))
+
+    for t in [None, '', ' - ! ']:
+        _search_samples_by_text_fail(samples, t, 1, IllegalParameterError(
+            'The search text must contain at least one word'))
+    _search_samples_by_text_fail(samples, ' '.join(str(i) for i in range(21)), 1,
+                                 IllegalParameterError(
+        'The search text may contain no more than 20 distinct words'))
+    for limit in [0, 10001]:
+        _search_samples_by_text_fail(samples, 'soil', limit, IllegalParameterError(
+            'limit must be between 1 and 10000'))
+
+
+def _search_samples_by_text_fail(samples, text, limit, expected):
+    with raises(Exception) as got:
+        samples.search_samples_by_text(text, UserID('x'), limit=limit)
+    assert_exception_correct(got.value, expected)
+
+
+def test_search_samples_by_location():
+    storage = create_autospec(ArangoSampleStorage, spec_set=True, instance=True)
+    lu = create_autospec(KBaseUserLookup, spec_set=True, instance=True)
+    meta = create_autospec(MetadataValidatorSet, spec_set=True, instance=True)
+    ws = create_autospec(WS, spec_set=True, instance=True)
+    samples = Samples(
+        storage, lu, meta, ws, uuid_gen=lambda: UUID('1234567890abcdef1234567890abcdef'))
+
+    c1 = LocationCondition(bounding_box=(40, -112, 45, -109))
+    c2 = LocationCondition(center=(44.4, -110.8), radius=5000)
+    res = [SampleAddress(UUID('1234567890abcdef1234567890abcdea'), 2)]
+    storage.search_samples_by_location.return_value = res
+    after = SampleAddress(UUID('1234567890abcdef1234567890abcdeb'), 1)
+
+    assert samples.search_samples_by_location(c1, UserID('x')) == res
+    assert samples.search_samples_by_location(
+        c2, None, as_admin=True, limit=10000, after=after) == res
+
+    assert storage.search_samples_by_location.call_args_list == [
+        ((c1, UserID('x')), {'check_acls': True, 'limit': 1000, 'after': None}),
+        ((c2, None), {'check_acls': False, 'limit': 10000, 'after': after}),
+    ]
+
+
+def test_search_samples_by_location_fail_bad_args():
+    storage = create_autospec(ArangoSampleStorage, spec_set=True, instance=True)
+    lu = create_autospec(KBaseUserLookup, spec_set=True, instance=True)
+    meta = create_autospec(MetadataValidatorSet, spec_set=True, instance=True)
+    ws = create_autospec(WS, spec_set=True, instance=True)
+    samples = Samples(
+        storage, lu, meta, ws, uuid_gen=lambda: UUID('1234567890abcdef1234567890abcdef'))
+    c = LocationCondition(center=(44.4, -110.8), radius=5000)
+
+    _search_samples_by_location_fail(samples, None, 1, ValueError(
+        'condition cannot be a value that evaluates to false'))
+    for limit in [0, 10001]:
+        _search_samples_by_location_fail(samples, c, limit, IllegalParameterError(
+            'limit must be between 1 and 10000'))
+
+
+def _search_samples_by_location_fail(samples, condition, limit, expected):
+    with raises(Exception) as got:
+        samples.search_samples_by_location(condition, UserID('x'), limit=limit)
+    assert_exception_correct(got.value, expected)
+
+
+def test_get_metadata_facets():
+    storage = create_autospec(ArangoSampleStorage, spec_set=True, instance=True)
+    lu = create_autospec(KBaseUserLookup, spec_set=True, instance=True)
+    meta = create_autospec(MetadataValidatorSet, spec_set=True, instance=True)
+    ws = create_autospec(WS, spec_set=True, instance=True)
+    samples = Samples(
+        storage, lu, meta, ws, uuid_gen=lambda: UUID('1234567890abcdef1234567890abcdef'))
+
+    storage.count_metadata_values.side_effect = [
+        [('soil', 12), ('marine', 8)], [(True, 3)], [(6, 1)]]
+    c = MetadataCondition('depth', 'value', minimum=3)
+
+    assert samples.get_metadata_facets(['biome', 'wet'], UserID('x')) == {
+        'biome': [('soil', 12), ('marine', 8)], 'wet': [(True, 3)]}
+    assert samples.get_metadata_facets(
+        ['depth'], None, [c] * 10, as_admin=True, limit=1000) == {'depth': [(6, 1)]}
+
+    assert storage.count_metadata_values.call_args_list == [
+        (('biome', 'value', UserID('x'), []), {'check_acls': True, 'limit': 100}),
+        (('wet', 'value', UserID('x'), []), {'check_acls': True, 'limit': 100}),
+        (('depth', 'value', None, [c] * 10), {'check_acls': False, 'limit': 1000}),
+    ]
+
+
+def test_get_metadata_facets_fail_bad_args():
+    storage = create_autospec(ArangoSampleStorage, spec_set=True, instance=True)
+    lu = create_autospec(KBaseUserLookup, spec_set=True, instance=True)
+    meta = create_autospec(MetadataValidatorSet, spec_set=True, instance=True)
+    ws = create_autospec(WS, spec_set=True, instance=True)
+    samples = Samples(
+        storage, lu, meta, ws, uuid_gen=lambda: UUID('1234567890abcdef1234567890abcdef'))
+    c = MetadataCondition('depth', 'value', minimum=3)
+
+    for keys in [None, []]:
+        _get_metadata_facets_fail(samples, keys, None, 1, IllegalParameterError(
+            'At least one metadata key must be supplied'))
+    _get_metadata_facets_fail(samples, ['k'] * 11, None, 1, IllegalParameterError(
+        'No more than 10 metadata keys may be supplied'))
+    _get_metadata_facets_fail(samples, ['k'], [c] * 11, 1, IllegalParameterError(
+        'No more than 10 search conditions may be supplied'))
+    _get_metadata_facets_fail(samples, ['k'], [c, None], 1, ValueError(
+        'condition at index 1 cannot be a value that evaluates to false'))
+    for limit in [0, 1001]:
+        _get_metadata_facets_fail(samples, ['k'], None, limit, IllegalParameterError(
+            'limit must be between 1 and 1000'))
+
+
+def _get_metadata_facets_fail(samples, keys, conditions, limit, expected):
+    with raises(Exception) as got:
+        samples.get_metadata_facets(keys, UserID('x'), conditions, limit=limit)
+    assert_exception_correct(got.value, expected)
 
 
-def test_get_sample_fail_bad_args():
+def test_list_samples():
     storage = create_autospec(ArangoSampleStorage, spec_set=True, instance=True)
     lu = create_autospec(KBaseUserLookup, spec_set=True, instance=True)
     meta = create_autospec(MetadataValidatorSet, spec_set=True, instance=True)
     ws = create_autospec(WS, spec_set=True, instance=True)
     samples = Samples(
-        storage, lu, meta, ws, now=nw, uuid_gen=lambda: UUID('1234567890abcdef1234567890abcdef'))
-    id_ = UUID('1234567890abcdef1234567890abcdef')
+        storage, lu, meta, ws, uuid_gen=lambda: UUID('1234567890abcdef1234567890abcdef'))
 
-    _get_sample_fail(samples, None, UserID('foo'), 1, ValueError(
-        'id_ cannot be a value that evaluates to false'))
-    _get_sample_fail(samples, id_, UserID('a'), 0, IllegalParameterError('Version must be > 0'))
+    res = [(SampleAddress(UUID('1234567890abcdef1234567890abcdea'), 2), dt(5))]
+    storage.list_samples.return_value = res
+    after = (dt(6), UUID('1234567890abcdef1234567890abcdeb'))
 
+    assert samples.list_samples(UserID('x')) == res
+    assert samples.list_samples(None, limit=10000, after=after) == res
 
-def test_get_sample_fail_unauthorized():
-    _get_sample_fail_unauthorized(UserID('y'), UnauthorizedError(
-        'User y cannot read sample 12345678-90ab-cdef-1234-567890abcdef'))
-    _get_sample_fail_unauthorized(None, UnauthorizedError(
-        'Anonymous users cannot read sample 12345678-90ab-cdef-1234-567890abcdef'))
+    assert storage.list_samples.call_args_list == [
+        ((UserID('x'),), {'limit': 1000, 'after': None}),
+        ((None,), {'limit': 10000, 'after': after}),
+    ]
 
 
-def _get_sample_fail_unauthorized(user, expected):
+def test_list_samples_fail_bad_args():
     storage = create_autospec(ArangoSampleStorage, spec_set=True, instance=True)
     lu = create_autospec(KBaseUserLookup, spec_set=True, instance=True)
     meta = create_autospec(MetadataValidatorSet, spec_set=True, instance=True)
     ws = create_autospec(WS, spec_set=True, instance=True)
     samples = Samples(
-        storage, lu, meta, ws, now=nw, uuid_gen=lambda: UUID('1234567890abcdef1234567890abcdef'))
-
-    storage.get_sample_acls.return_value = SampleACL(
-        u('someuser'),
-        dt(1),
-        [u('otheruser')],
-        [u('anotheruser'), u('ur mum')],
-        [u('Fungus J. Pustule Jr.'), u('x')])
-
-    _get_sample_fail(
-        samples, UUID('1234567890abcdef1234567890abcdef'), user, 3, expected)
-
-    assert storage.get_sample_acls.call_args_list == [
-        ((UUID('1234567890abcdef1234567890abcdef'),), {})]
-
+        storage, lu, meta, ws, uuid_gen=lambda: UUID('1234567890abcdef1234567890abcdef'))
 
-def _get_sample_fail(samples, id_, user, version, expected):
-    with raises(Exception) as got:
-        samples.get_sample(id_, user, version)
-    assert_exception_correct(got.value, expected)
+    for limit in [0, 10001]:
+        with raises(Exception) as got:
+            samples.list_samples(UserID('x'), limit=limit)
+        assert_exception_correct(got.value, IllegalParameterError(
+            'limit must be between 1 and 10000'))
 
 
 def test_get_sample_acls():
@@ -1367,6 +1937,141 @@ def _create_data_link_fail(samples, user, duid, sna, expected):
     assert_exception_correct(got.value, expected)
 
 
+def test_create_data_links():
+    storage = create_autospec(ArangoSampleStorage, spec_set=True, instance=True)
+    lu = create_autospec(KBaseUserLookup, spec_set=True, instance=True)
+    meta = create_autospec(MetadataValidatorSet, spec_set=True, instance=True)
+    ws = create_autospec(WS, spec_set=True, instance=True)
+    kafka = create_autospec(KafkaNotifier, spec_set=True, instance=True)
+    ids = iter([UUID('1234567890abcdef1234567890abcde1'), UUID('1234567890abcdef1234567890abcde2'),
+                UUID('1234567890abcdef1234567890abcde3'), UUID('1234567890abcdef1234567890abcde4')])
+    s = Samples(storage, lu, meta, ws, kafka, now=nw, uuid_gen=lambda: next(ids))
+
+    sid1 = UUID('1234567890abcdef1234567890abcdee')
+    sid2 = UUID('1234567890abcdef1234567890abcdea')
+    storage.get_sample_acls.side_effect = [
+        SampleACL(u('someuser'), dt(1)), SampleACL(u('otheruser'), dt(1))]
+    ws.has_permissions.return_value = [None, None, UnauthorizedError('nope. uh uh')]
+    storage.create_data_links.return_value = [
+        (True, None),
+        (True, UUID('1234567890abcdef1234567890abcdeb')),
+        (False, None),
+        DataLinkExistsError('1/1/1:z')
+    ]
+
+    def sna(sid, node):
+        return SampleNodeAddress(SampleAddress(sid, 3), node)
+
+    def dl(id_, duid, sna):
+        return DataLink(UUID(id_), duid, sna, dt(6), UserID('someuser'))
+
+    res = s.create_data_links(
+        UserID('someuser'),
+        [(DataUnitID(UPA('1/1/1')), sna(sid1, 'a')),
+         (DataUnitID(UPA('1/1/1'), 'x'), sna(sid1, 'b')),
+         (DataUnitID(UPA('1/1/2')), sna(sid2, 'a')),
+         (DataUnitID(UPA('2/2/2')), sna(sid1, 'a')),
+         (DataUnitID(UPA('1/1/1'), 'y'), sna(sid1, 'c')),
+         (DataUnitID(UPA('1/1/1'), 'z'), sna(sid1, 'd')),
+         ],
+        update=True)
+
+    assert res[0] == dl(
+        '1234567890abcdef1234567890abcde1', DataUnitID(UPA('1/1/1')), sna(sid1, 'a'))
+    assert res[1] == dl(
+        '1234567890abcdef1234567890abcde2', DataUnitID(UPA('1/1/1'), 'x'), sna(sid1, 'b'))
+    assert_exception_correct(res[2], UnauthorizedError(
+        'User someuser cannot administrate sample 12345678-90ab-cdef-1234-567890abcdea'))
+    assert_exception_correct(res[3], UnauthorizedError('nope. uh uh'))
+    assert res[4] is None
+    assert_exception_correct(res[5], DataLinkExistsError('1/1/1:z'))
+    assert len(res) == 6
+
+    assert storage.get_sample_acls.call_args_list == [((sid1,), {}), ((sid2,), {})]
+
+    ws.has_permissions.assert_called_once_with(
+        UserID('someuser'), WorkspaceAccessType.WRITE,
+        upas=[UPA('1/1/1'), UPA('1/1/2'), UPA('2/2/2')])
+
+    storage.create_data_links.assert_called_once_with([
+        dl('1234567890abcdef1234567890abcde1', DataUnitID(UPA('1/1/1')), sna(sid1, 'a')),
+        dl('1234567890abcdef1234567890abcde2', DataUnitID(UPA('1/1/1'), 'x'), sna(sid1, 'b')),
+        dl('1234567890abcdef1234567890abcde3', DataUnitID(UPA('1/1/1'), 'y'), sna(sid1, 'c')),
+        dl('1234567890abcdef1234567890abcde4', DataUnitID(UPA('1/1/1'), 'z'), sna(sid1, 'd')),
+        ],
+        update=True)
+
+    assert kafka.notify_new_link.call_args_list == [
+        ((UUID('1234567890abcdef1234567890abcde1'),), {}),
+        ((UUID('1234567890abcdef1234567890abcde2'),), {}),
+    ]
+    kafka.notify_expired_link.assert_called_once_with(UUID('1234567890abcdef1234567890abcdeb'))
+
+
+def test_create_data_links_as_admin_all_errors():
+    storage = create_autospec(ArangoSampleStorage, spec_set=True, instance=True)
+    lu = create_autospec(KBaseUserLookup, spec_set=True, instance=True)
+    meta = create_autospec(MetadataValidatorSet, spec_set=True, instance=True)
+    ws = create_autospec(WS, spec_set=True, instance=True)
+    s = Samples(storage, lu, meta, ws, now=nw,
+                uuid_gen=lambda: UUID('1234567890abcdef1234567890abcdef'))
+
+    ws.has_permissions.return_value = [NoSuchWorkspaceDataError('No workspace 1')]
+
+    sna = SampleNodeAddress(SampleAddress(UUID('1234567890abcdef1234567890abcdee'), 3), 'node')
+    res = s.create_data_links(
+        UserID('someuser'),
+        [(DataUnitID(UPA('1/1/1')), sna), (DataUnitID(UPA('1/1/1'), 'a'), sna)],
+        as_admin=True)
+
+    assert_exception_correct(res[0], NoSuchWorkspaceDataError('No workspace 1'))
+    assert_exception_correct(res[1], NoSuchWorkspaceDataError('No workspace 1'))
+    assert len(res) == 2
+
+    assert storage.get_sample_acls.call_args_list == []
+    ws.has_permissions.assert_called_once_with(
+        UserID('someuser'), WorkspaceAccessType.NONE, upas=[UPA('1/1/1')])
+    assert storage.create_data_links.call_args_list == []
+
+
+def test_create_data_links_fail_bad_args():
+    storage = create_autospec(ArangoSampleStorage, spec_set=True, instance=True)
+    lu = create_autospec(KBaseUserLookup, spec_set=True, instance=True)
+    meta = create_autospec(MetadataValidatorSet, spec_set=True, instance=True)
+    ws = create_autospec(WS, spec_set=True, instance=True)
+    s = Samples(storage, lu, meta, ws, now=nw,
+                uuid_gen=lambda: UUID('1234567890abcdef1234567890abcdef'))
+
+    u = UserID('u')
+    d = DataUnitID(UPA('1/1/1'))
+    sna = SampleNodeAddress(SampleAddress(UUID('1234567890abcdef1234567890abcdee'), 3), 'node')
+
+    _create_data_links_fail(s, None, [(d, sna)], ValueError(
+        'user cannot be a value that evaluates to false'))
+    _create_data_links_fail(s, u, None, IllegalParameterError(
+        'At least one link must be supplied'))
+    _create_data_links_fail(s, u, [], IllegalParameterError(
+        'At least one link must be supplied'))
+    _create_data_links_fail(
+        s, u, [(DataUnitID(UPA(f'1/1/{i}')), sna) for i in range(1, 10002)],
+        IllegalParameterError('No more than 10000 links may be created at once'))
+    _create_data_links_fail(s, u, [(d, sna), (None, sna)], ValueError(
+        'duid at index 1 cannot be a value that evaluates to false'))
+    _create_data_links_fail(s, u, [(d, sna), (DataUnitID(UPA('1/1/2')), None)], ValueError(
+        'sna at index 1 cannot be a value that evaluates to false'))
+    _create_data_links_fail(
+        s, u, [(d, sna), (DataUnitID(UPA('1/1/1'), 'a'), sna), (d, sna)],
+        IllegalParameterError('Duplicate data unit ID at index 2: 1/1/1'))
+
+    assert storage.create_data_links.call_args_list == []
+
+
+def _create_data_links_fail(samples, user, links, expected):
+    with raises(Exception) as got:
+        samples.create_data_links(user, links)
+    assert_exception_correct(got.value, expected)
+
+
 def test_get_links_from_sample():
     _get_links_from_sample(UserID('someuser'))
     _get_links_from_sample(UserID('otheruser'))
@@ -1421,7 +2126,9 @@ def _get_links_from_sample(user, public_read=False):
     storage.get_links_from_sample.assert_called_once_with(
         SampleAddress(UUID('1234567890abcdef1234567890abcdee'), 3),
         [7, 90, 106],
-        dt(6)
+        dt(6),
+        None,
+        None
     )
 
 
@@ -1458,7 +2165,9 @@ def test_get_links_from_sample_as_admin():
     storage.get_links_from_sample.assert_called_once_with(
         SampleAddress(UUID('1234567890abcdef1234567890abcdee'), 3),
         None,
-        dt(6)
+        dt(6),
+        None,
+        None
     )
 
 
@@ -1495,7 +2204,46 @@ def test_get_links_from_sample_with_timestamp():
     storage.get_links_from_sample.assert_called_once_with(
         SampleAddress(UUID('1234567890abcdef1234567890abcdee'), 3),
         [3],
-        dt(40)
+        dt(40),
+        None,
+        None
+    )
+
+
+def test_get_links_from_sample_with_paging():
+    storage = create_autospec(ArangoSampleStorage, spec_set=True, instance=True)
+    lu = create_autospec(KBaseUserLookup, spec_set=True, instance=True)
+    meta = create_autospec(MetadataValidatorSet, spec_set=True, instance=True)
+    ws = create_autospec(WS, spec_set=True, instance=True)
+    s = Samples(storage, lu, meta, ws, now=nw)
+
+    storage.get_sample_acls.return_value = SampleACL(u('someuser'), dt(1))
+
+    ws.get_user_workspaces.return_value = [3]
+
+    dl1 = DataLink(
+        UUID('1234567890abcdef1234567890abcdee'),
+        DataUnitID(UPA('3/1/1'), 'foo'),
+        SampleNodeAddress(SampleAddress(UUID('1234567890abcdef1234567890abcdee'), 3), 'mynode'),
+        dt(5),
+        UserID('userb')
+    )
+
+    storage.get_links_from_sample.return_value = [dl1]
+
+    assert s.get_links_from_sample(
+        UserID('someuser'),
+        SampleAddress(UUID('1234567890abcdef1234567890abcdee'), 3),
+        dt(40),
+        limit=1,
+        after=(dt(4), UUID('1234567890abcdef1234567890abcdef'))) == ([dl1], dt(40))
+
+    storage.get_links_from_sample.assert_called_once_with(
+        SampleAddress(UUID('1234567890abcdef1234567890abcdee'), 3),
+        [3],
+        dt(40),
+        1,
+        (dt(4), UUID('1234567890abcdef1234567890abcdef'))
     )
 
 
@@ -1583,7 +2331,7 @@ def test_get_links_from_data():
     ws.has_permission.assert_called_once_with(
         UserID('u1'), WorkspaceAccessType.READ, upa=UPA('2/4/6'))
 
-    storage.get_links_from_data.assert_called_once_with(UPA('2/4/6'), dt(6))
+    storage.get_links_from_data.assert_called_once_with(UPA('2/4/6'), dt(6), None, None)
 
 
 def test_get_links_from_data_with_timestamp_and_anon_user():
@@ -1608,7 +2356,7 @@ def test_get_links_from_data_with_timestamp_and_anon_user():
     ws.has_permission.assert_called_once_with(
         None, WorkspaceAccessType.READ, upa=UPA('2/4/6'))
 
-    storage.get_links_from_data.assert_called_once_with(UPA('2/4/6'), dt(700))
+    storage.get_links_from_data.assert_called_once_with(UPA('2/4/6'), dt(700), None, None)
 
 
 def test_get_links_from_data_as_admin():
@@ -1641,7 +2389,37 @@ def test_get_links_from_data_as_admin():
     ws.has_permission.assert_called_once_with(
         UserID('u1'), WorkspaceAccessType.NONE, upa=UPA('2/4/6'))
 
-    storage.get_links_from_data.assert_called_once_with(UPA('2/4/6'), dt(6))
+    storage.get_links_from_data.assert_called_once_with(UPA('2/4/6'), dt(6), None, None)
+
+
+def test_get_links_from_data_with_paging():
+    storage = create_autospec(ArangoSampleStorage, spec_set=True, instance=True)
+    lu = create_autospec(KBaseUserLookup, spec_set=True, instance=True)
+    meta = create_autospec(MetadataValidatorSet, spec_set=True, instance=True)
+    ws = create_autospec(WS, spec_set=True, instance=True)
+    s = Samples(storage, lu, meta, ws, now=nw)
+
+    dl1 = DataLink(
+        UUID('1234567890abcdef1234567890abcdee'),
+        DataUnitID(UPA('2/4/6'), 'foo'),
+        SampleNodeAddress(SampleAddress(UUID('1234567890abcdef1234567890abcdea'), 3), 'mynode'),
+        dt(5),
+        UserID('userb')
+    )
+
+    storage.get_links_from_data.return_value = [dl1]
+
+    assert s.get_links_from_data(
+        UserID('u1'),
+        UPA('2/4/6'),
+        limit=1,
+        after=(dt(4), UUID('1234567890abcdef1234567890abcdef'))) == ([dl1], dt(6))
+
+    ws.has_permission.assert_called_once_with(
+        UserID('u1'), WorkspaceAccessType.READ, upa=UPA('2/4/6'))
+
+    storage.get_links_from_data.assert_called_once_with(
+        UPA('2/4/6'), dt(6), 1, (dt(4), UUID('1234567890abcdef1234567890abcdef')))
 
 
 def test_get_links_from_data_fail_bad_args():
@@ -1688,6 +2466,108 @@ def _get_links_from_from_data_fail(samples, user, upa, ts, expected):
     assert_exception_correct(got.value, expected)
 
 
+def test_get_links_from_data_bulk():
+    storage = create_autospec(ArangoSampleStorage, spec_set=True, instance=True)
+    lu = create_autospec(KBaseUserLookup, spec_set=True, instance=True)
+    meta = create_autospec(MetadataValidatorSet, spec_set=True, instance=True)
+    ws = create_autospec(WS, spec_set=True, instance=True)
+    s = Samples(storage, lu, meta, ws, now=nw)
+
+    dl1 = DataLink(
+        UUID('1234567890abcdef1234567890abcdee'),
+        DataUnitID(UPA('2/4/6'), 'foo'),
+        SampleNodeAddress(SampleAddress(UUID('1234567890abcdef1234567890abcdea'), 3), 'mynode'),
+        dt(5),
+        UserID('userb')
+    )
+
+    ws.has_permissions.return_value = [
+        None, UnauthorizedError('nope'), None, NoSuchWorkspaceDataError('gone'), None]
+    storage.get_links_from_data_bulk.return_value = {UPA('2/4/6'): [dl1], UPA('1/1/1'): []}
+
+    upas = [UPA('2/4/6'), UPA('3/1/1'), UPA('1/1/1'), UPA('4/1/1'), UPA('2/4/6')]
+    res, ts = s.get_links_from_data_bulk(UserID('u1'), upas)
+
+    assert res[0] == [dl1]
+    assert_exception_correct(res[1], UnauthorizedError('nope'))
+    assert res[2] == []
+    assert_exception_correct(res[3], NoSuchWorkspaceDataError('gone'))
+    assert res[4] == [dl1]
+    assert len(res) == 5
+    assert ts == dt(6)
+
+    ws.has_permissions.assert_called_once_with(
+        UserID('u1'), WorkspaceAccessType.READ, upas=upas)
+    storage.get_links_from_data_bulk.assert_called_once_with(
+        [UPA('2/4/6'), UPA('1/1/1'), UPA('2/4/6')], dt(6))
+
+
+def test_get_links_from_data_bulk_as_admin_with_timestamp_and_anon_user():
+    storage = create_autospec(ArangoSampleStorage, spec_set=True, instance=True)
+    lu = create_autospec(KBaseUserLookup, spec_set=True, instance=True)
+    meta = create_autospec(MetadataValidatorSet, spec_set=True, instance=True)
+    ws = create_autospec(WS, spec_set=True, instance=True)
+    s = Samples(storage, lu, meta, ws, now=nw)
+
+    ws.has_permissions.return_value = [None]
+    storage.get_links_from_data_bulk.return_value = {UPA('2/4/6'): []}
+
+    assert s.get_links_from_data_bulk(
+        None, [UPA('2/4/6')], timestamp=dt(700), as_admin=True) == ([[]], dt(700))
+
+    ws.has_permissions.assert_called_once_with(
+        None, WorkspaceAccessType.NONE, upas=[UPA('2/4/6')])
+    storage.get_links_from_data_bulk.assert_called_once_with([UPA('2/4/6')], dt(700))
+
+
+def test_get_links_from_data_bulk_no_readable_data():
+    storage = create_autospec(ArangoSampleStorage, spec_set=True, instance=True)
+    lu = create_autospec(KBaseUserLookup, spec_set=True, instance=True)
+    meta = create_autospec(MetadataValidatorSet, spec_set=True, instance=True)
+    ws = create_autospec(WS, spec_set=True, instance=True)
+    s = Samples(storage, lu, meta, ws, now=nw)
+
+    ws.has_permissions.return_value = [UnauthorizedError('oh honey')]
+
+    res, ts = s.get_links_from_data_bulk(UserID('u'), [UPA('1/1/1')])
+    assert_exception_correct(res[0], UnauthorizedError('oh honey'))
+    assert len(res) == 1
+    assert ts == dt(6)
+
+    assert storage.get_links_from_data_bulk.call_args_list == []
+
+
+def test_get_links_from_data_bulk_fail_bad_args():
+    storage = create_autospec(ArangoSampleStorage, spec_set=True, instance=True)
+    lu = create_autospec(KBaseUserLookup, spec_set=True, instance=True)
+    meta = create_autospec(MetadataValidatorSet, spec_set=True, instance=True)
+    ws = create_autospec(WS, spec_set=True, instance=True)
+    s = Samples(storage, lu, meta, ws, now=nw)
+
+    u = UserID('u')
+    up = [UPA('1/1/1')]
+    bt = datetime.datetime.fromtimestamp(1)
+
+    _get_links_from_data_bulk_fail(s, u, None, None, IllegalParameterError(
+        'At least one UPA must be supplied'))
+    _get_links_from_data_bulk_fail(s, u, [], None, IllegalParameterError(
+        'At least one UPA must be supplied'))
+    _get_links_from_data_bulk_fail(s, u, [UPA('1/1/1')] * 1001, None, IllegalParameterError(
+        'No more than 1000 UPAs may be requested at once'))
+    _get_links_from_data_bulk_fail(s, u, [UPA('1/1/1'), None], None, ValueError(
+        'upa at index 1 cannot be a value that evaluates to false'))
+    _get_links_from_data_bulk_fail(s, u, up, bt, ValueError(
+        'timestamp cannot be a naive datetime'))
+
+    assert ws.has_permissions.call_args_list == []
+
+
+def _get_links_from_data_bulk_fail(samples, user, upas, ts, expected):
+    with raises(Exception) as got:
+        samples.get_links_from_data_bulk(user, upas, ts)
+    assert_exception_correct(got.value, expected)
+
+
 def test_get_sample_via_data():
     _get_sample_via_data(None)
     _get_sample_via_data(UserID('someguy'))
@@ -1998,6 +2878,184 @@ def _expire_data_link_fail(samples, user, duid, expected):
     assert_exception_correct(got.value, expected)
 
 
+def _expire_data_links_setup(kafka=True):
+    storage = create_autospec(ArangoSampleStorage, spec_set=True, instance=True)
+    lu = create_autospec(KBaseUserLookup, spec_set=True, instance=True)
+    meta = create_autospec(MetadataValidatorSet, spec_set=True, instance=True)
+    ws = create_autospec(WS, spec_set=True, instance=True)
+    k = create_autospec(KafkaNotifier, spec_set=True, instance=True) if kafka else None
+    s = Samples(storage, lu, meta, ws, k, now=nw)
+    return s, storage, ws, k
+
+
+def _dl(lid, upa, sid, expired=None):
+    return DataLink(
+        UUID(lid),
+        DataUnitID(UPA(upa)),
+        SampleNodeAddress(SampleAddress(sid, 3), 'node'),
+        dt(34),
+        UserID('userc'),
+        expired,
+        UserID('userd') if expired else None)
+
+
+LID1 = '1234567890abcdef1234567890abcde1'
+LID2 = '1234567890abcdef1234567890abcde2'
+LID3 = '1234567890abcdef1234567890abcde3'
+SID1 = UUID('1234567890abcdef1234567890abcdee')
+SID2 = UUID('1234567890abcdef1234567890abcdea')
+
+
+def test_expire_data_links_by_upa():
+    s, storage, ws, kafka = _expire_data_links_setup()
+
+    links = [_dl(LID1, '6/1/2', SID1), _dl(LID2, '6/1/2', SID2), _dl(LID3, '6/1/2', SID1)]
+    storage.get_links_from_data.return_value = links
+    storage.get_sample_acls.side_effect = [
+        SampleACL(u('someuser'), dt(1)), SampleACL(u('otheruser'), dt(1), [u('someuser')])]
+    storage.expire_data_links.return_value = links  # not actually expired, but who cares
+
+    assert s.expire_data_links(UserID('someuser'), upa=UPA('6/1/2')) == links
+
+    ws.has_permission.assert_called_once_with(
+        UserID('someuser'), WorkspaceAccessType.WRITE, workspace_id=6)
+    storage.get_links_from_data.assert_called_once_with(UPA('6/1/2'), dt(6))
+    assert storage.get_sample_acls.call_args_list == [((SID1,), {}), ((SID2,), {})]
+    storage.expire_data_links.assert_called_once_with(
+        dt(6), UserID('someuser'), [UUID(LID1), UUID(LID2), UUID(LID3)])
+    kafka.notify_expired_links.assert_called_once_with(
+        [UUID(LID1), UUID(LID2), UUID(LID3)])
+
+
+def test_expire_data_links_by_sample():
+    s, storage, ws, kafka = _expire_data_links_setup()
+
+    links = [_dl(LID1, '6/1/2', SID1), _dl(LID2, '7/1/2', SID1), _dl(LID3, '6/2/2', SID1)]
+    storage.get_links_from_sample.return_value = links
+    storage.get_sample_acls.return_value = SampleACL(u('otheruser'), dt(1), [u('someuser')])
+    storage.expire_data_links.return_value = links
+
+    assert s.expire_data_links(
+        UserID('someuser'), sample=SampleAddress(SID1, 3)) == links
+
+    storage.get_sample_acls.assert_called_once_with(SID1)
+    storage.get_links_from_sample.assert_called_once_with(SampleAddress(SID1, 3), None, dt(6))
+    ws.has_permissions.assert_called_once_with(
+        UserID('someuser'), WorkspaceAccessType.WRITE, workspace_ids=[6, 7])
+    storage.expire_data_links.assert_called_once_with(
+        dt(6), UserID('someuser'), [UUID(LID1), UUID(LID2), UUID(LID3)])
+    kafka.notify_expired_links.assert_called_once_with(
+        [UUID(LID1), UUID(LID2), UUID(LID3)])
+
+
+def test_expire_data_links_by_id_as_admin():
+    """
+    Also tests expiring links without a notifier.
+    """
+    s, storage, ws, _ = _expire_data_links_setup(kafka=False)
+
+    links = [_dl(LID2, '6/1/2', SID1), _dl(LID1, '7/1/2', SID2)]
+    storage.get_data_links.return_value = links
+    storage.expire_data_links.return_value = links
+
+    assert s.expire_data_links(
+        UserID('someuser'), link_ids=[UUID(LID2), UUID(LID1)], as_admin=True) == links
+
+    storage.get_data_links.assert_called_once_with([UUID(LID2), UUID(LID1)])
+    assert storage.get_sample_acls.call_args_list == []
+    ws.has_permissions.assert_called_once_with(
+        UserID('someuser'), WorkspaceAccessType.NONE, workspace_ids=[6, 7])
+    storage.expire_data_links.assert_called_once_with(
+        dt(6), UserID('someuser'), [UUID(LID2), UUID(LID1)])
+
+
+def test_expire_data_links_no_links():
+    s, storage, ws, kafka = _expire_data_links_setup()
+
+    storage.get_links_from_data.return_value = []
+
+    assert s.expire_data_links(UserID('someuser'), upa=UPA('6/1/2')) == []
+
+    ws.has_permission.assert_called_once_with(
+        UserID('someuser'), WorkspaceAccessType.WRITE, workspace_id=6)
+    assert storage.expire_data_links.call_args_list == []
+    assert kafka.notify_expired_links.call_args_list == []
+
+
+def test_expire_data_links_fail_bad_args():
+    s, storage, _, _ = _expire_data_links_setup()
+
+    u = UserID('u')
+    upa = UPA('1/1/1')
+    sa = SampleAddress(SID1, 1)
+    err = ValueError('exactly one of upa, sample, or link_ids must be provided')
+    _expire_data_links_fail(s, None, upa, None, None, ValueError(
+        'user cannot be a value that evaluates to false'))
+    _expire_data_links_fail(s, u, None, None, None, err)
+    _expire_data_links_fail(s, u, upa, sa, None, err)
+    _expire_data_links_fail(s, u, upa, None, [UUID(LID1)], err)
+    _expire_data_links_fail(s, u, None, sa, [UUID(LID1)], err)
+    _expire_data_links_fail(s, u, None, None, [], IllegalParameterError(
+        'At least one link ID must be supplied'))
+    _expire_data_links_fail(s, u, None, None, [uuid.uuid4() for _ in range(10001)],
+                            IllegalParameterError(
+                                'No more than 10000 links may be expired at once'))
+    _expire_data_links_fail(s, u, None, None, [UUID(LID1), UUID(LID2), UUID(LID1)],
+                            IllegalParameterError('link_ids contains duplicate IDs'))
+
+    assert storage.expire_data_links.call_args_list == []
+
+
+def test_expire_data_links_fail_expired_link():
+    s, storage, ws, _ = _expire_data_links_setup()
+
+    storage.get_data_links.return_value = [
+        _dl(LID1, '6/1/2', SID1), _dl(LID2, '6/1/2', SID1, dt(40))]
+
+    _expire_data_links_fail(s, UserID('u'), None, None, [UUID(LID1), UUID(LID2)],
+                            NoSuchLinkError('12345678-90ab-cdef-1234-567890abcde2'))
+
+    assert ws.has_permission.call_args_list == []
+    assert storage.expire_data_links.call_args_list == []
+
+
+def test_expire_data_links_fail_no_ws_access():
+    s, storage, ws, kafka = _expire_data_links_setup()
+
+    storage.get_data_links.return_value = [
+        _dl(LID1, '6/1/2', SID1), _dl(LID2, '7/1/2', SID1)]
+    storage.get_sample_acls.return_value = SampleACL(u('u'), dt(1))
+    ws.has_permissions.return_value = [None, UnauthorizedError('oh honey boo boo foofy foo')]
+
+    _expire_data_links_fail(s, UserID('u'), None, None, [UUID(LID1), UUID(LID2)],
+                            UnauthorizedError('oh honey boo boo foofy foo'))
+
+    assert storage.expire_data_links.call_args_list == []
+    assert kafka.notify_expired_links.call_args_list == []
+
+
+def test_expire_data_links_fail_no_sample_access():
+    s, storage, ws, kafka = _expire_data_links_setup()
+
+    storage.get_links_from_data.return_value = [
+        _dl(LID1, '6/1/2', SID1), _dl(LID2, '6/1/2', SID2)]
+    storage.get_sample_acls.side_effect = [
+        SampleACL(u('u'), dt(1)),
+        SampleACL(u('someuser'), dt(1), write=[u('u')], public_read=True)]
+
+    _expire_data_links_fail(s, UserID('u'), UPA('6/1/2'), None, None, UnauthorizedError(
+        'User u cannot administrate sample 12345678-90ab-cdef-1234-567890abcdea'))
+
+    assert storage.expire_data_links.call_args_list == []
+    assert kafka.notify_expired_links.call_args_list == []
+
+
+def _expire_data_links_fail(samples, user, upa, sample, link_ids, expected):
+    with raises(Exception) as got:
+        samples.expire_data_links(user, upa=upa, sample=sample, link_ids=link_ids)
+    assert_exception_correct(got.value, expected)
+
+
 def test_get_data_link_admin():
     storage = create_autospec(ArangoSampleStorage, spec_set=True, instance=True)
     lu = create_autospec(KBaseUserLookup, spec_set=True, instance=True)
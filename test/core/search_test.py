@@ -0,0 +1,255 @@
+from pytest import raises
+from core.test_utils import assert_exception_correct
+from SampleService.core.sample import Sample, SampleNode, SubSampleType
+from SampleService.core.search import (
+    LocationCondition,
+    MetadataCondition,
+    get_node_location,
+    get_search_terms,
+    get_sample_search_terms,
+)
+from SampleService.core.errors import IllegalParameterError, MissingParameterError
+
+
+def test_metadata_condition_build():
+    c = MetadataCondition('k' * 256, 'v' * 256, equals='foo')
+    assert c.key == 'k' * 256
+    assert c.value_key == 'v' * 256
+    assert c.equals == 'foo'
+    assert c.minimum is None
+    assert c.maximum is None
+    assert c.prefix is None
+
+    for eq in [False, 0, 1.5, '']:
+        c = MetadataCondition('k', 'v', equals=eq)
+        assert c.equals == eq
+        assert type(c.equals) == type(eq)
+
+    c = MetadataCondition('k', 'v', minimum=-3)
+    assert (c.equals, c.minimum, c.maximum, c.prefix) == (None, -3, None, None)
+
+    c = MetadataCondition('k', 'v', maximum=4.5)
+    assert (c.equals, c.minimum, c.maximum, c.prefix) == (None, None, 4.5, None)
+
+    c = MetadataCondition('k', 'v', minimum=4.5, maximum=4.5)
+    assert (c.equals, c.minimum, c.maximum, c.prefix) == (None, 4.5, 4.5, None)
+
+    c = MetadataCondition('k', 'v', prefix='p')
+    assert (c.equals, c.minimum, c.maximum, c.prefix) == (None, None, None, 'p')
+    assert c.units is None
+
+    c = MetadataCondition('k', 'value', minimum=1, units='ft')
+    assert (c.equals, c.minimum, c.maximum, c.prefix, c.units) == (None, 1, None, None, 'ft')
+
+
+def test_metadata_condition_get_canonical_range():
+    assert MetadataCondition('k', 'value', minimum=3, maximum=6, units='ft'
+                             ).get_canonical_range() == (0.9144, 1.8288, 'meter')
+    assert MetadataCondition('k', 'value', minimum=5, units='cm'
+                             ).get_canonical_range() == (0.05, None, 'meter')
+    assert MetadataCondition('k', 'value', maximum=0, units='degC'
+                             ).get_canonical_range() == (None, 273.15, 'kelvin')
+
+
+def test_metadata_condition_get_canonical_range_fail():
+    with raises(Exception) as got:
+        MetadataCondition('k', 'value', minimum=3).get_canonical_range()
+    assert_exception_correct(got.value, ValueError('The condition has no units'))
+
+
+def test_metadata_condition_build_fail():
+    one = ('Exactly one of an equality, range, or prefix condition must be provided for ' +
+           'metadata key k')
+    _metadata_condition_build_fail(None, 'v', 'e', None, None, None, MissingParameterError('key'))
+    _metadata_condition_build_fail('k' * 257, 'v', 'e', None, None, None, IllegalParameterError(
+        'key exceeds maximum length of 256'))
+    _metadata_condition_build_fail('k', '  ', 'e', None, None, None, MissingParameterError(
+        'value_key'))
+    _metadata_condition_build_fail('k', 'v' * 257, 'e', None, None, None, IllegalParameterError(
+        'value_key exceeds maximum length of 256'))
+    _metadata_condition_build_fail('k', 'v', None, None, None, None, IllegalParameterError(one))
+    _metadata_condition_build_fail('k', 'v', 'e', 1, None, None, IllegalParameterError(one))
+    _metadata_condition_build_fail('k', 'v', 'e', None, None, 'p', IllegalParameterError(one))
+    _metadata_condition_build_fail('k', 'v', None, None, 1, 'p', IllegalParameterError(one))
+    _metadata_condition_build_fail('k', 'v', {'a': 'b'}, None, None, None, IllegalParameterError(
+        'The equality condition for metadata key k must be a string, number, or boolean'))
+    bounds = IllegalParameterError(
+        'The range condition for metadata key k must have numeric bounds')
+    for minimum, maximum in [('1', None), (None, True), (1, '2')]:
+        _metadata_condition_build_fail('k', 'v', None, minimum, maximum, None, bounds)
+    _metadata_condition_build_fail('k', 'v', None, 2, 1.5, None, IllegalParameterError(
+        'The range condition for metadata key k has a minimum greater than the maximum'))
+    for prefix in ['', 1]:
+        _metadata_condition_build_fail('k', 'v', None, None, None, prefix, IllegalParameterError(
+            'The prefix condition for metadata key k must be a non-empty string'))
+    _metadata_condition_build_fail('k', 'value', 'e', None, None, None, IllegalParameterError(
+        'Only range conditions may have units, as for metadata key k'), 'm')
+    _metadata_condition_build_fail('k', 'value', None, None, None, 'p', IllegalParameterError(
+        'Only range conditions may have units, as for metadata key k'), 'm')
+    _metadata_condition_build_fail('k', 'v', None, 1, None, None, IllegalParameterError(
+        'The value key for metadata key k must be value when units are provided'), 'm')
+    for u in ['', 'not a unit', 1]:
+        _metadata_condition_build_fail('k', 'value', None, 1, None, None, IllegalParameterError(
+            f"Unable to parse units '{u}' for metadata key k"), u)
+
+
+def _metadata_condition_build_fail(
+        key, value_key, equals, minimum, maximum, prefix, expected, units=None):
+    with raises(Exception) as got:
+        MetadataCondition(key, value_key, equals, minimum, maximum, prefix, units)
+    assert_exception_correct(got.value, expected)
+
+
+def test_metadata_condition_eq():
+    assert MetadataCondition('k', 'v', equals='e') == MetadataCondition('k', 'v', equals='e')
+    assert MetadataCondition('k', 'v', equals='e') != MetadataCondition('k1', 'v', equals='e')
+    assert MetadataCondition('k', 'v', equals='e') != MetadataCondition('k', 'v1', equals='e')
+    assert MetadataCondition('k', 'v', equals='e') != MetadataCondition('k', 'v', equals='e1')
+    assert MetadataCondition('k', 'v', equals=1) != MetadataCondition('k', 'v', equals=True)
+    assert MetadataCondition('k', 'v', equals=1) != MetadataCondition('k', 'v', equals=1.0)
+    assert MetadataCondition('k', 'v', equals='e') != MetadataCondition('k', 'v', prefix='e')
+    assert MetadataCondition('k', 'v', minimum=1) == MetadataCondition('k', 'v', minimum=1)
+    assert MetadataCondition('k', 'v', minimum=1) != MetadataCondition('k', 'v', maximum=1)
+    assert MetadataCondition('k', 'v', minimum=1) != MetadataCondition(
+        'k', 'v', minimum=1, maximum=2)
+    assert MetadataCondition('k', 'value', minimum=1, units='m') == MetadataCondition(
+        'k', 'value', minimum=1, units='m')
+    assert MetadataCondition('k', 'value', minimum=1, units='m') != MetadataCondition(
+        'k', 'value', minimum=1, units='cm')
+    assert MetadataCondition('k', 'value', minimum=1, units='m') != MetadataCondition(
+        'k', 'value', minimum=1)
+
+    assert MetadataCondition('k', 'v', equals='e') != 'k'
+    assert {} != MetadataCondition('k', 'v', equals='e')
+
+
+def test_metadata_condition_hash():
+    # hashes will change from instance to instance of the python interpreter, and therefore
+    # tests can't be written that directly test the hash value. See
+    # https://docs.python.org/3/reference/datamodel.html#object.__hash__
+
+    assert hash(MetadataCondition('k', 'v', equals='e')) == hash(
+        MetadataCondition('k', 'v', equals='e'))
+    assert hash(MetadataCondition('k', 'v', equals='e')) != hash(
+        MetadataCondition('k1', 'v', equals='e'))
+    assert hash(MetadataCondition('k', 'v', equals='e')) != hash(
+        MetadataCondition('k', 'v1', equals='e'))
+    assert hash(MetadataCondition('k', 'v', equals=1)) != hash(
+        MetadataCondition('k', 'v', equals=True))
+    assert hash(MetadataCondition('k', 'v', minimum=1)) != hash(
+        MetadataCondition('k', 'v', maximum=1))
+    assert hash(MetadataCondition('k', 'v', prefix='p')) != hash(
+        MetadataCondition('k', 'v', prefix='q'))
+    assert hash(MetadataCondition('k', 'value', minimum=1, units='m')) == hash(
+        MetadataCondition('k', 'value', minimum=1, units='m'))
+    assert hash(MetadataCondition('k', 'value', minimum=1, units='m')) != hash(
+        MetadataCondition('k', 'value', minimum=1, units='cm'))
+
+
+def test_location_condition_build():
+    c = LocationCondition(bounding_box=(-90, -180, 90, 180))
+    assert (c.bounding_box, c.center, c.radius) == ((-90, -180, 90, 180), None, None)
+
+    # crosses the antimeridian
+    c = LocationCondition(bounding_box=(10.5, 170, 20, -170.5))
+    assert (c.bounding_box, c.center, c.radius) == ((10.5, 170, 20, -170.5), None, None)
+
+    c = LocationCondition(center=(44.5, -110.75), radius=0.5)
+    assert (c.bounding_box, c.center, c.radius) == (None, (44.5, -110.75), 0.5)
+
+
+def test_location_condition_build_fail():
+    one = IllegalParameterError('Exactly one of a bounding box or a center and radius must be ' +
+                                'provided for a location condition')
+    _location_condition_build_fail(None, None, None, one)
+    _location_condition_build_fail((1, 2, 3, 4), (1, 2), None, one)
+    _location_condition_build_fail((1, 2, 3, 4), None, 3, one)
+    for bb in [[1, 2, 3, 4], (1, 2, 3)]:
+        _location_condition_build_fail(bb, None, None, IllegalParameterError(
+            'The bounding box must have 4 coordinates'))
+    for bb, err in [((-90.1, 2, 3, 4), 'minimum latitude must be a number from -90 to 90'),
+                    ((1, 180.1, 3, 4), 'minimum longitude must be a number from -180 to 180'),
+                    ((1, 2, '3', 4), 'maximum latitude must be a number from -90 to 90'),
+                    ((1, 2, 3, True), 'maximum longitude must be a number from -180 to 180'),
+                    ((3, 2, 1, 4), 'minimum latitude is greater than the maximum latitude')]:
+        _location_condition_build_fail(bb, None, None, IllegalParameterError(
+            'The bounding box ' + err))
+    for center in [[1, 2], (1, 2, 3)]:
+        _location_condition_build_fail(None, center, 1, IllegalParameterError(
+            'The center must have 2 coordinates'))
+    _location_condition_build_fail(None, None, 1, IllegalParameterError(
+        'The center must have 2 coordinates'))
+    _location_condition_build_fail(None, (91, 2), 1, IllegalParameterError(
+        'The center latitude must be a number from -90 to 90'))
+    _location_condition_build_fail(None, (1, -181), 1, IllegalParameterError(
+        'The center longitude must be a number from -180 to 180'))
+    for r in [None, 0, -1, '1']:
+        _location_condition_build_fail(None, (1, 2), r, IllegalParameterError(
+            'The radius must be a number greater than 0'))
+
+
+def _location_condition_build_fail(bounding_box, center, radius, expected):
+    with raises(Exception) as got:
+        LocationCondition(bounding_box, center, radius)
+    assert_exception_correct(got.value, expected)
+
+
+def test_location_condition_eq_and_hash():
+    assert LocationCondition((1, 2, 3, 4)) == LocationCondition((1, 2, 3, 4))
+    assert LocationCondition((1, 2, 3, 4)) != LocationCondition((1, 2, 3, 5))
+    assert LocationCondition(center=(1, 2), radius=3) == LocationCondition(
+        center=(1, 2), radius=3)
+    assert LocationCondition(center=(1, 2), radius=3) != LocationCondition(
+        center=(1, 2), radius=4)
+    assert LocationCondition(center=(1, 2), radius=3) != LocationCondition(
+        center=(2, 2), radius=3)
+    assert LocationCondition((1, 2, 3, 4)) != (1, 2, 3, 4)
+
+    assert hash(LocationCondition((1, 2, 3, 4))) == hash(LocationCondition((1, 2, 3, 4)))
+    assert hash(LocationCondition((1, 2, 3, 4))) != hash(LocationCondition((1, 2, 3, 5)))
+    assert hash(LocationCondition(center=(1, 2), radius=3)) != hash(
+        LocationCondition(center=(1, 2), radius=4))
+
+
+def test_get_node_location():
+    assert get_node_location(SampleNode('root')) is None
+    assert get_node_location(SampleNode('root', controlled_metadata={
+        'latitude': {'value': 44.46, 'units': 'degrees'},
+        'longitude': {'value': -110.83, 'units': 'degrees'}})) == (44.46, -110.83)
+    assert get_node_location(SampleNode('root', controlled_metadata={
+        'latitude': {'value': -90}, 'longitude': {'value': 180}})) == (-90, 180)
+
+    for lat, lon in [(44, None), ('44', -110), (True, -110), (90.1, -110), (44, -180.1)]:
+        meta = {'latitude': {'value': lat}}
+        if lon is not None:
+            meta['longitude'] = {'value': lon}
+        assert get_node_location(SampleNode('root', controlled_metadata=meta)) is None
+    # user metadata is ignored
+    assert get_node_location(SampleNode('root', user_metadata={
+        'latitude': {'value': 44.46}, 'longitude': {'value': -110.83}})) is None
+
+
+def test_get_search_terms():
+    assert get_search_terms(None) == []
+    assert get_search_terms('') == []
+    assert get_search_terms('  -- !? ') == []
+    assert get_search_terms('soil Yellowstone 2019') == ['2019', 'soil', 'yellowstone']
+    assert get_search_terms('Soil, soil; SOIL') == ['soil']
+    assert get_search_terms('2019-06-01T12:00 sub_sample') == [
+        '00', '01t12', '06', '2019', 'sub_sample']
+    assert get_search_terms('Straße Ærø') == ['strasse', 'ærø']
+    assert get_search_terms('a' * 64 + ' ' + 'b' * 65) == ['a' * 64]
+
+
+def test_get_sample_search_terms():
+    assert get_sample_search_terms(Sample([SampleNode('root')])) == []
+
+    assert get_sample_search_terms(Sample([
+        SampleNode('root', controlled_metadata={
+            'location': {'name': 'Castle Geyser', 'lat': 44.43, 'verified': True},
+            'material': {'value': 'Soil'}},
+            user_metadata={'note': {'value': 'wet soil', 'count': 3}}),
+        SampleNode('kid', SubSampleType.TECHNICAL_REPLICATE, 'root',
+                   {'material': {'value': 'sand'}}, {'note': {'value': 'dry'}})
+        ], 'Yellowstone 2019')) == [
+            '2019', 'castle', 'dry', 'geyser', 'sand', 'soil', 'wet', 'yellowstone']
@@ -1,10 +1,12 @@
 import datetime
 import uuid
 import time
+from unittest.mock import patch
 
 from pytest import raises, fixture
 from core import test_utils
 from core.test_utils import assert_exception_correct
+from arango.request import Request
 from arango_controller import ArangoController
 from SampleService.core.acls import SampleACL, SampleACLDelta
 from SampleService.core.data_link import DataLink
@@ -21,9 +23,11 @@ from SampleService.core.errors import (
     NoSuchSampleVersionError, DataLinkExistsError, TooManyDataLinksError, NoSuchLinkError,
     NoSuchSampleNodeError
 )
+from SampleService.core.search import LocationCondition, MetadataCondition
 from SampleService.core.storage.arango_sample_storage import ArangoSampleStorage
 from SampleService.core.storage.errors import SampleStorageError, StorageInitError
 from SampleService.core.storage.errors import OwnerChangedError
+from SampleService.core.storage.sample_version_cache import SampleVersionCache
 from SampleService.core.user import UserID
 from SampleService.core.workspace import UPA, DataUnitID
 
@@ -37,6 +41,9 @@ TEST_COL_NODES = 'nodes'
 TEST_COL_NODE_EDGE = 'node_edges'
 TEST_COL_WS_OBJ_VER = 'ws_obj_ver'
 TEST_COL_DATA_LINK = 'data_link'
+TEST_COL_DATA_LINK_COUNT = 'data_link_count'
+TEST_COL_META = 'meta'
+TEST_COL_NODE_CONTENT = 'node_content'
 TEST_COL_SCHEMA = 'schema'
 TEST_USER = 'user1'
 TEST_PWD = 'password1'
@@ -77,6 +84,9 @@ def clear_db_and_recreate(arango):
     db.create_collection(TEST_COL_NODE_EDGE, edge=True)
     db.create_collection(TEST_COL_WS_OBJ_VER)
     db.create_collection(TEST_COL_DATA_LINK, edge=True)
+    db.create_collection(TEST_COL_DATA_LINK_COUNT)
+    db.create_collection(TEST_COL_META)
+    db.create_collection(TEST_COL_NODE_CONTENT)
     db.create_collection(TEST_COL_SCHEMA)
     return db
 
@@ -92,6 +102,9 @@ def samplestorage_method(arango):
         TEST_COL_NODE_EDGE,
         TEST_COL_WS_OBJ_VER,
         TEST_COL_DATA_LINK,
+        TEST_COL_DATA_LINK_COUNT,
+        TEST_COL_META,
+        TEST_COL_NODE_CONTENT,
         TEST_COL_SCHEMA)
 
 
@@ -118,6 +131,9 @@ def test_startup_and_check_config_doc(samplestorage):
         samplestorage._col_node_edge.name,
         samplestorage._col_ws.name,
         samplestorage._col_data_link.name,
+        samplestorage._col_data_link_count.name,
+        samplestorage._col_meta.name,
+        samplestorage._col_node_content.name,
         samplestorage._col_schema.name)
 
     id_ = uuid.UUID('1234567890abcdef1234567890abcdef')
@@ -140,9 +156,12 @@ def test_startup_with_extra_config_doc(arango):
     ne = TEST_COL_NODE_EDGE
     ws = TEST_COL_WS_OBJ_VER
     dl = TEST_COL_DATA_LINK
+    dlc = TEST_COL_DATA_LINK_COUNT
+    md = TEST_COL_META
+    nc = TEST_COL_NODE_CONTENT
     sc = TEST_COL_SCHEMA
 
-    _fail_startup(db, s, v, ve, n, ne, ws, dl, sc, nw, StorageInitError(
+    _fail_startup(db, s, v, ve, n, ne, ws, dl, dlc, md, nc, sc, nw, StorageInitError(
         'Multiple config objects found ' +
         'in the database. This should not happen, something is very wrong.'))
 
@@ -159,9 +178,12 @@ def test_startup_with_bad_schema_version(arango):
     ne = TEST_COL_NODE_EDGE
     ws = TEST_COL_WS_OBJ_VER
     dl = TEST_COL_DATA_LINK
+    dlc = TEST_COL_DATA_LINK_COUNT
+    md = TEST_COL_META
+    nc = TEST_COL_NODE_CONTENT
     sc = TEST_COL_SCHEMA
 
-    _fail_startup(db, s, v, ve, n, ne, ws, dl, sc, nw, StorageInitError(
+    _fail_startup(db, s, v, ve, n, ne, ws, dl, dlc, md, nc, sc, nw, StorageInitError(
         'Incompatible database schema. Server is v1, DB is v4'))
 
 
@@ -177,9 +199,12 @@ def test_startup_in_update(arango):
     ne = TEST_COL_NODE_EDGE
     ws = TEST_COL_WS_OBJ_VER
     dl = TEST_COL_DATA_LINK
+    dlc = TEST_COL_DATA_LINK_COUNT
+    md = TEST_COL_META
+    nc = TEST_COL_NODE_CONTENT
     sc = TEST_COL_SCHEMA
 
-    _fail_startup(db, s, v, ve, n, ne, ws, dl, sc, nw, StorageInitError(
+    _fail_startup(db, s, v, ve, n, ne, ws, dl, dlc, md, nc, sc, nw, StorageInitError(
         'The database is in the middle of an update from v1 of the schema. Aborting startup.'))
 
 
@@ -211,6 +236,9 @@ def test_startup_with_unupdated_version_and_node_docs(samplestorage):
         samplestorage._col_node_edge.name,
         samplestorage._col_ws.name,
         samplestorage._col_data_link.name,
+        samplestorage._col_data_link_count.name,
+        samplestorage._col_meta.name,
+        samplestorage._col_node_content.name,
         samplestorage._col_schema.name)
 
     assert samplestorage._col_version.count() == 1
@@ -260,6 +288,9 @@ def test_startup_with_unupdated_node_docs(samplestorage):
         samplestorage._col_node_edge.name,
         samplestorage._col_ws.name,
         samplestorage._col_data_link.name,
+        samplestorage._col_data_link_count.name,
+        samplestorage._col_meta.name,
+        samplestorage._col_node_content.name,
         samplestorage._col_schema.name)
 
     assert samplestorage._col_version.count() == 2
@@ -316,6 +347,9 @@ def test_startup_with_no_sample_doc(samplestorage):
         samplestorage._col_node_edge.name,
         samplestorage._col_ws.name,
         samplestorage._col_data_link.name,
+        samplestorage._col_data_link_count.name,
+        samplestorage._col_meta.name,
+        samplestorage._col_node_content.name,
         samplestorage._col_schema.name,
         now=lambda: datetime.datetime.fromtimestamp(4600, tz=datetime.timezone.utc))
 
@@ -334,6 +368,9 @@ def test_startup_with_no_sample_doc(samplestorage):
         samplestorage._col_node_edge.name,
         samplestorage._col_ws.name,
         samplestorage._col_data_link.name,
+        samplestorage._col_data_link_count.name,
+        samplestorage._col_meta.name,
+        samplestorage._col_node_content.name,
         samplestorage._col_schema.name,
         now=lambda: datetime.datetime.fromtimestamp(4601, tz=datetime.timezone.utc))
 
@@ -398,6 +435,9 @@ def test_startup_with_no_version_in_sample_doc(samplestorage):
         samplestorage._col_node_edge.name,
         samplestorage._col_ws.name,
         samplestorage._col_data_link.name,
+        samplestorage._col_data_link_count.name,
+        samplestorage._col_meta.name,
+        samplestorage._col_node_content.name,
         samplestorage._col_schema.name,
         now=lambda: datetime.datetime.fromtimestamp(5600, tz=datetime.timezone.utc))
 
@@ -416,6 +456,9 @@ def test_startup_with_no_version_in_sample_doc(samplestorage):
         samplestorage._col_node_edge.name,
         samplestorage._col_ws.name,
         samplestorage._col_data_link.name,
+        samplestorage._col_data_link_count.name,
+        samplestorage._col_meta.name,
+        samplestorage._col_node_content.name,
         samplestorage._col_schema.name,
         now=lambda: datetime.datetime.fromtimestamp(5601, tz=datetime.timezone.utc))
 
@@ -432,6 +475,53 @@ def test_startup_with_no_version_in_sample_doc(samplestorage):
     assert len(list(samplestorage._col_node_edge.find({'uuidver': uuidver1}))) == 4
 
 
+def test_startup_with_no_link_counts(samplestorage):
+    # this test simulates a server coming up on a database with links but without link counts,
+    # for example a database created before link counts were stored
+    id1 = uuid.UUID('1234567890abcdef1234567890abcdef')
+    assert samplestorage.save_sample(
+        SavedSample(id1, UserID('u'), [SampleNode('mynode')], dt(1), 'foo')) is True
+    assert samplestorage.save_sample_version(
+        SavedSample(id1, UserID('u'), [SampleNode('mynode')], dt(2), 'foo')) == 2
+    sna1 = SampleNodeAddress(SampleAddress(id1, 1), 'mynode')
+    sna2 = SampleNodeAddress(SampleAddress(id1, 2), 'mynode')
+
+    samplestorage.create_data_link(DataLink(
+        uuid.uuid4(), DataUnitID(UPA('1/1/1')), sna1, dt(100), UserID('u')))
+    samplestorage.create_data_link(DataLink(
+        uuid.uuid4(), DataUnitID(UPA('1/1/1'), 'foo'), sna2, dt(100), UserID('u')))
+    samplestorage.create_data_link(DataLink(
+        uuid.uuid4(), DataUnitID(UPA('1/1/2')), sna1, dt(100), UserID('u')))
+    samplestorage.expire_data_link(dt(200), UserID('u'), duid=DataUnitID(UPA('1/1/2')))
+    samplestorage.create_data_link(DataLink(
+        uuid.uuid4(), DataUnitID(UPA('1/1/3')), sna2, dt(100), UserID('u')))
+
+    expected = {'ws_1_1_1': 2, 'ws_1_1_2': 0, 'ws_1_1_3': 1, f'sv_{id1}_1': 1, f'sv_{id1}_2': 2}
+    assert _get_link_counts(samplestorage) == expected
+
+    # this is very naughty
+    samplestorage._col_data_link_count.truncate()
+
+    # this is also very naughty
+    ArangoSampleStorage(
+        samplestorage._db,
+        samplestorage._col_sample.name,
+        samplestorage._col_version.name,
+        samplestorage._col_ver_edge.name,
+        samplestorage._col_nodes.name,
+        samplestorage._col_node_edge.name,
+        samplestorage._col_ws.name,
+        samplestorage._col_data_link.name,
+        samplestorage._col_data_link_count.name,
+        samplestorage._col_meta.name,
+        samplestorage._col_node_content.name,
+        samplestorage._col_schema.name)
+
+    # counts for objects and versions with no extant links aren't recreated
+    del expected['ws_1_1_2']
+    assert _get_link_counts(samplestorage) == expected
+
+
 def test_fail_startup_bad_args(arango):
     samplestorage_method(arango)
     db = arango.client.db(TEST_DB_NAME, TEST_USER, TEST_PWD)
@@ -443,27 +533,39 @@ def test_fail_startup_bad_args(arango):
     ne = TEST_COL_NODE_EDGE
     ws = TEST_COL_WS_OBJ_VER
     dl = TEST_COL_DATA_LINK
+    dlc = TEST_COL_DATA_LINK_COUNT
+    md = TEST_COL_META
+    nc = TEST_COL_NODE_CONTENT
     sc = TEST_COL_SCHEMA
 
     def nw():
         datetime.datetime.fromtimestamp(1, tz=datetime.timezone.utc)
 
-    _fail_startup(None, s, v, ve, n, ne, ws, dl, sc, nw,
+    _fail_startup(None, s, v, ve, n, ne, ws, dl, dlc, md, nc, sc, nw,
                   ValueError('db cannot be a value that evaluates to false'))
-    _fail_startup(db, '', v, ve, n, ne, ws, dl, sc, nw, MissingParameterError('sample_collection'))
-    _fail_startup(db, s, '', ve, n, ne, ws, dl, sc, nw, MissingParameterError(
+    _fail_startup(db, '', v, ve, n, ne, ws, dl, dlc, md, nc, sc, nw, MissingParameterError(
+        'sample_collection'))
+    _fail_startup(db, s, '', ve, n, ne, ws, dl, dlc, md, nc, sc, nw, MissingParameterError(
         'version_collection'))
-    _fail_startup(db, s, v, '', n, ne, ws, dl, sc, nw, MissingParameterError(
+    _fail_startup(db, s, v, '', n, ne, ws, dl, dlc, md, nc, sc, nw, MissingParameterError(
         'version_edge_collection'))
-    _fail_startup(db, s, v, ve, '', ne, ws, dl, sc, nw, MissingParameterError('node_collection'))
-    _fail_startup(db, s, v, ve, n, '', ws, dl, sc, nw, MissingParameterError(
+    _fail_startup(db, s, v, ve, '', ne, ws, dl, dlc, md, nc, sc, nw, MissingParameterError(
+        'node_collection'))
+    _fail_startup(db, s, v, ve, n, '', ws, dl, dlc, md, nc, sc, nw, MissingParameterError(
         'node_edge_collection'))
-    _fail_startup(db, s, v, ve, n, ne, '', dl, sc, nw, MissingParameterError(
+    _fail_startup(db, s, v, ve, n, ne, '', dl, dlc, md, nc, sc, nw, MissingParameterError(
         'workspace_object_version_shadow_collection'))
-    _fail_startup(db, s, v, ve, n, ne, ws, '', sc, nw, MissingParameterError(
+    _fail_startup(db, s, v, ve, n, ne, ws, '', dlc, md, nc, sc, nw, MissingParameterError(
         'data_link_collection'))
-    _fail_startup(db, s, v, ve, n, ne, ws, dl, '', nw, MissingParameterError('schema_collection'))
-    _fail_startup(db, s, v, ve, n, ne, ws, dl, sc, None,
+    _fail_startup(db, s, v, ve, n, ne, ws, dl, '', md, nc, sc, nw, MissingParameterError(
+        'data_link_count_collection'))
+    _fail_startup(db, s, v, ve, n, ne, ws, dl, dlc, '', nc, sc, nw, MissingParameterError(
+        'metadata_collection'))
+    _fail_startup(db, s, v, ve, n, ne, ws, dl, dlc, md, '', sc, nw, MissingParameterError(
+        'node_content_collection'))
+    _fail_startup(db, s, v, ve, n, ne, ws, dl, dlc, md, nc, '', nw, MissingParameterError(
+        'schema_collection'))
+    _fail_startup(db, s, v, ve, n, ne, ws, dl, dlc, md, nc, sc, None,
                   ValueError('now cannot be a value that evaluates to false'))
 
 
@@ -479,26 +581,35 @@ def test_fail_startup_incorrect_collection_type(arango):
     ne = TEST_COL_NODE_EDGE
     ws = TEST_COL_WS_OBJ_VER
     dl = TEST_COL_DATA_LINK
+    dlc = TEST_COL_DATA_LINK_COUNT
+    md = TEST_COL_META
+    nc = TEST_COL_NODE_CONTENT
     sc = TEST_COL_SCHEMA
 
     def nw():
         datetime.datetime.fromtimestamp(1, tz=datetime.timezone.utc)
 
-    _fail_startup(db, 'sampleedge', v, ve, n, ne, ws, dl, sc, nw, StorageInitError(
+    _fail_startup(db, 'sampleedge', v, ve, n, ne, ws, dl, dlc, md, nc, sc, nw, StorageInitError(
         'sample collection sampleedge is not a vertex collection'))
-    _fail_startup(db, s, ve, ve, n, ne, ws, dl, sc, nw, StorageInitError(
+    _fail_startup(db, s, ve, ve, n, ne, ws, dl, dlc, md, nc, sc, nw, StorageInitError(
         'version collection ver_to_sample is not a vertex collection'))
-    _fail_startup(db, s, v, v, n, ne, ws, dl, sc, nw, StorageInitError(
+    _fail_startup(db, s, v, v, n, ne, ws, dl, dlc, md, nc, sc, nw, StorageInitError(
         'version edge collection versions is not an edge collection'))
-    _fail_startup(db, s, v, ve, ne, ne, ws, dl, sc, nw, StorageInitError(
+    _fail_startup(db, s, v, ve, ne, ne, ws, dl, dlc, md, nc, sc, nw, StorageInitError(
         'node collection node_edges is not a vertex collection'))
-    _fail_startup(db, s, v, ve, n, n, ws, dl, sc, nw, StorageInitError(
+    _fail_startup(db, s, v, ve, n, n, ws, dl, dlc, md, nc, sc, nw, StorageInitError(
         'node edge collection nodes is not an edge collection'))
-    _fail_startup(db, s, v, ve, n, ne, dl, dl, sc, nw, StorageInitError(
+    _fail_startup(db, s, v, ve, n, ne, dl, dl, dlc, md, nc, sc, nw, StorageInitError(
         'workspace object version shadow collection data_link is not a vertex collection'))
-    _fail_startup(db, s, v, ve, n, ne, ws, ws, sc, nw, StorageInitError(
+    _fail_startup(db, s, v, ve, n, ne, ws, ws, dlc, md, nc, sc, nw, StorageInitError(
         'data link collection ws_obj_ver is not an edge collection'))
-    _fail_startup(db, s, v, ve, n, ne, ws, dl, ne, nw, StorageInitError(
+    _fail_startup(db, s, v, ve, n, ne, ws, dl, dl, md, nc, sc, nw, StorageInitError(
+        'data link count collection data_link is not a vertex collection'))
+    _fail_startup(db, s, v, ve, n, ne, ws, dl, dlc, dl, nc, sc, nw, StorageInitError(
+        'metadata collection data_link is not a vertex collection'))
+    _fail_startup(db, s, v, ve, n, ne, ws, dl, dlc, md, dl, sc, nw, StorageInitError(
+        'node content collection data_link is not a vertex collection'))
+    _fail_startup(db, s, v, ve, n, ne, ws, dl, dlc, md, nc, ne, nw, StorageInitError(
         'schema collection node_edges is not a vertex collection'))
 
 
@@ -511,6 +622,9 @@ def _fail_startup(
         colnodeedge,
         colws,
         coldatalink,
+        coldatalinkcount,
+        colmeta,
+        colnodecontent,
         colschema,
         now,
         expected):
@@ -525,6 +639,9 @@ def _fail_startup(
             colnodeedge,
             colws,
             coldatalink,
+            coldatalinkcount,
+            colmeta,
+            colnodecontent,
             colschema,
             now=now)
     assert_exception_correct(got.value, expected)
@@ -538,6 +655,9 @@ def test_indexes_created(samplestorage):
                    if not x['name'].startswith('_')])
     assert cols == [
         'data_link',
+        'data_link_count',
+        'meta',
+        'node_content',
         'node_edges',
         'nodes',
         'samples',
@@ -547,20 +667,33 @@ def test_indexes_created(samplestorage):
         'ws_obj_ver']
 
     indexes = samplestorage._col_sample.indexes()
-    assert len(indexes) == 1
+    assert len(indexes) == 6
     assert indexes[0]['fields'] == ['_key']
+    _check_index(indexes[1], ['acls.owner', 'saved', 'id'])
+    _check_index(indexes[2], ['acls.admin[*]'])
+    _check_index(indexes[3], ['acls.write[*]'])
+    _check_index(indexes[4], ['acls.read[*]'])
+    _check_index(indexes[5], ['acls.pubread', 'saved', 'id'])
 
     indexes = samplestorage._col_nodes.indexes()
-    assert len(indexes) == 3
+    assert len(indexes) == 6
     assert indexes[0]['fields'] == ['_key']
     _check_index(indexes[1], ['uuidver'])
-    _check_index(indexes[2], ['ver'])
+    _check_index(indexes[2], ['ver', 'saved'])
+    assert indexes[3]['fields'] == ['lat', 'lon']
+    assert indexes[3]['type'] == 'geo'
+    assert indexes[4]['fields'] == ['lat', 'lon']
+    assert indexes[4]['type'] == 'persistent'
+    assert indexes[4]['sparse'] is True
+    _check_index(indexes[5], ['content', 'latest'])
 
     indexes = samplestorage._col_version.indexes()
-    assert len(indexes) == 3
+    assert len(indexes) == 5
     assert indexes[0]['fields'] == ['_key']
     _check_index(indexes[1], ['uuidver'])
-    _check_index(indexes[2], ['ver'])
+    _check_index(indexes[2], ['ver', 'saved'])
+    _check_index(indexes[3], ['derivedver'])
+    _check_index(indexes[4], ['terms[*]'])
 
     indexes = samplestorage._col_node_edge.indexes()
     assert len(indexes) == 3
@@ -589,6 +722,21 @@ def test_indexes_created(samplestorage):
     _check_index(indexes[4], ['samuuidver'])
     _check_index(indexes[5], ['sampleid'])
 
+    indexes = samplestorage._col_data_link_count.indexes()
+    assert len(indexes) == 1
+    assert indexes[0]['fields'] == ['_key']
+
+    indexes = samplestorage._col_meta.indexes()
+    assert len(indexes) == 4
+    assert indexes[0]['fields'] == ['_key']
+    _check_index(indexes[1], ['ok', 'k', 'v'])
+    _check_index(indexes[2], ['content', 'ok', 'k'])
+    _check_index(indexes[3], ['ok', 'k', 'cu', 'cv'])
+
+    indexes = samplestorage._col_node_content.indexes()
+    assert len(indexes) == 1
+    assert indexes[0]['fields'] == ['_key']
+
     indexes = samplestorage._col_schema.indexes()
     assert len(indexes) == 1
     assert indexes[0]['fields'] == ['_key']
@@ -674,6 +822,266 @@ def test_consistency_checker_run(samplestorage):
     time.sleep(1)
 
 
+def test_consistency_checker_watermark(samplestorage):
+    now = [dt(10000)]
+    # this is very naughty
+    ss = ArangoSampleStorage(
+        samplestorage._db,
+        samplestorage._col_sample.name,
+        samplestorage._col_version.name,
+        samplestorage._col_ver_edge.name,
+        samplestorage._col_nodes.name,
+        samplestorage._col_node_edge.name,
+        samplestorage._col_ws.name,
+        samplestorage._col_data_link.name,
+        samplestorage._col_data_link_count.name,
+        samplestorage._col_meta.name,
+        samplestorage._col_node_content.name,
+        samplestorage._col_schema.name,
+        now=lambda: now[0])
+    assert ss._checker_watermark == 6400
+
+    id1 = uuid.UUID('1234567890abcdef1234567890abcdef')
+    id2 = uuid.UUID('1234567890abcdef1234567890abcdea')
+    n1 = SampleNode('root')
+    n2 = SampleNode('kid1', SubSampleType.TECHNICAL_REPLICATE, 'root')
+    assert ss.save_sample(SavedSample(id1, UserID('u'), [n1, n2], dt(6000), 'foo')) is True
+    assert ss.save_sample(SavedSample(id2, UserID('u'), [n1, n2], dt(9000), 'foo')) is True
+    ss._col_version.update_match({}, {'ver': -1})
+    ss._col_nodes.update_match({'name': 'kid1'}, {'ver': -1})
+    ss._col_sample.delete(str(id2))
+
+    # id1 was saved before the watermark and is not checked
+    assert _check_db_updated(ss) == {'checked': 1, 'updated': 0, 'deleted': 0, 'pending': 1}
+    assert ss._checker_watermark == 6400
+    assert ss._col_version.find({'id': str(id1)}).next()['ver'] == -1
+
+    now[0] = dt(12601)
+    ss._checker_watermark = None  # check all docs
+    assert _check_db_updated(ss) == {'checked': 2, 'updated': 1, 'deleted': 1, 'pending': 0}
+    assert ss._checker_watermark == 9001
+
+    assert ss._col_version.count() == 1
+    assert ss._col_ver_edge.count() == 1
+    assert ss._col_nodes.count() == 2
+    assert ss._col_node_edge.count() == 2
+    for col in [ss._col_version, ss._col_nodes]:
+        for d in col.all():
+            assert d['id'] == str(id1)
+            assert d['ver'] == 1
+
+    assert _check_db_updated(ss) == {'checked': 0, 'updated': 0, 'deleted': 0, 'pending': 0}
+
+
+def test_consistency_checker_lease(samplestorage):
+    # this is very naughty
+    ss = _samplestorage_with_max_links(samplestorage, 10000)
+    col = samplestorage._col_schema
+
+    assert samplestorage._acquire_checker_lease() is True
+    assert ss._acquire_checker_lease() is False
+    assert samplestorage._acquire_checker_lease() is True  # renew
+
+    lease = col.get('checkerlease')
+    assert lease['holder'] == samplestorage._checker_id
+    assert 179 < lease['expires'] - time.time() < 181
+
+    # startup ignores the lease document
+    _samplestorage_with_max_links(samplestorage, 10000)
+
+    # the lease is taken over when it expires
+    col.update({'_key': 'checkerlease', 'expires': time.time() - 1})
+    assert ss._acquire_checker_lease() is True
+    assert samplestorage._acquire_checker_lease() is False
+    assert col.get('checkerlease')['holder'] == ss._checker_id
+
+    # only the holder can release the lease
+    samplestorage.stop_consistency_checker()
+    assert col.get('checkerlease')['holder'] == ss._checker_id
+    ss.stop_consistency_checker()
+    assert col.get('checkerlease') is None
+    assert samplestorage._acquire_checker_lease() is True
+
+    ss.start_consistency_checker(interval_sec=2)
+    assert ss._checker_lease_sec == 6
+    ss.stop_consistency_checker()
+
+
+def _remove_derived_data(samplestorage):
+    # this is very naughty - simulate sample versions saved before the derived data existed
+    samplestorage._col_version.update_match({}, {'derivedver': None}, keep_none=False)
+    samplestorage._col_meta.truncate()
+
+
+def test_update_derived_data_metadata(samplestorage):
+    id1, id2, id3 = _save_search_samples(samplestorage)
+    _remove_derived_data(samplestorage)
+    # an unversioned sample version is skipped until the version is set
+    samplestorage._col_version.update_match({'id': str(id3)}, {'ver': -1})
+
+    def search():
+        return samplestorage.search_samples(
+            [MetadataCondition('material', 'value', prefix='soil')], UserID('user'),
+            check_acls=False)
+
+    assert search() == []
+
+    assert samplestorage._update_derived_data() == 3
+    assert search() == [SampleAddress(id2, 1), SampleAddress(id1, 1), SampleAddress(id1, 2)]
+    assert samplestorage._update_derived_data() == 0
+
+    samplestorage._col_version.update_match({'id': str(id3)}, {'ver': 1})
+    assert samplestorage._update_derived_data() == 1
+    assert samplestorage.search_samples(
+        [MetadataCondition('material', 'value', equals='Soil')], UserID('user'),
+        check_acls=False) == [SampleAddress(id3, 1)]
+    assert {d['derivedver'] for d in samplestorage._col_version.all()} == {2}
+
+
+def test_update_derived_data_canonical_values(samplestorage):
+    id1, id2, id3 = _save_search_samples(samplestorage)
+    # metadata documents saved before canonical values were added
+    samplestorage._col_version.update_match({}, {'derivedver': None}, keep_none=False)
+    samplestorage._col_meta.update_match({}, {'cv': None, 'cu': None}, keep_none=False)
+
+    def search(cond):
+        return samplestorage.search_samples([cond], UserID('user'), check_acls=False)
+
+    assert search(MetadataCondition('depth', 'value', minimum=0.1, maximum=6, units='m')) == []
+
+    assert samplestorage._update_derived_data() == 4
+    # includes the first version of a sample with a later version
+    assert search(MetadataCondition('depth', 'value', minimum=0.1, maximum=6, units='m')) == [
+        SampleAddress(id1, 1), SampleAddress(id1, 2)]
+    assert search(MetadataCondition('depth', 'value', minimum=600, maximum=800, units='cm')) == [
+        SampleAddress(id2, 1)]
+
+
+def test_update_derived_data_latest_version_flags(samplestorage):
+    id1, id2, id3 = _save_search_samples(samplestorage)
+    _remove_derived_data(samplestorage)
+    samplestorage._col_nodes.update_match({}, {'latest': None}, keep_none=False)
+
+    assert samplestorage.count_metadata_values('depth', 'value', None, check_acls=False) == []
+
+    assert samplestorage._update_derived_data() == 4
+    assert samplestorage.count_metadata_values('depth', 'value', None, check_acls=False) == [
+        (7.5, 1), (20, 1), ('5', 1)]
+    uuidver1 = samplestorage._col_sample.get(str(id1))['vers'][0]
+    for n in samplestorage._col_nodes.all():
+        assert n['latest'] is (n['uuidver'] != uuidver1)
+
+
+def test_update_derived_data_replaces_node_meta_docs(samplestorage):
+    id1, id2, id3 = _save_search_samples(samplestorage)
+    _remove_derived_data(samplestorage)
+    uuidver = samplestorage._col_sample.get(str(id2))['vers'][0]
+    oldkeys = samplestorage._create_node_meta_keys(
+        samplestorage.get_sample(id2), uuid.UUID(uuidver))
+    assert len(oldkeys) == 4
+    # this is very naughty - simulate metadata documents saved per node document and node
+    # documents saved before node content was content addressed
+    samplestorage._col_meta.insert_many([
+        {'_key': k, 'id': str(id2), 'uuidver': uuidver, 'node': 'root', 'latest': True,
+         'ok': 'material', 'k': 'value', 'v': 'soil'}
+        for k in oldkeys])
+    samplestorage._db.aql.execute(
+        """
+        FOR n in @@col
+            FILTER n.uuidver == @uuidver
+            LET c = DOCUMENT(@@content, n.content)
+            UPDATE n WITH {content: null, cmeta: c.cmeta, ucmeta: c.ucmeta, smeta: c.smeta}
+                IN @@col
+            OPTIONS {keepNull: false}
+        """,
+        bind_vars={'@col': TEST_COL_NODES, '@content': TEST_COL_NODE_CONTENT,
+                   'uuidver': uuidver}
+    )
+
+    def search():
+        return samplestorage.search_samples(
+            [MetadataCondition('material', 'value', prefix='soil')], UserID('user'),
+            check_acls=False)
+
+    # metadata documents without a content key are ignored
+    assert search() == []
+
+    assert samplestorage._update_derived_data() == 4
+    assert search() == [SampleAddress(id2, 1), SampleAddress(id1, 1), SampleAddress(id1, 2)]
+    for k in oldkeys:
+        assert samplestorage._col_meta.get(k) is None
+    for n in samplestorage._col_nodes.find({'uuidver': uuidver}):
+        assert len(n['content']) == 64
+    # one document per node content document, metadata key, and value key
+    assert samplestorage._col_meta.count() == 15
+
+
+def test_update_derived_data_terms(samplestorage):
+    id1, id2, id3 = _save_text_search_samples(samplestorage)
+    _remove_derived_data(samplestorage)
+    samplestorage._col_version.update_match({}, {'terms': None}, keep_none=False)
+
+    def search(*terms):
+        return samplestorage.search_samples_by_text(
+            list(terms), UserID('user'), check_acls=False)
+
+    assert search('soil', 'yellowstone', '2019') == []
+
+    assert samplestorage._update_derived_data() == 4
+    assert search('soil', 'yellowstone', '2019') == [
+        (SampleAddress(id2, 1), 3),
+        (SampleAddress(id1, 1), 2),
+        (SampleAddress(id3, 1), 1),
+        (SampleAddress(id1, 2), 1),
+        ]
+
+
+def test_update_derived_data_locations(samplestorage):
+    id1, id2, id3 = _save_location_samples(samplestorage)
+    _remove_derived_data(samplestorage)
+    samplestorage._col_nodes.update_match({}, {'lat': None, 'lon': None}, keep_none=False)
+
+    def search(bb):
+        return samplestorage.search_samples_by_location(
+            LocationCondition(bounding_box=bb), UserID('user'), check_acls=False)
+
+    assert search((-90, -180, 90, 180)) == []
+
+    assert samplestorage._update_derived_data() == 4
+    assert search((-90, -180, 90, 180)) == [
+        SampleAddress(id2, 1), SampleAddress(id1, 1), SampleAddress(id1, 2)]
+    assert samplestorage.search_samples_by_location(
+        LocationCondition(center=(44.4605, -110.8281), radius=100), UserID('user'),
+        check_acls=False) == [SampleAddress(id1, 1)]
+    # nodes without a location are unchanged
+    assert samplestorage._col_nodes.find({'id': str(id3)}).next().get('lat') is None
+
+
+def test_update_derived_data_batches(samplestorage):
+    ids = [uuid.UUID(f'1234567890abcdef1234567890abcde{c}') for c in 'abc']
+    for id_ in ids:
+        assert samplestorage.save_sample(SavedSample(id_, UserID('user'), [
+            SampleNode('root', controlled_metadata={'material': {'value': 'soil'}})
+            ], dt(1))) is True
+    _remove_derived_data(samplestorage)
+    # a version with missing nodes is marked so the batches always end
+    samplestorage._col_nodes.delete_match({'id': str(ids[1])})
+
+    with patch('SampleService.core.storage.arango_sample_storage._CHECKER_BATCH_SIZE', 2):
+        assert samplestorage._update_derived_data() == 3
+
+    assert samplestorage.search_samples(
+        [MetadataCondition('material', 'value', equals='soil')], UserID('user'),
+        check_acls=False) == [SampleAddress(ids[0], 1), SampleAddress(ids[2], 1)]
+    assert samplestorage._update_derived_data() == 0
+
+
+def _check_db_updated(samplestorage):
+    stats = samplestorage._check_db_updated()
+    assert stats.pop('duration_sec') >= 0
+    return stats
+
+
 def dt(timestamp):
     return datetime.datetime.fromtimestamp(timestamp, tz=datetime.timezone.utc)
 
@@ -727,6 +1135,57 @@ def test_save_sample_fail_duplicate_race_condition(samplestorage):
         SavedSample(id_, UserID('user'), [TEST_NODE], dt(1), 'bar')) is False
 
 
+def test_save_samples_and_get_samples(samplestorage):
+    n1 = SampleNode('root')
+    n2 = SampleNode(
+        'kid1', SubSampleType.TECHNICAL_REPLICATE, 'root',
+        {'a': {'b': 'c', 'd': 'e'}, 'f': {'g': 'h'}},
+        {'m': {'n': 'o'}},
+        [SourceMetadata('a', 'sk', {'a': 'b'})])
+    n3 = SampleNode('root2', user_metadata={'f': {'g': 'h'}})
+
+    id1 = uuid.UUID('1234567890abcdef1234567890abcdef')
+    id2 = uuid.UUID('1234567890abcdef1234567890abcdea')
+
+    samplestorage.save_samples([
+        SavedSample(id1, UserID('auser'), [n1, n2], dt(8), 'foo'),
+        SavedSample(id2, UserID('buser'), [n3], dt(9))])
+
+    assert samplestorage.get_sample(id1) == SavedSample(
+        id1, UserID('auser'), [n1, n2], dt(8), 'foo', 1)
+    assert samplestorage.get_sample(id2) == SavedSample(
+        id2, UserID('buser'), [n3], dt(9), None, 1)
+
+    assert samplestorage.get_sample_acls(id1) == SampleACL(
+        UserID('auser'), dt(8), public_read=False)
+    assert samplestorage.get_sample_acls(id2) == SampleACL(
+        UserID('buser'), dt(9), public_read=False)
+
+    # check a new version can be saved on top of a bulk saved sample
+    assert samplestorage.save_sample_version(
+        SavedSample(id2, UserID('buser'), [n1], dt(10), 'bar')) == 2
+    assert samplestorage.get_sample(id2) == SavedSample(
+        id2, UserID('buser'), [n1], dt(10), 'bar', 2)
+
+
+def test_save_samples_fail_bad_input(samplestorage):
+    s = SavedSample(uuid.UUID('1234567890abcdef1234567890abcdef'), UserID('u'), [TEST_NODE],
+                    dt(1))
+    _save_samples_fail(samplestorage, None, ValueError(
+        'samples cannot be a value that evaluates to false'))
+    _save_samples_fail(samplestorage, [], ValueError(
+        'samples cannot be a value that evaluates to false'))
+    _save_samples_fail(samplestorage, [s, None], ValueError(
+        'Index 1 of iterable samples cannot be a value that evaluates to false'))
+    _save_samples_fail(samplestorage, [s, s], ValueError('samples contains duplicate IDs'))
+
+
+def _save_samples_fail(samplestorage, samples, expected):
+    with raises(Exception) as got:
+        samplestorage.save_samples(samples)
+    assert_exception_correct(got.value, expected)
+
+
 def test_get_sample_with_non_updated_version_doc(samplestorage):
     # simulates the case where a save failed part way through. The version UUID was added to the
     # sample doc but the node and version doc updates were not completed
@@ -784,8 +1243,8 @@ def test_get_sample_with_non_updated_node_doc(samplestorage):
 
 def test_get_sample_with_missing_source_metadata_key(samplestorage, arango):
     """
-    Backwards compatibility test. Checks that a missing smeta key in the sample node returns an
-    empty source metadata list.
+    Backwards compatibility test. Checks that a missing smeta key in a sample node saved before
+    node content was content addressed returns an empty source metadata list.
     """
     id1 = uuid.UUID('1234567890abcdef1234567890abcdef')
     assert samplestorage.save_sample(SavedSample(
@@ -803,7 +1262,8 @@ def test_get_sample_with_missing_source_metadata_key(samplestorage, arango):
         """
         FOR n in @@col
             FILTER n.name == @name
-            UPDATE n WITH {smeta: null} IN @@col
+            UPDATE n WITH {content: null, cmeta: [{k: 'c', ok: 'a', v: 'd'}], ucmeta: []}
+                IN @@col
             OPTIONS {keepNull: false}
         """,
         bind_vars={'@col': TEST_COL_NODES, 'name': 'mynode'}
@@ -830,6 +1290,7 @@ def test_get_sample_with_missing_source_metadata_key(samplestorage, arango):
         'type': 'BIOLOGICAL_REPLICATE',
         'parent': None,
         'index': 0,
+        'latest': True,
         'cmeta': [{'k': 'c', 'ok': 'a', 'v': 'd'}],
         'ucmeta': [],
     }
@@ -843,6 +1304,110 @@ def test_get_sample_with_missing_source_metadata_key(samplestorage, arango):
         1)
 
 
+def test_save_sample_version_shares_node_content(samplestorage):
+    id_ = uuid.UUID('1234567890abcdef1234567890abcdef')
+    id2 = uuid.UUID('1234567890abcdef1234567890abcdea')
+    root = SampleNode('root', user_metadata={'a': {'b': 'c'}})
+    kid1 = SampleNode('kid1', SubSampleType.SUB_SAMPLE, 'root', {'a': {'b': 'c'}})
+    kid1_2 = SampleNode('kid1', SubSampleType.SUB_SAMPLE, 'root', {'a': {'b': 'd'}})
+    # same content in a different order
+    kid2 = SampleNode('kid2', SubSampleType.SUB_SAMPLE, 'root', {'a': {'b': 'c', 'x': 'y'}})
+    kid2_2 = SampleNode('kid2', SubSampleType.SUB_SAMPLE, 'root', {'a': {'x': 'y', 'b': 'c'}})
+    assert samplestorage.save_sample(
+        SavedSample(id_, UserID('user'), [root, kid1, kid2], dt(1), 'foo')) is True
+    assert samplestorage.save_sample_version(
+        SavedSample(id_, UserID('user'), [root, kid1_2, kid2_2], dt(2), 'foo')) == 2
+    samplestorage.save_samples([SavedSample(id2, UserID('user'), [root], dt(3), 'bar')])
+
+    assert samplestorage._col_nodes.count() == 7
+    # root, kid1 x 2, kid2
+    assert samplestorage._col_node_content.count() == 4
+    for n in samplestorage._col_nodes.all():
+        assert len(n['content']) == 64
+        assert 'cmeta' not in n
+        assert 'ucmeta' not in n
+        assert 'smeta' not in n
+
+    assert samplestorage.get_sample(id_, 1) == SavedSample(
+        id_, UserID('user'), [root, kid1, kid2], dt(1), 'foo', 1)
+    assert samplestorage.get_sample(id_, 2) == SavedSample(
+        id_, UserID('user'), [root, kid1_2, kid2_2], dt(2), 'foo', 2)
+    assert samplestorage.get_sample(id2) == SavedSample(
+        id2, UserID('user'), [root], dt(3), 'bar', 1)
+    assert samplestorage.get_changed_nodes(id_, 1, 2) == ([kid1], [kid1_2])
+
+
+def test_save_sample_version_shares_metadata_docs(samplestorage):
+    id_ = uuid.UUID('1234567890abcdef1234567890abcdef')
+    id2 = uuid.UUID('1234567890abcdef1234567890abcdea')
+    root = SampleNode('root', controlled_metadata={'a': {'b': 'c'}, 'x': {'y': 'z'}})
+    kid = SampleNode('kid', SubSampleType.SUB_SAMPLE, 'root', {'a': {'b': 'd'}})
+    kid_2 = SampleNode('kid', SubSampleType.SUB_SAMPLE, 'root', {'a': {'b': 'e'}})
+    assert samplestorage.save_sample(
+        SavedSample(id_, UserID('user'), [root, kid], dt(1), 'foo')) is True
+    assert samplestorage._col_meta.count() == 3
+    # only the changed node adds metadata documents
+    assert samplestorage.save_sample_version(
+        SavedSample(id_, UserID('user'), [root, kid_2], dt(2), 'foo')) == 2
+    assert samplestorage._col_meta.count() == 4
+    samplestorage.save_samples([SavedSample(id2, UserID('user'), [root], dt(3), 'bar')])
+    assert samplestorage._col_meta.count() == 4
+
+    contentkeys = {n['content'] for n in samplestorage._col_nodes.all()}
+    for m in samplestorage._col_meta.all():
+        assert m['content'] in contentkeys
+        assert 'uuidver' not in m
+
+    def search(value):
+        return samplestorage.search_samples(
+            [MetadataCondition('a', 'b', equals=value)], UserID('user'), check_acls=False)
+
+    assert search('c') == [SampleAddress(id2, 1), SampleAddress(id_, 1), SampleAddress(id_, 2)]
+    assert search('d') == [SampleAddress(id_, 1)]
+    assert search('e') == [SampleAddress(id_, 2)]
+    assert samplestorage.search_samples(
+        [MetadataCondition('a', 'b', equals='c'), MetadataCondition('a', 'b', equals='e')],
+        UserID('user'), check_acls=False) == [SampleAddress(id_, 2)]
+    assert samplestorage.count_metadata_values('a', 'b', None, check_acls=False) == [
+        ('c', 2), ('e', 1)]
+
+
+def test_get_changed_nodes_with_uncontent_addressed_node_docs(samplestorage):
+    """
+    Backwards compatibility test. Checks that node docs saved before node content was content
+    addressed are compared correctly.
+    """
+    id_ = uuid.UUID('1234567890abcdef1234567890abcdef')
+    root1 = SampleNode('root', user_metadata={'a': {'b': 'c'}})
+    root2 = SampleNode('root', user_metadata={'a': {'b': 'd'}})
+    kid = SampleNode('kid', SubSampleType.SUB_SAMPLE, 'root')
+    assert samplestorage.save_sample(
+        SavedSample(id_, UserID('user'), [root1, kid], dt(1), 'foo')) is True
+    assert samplestorage.save_sample_version(
+        SavedSample(id_, UserID('user'), [root2, kid], dt(2), 'foo')) == 2
+    uuidver1 = samplestorage._col_sample.get(str(id_))['vers'][0]
+
+    # this is very naughty
+    samplestorage._db.aql.execute(
+        """
+        FOR n in @@col
+            FILTER n.uuidver == @uuidver
+            LET c = DOCUMENT(@@content, n.content)
+            UPDATE n WITH {content: null, cmeta: c.cmeta, ucmeta: c.ucmeta, smeta: c.smeta}
+                IN @@col
+            OPTIONS {keepNull: false}
+        """,
+        bind_vars={'@col': TEST_COL_NODES, '@content': TEST_COL_NODE_CONTENT,
+                   'uuidver': uuidver1}
+    )
+
+    assert samplestorage.get_sample(id_, 1) == SavedSample(
+        id_, UserID('user'), [root1, kid], dt(1), 'foo', 1)
+    assert samplestorage.get_changed_nodes(id_, 1, 2) == ([root1], [root2])
+    assert samplestorage.get_changed_nodes(id_, 2, 1) == ([root2], [root1])
+    assert samplestorage.get_changed_nodes(id_, 1, 1) == ([], [])
+
+
 def test_get_sample_fail_bad_input(samplestorage):
     with raises(Exception) as got:
         samplestorage.get_sample(None)
@@ -967,6 +1532,825 @@ def test_get_sample_fail_no_node_docs_2_versions(samplestorage):
             '12345678-90ab-cdef-1234-567890abcdef'))
 
 
+def test_get_sample_and_acls(samplestorage):
+    id_ = uuid.UUID('1234567890abcdef1234567890abcdef')
+    n1 = SampleNode('root')
+    n2 = SampleNode('kid1', SubSampleType.TECHNICAL_REPLICATE, 'root', {'a': {'b': 'c'}})
+    assert samplestorage.save_sample(
+        SavedSample(id_, UserID('user'), [n1, n2], dt(1), 'foo')) is True
+    assert samplestorage.save_sample_version(
+        SavedSample(id_, UserID('user2'), [TEST_NODE], dt(2), 'bar')) == 2
+    samplestorage.replace_sample_acls(id_, SampleACL(
+        UserID('user'), dt(3), [UserID('foo')], read=[UserID('bar')], public_read=True))
+
+    acls = SampleACL(
+        UserID('user'), dt(3), [UserID('foo')], read=[UserID('bar')], public_read=True)
+
+    assert samplestorage.get_sample_and_acls(id_) == (
+        SavedSample(id_, UserID('user2'), [TEST_NODE], dt(2), 'bar', 2), acls)
+
+    assert samplestorage.get_sample_and_acls(id_, version=1) == (
+        SavedSample(id_, UserID('user'), [n1, n2], dt(1), 'foo', 1), acls)
+
+
+def test_get_sample_and_acls_with_non_updated_node_doc(samplestorage):
+    id_ = uuid.UUID('1234567890abcdef1234567890abcdef')
+    assert samplestorage.save_sample(
+        SavedSample(id_, UserID('user'), [TEST_NODE], dt(1), 'foo')) is True
+
+    # this is very naughty
+    samplestorage._col_nodes.update_match({}, {'ver': -1})
+
+    assert samplestorage.get_sample_and_acls(id_) == (
+        SavedSample(id_, UserID('user'), [TEST_NODE], dt(1), 'foo', 1),
+        SampleACL(UserID('user'), dt(1), public_read=False))
+
+    for v in samplestorage._col_nodes.all():
+        assert v['ver'] == 1
+
+
+def test_get_sample_and_acls_fail(samplestorage):
+    id_ = uuid.UUID('1234567890abcdef1234567890abcdef')
+    assert samplestorage.save_sample(
+        SavedSample(id_, UserID('user'), [TEST_NODE], dt(1), 'foo')) is True
+
+    _get_sample_and_acls_fail(samplestorage, None, None, ValueError(
+        'id_ cannot be a value that evaluates to false'))
+    _get_sample_and_acls_fail(
+        samplestorage, uuid.UUID('1234567890abcdef1234567890abcdea'), None,
+        NoSuchSampleError('12345678-90ab-cdef-1234-567890abcdea'))
+    _get_sample_and_acls_fail(
+        samplestorage, id_, 2,
+        NoSuchSampleVersionError('12345678-90ab-cdef-1234-567890abcdef ver 2'))
+
+
+def _get_sample_and_acls_fail(samplestorage, id_, version, expected):
+    with raises(Exception) as got:
+        samplestorage.get_sample_and_acls(id_, version)
+    assert_exception_correct(got.value, expected)
+
+
+def test_get_changed_nodes(samplestorage):
+    id_ = uuid.UUID('1234567890abcdef1234567890abcdef')
+    root = SampleNode('root')
+    same = SampleNode('same', SubSampleType.SUB_SAMPLE, 'root', {'a': {'b': 'c'}})
+    gone = SampleNode('gone', SubSampleType.SUB_SAMPLE, 'root')
+    meta1 = SampleNode('meta', SubSampleType.SUB_SAMPLE, 'root', {'a': {'b': 'c'}},
+                       source_metadata=[SourceMetadata('a', 'sa', {'b': 'd'})])
+    meta2 = SampleNode('meta', SubSampleType.SUB_SAMPLE, 'root', {'a': {'b': 'c'}},
+                       source_metadata=[SourceMetadata('a', 'sa', {'b': 'e'})])
+    type1 = SampleNode('type', SubSampleType.SUB_SAMPLE, 'root')
+    type2 = SampleNode('type', SubSampleType.TECHNICAL_REPLICATE, 'root')
+    parent2 = SampleNode('parent', SubSampleType.SUB_SAMPLE, 'same')
+    parent1 = SampleNode('parent', SubSampleType.SUB_SAMPLE, 'root')
+    new = SampleNode('new', SubSampleType.SUB_SAMPLE, 'root', user_metadata={'x': {'y': 1}})
+    assert samplestorage.save_sample(SavedSample(
+        id_, UserID('user'), [root, same, gone, meta1, type1, parent1], dt(1), 'foo')) is True
+    assert samplestorage.save_sample_version(SavedSample(
+        id_, UserID('user'), [root, new, type2, parent2, same, meta2], dt(2), 'foo')) == 2
+    assert samplestorage.save_sample_version(SavedSample(
+        id_, UserID('user'), [root], dt(3), 'foo')) == 3
+
+    assert samplestorage.get_changed_nodes(id_, 1, 2) == (
+        [gone, meta1, type1, parent1], [new, type2, parent2, meta2])
+    assert samplestorage.get_changed_nodes(id_, 2, 1) == (
+        [new, type2, parent2, meta2], [gone, meta1, type1, parent1])
+    assert samplestorage.get_changed_nodes(id_, 2, 2) == ([], [])
+    assert samplestorage.get_changed_nodes(id_, 1, 3) == (
+        [same, gone, meta1, type1, parent1], [])
+
+
+def test_get_changed_nodes_fail(samplestorage):
+    id_ = uuid.UUID('1234567890abcdef1234567890abcdef')
+    assert samplestorage.save_sample(
+        SavedSample(id_, UserID('user'), [TEST_NODE], dt(1), 'foo')) is True
+
+    _get_changed_nodes_fail(samplestorage, None, 1, 1, ValueError(
+        'id_ cannot be a value that evaluates to false'))
+    _get_changed_nodes_fail(samplestorage, id_, 0, 1, ValueError('version_a must be > 0'))
+    _get_changed_nodes_fail(samplestorage, id_, 1, None, ValueError('version_b must be > 0'))
+    _get_changed_nodes_fail(
+        samplestorage, uuid.UUID('1234567890abcdef1234567890abcdea'), 1, 1,
+        NoSuchSampleError('12345678-90ab-cdef-1234-567890abcdea'))
+    _get_changed_nodes_fail(
+        samplestorage, id_, 2, 1,
+        NoSuchSampleVersionError('12345678-90ab-cdef-1234-567890abcdef ver 2'))
+    _get_changed_nodes_fail(
+        samplestorage, id_, 1, 3,
+        NoSuchSampleVersionError('12345678-90ab-cdef-1234-567890abcdef ver 3'))
+
+
+def _get_changed_nodes_fail(samplestorage, id_, vera, verb, expected):
+    with raises(Exception) as got:
+        samplestorage.get_changed_nodes(id_, vera, verb)
+    assert_exception_correct(got.value, expected)
+
+
+def test_get_samples_and_acls(samplestorage):
+    id1 = uuid.UUID('1234567890abcdef1234567890abcdef')
+    id2 = uuid.UUID('1234567890abcdef1234567890abcdea')
+    n1 = SampleNode('root')
+    n2 = SampleNode('kid1', SubSampleType.TECHNICAL_REPLICATE, 'root', {'a': {'b': 'c'}})
+    assert samplestorage.save_sample(
+        SavedSample(id1, UserID('user'), [n1, n2], dt(1), 'foo')) is True
+    assert samplestorage.save_sample_version(
+        SavedSample(id1, UserID('user'), [TEST_NODE], dt(2), 'bar')) == 2
+    assert samplestorage.save_sample(
+        SavedSample(id2, UserID('user2'), [TEST_NODE], dt(3), 'baz')) is True
+    samplestorage.replace_sample_acls(id2, SampleACL(
+        UserID('user2'), dt(4), read=[UserID('user')]))
+
+    res = samplestorage.get_samples_and_acls([
+        (id1, None),
+        (id1, 1),
+        (id2, 1),
+        (id2, 2),
+        (uuid.UUID('1234567890abcdef1234567890abcdeb'), None),
+        ])
+
+    acls1 = SampleACL(UserID('user'), dt(1), public_read=False)
+    acls2 = SampleACL(UserID('user2'), dt(4), read=[UserID('user')], public_read=False)
+    assert res[:3] == [
+        (acls1, SavedSample(id1, UserID('user'), [TEST_NODE], dt(2), 'bar', 2)),
+        (acls1, SavedSample(id1, UserID('user'), [n1, n2], dt(1), 'foo', 1)),
+        (acls2, SavedSample(id2, UserID('user2'), [TEST_NODE], dt(3), 'baz', 1)),
+        ]
+    assert res[3][0] == acls2
+    assert_exception_correct(res[3][1], NoSuchSampleVersionError(
+        '12345678-90ab-cdef-1234-567890abcdea ver 2'))
+    assert res[4][0] is None
+    assert_exception_correct(res[4][1], NoSuchSampleError(
+        '12345678-90ab-cdef-1234-567890abcdeb'))
+    assert len(res) == 5
+
+
+def test_get_samples_and_acls_fail_bad_input(samplestorage):
+    id_ = uuid.UUID('1234567890abcdef1234567890abcdef')
+    _get_samples_and_acls_fail(samplestorage, None, ValueError(
+        'addresses cannot be a value that evaluates to false'))
+    _get_samples_and_acls_fail(samplestorage, [], ValueError(
+        'addresses cannot be a value that evaluates to false'))
+    _get_samples_and_acls_fail(samplestorage, [(id_, 1), (None, 1)], ValueError(
+        'Index 1 of addresses id_ cannot be a value that evaluates to false'))
+
+
+def _get_samples_and_acls_fail(samplestorage, addresses, expected):
+    with raises(Exception) as got:
+        samplestorage.get_samples_and_acls(addresses)
+    assert_exception_correct(got.value, expected)
+
+
+def _save_search_samples(samplestorage):
+    id1 = uuid.UUID('1234567890abcdef1234567890abcdef')
+    id2 = uuid.UUID('1234567890abcdef1234567890abcdea')
+    id3 = uuid.UUID('1234567890abcdef1234567890abcdeb')
+    assert samplestorage.save_sample(SavedSample(id1, UserID('user'), [
+        SampleNode('root', controlled_metadata={'depth': {'value': 5, 'units': 'm'},
+                                                'material': {'value': 'soil'}}),
+        SampleNode('kid', SubSampleType.TECHNICAL_REPLICATE, 'root',
+                   {'depth': {'value': 10, 'units': 'm'}, 'material': {'value': 'sand'}},
+                   {'depth': {'value': 1000}})
+        ], dt(1), 'foo')) is True
+    assert samplestorage.save_sample_version(SavedSample(id1, UserID('user'), [
+        SampleNode('root', controlled_metadata={'depth': {'value': 20, 'units': 'cm'},
+                                                'material': {'value': 'soilish'}})
+        ], dt(2), 'foo')) == 2
+    assert samplestorage.save_sample(SavedSample(id2, UserID('user2'), [
+        SampleNode('root', controlled_metadata={'depth': {'value': 7.5, 'units': 'm'},
+                                                'material': {'value': 'soil'},
+                                                'wet': {'value': True}})
+        ], dt(3), 'bar')) is True
+    assert samplestorage.save_sample(SavedSample(id3, UserID('user3'), [
+        SampleNode('root', controlled_metadata={'depth': {'value': '5'},
+                                                'material': {'value': 'Soil'}})
+        ], dt(4), 'baz')) is True
+    return id1, id2, id3
+
+
+def test_search_samples_equals(samplestorage):
+    id1, id2, id3 = _save_search_samples(samplestorage)
+
+    def search(cond):
+        return samplestorage.search_samples([cond], UserID('user'), check_acls=False)
+
+    assert search(MetadataCondition('material', 'value', equals='soil')) == [
+        SampleAddress(id2, 1), SampleAddress(id1, 1)]
+    assert search(MetadataCondition('depth', 'units', equals='cm')) == [SampleAddress(id1, 2)]
+    assert search(MetadataCondition('depth', 'value', equals=5)) == [SampleAddress(id1, 1)]
+    assert search(MetadataCondition('depth', 'value', equals='5')) == [SampleAddress(id3, 1)]
+    assert search(MetadataCondition('wet', 'value', equals=True)) == [SampleAddress(id2, 1)]
+    # user metadata isn't searchable
+    assert search(MetadataCondition('depth', 'value', equals=1000)) == []
+    assert search(MetadataCondition('material', 'value', equals='clay')) == []
+
+
+def test_search_samples_range(samplestorage):
+    id1, id2, id3 = _save_search_samples(samplestorage)
+
+    def search(cond):
+        return samplestorage.search_samples([cond], UserID('user'), check_acls=False)
+
+    assert search(MetadataCondition('depth', 'value', minimum=7.5)) == [
+        SampleAddress(id2, 1), SampleAddress(id1, 1), SampleAddress(id1, 2)]
+    # strings never match ranges
+    assert search(MetadataCondition('depth', 'value', maximum=7)) == [SampleAddress(id1, 1)]
+    assert search(MetadataCondition('depth', 'value', minimum=6, maximum=9)) == [
+        SampleAddress(id2, 1)]
+    assert search(MetadataCondition('depth', 'value', minimum=100)) == []
+
+
+def test_search_samples_range_with_units(samplestorage):
+    id1, id2, id3 = _save_search_samples(samplestorage)
+
+    def search(cond):
+        return samplestorage.search_samples([cond], UserID('user'), check_acls=False)
+
+    assert search(MetadataCondition('depth', 'value', minimum=0.1, maximum=6, units='m')) == [
+        SampleAddress(id1, 1), SampleAddress(id1, 2)]
+    assert search(MetadataCondition('depth', 'value', minimum=600, maximum=800, units='cm')) == [
+        SampleAddress(id2, 1)]
+    assert search(MetadataCondition('depth', 'value', maximum=1, units='ft')) == [
+        SampleAddress(id1, 2)]
+    assert search(MetadataCondition('depth', 'value', minimum=1, units='km')) == []
+    # incompatible units never match
+    assert search(MetadataCondition('depth', 'value', minimum=0, units='g')) == []
+
+
+def test_search_samples_prefix(samplestorage):
+    id1, id2, id3 = _save_search_samples(samplestorage)
+
+    def search(cond):
+        return samplestorage.search_samples([cond], UserID('user'), check_acls=False)
+
+    assert search(MetadataCondition('material', 'value', prefix='soil')) == [
+        SampleAddress(id2, 1), SampleAddress(id1, 1), SampleAddress(id1, 2)]
+    assert search(MetadataCondition('material', 'value', prefix='soili')) == [
+        SampleAddress(id1, 2)]
+    assert search(MetadataCondition('material', 'value', prefix='S')) == [SampleAddress(id3, 1)]
+    assert search(MetadataCondition('material', 'value', prefix='s')) == [
+        SampleAddress(id2, 1), SampleAddress(id1, 1), SampleAddress(id1, 2)]
+    assert search(MetadataCondition('depth', 'value', prefix='5')) == [SampleAddress(id3, 1)]
+
+
+def test_search_samples_prefix_ending_in_digit_or_z(samplestorage):
+    # incrementing the last character of these prefixes gives a punctuation character, which
+    # sorts before digits and letters in arango's collation
+    id_ = uuid.UUID('1234567890abcdef1234567890abcdef')
+    assert samplestorage.save_sample(SavedSample(id_, UserID('user'), [
+        SampleNode('root', controlled_metadata={'year': {'value': '2019'},
+                                                'material': {'value': 'quartzite'},
+                                                'color': {'value': 'Zinc gray'}})
+        ], dt(1), 'foo')) is True
+
+    def search(cond):
+        return samplestorage.search_samples([cond], UserID('user'), check_acls=False)
+
+    assert search(MetadataCondition('year', 'value', prefix='2019')) == [SampleAddress(id_, 1)]
+    assert search(MetadataCondition('year', 'value', prefix='9')) == []
+    assert search(MetadataCondition('material', 'value', prefix='quartz')) == [
+        SampleAddress(id_, 1)]
+    assert search(MetadataCondition('color', 'value', prefix='Z')) == [SampleAddress(id_, 1)]
+    assert search(MetadataCondition('color', 'value', prefix='z')) == []
+
+
+def test_search_samples_multiple_conditions(samplestorage):
+    id1, id2, id3 = _save_search_samples(samplestorage)
+
+    def search(*conds):
+        return samplestorage.search_samples(list(conds), UserID('user'), check_acls=False)
+
+    assert search(MetadataCondition('material', 'value', equals='soil'),
+                  MetadataCondition('depth', 'value', minimum=7)) == [
+                      SampleAddress(id2, 1), SampleAddress(id1, 1)]
+    assert search(MetadataCondition('material', 'value', equals='soil'),
+                  MetadataCondition('depth', 'units', equals='m'),
+                  MetadataCondition('wet', 'value', equals=True)) == [SampleAddress(id2, 1)]
+    assert search(MetadataCondition('material', 'value', equals='sand'),
+                  MetadataCondition('depth', 'units', equals='cm')) == []
+
+
+def test_search_samples_acls(samplestorage):
+    id1, id2, id3 = _save_search_samples(samplestorage)
+    samplestorage.replace_sample_acls(id2, SampleACL(
+        UserID('user2'), dt(5), read=[UserID('user')]))
+    samplestorage.replace_sample_acls(id3, SampleACL(UserID('user3'), dt(6), public_read=True))
+    cond = [MetadataCondition('depth', 'value', minimum=0)]
+
+    assert samplestorage.search_samples(cond, UserID('user')) == [
+        SampleAddress(id2, 1), SampleAddress(id1, 1), SampleAddress(id1, 2)]
+    assert samplestorage.search_samples(cond, UserID('user2')) == [SampleAddress(id2, 1)]
+    assert samplestorage.search_samples(cond, UserID('user4')) == []
+    assert samplestorage.search_samples(cond, None) == []
+
+    cond = [MetadataCondition('material', 'value', equals='Soil')]
+    assert samplestorage.search_samples(cond, UserID('user4')) == [SampleAddress(id3, 1)]
+    assert samplestorage.search_samples(cond, None) == [SampleAddress(id3, 1)]
+
+
+def test_search_samples_paging(samplestorage):
+    id1, id2, id3 = _save_search_samples(samplestorage)
+    cond = [MetadataCondition('material', 'value', prefix='s')]
+
+    def search(limit, after):
+        return samplestorage.search_samples(
+            cond, UserID('user'), check_acls=False, limit=limit, after=after)
+
+    assert search(2, None) == [SampleAddress(id2, 1), SampleAddress(id1, 1)]
+    assert search(2, SampleAddress(id1, 1)) == [SampleAddress(id1, 2)]
+    assert search(1, SampleAddress(id2, 1)) == [SampleAddress(id1, 1)]
+    assert search(2, SampleAddress(id1, 2)) == []
+
+
+def test_search_samples_excludes_unversioned_samples(samplestorage):
+    id1, id2, id3 = _save_search_samples(samplestorage)
+    # this is very naughty - simulate a save that crashed before the versions were updated
+    samplestorage._col_version.update_match({'id': str(id2)}, {'ver': -1})
+
+    assert samplestorage.search_samples(
+        [MetadataCondition('material', 'value', equals='soil')], UserID('user'),
+        check_acls=False) == [SampleAddress(id1, 1)]
+
+
+def test_search_samples_fail_bad_input(samplestorage):
+    c = MetadataCondition('material', 'value', equals='soil')
+    u = UserID('user')
+    _search_samples_fail(samplestorage, None, u, 1, ValueError(
+        'conditions cannot be a value that evaluates to false'))
+    _search_samples_fail(samplestorage, [], u, 1, ValueError(
+        'conditions cannot be a value that evaluates to false'))
+    _search_samples_fail(samplestorage, [c, None], u, 1, ValueError(
+        'Index 1 of iterable conditions cannot be a value that evaluates to false'))
+    _search_samples_fail(samplestorage, [c], u, 0, ValueError('limit must be > 0'))
+
+
+def _search_samples_fail(samplestorage, conditions, user, limit, expected):
+    with raises(Exception) as got:
+        samplestorage.search_samples(conditions, user, limit=limit)
+    assert_exception_correct(got.value, expected)
+
+
+def _save_text_search_samples(samplestorage):
+    id1 = uuid.UUID('1234567890abcdef1234567890abcdef')
+    id2 = uuid.UUID('1234567890abcdef1234567890abcdea')
+    id3 = uuid.UUID('1234567890abcdef1234567890abcdeb')
+    assert samplestorage.save_sample(SavedSample(id1, UserID('user'), [
+        SampleNode('root', controlled_metadata={'material': {'value': 'Soil'}}),
+        SampleNode('kid', SubSampleType.TECHNICAL_REPLICATE, 'root',
+                   user_metadata={'site': {'name': 'Old Faithful, Yellowstone', 'n': 2019}})
+        ], dt(1), 'geyser run')) is True
+    assert samplestorage.save_sample_version(SavedSample(id1, UserID('user'), [
+        SampleNode('root', controlled_metadata={'material': {'value': 'sand'}})
+        ], dt(2), 'geyser run 2019')) == 2
+    assert samplestorage.save_sample(SavedSample(id2, UserID('user2'), [
+        SampleNode('root', user_metadata={'notes': {'value': 'soil from yellowstone'}})
+        ], dt(3), 'sample 2019')) is True
+    assert samplestorage.save_sample(SavedSample(id3, UserID('user3'), [
+        SampleNode('root', controlled_metadata={'material': {'value': 'soil'}})
+        ], dt(4), 'baz')) is True
+    return id1, id2, id3
+
+
+def test_count_metadata_values(samplestorage):
+    id1, id2, id3 = _save_search_samples(samplestorage)
+    id4 = uuid.UUID('1234567890abcdef1234567890abcdec')
+    # a sample is counted once per value, not once per node
+    assert samplestorage.save_sample(SavedSample(id4, UserID('user'), [
+        SampleNode('root', controlled_metadata={'material': {'value': 'soil'}}),
+        SampleNode('kid', SubSampleType.TECHNICAL_REPLICATE, 'root',
+                   {'material': {'value': 'soil'}})
+        ], dt(5), 'bat')) is True
+
+    def count(key, value_key='value', conditions=None, limit=100):
+        return samplestorage.count_metadata_values(
+            key, value_key, UserID('user'), conditions, check_acls=False, limit=limit)
+
+    # only the latest versions are counted. In AQL, numbers sort before strings.
+    assert count('depth') == [(7.5, 1), (20, 1), ('5', 1)]
+    assert count('depth', 'units') == [('cm', 1), ('m', 1)]
+    # arango's ICU collation sorts lower case before upper case
+    assert count('material', limit=2) == [('soil', 2), ('Soil', 1)]
+    assert count('material', conditions=[MetadataCondition('depth', 'value', minimum=0)]) == [
+        ('soil', 1), ('soilish', 1)]
+    assert count('material', conditions=[
+        MetadataCondition('depth', 'value', minimum=0),
+        MetadataCondition('wet', 'value', equals=True)]) == [('soil', 1)]
+    assert count('wet') == [(True, 1)]
+    assert count('color') == []
+
+
+def test_count_metadata_values_latest_version_flags(samplestorage):
+    id1, id2, id3 = _save_search_samples(samplestorage)
+    vers = samplestorage._col_sample.get(str(id1))['vers']
+    for n in samplestorage._col_nodes.all():
+        assert n['latest'] is (n['uuidver'] != vers[0])
+
+    # simulate a save that failed before the prior version's flags were cleared. The sample
+    # document is checked so the prior version still isn't counted.
+    samplestorage._col_nodes.update_match({'uuidver': vers[0]}, {'latest': True})
+    assert samplestorage.count_metadata_values(
+        'depth', 'value', None, check_acls=False) == [(7.5, 1), (20, 1), ('5', 1)]
+
+
+def test_count_metadata_values_acls(samplestorage):
+    id1, id2, id3 = _save_search_samples(samplestorage)
+    samplestorage.replace_sample_acls(id3, SampleACL(UserID('user3'), dt(6), public_read=True))
+
+    assert samplestorage.count_metadata_values('material', 'value', UserID('user')) == [
+        ('soilish', 1)]
+    assert samplestorage.count_metadata_values('material', 'value', UserID('user2')) == [
+        ('soil', 1), ('Soil', 1)]
+    assert samplestorage.count_metadata_values('material', 'value', None) == [('Soil', 1)]
+
+
+def test_count_metadata_values_fail_bad_input(samplestorage):
+    c = MetadataCondition('depth', 'value', minimum=0)
+    _count_metadata_values_fail(samplestorage, None, 'v', [c], 1, MissingParameterError('key'))
+    _count_metadata_values_fail(samplestorage, 'k', '', [c], 1, MissingParameterError(
+        'value_key'))
+    _count_metadata_values_fail(samplestorage, 'k', 'v', [c, None], 1, ValueError(
+        'Index 1 of iterable conditions cannot be a value that evaluates to false'))
+    _count_metadata_values_fail(samplestorage, 'k', 'v', [c], 0, ValueError(
+        'limit must be > 0'))
+
+
+def _count_metadata_values_fail(samplestorage, key, value_key, conditions, limit, expected):
+    with raises(Exception) as got:
+        samplestorage.count_metadata_values(
+            key, value_key, UserID('user'), conditions, limit=limit)
+    assert_exception_correct(got.value, expected)
+
+
+def _save_location_samples(samplestorage):
+    id1 = uuid.UUID('1234567890abcdef1234567890abcdef')
+    id2 = uuid.UUID('1234567890abcdef1234567890abcdea')
+    id3 = uuid.UUID('1234567890abcdef1234567890abcdeb')
+
+    def loc(lat, lon):
+        return {'latitude': {'value': lat}, 'longitude': {'value': lon}}
+
+    # Old Faithful and Castle Geyser are about 700m apart
+    assert samplestorage.save_sample(SavedSample(id1, UserID('user'), [
+        SampleNode('root', controlled_metadata=loc(44.4605, -110.8281)),
+        SampleNode('kid', SubSampleType.TECHNICAL_REPLICATE, 'root',
+                   loc(44.4635, -110.8358))
+        ], dt(1), 'foo')) is True
+    assert samplestorage.save_sample_version(SavedSample(id1, UserID('user'), [
+        SampleNode('root', controlled_metadata=loc(44.4635, -110.8358))
+        ], dt(2), 'foo')) == 2
+    # Fiji, on either side of the antimeridian
+    assert samplestorage.save_sample(SavedSample(id2, UserID('user2'), [
+        SampleNode('root', controlled_metadata=loc(-16.8, 179.9)),
+        SampleNode('kid', SubSampleType.TECHNICAL_REPLICATE, 'root', loc(-16.7, -179.9))
+        ], dt(3), 'bar')) is True
+    assert samplestorage.save_sample(SavedSample(id3, UserID('user3'), [
+        SampleNode('root', controlled_metadata={'latitude': {'value': 44.4605}},
+                   user_metadata={'longitude': {'value': -110.8281}})
+        ], dt(4), 'baz')) is True
+    return id1, id2, id3
+
+
+def test_search_samples_by_location_bounding_box(samplestorage):
+    id1, id2, id3 = _save_location_samples(samplestorage)
+
+    def search(bb):
+        return samplestorage.search_samples_by_location(
+            LocationCondition(bounding_box=bb), UserID('user'), check_acls=False)
+
+    assert search((44, -111, 45, -110)) == [SampleAddress(id1, 1), SampleAddress(id1, 2)]
+    assert search((44.461, -111, 45, -110)) == [SampleAddress(id1, 1), SampleAddress(id1, 2)]
+    assert search((44, -110.83, 45, -110)) == [SampleAddress(id1, 1)]
+    assert search((-17, 179, -16, 180)) == [SampleAddress(id2, 1)]
+    assert search((-17, 179, -16, -179)) == [SampleAddress(id2, 1)]
+    assert search((-90, -180, 90, 180)) == [
+        SampleAddress(id2, 1), SampleAddress(id1, 1), SampleAddress(id1, 2)]
+    assert search((0, 0, 10, 10)) == []
+
+
+def test_search_samples_by_location_radius(samplestorage):
+    id1, id2, id3 = _save_location_samples(samplestorage)
+
+    def search(center, radius):
+        return samplestorage.search_samples_by_location(
+            LocationCondition(center=center, radius=radius), UserID('user'), check_acls=False)
+
+    assert search((44.4605, -110.8281), 100) == [SampleAddress(id1, 1)]
+    assert search((44.4605, -110.8281), 1000) == [SampleAddress(id1, 1), SampleAddress(id1, 2)]
+    # across the antimeridian. The nodes are about 23km apart.
+    assert search((-16.75, 180), 20000) == [SampleAddress(id2, 1)]
+    assert search((0, 0), 1000) == []
+
+
+def test_search_samples_by_location_radius_without_geo_index(samplestorage):
+    id1, id2, id3 = _save_location_samples(samplestorage)
+    # this is very naughty - nodes without a location must not match if the geo index isn't used
+    for index in samplestorage._col_nodes.indexes():
+        if index['type'] == 'geo':
+            samplestorage._col_nodes.delete_index(index['id'])
+
+    def search(center, radius):
+        return samplestorage.search_samples_by_location(
+            LocationCondition(center=center, radius=radius), UserID('user'), check_acls=False)
+
+    assert search((44.4605, -110.8281), 100) == [SampleAddress(id1, 1)]
+    assert search((0, 0), 1000) == []
+
+
+def test_search_samples_by_location_acls_and_paging(samplestorage):
+    id1, id2, id3 = _save_location_samples(samplestorage)
+    samplestorage.replace_sample_acls(id2, SampleACL(UserID('user2'), dt(5), read=[
+        UserID('user')]))
+    c = LocationCondition(bounding_box=(-90, -180, 90, 180))
+
+    assert samplestorage.search_samples_by_location(c, UserID('user')) == [
+        SampleAddress(id2, 1), SampleAddress(id1, 1), SampleAddress(id1, 2)]
+    assert samplestorage.search_samples_by_location(c, UserID('user2')) == [
+        SampleAddress(id2, 1)]
+    assert samplestorage.search_samples_by_location(c, None) == []
+    assert samplestorage.search_samples_by_location(c, None, check_acls=False) == [
+        SampleAddress(id2, 1), SampleAddress(id1, 1), SampleAddress(id1, 2)]
+
+    assert samplestorage.search_samples_by_location(c, UserID('user'), limit=2) == [
+        SampleAddress(id2, 1), SampleAddress(id1, 1)]
+    assert samplestorage.search_samples_by_location(
+        c, UserID('user'), limit=2, after=SampleAddress(id1, 1)) == [SampleAddress(id1, 2)]
+
+
+def test_search_samples_by_location_fail_bad_input(samplestorage):
+    c = LocationCondition(center=(0, 0), radius=1)
+    with raises(Exception) as got:
+        samplestorage.search_samples_by_location(None, UserID('user'))
+    assert_exception_correct(got.value, ValueError(
+        'condition cannot be a value that evaluates to false'))
+    with raises(Exception) as got:
+        samplestorage.search_samples_by_location(c, UserID('user'), limit=0)
+    assert_exception_correct(got.value, ValueError('limit must be > 0'))
+
+
+def _save_list_samples(samplestorage):
+    ids = [uuid.UUID(f'1234567890abcdef1234567890abcde{c}') for c in 'abcde']
+    for i, id_ in enumerate(ids):
+        assert samplestorage.save_sample(SavedSample(
+            id_, UserID(f'user{i}'), [SampleNode('root')], dt(i + 1))) is True
+    # the second version doesn't change the sample's place in the list
+    assert samplestorage.save_sample_version(SavedSample(
+        ids[0], UserID('user0'), [SampleNode('root')], dt(10))) == 2
+    samplestorage.replace_sample_acls(ids[1], SampleACL(
+        UserID('user1'), dt(11), admin=[UserID('user0')]))
+    samplestorage.replace_sample_acls(ids[2], SampleACL(
+        UserID('user2'), dt(12), write=[UserID('user0')]))
+    samplestorage.replace_sample_acls(ids[3], SampleACL(
+        UserID('user3'), dt(13), read=[UserID('user0')]))
+    samplestorage.replace_sample_acls(ids[4], SampleACL(
+        UserID('user4'), dt(14), public_read=True))
+    return ids
+
+
+def test_list_samples(samplestorage):
+    ids = _save_list_samples(samplestorage)
+
+    assert samplestorage.list_samples(UserID('user0')) == [
+        (SampleAddress(ids[4], 1), dt(5)),
+        (SampleAddress(ids[3], 1), dt(4)),
+        (SampleAddress(ids[2], 1), dt(3)),
+        (SampleAddress(ids[1], 1), dt(2)),
+        (SampleAddress(ids[0], 2), dt(1)),
+    ]
+    assert samplestorage.list_samples(UserID('user2')) == [
+        (SampleAddress(ids[4], 1), dt(5)), (SampleAddress(ids[2], 1), dt(3))]
+    assert samplestorage.list_samples(UserID('user5')) == [(SampleAddress(ids[4], 1), dt(5))]
+    assert samplestorage.list_samples(None) == [(SampleAddress(ids[4], 1), dt(5))]
+
+
+def test_list_samples_with_equal_save_times(samplestorage):
+    id1 = uuid.UUID('1234567890abcdef1234567890abcdef')
+    id2 = uuid.UUID('1234567890abcdef1234567890abcdea')
+    for id_ in [id1, id2]:
+        assert samplestorage.save_sample(SavedSample(
+            id_, UserID('user'), [SampleNode('root')], dt(1))) is True
+
+    assert samplestorage.list_samples(UserID('user')) == [
+        (SampleAddress(id1, 1), dt(1)), (SampleAddress(id2, 1), dt(1))]
+    assert samplestorage.list_samples(UserID('user'), limit=1, after=(dt(1), id1)) == [
+        (SampleAddress(id2, 1), dt(1))]
+
+
+def test_list_samples_without_save_time(samplestorage):
+    # samples saved before the save time was added to the sample document
+    ids = _save_list_samples(samplestorage)
+    _remove_derived_data(samplestorage)
+    samplestorage._col_sample.update_match({}, {'saved': None}, keep_none=False)
+    samplestorage._col_sample.update_match({'id': str(ids[4])}, {'saved': 5})
+
+    # samples without a save time are not listed until the consistency checker adds it
+    assert samplestorage.list_samples(UserID('user0')) == [(SampleAddress(ids[4], 1), dt(5))]
+
+    assert samplestorage._update_derived_data() == 6
+    assert samplestorage.list_samples(UserID('user0')) == [
+        (SampleAddress(ids[4], 1), dt(5)),
+        (SampleAddress(ids[3], 1), dt(4)),
+        (SampleAddress(ids[2], 1), dt(3)),
+        (SampleAddress(ids[1], 1), dt(2)),
+        (SampleAddress(ids[0], 2), dt(1)),
+    ]
+
+
+def _get_plan_nodes(plan):
+    # returns all the nodes in a query plan, including the nodes in subqueries
+    if isinstance(plan, dict):
+        nodes = [plan] if 'type' in plan and 'id' in plan else []
+        for v in plan.values():
+            nodes.extend(_get_plan_nodes(v))
+        return nodes
+    if isinstance(plan, list):
+        return [n for v in plan for n in _get_plan_nodes(v)]
+    return []
+
+
+def _explain(db, aql, bind_vars):
+    # the arango client's explain method doesn't take bind variables
+    resp = db._conn.send_request(Request(
+        method='post', endpoint='/_api/explain', data={'query': aql, 'bindVars': bind_vars}))
+    assert resp.is_success, resp.body
+    return resp.body['plan']
+
+
+def test_list_samples_query_plan_uses_acl_indexes(samplestorage):
+    _save_list_samples(samplestorage)
+    # this is very naughty
+    for user, after, expected in [
+            (UserID('user'), None, [['acls.owner', 'saved', 'id'], ['acls.admin[*]'],
+                                    ['acls.write[*]'], ['acls.read[*]'],
+                                    ['acls.pubread', 'saved', 'id']]),
+            (UserID('user'), (dt(1), uuid.uuid4()), [
+                ['acls.owner', 'saved', 'id'], ['acls.admin[*]'], ['acls.write[*]'],
+                ['acls.read[*]'], ['acls.pubread', 'saved', 'id']]),
+            (None, None, [['acls.pubread', 'saved', 'id']])]:
+        aql, bind_vars = samplestorage._list_samples_query(user, 10, after)
+        nodes = _get_plan_nodes(_explain(samplestorage._db, aql, bind_vars)['nodes'])
+        types = [n['type'] for n in nodes]
+        # the sample collection is never scanned in full
+        assert 'EnumerateCollectionNode' not in types
+        assert sorted(i['fields'] for n in nodes if n['type'] == 'IndexNode'
+                      for i in n['indexes']) == sorted(expected)
+
+
+def test_list_samples_paging(samplestorage):
+    ids = _save_list_samples(samplestorage)
+
+    assert samplestorage.list_samples(UserID('user0'), limit=2) == [
+        (SampleAddress(ids[4], 1), dt(5)), (SampleAddress(ids[3], 1), dt(4))]
+    assert samplestorage.list_samples(UserID('user0'), limit=2, after=(dt(4), ids[3])) == [
+        (SampleAddress(ids[2], 1), dt(3)), (SampleAddress(ids[1], 1), dt(2))]
+    assert samplestorage.list_samples(UserID('user0'), limit=2, after=(dt(2), ids[1])) == [
+        (SampleAddress(ids[0], 2), dt(1))]
+    assert samplestorage.list_samples(UserID('user0'), after=(dt(1), ids[0])) == []
+
+
+def test_list_samples_fail_bad_input(samplestorage):
+    _list_samples_fail(samplestorage, 0, None, ValueError('limit must be > 0'))
+    _list_samples_fail(samplestorage, 1, (datetime.datetime.fromtimestamp(1), uuid.uuid4()),
+                       ValueError('after save time cannot be a naive datetime'))
+    _list_samples_fail(samplestorage, 1, (dt(1), None), ValueError(
+        'after sample ID cannot be a value that evaluates to false'))
+
+
+def _list_samples_fail(samplestorage, limit, after, expected):
+    with raises(Exception) as got:
+        samplestorage.list_samples(UserID('user'), limit=limit, after=after)
+    assert_exception_correct(got.value, expected)
+
+
+def test_search_samples_by_text(samplestorage):
+    id1, id2, id3 = _save_text_search_samples(samplestorage)
+
+    def search(*terms):
+        return samplestorage.search_samples_by_text(
+            list(terms), UserID('user'), check_acls=False)
+
+    assert search('soil', 'yellowstone', '2019') == [
+        (SampleAddress(id2, 1), 3),
+        (SampleAddress(id1, 1), 2),
+        (SampleAddress(id3, 1), 1),
+        (SampleAddress(id1, 2), 1),
+        ]
+    # duplicate terms don't count twice
+    assert search('soil', 'soil') == [
+        (SampleAddress(id2, 1), 1), (SampleAddress(id3, 1), 1), (SampleAddress(id1, 1), 1)]
+    assert search('old', 'faithful') == [(SampleAddress(id1, 1), 2)]
+    # numbers aren't indexed
+    assert search('sand', 'n', '2019') == [
+        (SampleAddress(id1, 2), 2), (SampleAddress(id2, 1), 1)]
+    assert search('root', 'site', 'material', 'value') == []
+
+
+def test_search_samples_by_text_acls(samplestorage):
+    id1, id2, id3 = _save_text_search_samples(samplestorage)
+    samplestorage.replace_sample_acls(id2, SampleACL(
+        UserID('user2'), dt(5), read=[UserID('user')]))
+    samplestorage.replace_sample_acls(id3, SampleACL(UserID('user3'), dt(6), public_read=True))
+
+    assert samplestorage.search_samples_by_text(['soil', 'yellowstone'], UserID('user')) == [
+        (SampleAddress(id2, 1), 2), (SampleAddress(id1, 1), 2), (SampleAddress(id3, 1), 1)]
+    assert samplestorage.search_samples_by_text(['soil', 'yellowstone'], UserID('user2')) == [
+        (SampleAddress(id2, 1), 2), (SampleAddress(id3, 1), 1)]
+    assert samplestorage.search_samples_by_text(['soil', 'yellowstone'], UserID('user4')) == [
+        (SampleAddress(id3, 1), 1)]
+    assert samplestorage.search_samples_by_text(['soil', 'yellowstone'], None) == [
+        (SampleAddress(id3, 1), 1)]
+    assert samplestorage.search_samples_by_text(['geyser'], None) == []
+
+
+def test_search_samples_by_text_paging(samplestorage):
+    id1, id2, id3 = _save_text_search_samples(samplestorage)
+    terms = ['soil', 'yellowstone', '2019']
+
+    def search(limit, after):
+        return samplestorage.search_samples_by_text(
+            terms, UserID('user'), check_acls=False, limit=limit, after=after)
+
+    assert search(2, None) == [(SampleAddress(id2, 1), 3), (SampleAddress(id1, 1), 2)]
+    assert search(2, (2, SampleAddress(id1, 1))) == [
+        (SampleAddress(id3, 1), 1), (SampleAddress(id1, 2), 1)]
+    assert search(1, (1, SampleAddress(id3, 1))) == [(SampleAddress(id1, 2), 1)]
+    assert search(2, (1, SampleAddress(id1, 2))) == []
+
+
+def test_search_samples_by_text_excludes_unversioned_samples(samplestorage):
+    id1, id2, id3 = _save_text_search_samples(samplestorage)
+    # this is very naughty - simulate a save that crashed before the versions were updated
+    samplestorage._col_version.update_match({'id': str(id2)}, {'ver': -1})
+
+    assert samplestorage.search_samples_by_text(['2019'], UserID('user'), check_acls=False) == [
+        (SampleAddress(id1, 2), 1)]
+
+
+def test_search_samples_by_text_fail_bad_input(samplestorage):
+    u = UserID('user')
+    _search_samples_by_text_fail(samplestorage, None, u, 1, ValueError(
+        'terms cannot be a value that evaluates to false'))
+    _search_samples_by_text_fail(samplestorage, [], u, 1, ValueError(
+        'terms cannot be a value that evaluates to false'))
+    _search_samples_by_text_fail(samplestorage, ['soil', ''], u, 1, ValueError(
+        'Index 1 of iterable terms cannot be a value that evaluates to false'))
+    _search_samples_by_text_fail(samplestorage, ['soil'], u, 0, ValueError(
+        'limit must be > 0'))
+
+
+def _search_samples_by_text_fail(samplestorage, terms, user, limit, expected):
+    with raises(Exception) as got:
+        samplestorage.search_samples_by_text(terms, user, limit=limit)
+    assert_exception_correct(got.value, expected)
+
+
+def test_get_sample_with_version_cache(arango):
+    clear_db_and_recreate(arango)
+    cache = SampleVersionCache(100000)
+    ss = ArangoSampleStorage(
+        arango.client.db(TEST_DB_NAME, TEST_USER, TEST_PWD),
+        TEST_COL_SAMPLE,
+        TEST_COL_VERSION,
+        TEST_COL_VER_EDGE,
+        TEST_COL_NODES,
+        TEST_COL_NODE_EDGE,
+        TEST_COL_WS_OBJ_VER,
+        TEST_COL_DATA_LINK,
+        TEST_COL_DATA_LINK_COUNT,
+        TEST_COL_META,
+        TEST_COL_NODE_CONTENT,
+        TEST_COL_SCHEMA,
+        version_cache=cache)
+
+    id_ = uuid.UUID('1234567890abcdef1234567890abcdef')
+    n1 = SampleNode('root')
+    n2 = SampleNode('kid1', SubSampleType.TECHNICAL_REPLICATE, 'root', {'a': {'b': 'c'}})
+    assert ss.save_sample(SavedSample(id_, UserID('user'), [n1, n2], dt(1), 'foo')) is True
+
+    expected = SavedSample(id_, UserID('user'), [n1, n2], dt(1), 'foo', 1)
+    assert ss.get_sample(id_) == expected
+    assert (cache.hits, cache.misses, len(cache)) == (0, 1, 1)
+    assert ss.get_sample(id_, 1) == expected
+    assert (cache.hits, cache.misses, len(cache)) == (1, 1, 1)
+
+    # a new version should be fetched from the DB, not the cached older version
+    assert ss.save_sample_version(
+        SavedSample(id_, UserID('user2'), [TEST_NODE], dt(2), 'bar')) == 2
+    assert ss.get_sample_and_acls(id_) == (
+        SavedSample(id_, UserID('user2'), [TEST_NODE], dt(2), 'bar', 2),
+        SampleACL(UserID('user'), dt(1), public_read=False))
+    assert (cache.hits, cache.misses, len(cache)) == (1, 2, 2)
+
+    # the ACLs are never cached
+    ss.replace_sample_acls(id_, SampleACL(UserID('user'), dt(3), read=[UserID('foo')]))
+    assert ss.get_sample_and_acls(id_, 1) == (
+        expected, SampleACL(UserID('user'), dt(3), read=[UserID('foo')], public_read=False))
+    assert (cache.hits, cache.misses, len(cache)) == (2, 2, 2)
+
+    # the cached sample is returned even if the DB is altered
+    ss._col_nodes.delete_match({'ver': 1})
+    assert ss.get_sample(id_, 1) == expected
+    assert (cache.hits, cache.misses, len(cache)) == (3, 2, 2)
+
+
 def test_save_and_get_sample_version(samplestorage):
     id_ = uuid.UUID('1234567890abcdef1234567890abcdef')
     assert samplestorage.save_sample(
@@ -2466,9 +3850,9 @@ def test_create_data_link_fail_too_many_links_from_sample_ver_basic(samplestorag
         )
 
 
-def test_create_data_link_fail_too_many_links_from_ws_obj_time_travel(samplestorage):
-    # tests that links that do not co-exist with the new link are not counted against the total.
-    ss = _samplestorage_with_max_links(samplestorage, 3)
+def test_create_data_link_fail_too_many_links_from_ws_obj_with_expired_links(samplestorage):
+    # tests that expired links are not counted against the total.
+    ss = _samplestorage_with_max_links(samplestorage, 2)
 
     id1 = uuid.UUID('1234567890abcdef1234567890abcdef')
     assert ss.save_sample(
@@ -2476,7 +3860,6 @@ def test_create_data_link_fail_too_many_links_from_ws_obj_time_travel(samplestor
     assert ss.save_sample_version(
         SavedSample(id1, UserID('user'), [SampleNode('mynode')], dt(1), 'foo')) == 2
 
-    # completely outside the new sample time range.
     _create_and_expire_data_link(
         ss,
         DataLink(
@@ -2485,11 +3868,10 @@ def test_create_data_link_fail_too_many_links_from_ws_obj_time_travel(samplestor
             SampleNodeAddress(SampleAddress(id1, 1), 'mynode'),
             dt(100),
             UserID('user')),
-        dt(299),
+        dt(200),
         UserID('user')
     )
 
-    # expire matches create
     _create_and_expire_data_link(
         ss,
         DataLink(
@@ -2502,31 +3884,14 @@ def test_create_data_link_fail_too_many_links_from_ws_obj_time_travel(samplestor
         UserID('user')
     )
 
-    # overlaps create
-    _create_and_expire_data_link(
-        ss,
-        DataLink(
+    for i, ver in enumerate([1, 2], 2):
+        ss.create_data_link(DataLink(
             uuid.uuid4(),
-            DataUnitID(UPA('1/1/1'), '2'),
-            SampleNodeAddress(SampleAddress(id1, 1), 'mynode'),
-            dt(250),
-            UserID('user')),
-        dt(350),
-        UserID('user')
-    )
-
-    # contained inside
-    _create_and_expire_data_link(
-        ss,
-        DataLink(
-            uuid.uuid4(),
-            DataUnitID(UPA('1/1/1'), '3'),
-            SampleNodeAddress(SampleAddress(id1, 2), 'mynode'),
-            dt(325),
-            UserID('user')),
-        dt(375),
-        UserID('user')
-    )
+            DataUnitID(UPA('1/1/1'), str(i)),
+            SampleNodeAddress(SampleAddress(id1, ver), 'mynode'),
+            dt(400),
+            UserID('user'))
+        )
 
     _create_data_link_fail(
         ss,
@@ -2534,21 +3899,20 @@ def test_create_data_link_fail_too_many_links_from_ws_obj_time_travel(samplestor
             uuid.uuid4(),
             DataUnitID(UPA('1/1/1'), '8'),
             SampleNodeAddress(SampleAddress(id1, 1), 'mynode'),
-            dt(300),
+            dt(400),
             UserID('user')),
-        TooManyDataLinksError('More than 3 links from workspace object 1/1/1')
+        TooManyDataLinksError('More than 2 links from workspace object 1/1/1')
         )
 
 
-def test_create_data_link_fail_too_many_links_from_sample_ver_time_travel(samplestorage):
-    # tests that links that do not co-exist with the new link are not counted against the total.
-    ss = _samplestorage_with_max_links(samplestorage, 3)
+def test_create_data_link_fail_too_many_links_from_sample_ver_with_expired_links(samplestorage):
+    # tests that expired links are not counted against the total.
+    ss = _samplestorage_with_max_links(samplestorage, 2)
 
     id1 = uuid.UUID('1234567890abcdef1234567890abcdef')
     assert ss.save_sample(
         SavedSample(id1, UserID('user'), [SampleNode('mynode')], dt(1), 'foo')) is True
 
-    # completely outside the new sample time range.
     _create_and_expire_data_link(
         ss,
         DataLink(
@@ -2557,11 +3921,10 @@ def test_create_data_link_fail_too_many_links_from_sample_ver_time_travel(sample
             SampleNodeAddress(SampleAddress(id1, 1), 'mynode'),
             dt(100),
             UserID('user')),
-        dt(299),
+        dt(200),
         UserID('user')
     )
 
-    # expire matches create
     _create_and_expire_data_link(
         ss,
         DataLink(
@@ -2574,31 +3937,14 @@ def test_create_data_link_fail_too_many_links_from_sample_ver_time_travel(sample
         UserID('user')
     )
 
-    # overlaps create
-    _create_and_expire_data_link(
-        ss,
-        DataLink(
+    for upa in ['1/1/3', '1/1/4']:
+        ss.create_data_link(DataLink(
             uuid.uuid4(),
-            DataUnitID(UPA('1/1/3')),
+            DataUnitID(UPA(upa)),
             SampleNodeAddress(SampleAddress(id1, 1), 'mynode'),
-            dt(250),
-            UserID('user')),
-        dt(350),
-        UserID('user')
-    )
-
-    # contained inside
-    _create_and_expire_data_link(
-        ss,
-        DataLink(
-            uuid.uuid4(),
-            DataUnitID(UPA('1/1/4')),
-            SampleNodeAddress(SampleAddress(id1, 1), 'mynode'),
-            dt(325),
-            UserID('user')),
-        dt(375),
-        UserID('user')
-    )
+            dt(400),
+            UserID('user'))
+        )
 
     _create_data_link_fail(
         ss,
@@ -2606,9 +3952,9 @@ def test_create_data_link_fail_too_many_links_from_sample_ver_time_travel(sample
             uuid.uuid4(),
             DataUnitID(UPA('1/1/9')),
             SampleNodeAddress(SampleAddress(id1, 1), 'mynode'),
-            dt(300),
+            dt(400),
             UserID('user')),
-        TooManyDataLinksError('More than 3 links from sample ' +
+        TooManyDataLinksError('More than 2 links from sample ' +
                               '12345678-90ab-cdef-1234-567890abcdef version 1')
         )
 
@@ -2745,12 +4091,304 @@ def test_create_data_link_update_links_from_sample_ver_count_limit(samplestorage
         )
 
 
+def test_create_data_link_with_update_link_counts(samplestorage):
+    # tests that moving a link to a different sample version frees up a link for the old
+    # version.
+    ss = _samplestorage_with_max_links(samplestorage, 1)
+
+    id1 = uuid.UUID('1234567890abcdef1234567890abcdef')
+    assert ss.save_sample(
+        SavedSample(id1, UserID('user'), [SampleNode('mynode')], dt(1), 'foo')) is True
+    assert ss.save_sample_version(
+        SavedSample(id1, UserID('user'), [SampleNode('mynode')], dt(2), 'foo')) == 2
+
+    ss.create_data_link(DataLink(
+        uuid.uuid4(),
+        DataUnitID(UPA('1/1/1')),
+        SampleNodeAddress(SampleAddress(id1, 1), 'mynode'),
+        dt(500),
+        UserID('user'))
+    )
+    assert _get_link_counts(ss) == {'ws_1_1_1': 1, f'sv_{id1}_1': 1}
+
+    ss.create_data_link(DataLink(
+        uuid.uuid4(),
+        DataUnitID(UPA('1/1/1')),
+        SampleNodeAddress(SampleAddress(id1, 2), 'mynode'),
+        dt(600),
+        UserID('user')),
+        update=True
+    )
+    assert _get_link_counts(ss) == {'ws_1_1_1': 1, f'sv_{id1}_1': 0, f'sv_{id1}_2': 1}
+
+    ss.create_data_link(DataLink(
+        uuid.uuid4(),
+        DataUnitID(UPA('1/1/2')),
+        SampleNodeAddress(SampleAddress(id1, 1), 'mynode'),
+        dt(700),
+        UserID('user'))
+    )
+    assert _get_link_counts(ss) == {
+        'ws_1_1_1': 1, 'ws_1_1_2': 1, f'sv_{id1}_1': 1, f'sv_{id1}_2': 1}
+
+
+def test_create_data_link_with_concurrent_write(samplestorage):
+    # tests that creating a link collides with another transaction changing links from the same
+    # workspace object, but links from other objects are not blocked.
+    id1 = uuid.UUID('1234567890abcdef1234567890abcdef')
+    assert samplestorage.save_sample(
+        SavedSample(id1, UserID('user'), [SampleNode('mynode')], dt(1), 'foo')) is True
+    sna = SampleNodeAddress(SampleAddress(id1, 1), 'mynode')
+
+    samplestorage.create_data_link(DataLink(
+        uuid.uuid4(), DataUnitID(UPA('1/1/1')), sna, dt(100), UserID('user')))
+
+    link = DataLink(uuid.uuid4(), DataUnitID(UPA('1/1/1'), 'foo'), sna, dt(200), UserID('user'))
+    # this is very naughty
+    colname = samplestorage._col_data_link_count.name
+    tdb = samplestorage._db.begin_transaction(write=colname)
+    try:
+        tdb.collection(colname).update({'_key': 'ws_1_1_1', 'count': 1})
+
+        _create_data_link_fail(samplestorage, link, ConcurrencyError(
+            'Too many concurrent changes to data links from the same workspace object or to ' +
+            'the same sample version. Please retry.'))
+
+        samplestorage.create_data_link(DataLink(
+            uuid.uuid4(), DataUnitID(UPA('2/1/1')), sna, dt(200), UserID('user')))
+    finally:
+        tdb.abort_transaction()
+
+    samplestorage.create_data_link(link)
+
+    assert samplestorage._col_data_link.count() == 3
+    assert _get_link_counts(samplestorage) == {'ws_1_1_1': 2, 'ws_2_1_1': 1, f'sv_{id1}_1': 3}
+
+
+def test_create_update_and_expire_data_link_with_stream_transactions(samplestorage):
+    # the other tests use the default javascript transactions. This tests the same code paths
+    # with REST streaming transactions.
+    ss = _samplestorage_with_max_links(samplestorage, 1, js_link_transactions=False)
+
+    id1 = uuid.UUID('1234567890abcdef1234567890abcdef')
+    assert ss.save_sample(
+        SavedSample(id1, UserID('user'), [SampleNode('mynode')], dt(1), 'foo')) is True
+    assert ss.save_sample_version(
+        SavedSample(id1, UserID('user'), [SampleNode('mynode')], dt(2), 'foo')) == 2
+    lid1 = uuid.UUID('1234567890abcdef1234567890abcde1')
+    lid2 = uuid.UUID('1234567890abcdef1234567890abcde2')
+
+    _create_data_link_fail(
+        ss,
+        DataLink(lid1, DataUnitID(UPA('1/1/1')), SampleNodeAddress(
+            SampleAddress(id1, 1), 'mynode2'), dt(500), UserID('user')),
+        NoSuchSampleNodeError('12345678-90ab-cdef-1234-567890abcdef ver 1 mynode2'))
+
+    link1 = DataLink(lid1, DataUnitID(UPA('1/1/1')), SampleNodeAddress(
+        SampleAddress(id1, 1), 'mynode'), dt(500), UserID('user'))
+    assert ss.create_data_link(link1) is None
+
+    _create_data_link_fail(ss, link1, DataLinkExistsError('1/1/1'))
+    assert ss.create_data_link(link1, update=True) is None  # noop
+    _create_data_link_fail(
+        ss,
+        DataLink(uuid.uuid4(), DataUnitID(UPA('1/1/1'), 'foo'), SampleNodeAddress(
+            SampleAddress(id1, 2), 'mynode'), dt(500), UserID('user')),
+        TooManyDataLinksError('More than 1 links from workspace object 1/1/1'))
+
+    assert ss.create_data_link(DataLink(lid2, DataUnitID(UPA('1/1/1')), SampleNodeAddress(
+        SampleAddress(id1, 2), 'mynode'), dt(600), UserID('user2')), update=True) == lid1
+    assert _get_link_counts(ss) == {'ws_1_1_1': 1, f'sv_{id1}_1': 0, f'sv_{id1}_2': 1}
+    assert ss.get_data_link(lid1) == DataLink(
+        lid1, DataUnitID(UPA('1/1/1')), SampleNodeAddress(SampleAddress(id1, 1), 'mynode'),
+        dt(500), UserID('user'), dt(599.999), UserID('user2'))
+
+    _expire_data_link_fail(ss, dt(599), UserID('u'), lid2, None, ValueError(
+        'expired is < link created time: 600'))
+    assert ss.expire_data_link(dt(700), UserID('u'), duid=DataUnitID(UPA('1/1/1'))) == DataLink(
+        lid2, DataUnitID(UPA('1/1/1')), SampleNodeAddress(SampleAddress(id1, 2), 'mynode'),
+        dt(600), UserID('user2'), dt(700), UserID('u'))
+    _expire_data_link_fail(ss, dt(800), UserID('u'), lid2, None, NoSuchLinkError(str(lid2)))
+
+    assert ss._col_data_link.count() == 2
+    assert _get_link_counts(ss) == {'ws_1_1_1': 0, f'sv_{id1}_1': 0, f'sv_{id1}_2': 0}
+
+
+def test_create_data_links(samplestorage):
+    id1 = uuid.UUID('1234567890abcdef1234567890abcdef')
+    id2 = uuid.UUID('1234567890abcdef1234567890abcdee')
+    noid = uuid.UUID('1234567890abcdef1234567890abcded')
+    assert samplestorage.save_sample(
+        SavedSample(id1, UserID('user'), [SampleNode('mynode')], dt(1), 'foo')) is True
+    assert samplestorage.save_sample(
+        SavedSample(id2, UserID('user'), [SampleNode('mynode2')], dt(3), 'foo')) is True
+
+    def link(lid, duid, sid, node, created, user='usera'):
+        return DataLink(uuid.UUID(lid), duid, SampleNodeAddress(SampleAddress(sid, 1), node),
+                        dt(created), UserID(user))
+
+    old1 = link('1234567890abcdef1234567890abcde1', DataUnitID(UPA('5/89/32')), id1, 'mynode',
+                100)
+    old2 = link('1234567890abcdef1234567890abcde2', DataUnitID(UPA('5/89/32'), 'du'), id1,
+                'mynode', 100)
+    assert samplestorage.create_data_link(old1) is None
+    assert samplestorage.create_data_link(old2) is None
+
+    new1 = link('1234567890abcdef1234567890abcde3', DataUnitID(UPA('5/89/32'), 'du2'), id2,
+                'mynode2', 500)
+    noop = link('1234567890abcdef1234567890abcde4', DataUnitID(UPA('5/89/32')), id1, 'mynode',
+                500)
+    upd = link('1234567890abcdef1234567890abcde5', DataUnitID(UPA('5/89/32'), 'du'), id2,
+               'mynode2', 500, 'userb')
+    res = samplestorage.create_data_links([
+        new1,
+        noop,
+        upd,
+        link('1234567890abcdef1234567890abcde6', DataUnitID(UPA('1/1/1')), noid, 'mynode', 500),
+        DataLink(uuid.UUID('1234567890abcdef1234567890abcde7'), DataUnitID(UPA('1/1/2')),
+                 SampleNodeAddress(SampleAddress(id1, 2), 'mynode'), dt(500), UserID('usera')),
+        link('1234567890abcdef1234567890abcde8', DataUnitID(UPA('1/1/3')), id1, 'nonode', 500),
+        ],
+        update=True)
+
+    assert res[0] == (True, None)
+    assert res[1] == (False, None)
+    assert res[2] == (True, uuid.UUID('1234567890abcdef1234567890abcde2'))
+    assert_exception_correct(res[3], NoSuchSampleError(str(noid)))
+    assert_exception_correct(res[4], NoSuchSampleVersionError(
+        '12345678-90ab-cdef-1234-567890abcdef ver 2'))
+    assert_exception_correct(res[5], NoSuchSampleNodeError(
+        '12345678-90ab-cdef-1234-567890abcdef ver 1 nonode'))
+    assert len(res) == 6
+
+    assert samplestorage._col_data_link.count() == 4
+
+    assert samplestorage.get_data_link(duid=DataUnitID(UPA('5/89/32'))) == old1
+    assert samplestorage.get_data_link(duid=DataUnitID(UPA('5/89/32'), 'du2')) == new1
+    assert samplestorage.get_data_link(duid=DataUnitID(UPA('5/89/32'), 'du')) == upd
+    assert samplestorage.get_data_link(old2.id) == DataLink(
+        old2.id,
+        old2.duid,
+        old2.sample_node_address,
+        old2.created,
+        old2.created_by,
+        dt(499.999),
+        UserID('userb'))
+
+    assert _get_link_counts(samplestorage) == {
+        'ws_5_89_32': 3, f'sv_{id1}_1': 1, f'sv_{id2}_1': 2}
+
+
+def test_create_data_links_fail_link_exists(samplestorage):
+    id1 = uuid.UUID('1234567890abcdef1234567890abcdef')
+    assert samplestorage.save_sample(
+        SavedSample(id1, UserID('user'), [SampleNode('mynode')], dt(1), 'foo')) is True
+    sna = SampleNodeAddress(SampleAddress(id1, 1), 'mynode')
+
+    l1 = DataLink(uuid.uuid4(), DataUnitID(UPA('1/1/1')), sna, dt(100), UserID('u'))
+    samplestorage.create_data_link(l1)
+
+    l2 = DataLink(uuid.uuid4(), DataUnitID(UPA('1/1/2')), sna, dt(500), UserID('u'))
+    res = samplestorage.create_data_links([
+        DataLink(uuid.uuid4(), DataUnitID(UPA('1/1/1')), sna, dt(500), UserID('u')),
+        l2])
+
+    assert_exception_correct(res[0], DataLinkExistsError('1/1/1'))
+    assert res[1] == (True, None)
+    assert len(res) == 2
+
+    assert samplestorage.get_data_link(duid=DataUnitID(UPA('1/1/1'))) == l1
+    assert samplestorage.get_data_link(duid=DataUnitID(UPA('1/1/2'))) == l2
+
+
+def test_create_data_links_fail_too_many_links(samplestorage):
+    ss = _samplestorage_with_max_links(samplestorage, 2)
+
+    id1 = uuid.UUID('1234567890abcdef1234567890abcdef')
+    id2 = uuid.UUID('1234567890abcdef1234567890abcde3')
+    assert ss.save_sample(
+        SavedSample(id1, UserID('user'), [SampleNode('mynode')], dt(1), 'foo')) is True
+    assert ss.save_sample(
+        SavedSample(id2, UserID('user'), [SampleNode('mynode')], dt(1), 'foo')) is True
+    sna1 = SampleNodeAddress(SampleAddress(id1, 1), 'mynode')
+    sna2 = SampleNodeAddress(SampleAddress(id2, 1), 'mynode')
+
+    ss.create_data_link(DataLink(
+        uuid.uuid4(), DataUnitID(UPA('1/1/1')), sna1, dt(500), UserID('user')))
+
+    res = ss.create_data_links([
+        DataLink(uuid.uuid4(), DataUnitID(UPA('1/1/1'), '1'), sna2, dt(600), UserID('user')),
+        DataLink(uuid.uuid4(), DataUnitID(UPA('1/1/1'), '2'), sna2, dt(600), UserID('user')),
+        DataLink(uuid.uuid4(), DataUnitID(UPA('2/1/1'), '1'), sna1, dt(600), UserID('user')),
+        DataLink(uuid.uuid4(), DataUnitID(UPA('2/1/1'), '2'), sna1, dt(600), UserID('user')),
+        ])
+
+    assert res[0] == (True, None)
+    assert_exception_correct(res[1], TooManyDataLinksError(
+        'More than 2 links from workspace object 1/1/1'))
+    assert res[2] == (True, None)
+    assert_exception_correct(res[3], TooManyDataLinksError(
+        'More than 2 links from sample 12345678-90ab-cdef-1234-567890abcdef version 1'))
+    assert len(res) == 4
+
+    assert ss._col_data_link.count() == 3
+    assert _get_link_counts(ss) == {
+        'ws_1_1_1': 2, 'ws_2_1_1': 1, f'sv_{id1}_1': 2, f'sv_{id2}_1': 1}
+
+
+def test_create_data_links_fail_bad_args(samplestorage):
+    sna = SampleNodeAddress(
+        SampleAddress(uuid.UUID('1234567890abcdef1234567890abcdef'), 1), 'mynode')
+    dl = DataLink(uuid.uuid4(), DataUnitID(UPA('1/1/1')), sna, dt(100), UserID('u'))
+
+    _create_data_links_fail(samplestorage, None, ValueError(
+        'links cannot be a value that evaluates to false'))
+    _create_data_links_fail(samplestorage, [], ValueError(
+        'links cannot be a value that evaluates to false'))
+    _create_data_links_fail(samplestorage, [dl, None], ValueError(
+        'Index 1 of iterable links cannot be a value that evaluates to false'))
+    _create_data_links_fail(
+        samplestorage,
+        [dl, DataLink(uuid.uuid4(), DataUnitID(UPA('1/1/2')), sna, dt(100), UserID('u'),
+                      dt(200))],
+        ValueError('Index 1 of links is expired'))
+    _create_data_links_fail(
+        samplestorage,
+        [dl, DataLink(uuid.uuid4(), DataUnitID(UPA('1/1/1')), sna, dt(200), UserID('u'))],
+        ValueError('links contains duplicate data unit IDs'))
+
+
+def _create_data_links_fail(samplestorage, links, expected):
+    with raises(Exception) as got:
+        samplestorage.create_data_links(links)
+    assert_exception_correct(got.value, expected)
+
+
 def _create_and_expire_data_link(samplestorage, link, expired, user):
     samplestorage.create_data_link(link)
     samplestorage.expire_data_link(expired, user, link.id)
 
 
-def _samplestorage_with_max_links(samplestorage, max_links):
+def _get_uuid_ver(samplestorage, id_, ver):
+    # this is very naughty
+    return samplestorage._col_version.find({'id': str(id_), 'ver': ver}).next()['uuidver']
+
+
+def _get_link_counts(samplestorage):
+    # this is very naughty
+    # replaces the sample UUID version in the link count keys with the sample ID and integer
+    # version
+    vers = {d['uuidver']: f'{d["id"]}_{d["ver"]}' for d in samplestorage._col_version.all()}
+    counts = {}
+    for d in samplestorage._col_data_link_count.all():
+        key = d['_key']
+        if key.startswith('sv_'):
+            key = 'sv_' + vers[key[3:]]
+        counts[key] = d['count']
+    return counts
+
+
+def _samplestorage_with_max_links(samplestorage, max_links, js_link_transactions=True):
     # this is very naughty
     return ArangoSampleStorage(
         samplestorage._db,
@@ -2761,7 +4399,11 @@ def _samplestorage_with_max_links(samplestorage, max_links):
         samplestorage._col_node_edge.name,
         samplestorage._col_ws.name,
         samplestorage._col_data_link.name,
+        samplestorage._col_data_link_count.name,
+        samplestorage._col_meta.name,
+        samplestorage._col_node_content.name,
         samplestorage._col_schema.name,
+        js_link_transactions=js_link_transactions,
         max_links=max_links)
 
 
@@ -2900,6 +4542,7 @@ def _expire_and_get_data_link_via_duid(samplestorage, expired, dataid, expectedm
             )
 
     assert samplestorage._col_data_link.count() == 1
+    assert _get_link_counts(samplestorage) == {'ws_1_1_1': 0, f'sv_{sid}_1': 0}
 
     link = samplestorage._col_data_link.get(f'1_1_1_{expectedmd5}-100.0')
     assert link == {
@@ -3181,6 +4824,154 @@ def _expire_data_link_fail(samplestorage, expire, user, id_, duid, expected):
     assert_exception_correct(got.value, expected)
 
 
+def test_expire_data_link_with_concurrent_write(samplestorage):
+    sid = uuid.UUID('1234567890abcdef1234567890abcdef')
+    assert samplestorage.save_sample(
+        SavedSample(sid, UserID('user'), [SampleNode('mynode')], dt(1), 'foo')) is True
+
+    lid = uuid.UUID('1234567890abcdef1234567890abcde1')
+    samplestorage.create_data_link(DataLink(
+        lid,
+        DataUnitID(UPA('1/1/1')),
+        SampleNodeAddress(SampleAddress(sid, 1), 'mynode'),
+        dt(-100),
+        UserID('usera'))
+    )
+
+    # this is very naughty
+    colname = samplestorage._col_data_link_count.name
+    tdb = samplestorage._db.begin_transaction(write=colname)
+    try:
+        tdb.collection(colname).update({'_key': f'sv_{_get_uuid_ver(samplestorage, sid, 1)}',
+                                        'count': 1})
+
+        _expire_data_link_fail(samplestorage, dt(1), UserID('u'), lid, None, ConcurrencyError(
+            'Too many concurrent changes to data links from the same workspace object or to ' +
+            'the same sample version. Please retry.'))
+    finally:
+        tdb.abort_transaction()
+
+    assert samplestorage.get_data_link(lid).expired is None
+
+    samplestorage.expire_data_link(dt(1), UserID('u'), lid)
+    assert _get_link_counts(samplestorage) == {'ws_1_1_1': 0, f'sv_{sid}_1': 0}
+
+
+def _create_links_for_expire_data_links(samplestorage):
+    sid = uuid.UUID('1234567890abcdef1234567890abcdef')
+    assert samplestorage.save_sample(
+        SavedSample(sid, UserID('user'), [SampleNode('mynode')], dt(1), 'foo')) is True
+
+    links = []
+    for i, duid in enumerate([DataUnitID(UPA('1/1/1')), DataUnitID(UPA('1/1/1'), 'foo'),
+                              DataUnitID(UPA('2/1/1'))], 1):
+        link = DataLink(
+            uuid.UUID(f'1234567890abcdef1234567890abcde{i}'),
+            duid,
+            SampleNodeAddress(SampleAddress(sid, 1), 'mynode'),
+            dt(10 * i),
+            UserID('usera'))
+        samplestorage.create_data_link(link)
+        links.append(link)
+    return links
+
+
+def _expired(link, expired, user):
+    return DataLink(link.id, link.duid, link.sample_node_address, link.created, link.created_by,
+                    dt(expired), UserID(user))
+
+
+def test_expire_and_get_data_links(samplestorage):
+    l1, l2, l3 = _create_links_for_expire_data_links(samplestorage)
+
+    assert samplestorage.expire_data_links(dt(100), UserID('user'), [l3.id, l1.id]) == [
+        _expired(l3, 100, 'user'), _expired(l1, 100, 'user')]
+
+    assert samplestorage._col_data_link.count() == 3
+    assert samplestorage._col_data_link.get('2_1_1_30.0') is not None
+    assert samplestorage._col_data_link.get('1_1_1_10.0') is not None
+    assert samplestorage._col_data_link.get('1_1_1_') is None
+    assert samplestorage._col_data_link.get('2_1_1_') is None
+    assert _get_link_counts(samplestorage) == {
+        'ws_1_1_1': 1, 'ws_2_1_1': 0, 'sv_12345678-90ab-cdef-1234-567890abcdef_1': 1}
+
+    assert samplestorage.get_data_links([l1.id, l2.id, l3.id]) == [
+        _expired(l1, 100, 'user'), l2, _expired(l3, 100, 'user')]
+    assert samplestorage.get_data_link(duid=DataUnitID(UPA('1/1/1'), 'foo')) == l2
+
+
+def test_expire_data_links_fail_bad_args(samplestorage):
+    ss = samplestorage
+    e = dt(100)
+    i = uuid.uuid4()
+    u = UserID('u')
+
+    _expire_data_links_fail(ss, None, u, [i], ValueError(
+        'expired cannot be a value that evaluates to false'))
+    _expire_data_links_fail(ss, datetime.datetime.fromtimestamp(400), u, [i], ValueError(
+        'expired cannot be a naive datetime'))
+    _expire_data_links_fail(ss, e, None, [i], ValueError(
+        'expired_by cannot be a value that evaluates to false'))
+    _expire_data_links_fail(ss, e, u, None, ValueError(
+        'ids cannot be a value that evaluates to false'))
+    _expire_data_links_fail(ss, e, u, [], ValueError(
+        'ids cannot be a value that evaluates to false'))
+    _expire_data_links_fail(ss, e, u, [i, None], ValueError(
+        'Index 1 of iterable ids cannot be a value that evaluates to false'))
+    _expire_data_links_fail(ss, e, u, [i, uuid.uuid4(), i], ValueError(
+        'ids contains duplicates'))
+
+
+def test_expire_data_links_fail_no_link_or_expired(samplestorage):
+    l1, l2, _ = _create_links_for_expire_data_links(samplestorage)
+    assert samplestorage.expire_data_link(dt(50), UserID('u'), id_=l2.id) == _expired(
+        l2, 50, 'u')
+
+    _expire_data_links_fail(
+        samplestorage, dt(100), UserID('u'),
+        [l1.id, uuid.UUID('1234567890abcdef1234567890abcdea')],
+        NoSuchLinkError('12345678-90ab-cdef-1234-567890abcdea'))
+    _expire_data_links_fail(samplestorage, dt(100), UserID('u'), [l1.id, l2.id],
+                            NoSuchLinkError(str(l2.id)))
+
+    # check nothing was expired
+    assert samplestorage.get_data_link(l1.id) == l1
+
+
+def test_expire_data_links_fail_expire_before_create(samplestorage):
+    l1, _, l3 = _create_links_for_expire_data_links(samplestorage)
+
+    _expire_data_links_fail(samplestorage, dt(20), UserID('u'), [l1.id, l3.id], ValueError(
+        'expired is < link created time: 30'))
+
+    # check nothing was expired
+    assert samplestorage.get_data_links([l1.id, l3.id]) == [l1, l3]
+
+
+def _expire_data_links_fail(samplestorage, expire, user, ids, expected):
+    with raises(Exception) as got:
+        samplestorage.expire_data_links(expire, user, ids)
+    assert_exception_correct(got.value, expected)
+
+
+def test_get_data_links_fail(samplestorage):
+    l1, _, _ = _create_links_for_expire_data_links(samplestorage)
+
+    _get_data_links_fail(samplestorage, None, ValueError(
+        'ids cannot be a value that evaluates to false'))
+    _get_data_links_fail(samplestorage, [l1.id, None], ValueError(
+        'Index 1 of iterable ids cannot be a value that evaluates to false'))
+    _get_data_links_fail(
+        samplestorage, [l1.id, uuid.UUID('1234567890abcdef1234567890abcdea')],
+        NoSuchLinkError('12345678-90ab-cdef-1234-567890abcdea'))
+
+
+def _get_data_links_fail(samplestorage, ids, expected):
+    with raises(Exception) as got:
+        samplestorage.get_data_links(ids)
+    assert_exception_correct(got.value, expected)
+
+
 def test_get_links_from_sample(samplestorage):
     sid1 = uuid.UUID('1234567890abcdef1234567890abcdef')
     sid2 = uuid.UUID('1234567890abcdef1234567890abcdee')
@@ -3392,6 +5183,56 @@ def test_get_links_from_sample(samplestorage):
     assert got == [l2]
 
 
+def test_get_links_from_sample_paging(samplestorage):
+    sid = uuid.UUID('1234567890abcdef1234567890abcdef')
+    assert samplestorage.save_sample(SavedSample(
+        sid, UserID('user'), [SampleNode('mynode')], dt(1), 'foo')) is True
+
+    def link(lid, upa, created):
+        return DataLink(uuid.UUID(lid), DataUnitID(UPA(upa)),
+                        SampleNodeAddress(SampleAddress(sid, 1), 'mynode'), dt(created),
+                        UserID('usera'))
+
+    # sort order is created time, then ID
+    l1 = link('1234567890abcdef1234567890abcde3', '1/1/1', 10)
+    l2 = link('1234567890abcdef1234567890abcde1', '1/2/1', 20)
+    l3 = link('1234567890abcdef1234567890abcde2', '2/1/1', 20)
+    l4 = link('1234567890abcdef1234567890abcde0', '1/3/1', 30)
+    for link_ in [l3, l1, l4, l2]:
+        samplestorage.create_data_link(link_)
+
+    sa = SampleAddress(sid, 1)
+    assert samplestorage.get_links_from_sample(sa, None, dt(40)) == [l1, l2, l3, l4]
+    assert samplestorage.get_links_from_sample(sa, None, dt(40), 2) == [l1, l2]
+    assert samplestorage.get_links_from_sample(
+        sa, None, dt(40), 2, (dt(20), l2.id)) == [l3, l4]
+    assert samplestorage.get_links_from_sample(
+        sa, None, dt(40), after=(dt(20), l3.id)) == [l4]
+    assert samplestorage.get_links_from_sample(sa, None, dt(40), 5, (dt(30), l4.id)) == []
+    assert samplestorage.get_links_from_sample(sa, [1], dt(40), 2, (dt(10), l1.id)) == [l2, l4]
+
+
+def test_get_links_from_sample_fail_bad_paging_args(samplestorage):
+    sa = SampleAddress(uuid.uuid4(), 1)
+    i = uuid.uuid4()
+
+    _get_links_from_sample_paging_fail(samplestorage, sa, 0, None, ValueError(
+        'limit must be > 0'))
+    _get_links_from_sample_paging_fail(samplestorage, sa, None, (None, i), ValueError(
+        'after created time cannot be a value that evaluates to false'))
+    _get_links_from_sample_paging_fail(
+        samplestorage, sa, None, (datetime.datetime.fromtimestamp(1), i), ValueError(
+            'after created time cannot be a naive datetime'))
+    _get_links_from_sample_paging_fail(samplestorage, sa, None, (dt(1), None), ValueError(
+        'after link ID cannot be a value that evaluates to false'))
+
+
+def _get_links_from_sample_paging_fail(samplestorage, sample_address, limit, after, expected):
+    with raises(Exception) as got:
+        samplestorage.get_links_from_sample(sample_address, None, dt(1), limit, after)
+    assert_exception_correct(got.value, expected)
+
+
 def test_get_links_from_sample_fail_bad_args(samplestorage):
     ss = samplestorage
     sa = SampleAddress(uuid.uuid4(), 1)
@@ -3590,6 +5431,42 @@ def test_get_links_from_data(samplestorage):
     assert got == []
 
 
+def test_get_links_from_data_paging(samplestorage):
+    sid = uuid.UUID('1234567890abcdef1234567890abcdef')
+    assert samplestorage.save_sample(SavedSample(
+        sid, UserID('user'), [SampleNode('mynode')], dt(1), 'foo')) is True
+
+    def link(lid, dataid, created):
+        return DataLink(uuid.UUID(lid), DataUnitID(UPA('1/1/1'), dataid),
+                        SampleNodeAddress(SampleAddress(sid, 1), 'mynode'), dt(created),
+                        UserID('usera'))
+
+    # sort order is created time, then ID
+    l1 = link('1234567890abcdef1234567890abcde3', 'a', 10)
+    l2 = link('1234567890abcdef1234567890abcde1', 'b', 20)
+    l3 = link('1234567890abcdef1234567890abcde2', 'c', 20)
+    for link_ in [l3, l1, l2]:
+        samplestorage.create_data_link(link_)
+
+    upa = UPA('1/1/1')
+    assert samplestorage.get_links_from_data(upa, dt(40)) == [l1, l2, l3]
+    assert samplestorage.get_links_from_data(upa, dt(40), 2) == [l1, l2]
+    assert samplestorage.get_links_from_data(upa, dt(40), 2, (dt(20), l2.id)) == [l3]
+    assert samplestorage.get_links_from_data(upa, dt(40), after=(dt(10), l1.id)) == [l2, l3]
+    assert samplestorage.get_links_from_data(upa, dt(40), 5, (dt(20), l3.id)) == []
+
+
+def test_get_links_from_data_fail_bad_paging_args(samplestorage):
+    with raises(Exception) as got:
+        samplestorage.get_links_from_data(UPA('1/1/1'), dt(1), -1)
+    assert_exception_correct(got.value, ValueError('limit must be > 0'))
+
+    with raises(Exception) as got:
+        samplestorage.get_links_from_data(UPA('1/1/1'), dt(1), None, (dt(1), None))
+    assert_exception_correct(got.value, ValueError(
+        'after link ID cannot be a value that evaluates to false'))
+
+
 def test_get_links_from_data_fail_bad_args(samplestorage):
     ss = samplestorage
     u = UPA('1/1/1')
@@ -3610,6 +5487,69 @@ def _get_links_from_data_fail(samplestorage, upa, ts, expected):
     assert_exception_correct(got.value, expected)
 
 
+def test_get_links_from_data_bulk(samplestorage):
+    sid = uuid.UUID('1234567890abcdef1234567890abcdef')
+    assert samplestorage.save_sample(SavedSample(
+        sid, UserID('user'), [SampleNode('mynode')], dt(1), 'foo')) is True
+
+    def link(lid, upa, dataid, created):
+        return DataLink(uuid.UUID(lid), DataUnitID(UPA(upa), dataid),
+                        SampleNodeAddress(SampleAddress(sid, 1), 'mynode'), dt(created),
+                        UserID('usera'))
+
+    # sort order is created time, then ID
+    l1 = link('1234567890abcdef1234567890abcde3', '1/1/1', 'a', 10)
+    l2 = link('1234567890abcdef1234567890abcde1', '1/1/1', 'b', 20)
+    l3 = link('1234567890abcdef1234567890abcde2', '1/1/1', 'c', 20)
+    l4 = link('1234567890abcdef1234567890abcde4', '2/1/1', None, 5)
+    # different object / version, shouldn't be found
+    l5 = link('1234567890abcdef1234567890abcde5', '1/2/1', None, 5)
+    l6 = link('1234567890abcdef1234567890abcde6', '1/1/2', None, 5)
+    # not created yet
+    l7 = link('1234567890abcdef1234567890abcde7', '2/1/1', 'x', 50)
+    for link_ in [l3, l1, l2, l4, l5, l6, l7]:
+        samplestorage.create_data_link(link_)
+    # expired
+    l8id = uuid.UUID('1234567890abcdef1234567890abcde8')
+    _create_and_expire_data_link(
+        samplestorage,
+        DataLink(l8id, DataUnitID(UPA('1/1/1'), 'd'),
+                 SampleNodeAddress(SampleAddress(sid, 1), 'mynode'), dt(5), UserID('usera')),
+        dt(30),
+        UserID('userb'))
+
+    got = samplestorage.get_links_from_data_bulk(
+        [UPA('2/1/1'), UPA('1/1/1'), UPA('3/1/1'), UPA('2/1/1')], dt(40))
+    assert got == {UPA('2/1/1'): [l4], UPA('1/1/1'): [l1, l2, l3], UPA('3/1/1'): []}
+    assert list(got) == [UPA('2/1/1'), UPA('1/1/1'), UPA('3/1/1')]
+
+    got = samplestorage.get_links_from_data_bulk([UPA('1/1/2'), UPA('2/1/1')], dt(50))
+    assert got == {UPA('1/1/2'): [l6], UPA('2/1/1'): [l4, l7]}
+
+    assert samplestorage.get_links_from_data_bulk([], dt(40)) == {}
+
+
+def test_get_links_from_data_bulk_fail_bad_args(samplestorage):
+    ss = samplestorage
+    u = [UPA('1/1/1')]
+    ts = dt(1)
+    td = datetime.datetime.fromtimestamp(1)
+
+    _get_links_from_data_bulk_fail(ss, None, ts, ValueError('upas cannot be None'))
+    _get_links_from_data_bulk_fail(ss, [UPA('1/1/1'), None], ts, ValueError(
+        'Index 1 of iterable upas cannot be a value that evaluates to false'))
+    _get_links_from_data_bulk_fail(ss, u, None, ValueError(
+        'timestamp cannot be a value that evaluates to false'))
+    _get_links_from_data_bulk_fail(ss, u, td, ValueError(
+        'timestamp cannot be a naive datetime'))
+
+
+def _get_links_from_data_bulk_fail(samplestorage, upas, ts, expected):
+    with raises(Exception) as got:
+        samplestorage.get_links_from_data_bulk(upas, ts)
+    assert_exception_correct(got.value, expected)
+
+
 def test_has_data_link(samplestorage):
     sid1 = uuid.UUID('1234567890abcdef1234567890abcdef')
     sid2 = uuid.UUID('1234567890abcdef1234567890abcdee')
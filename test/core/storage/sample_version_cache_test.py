@@ -0,0 +1,123 @@
+import datetime
+import uuid
+
+from pytest import raises
+from core.test_utils import assert_exception_correct
+from SampleService.core.sample import SavedSample, SampleNode, SubSampleType, SourceMetadata
+from SampleService.core.storage.sample_version_cache import SampleVersionCache
+from SampleService.core.user import UserID
+
+ID1 = uuid.UUID('1234567890abcdef1234567890abcdef')
+ID2 = uuid.UUID('1234567890abcdef1234567890abcdea')
+V1 = uuid.UUID('1234567890abcdef1234567890abcde1')
+V2 = uuid.UUID('1234567890abcdef1234567890abcde2')
+V3 = uuid.UUID('1234567890abcdef1234567890abcde3')
+
+
+def dt(timestamp):
+    return datetime.datetime.fromtimestamp(timestamp, tz=datetime.timezone.utc)
+
+
+def _sample(id_, name, ver):
+    return SavedSample(id_, UserID('user'), [SampleNode('root')], dt(1), name, ver)
+
+
+def test_size_estimate():
+    c = SampleVersionCache(100000)
+    c.put(V1, SavedSample(ID1, UserID('user'), [SampleNode('root')], dt(1)))
+    assert c.size == 104
+
+    c = SampleVersionCache(100000)
+    c.put(V1, SavedSample(ID1, UserID('user'), [
+        SampleNode('root'),
+        SampleNode('kid', SubSampleType.TECHNICAL_REPLICATE, 'root',
+                   {'a': {'b': 'cde', 'f': 1.5}},
+                   {'gh': {'i': True}},
+                   [SourceMetadata('a', 'sk', {'x': 'yz'})])
+        ], dt(1), 'name', 1))
+    # 50 + 4 + 54 + (50 + 3 + 4) + (51 + 54 + 59) + (52 + 59) + (50 + 1 + 2 + 53)
+    assert c.size == 546
+
+
+def test_get_and_put():
+    c = SampleVersionCache(1000)
+    assert c.get(V1) is None
+    c.put(V1, _sample(ID1, 'foo', 1))
+    c.put(V2, _sample(ID1, 'bar', 2))
+    c.put(V3, _sample(ID2, 'baz', 1))
+    assert c.get(V1) == _sample(ID1, 'foo', 1)
+    assert c.get(V2) == _sample(ID1, 'bar', 2)
+    assert c.get(V3) == _sample(ID2, 'baz', 1)
+    assert c.get(uuid.UUID('1234567890abcdef1234567890abcde4')) is None
+
+    assert sorted(c.get_version_ids(ID1)) == [V1, V2]
+    assert c.get_version_ids(ID2) == [V3]
+    assert c.get_version_ids(uuid.UUID('1234567890abcdef1234567890abcdeb')) == []
+
+    assert len(c) == 3
+    assert c.size == 321
+    assert c.hits == 3
+    assert c.misses == 2
+    assert c.evictions == 0
+
+
+def test_put_existing():
+    c = SampleVersionCache(1000)
+    c.put(V1, _sample(ID1, 'foo', 1))
+    c.put(V1, _sample(ID1, 'foo', 1))
+    assert len(c) == 1
+    assert c.size == 107
+
+
+def test_put_too_large():
+    c = SampleVersionCache(106)
+    c.put(V1, _sample(ID1, 'foo', 1))
+    assert len(c) == 0
+    assert c.size == 0
+    assert c.evictions == 0
+    assert c.get_version_ids(ID1) == []
+
+
+def test_eviction():
+    c = SampleVersionCache(321)
+    c.put(V1, _sample(ID1, 'foo', 1))
+    c.put(V2, _sample(ID1, 'bar', 2))
+    c.put(V3, _sample(ID2, 'baz', 1))
+    assert len(c) == 3
+
+    c.get(V1)  # V2 is now least recently used
+    c.put(uuid.UUID('1234567890abcdef1234567890abcde4'), _sample(ID2, 'bat', 2))
+
+    assert len(c) == 3
+    assert c.size == 321
+    assert c.evictions == 1
+    assert c.get(V2) is None
+    assert c.get_version_ids(ID1) == [V1]
+
+    c.put(uuid.UUID('1234567890abcdef1234567890abcde5'), SavedSample(
+        ID2, UserID('user'), [SampleNode('root'), SampleNode('r2')], dt(1), 'bat', 3))
+
+    assert len(c) == 2
+    assert c.size == 266
+    assert c.evictions == 3
+    assert c.get_version_ids(ID1) == []
+
+
+def test_init_fail():
+    for m in [0, -1]:
+        with raises(Exception) as got:
+            SampleVersionCache(m)
+        assert_exception_correct(got.value, ValueError('max_bytes must be > 0'))
+
+
+def test_put_fail():
+    c = SampleVersionCache(1000)
+    _put_fail(c, None, _sample(ID1, 'foo', 1), ValueError(
+        'version_id cannot be a value that evaluates to false'))
+    _put_fail(c, V1, None, ValueError('sample cannot be a value that evaluates to false'))
+
+
+def _put_fail(cache, ver, sample, expected):
+    with raises(Exception) as got:
+        cache.put(ver, sample)
+    assert_exception_correct(got.value, expected)
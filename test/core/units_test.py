@@ -0,0 +1,19 @@
+from SampleService.core.units import get_canonical_value
+
+
+def test_get_canonical_value():
+    assert get_canonical_value(3, 'm') == (3, 'meter')
+    assert get_canonical_value(5, 'cm') == (0.05, 'meter')
+    assert get_canonical_value(3, 'ft') == (0.9144, 'meter')
+    assert get_canonical_value(0.9144, 'meter') == get_canonical_value(3, 'ft')
+    assert get_canonical_value(-1.5, 'km') == (-1500, 'meter')
+    assert get_canonical_value(10, 'degC') == (283.15, 'kelvin')
+    assert get_canonical_value(2, 'mg/L') == (0.002, 'kilogram / meter ** 3')
+    assert get_canonical_value(2, 'g / m^3') == (0.002, 'kilogram / meter ** 3')
+    assert get_canonical_value(7, 'cells') == (7, 'cell')
+
+
+def test_get_canonical_value_unparseable():
+    for val, units in [('3', 'm'), (True, 'm'), (None, 'm'), (3, None), (3, 1), (3, ''),
+                       (3, '   '), (3, 'not a unit'), (3, 'm**'), (3, '10 m'), (3, '5')]:
+        assert get_canonical_value(val, units) is None
@@ -184,10 +184,14 @@ def test_init_fail():
     wsc.administer.side_effect = ServerError('jsonrpcerror', 24, 'poopoo')
     _init_fail(wsc, ServerError('jsonrpcerror', 24, 'poopoo'))
 
+    wsc = create_autospec(Workspace, spec_set=True, instance=True)
+    _init_fail(wsc, ValueError('cache_max_size must be > 0'), cache_max_size=0)
+    _init_fail(wsc, ValueError('cache_expiration must be >= 0'), cache_expiration=-1)
+
 
-def _init_fail(wsc, expected):
+def _init_fail(wsc, expected, **kwargs):
     with raises(Exception) as got:
-        WS(wsc)
+        WS(wsc, **kwargs)
     assert_exception_correct(got.value, expected)
 
 
@@ -284,6 +288,81 @@ def test_has_permission_fail_on_get_info_server_error():
     assert_exception_correct(got.value, ServerError('JSONRPCError', -32500, 'Thanks Obama'))
 
 
+def test_has_permission_cache():
+    wsc = create_autospec(Workspace, spec_set=True, instance=True)
+    now = [1000]
+    ws = WS(wsc, cache_expiration=10, cache_timer=lambda: now[0])
+
+    getperms = {'command': 'getPermissionsMass', 'params': {'workspaces': [{'id': 42}]}}
+    getinfo = {'command': 'getObjectInfo',
+               'params': {'objects': [{'ref': '42/1/1'}], 'ignoreErrors': 1}}
+    wsc.administer.side_effect = [
+        {'perms': [{'a': 'w', 'b': 'r'}]},
+        {'infos': [['objinfo goes here']]},
+        {'perms': [{'b': 'r'}]},
+        ]
+
+    r = WorkspaceAccessType.READ
+    ws.has_permission(UserID('a'), WorkspaceAccessType.WRITE, upa=UPA('42/1/1'))
+    # permissions are cached per workspace, not per user
+    ws.has_permission(UserID('b'), r, upa=UPA('42/1/1'))
+    ws.has_permission(UserID('b'), r, workspace_id=42)
+    now[0] = 1009
+    ws.has_permission(UserID('a'), r, workspace_id=42)
+    now[0] = 1010
+    with raises(Exception) as got:
+        ws.has_permission(UserID('a'), r, workspace_id=42)
+    assert_exception_correct(got.value, UnauthorizedError('User a cannot read workspace 42'))
+
+    assert wsc.administer.call_args_list == [
+        (({'command': 'listModRequests'},),),
+        ((getperms,),),
+        ((getinfo,),),
+        ((getperms,),),
+        ]
+
+
+def test_has_permission_cache_errors_not_cached():
+    wsc = create_autospec(Workspace, spec_set=True, instance=True)
+    ws = WS(wsc)
+
+    wsc.administer.side_effect = [
+        ServerError('JSONRPCError', -32500, 'No workspace with id 22 exists'),
+        {'perms': [{'a': 'r'}]},
+        {'infos': [None]},
+        {'infos': [['objinfo goes here']]},
+        ]
+
+    with raises(Exception) as got:
+        ws.has_permission(UserID('a'), WorkspaceAccessType.READ, upa=UPA('22/1/1'))
+    assert_exception_correct(got.value, NoSuchWorkspaceDataError(
+        'No workspace with id 22 exists'))
+    with raises(Exception) as got:
+        ws.has_permission(UserID('a'), WorkspaceAccessType.READ, upa=UPA('22/1/1'))
+    assert_exception_correct(got.value, NoSuchWorkspaceDataError('Object 22/1/1 does not exist'))
+    ws.has_permission(UserID('a'), WorkspaceAccessType.READ, upa=UPA('22/1/1'))
+    ws.has_permission(UserID('a'), WorkspaceAccessType.READ, upa=UPA('22/1/1'))
+
+    assert wsc.administer.call_count == 5
+
+
+def test_has_permission_cache_disabled():
+    wsc = create_autospec(Workspace, spec_set=True, instance=True)
+    ws = WS(wsc, cache_expiration=0)
+
+    wsc.administer.side_effect = [
+        {'perms': [{'a': 'r'}]},
+        {'infos': [['objinfo goes here']]},
+        {'perms': [{'a': 'r'}]},
+        {'infos': [['objinfo goes here']]},
+        ]
+
+    ws.has_permission(UserID('a'), WorkspaceAccessType.READ, upa=UPA('22/1/1'))
+    ws.has_permission(UserID('a'), WorkspaceAccessType.READ, upa=UPA('22/1/1'))
+
+    assert wsc.administer.call_count == 5
+
+
 def _has_permission(user, wsid, upa, perm, expected_wsid, public=False):
     wsc = create_autospec(Workspace, spec_set=True, instance=True)
 
@@ -332,6 +411,171 @@ def _has_permission_fail_ws_exception(ws_exception, expected):
     assert_exception_correct(got.value, expected)
 
 
+def _getperms(*wsids):
+    return (({'command': 'getPermissionsMass',
+              'params': {'workspaces': [{'id': w} for w in wsids]}},),)
+
+
+def _getinfo(*upas):
+    return (({'command': 'getObjectInfo',
+              'params': {'objects': [{'ref': u} for u in upas], 'ignoreErrors': 1}},),)
+
+
+def test_has_permissions_workspaces():
+    wsc = create_autospec(Workspace, spec_set=True, instance=True)
+    ws = WS(wsc)
+
+    wsc.administer.side_effect = [{'perms': [{'a': 'w'}, {'b': 'r', '*': 'r'}, {'a': 'r'}]}]
+
+    res = ws.has_permissions(UserID('a'), WorkspaceAccessType.WRITE, workspace_ids=[3, 1, 3, 5])
+    assert res[0] is None
+    assert_exception_correct(res[1], UnauthorizedError('User a cannot write to workspace 1'))
+    assert res[2] is None
+    assert_exception_correct(res[3], UnauthorizedError('User a cannot write to workspace 5'))
+    assert len(res) == 4
+
+    assert wsc.administer.call_args_list == [
+        (({'command': 'listModRequests'},),), _getperms(3, 1, 5)]
+
+    # cached
+    assert ws.has_permissions(None, WorkspaceAccessType.READ, [1]) == [None]
+    assert ws.has_permissions(UserID('b'), WorkspaceAccessType.READ, []) == []
+    assert wsc.administer.call_count == 2
+
+
+def test_has_permissions_upas():
+    wsc = create_autospec(Workspace, spec_set=True, instance=True)
+    ws = WS(wsc)
+
+    wsc.administer.side_effect = [
+        {'perms': [{'a': 'r'}, {'b': 'r'}, {'*': 'r'}]},
+        {'infos': [['objinfo goes here'], None, ['objinfo goes here']]},
+        ]
+
+    res = ws.has_permissions(UserID('a'), WorkspaceAccessType.READ, upas=[
+        UPA('1/1/1'), UPA('2/1/1'), UPA('1/2/1'), UPA('3/1/1'), UPA('1/1/1')])
+    assert res[0] is None
+    assert_exception_correct(res[1], UnauthorizedError('User a cannot read upa 2/1/1'))
+    assert_exception_correct(res[2], NoSuchWorkspaceDataError('Object 1/2/1 does not exist'))
+    assert res[3] is None
+    assert res[4] is None
+    assert len(res) == 5
+
+    assert wsc.administer.call_args_list == [
+        (({'command': 'listModRequests'},),),
+        _getperms(1, 2, 3),
+        _getinfo('1/1/1', '1/2/1', '3/1/1'),
+        ]
+
+
+def test_has_permissions_missing_workspaces():
+    wsc = create_autospec(Workspace, spec_set=True, instance=True)
+    ws = WS(wsc, cache_expiration=0)
+
+    wsc.administer.side_effect = [
+        ServerError('JSONRPCError', -32500, 'No workspace with id 2 exists'),
+        ServerError('JSONRPCError', -32500, 'Workspace 3 is deleted'),
+        {'perms': [{'a': 'r'}]},
+        {'infos': [['objinfo goes here']]},
+        ]
+
+    res = ws.has_permissions(UserID('a'), WorkspaceAccessType.READ, upas=[
+        UPA('3/1/1'), UPA('1/1/1'), UPA('2/1/1')])
+    assert_exception_correct(res[0], NoSuchWorkspaceDataError('Workspace 3 is deleted'))
+    assert res[1] is None
+    assert_exception_correct(res[2], NoSuchWorkspaceDataError('No workspace with id 2 exists'))
+    assert len(res) == 3
+
+    assert wsc.administer.call_args_list == [
+        (({'command': 'listModRequests'},),),
+        _getperms(3, 1, 2),
+        _getperms(3, 1),
+        _getperms(1),
+        _getinfo('1/1/1'),
+        ]
+
+
+def test_has_permissions_missing_workspace_unknown_id():
+    wsc = create_autospec(Workspace, spec_set=True, instance=True)
+    ws = WS(wsc)
+
+    wsc.administer.side_effect = [
+        ServerError('JSONRPCError', -32500, 'No workspace for you'),
+        {'perms': [{'a': 'r'}]},
+        ServerError('JSONRPCError', -32500, 'No workspace for you'),
+        ]
+
+    res = ws.has_permissions(UserID('a'), WorkspaceAccessType.READ, workspace_ids=[4, 7])
+    assert res[0] is None
+    assert_exception_correct(res[1], NoSuchWorkspaceDataError('No workspace for you'))
+    assert len(res) == 2
+
+    assert wsc.administer.call_args_list == [
+        (({'command': 'listModRequests'},),),
+        _getperms(4, 7),
+        _getperms(4),
+        _getperms(7),
+        ]
+
+
+def test_has_permissions_max_request_size():
+    wsc = create_autospec(Workspace, spec_set=True, instance=True)
+    ws = WS(wsc)
+
+    wsc.administer.side_effect = [
+        {'perms': [{'a': 'r'}] * 1000},
+        {'perms': [{'a': 'r'}] * 2},
+        {'infos': [['objinfo goes here']] * 1000},
+        {'infos': [['objinfo goes here']] * 2},
+        ]
+
+    upas = [UPA(wsid=i, objid=1, version=1) for i in range(1, 1003)]
+    assert ws.has_permissions(UserID('a'), WorkspaceAccessType.READ, upas=upas) == [None] * 1002
+
+    assert wsc.administer.call_args_list == [
+        (({'command': 'listModRequests'},),),
+        _getperms(*range(1, 1001)),
+        _getperms(1001, 1002),
+        _getinfo(*[f'{i}/1/1' for i in range(1, 1001)]),
+        _getinfo('1001/1/1', '1002/1/1'),
+        ]
+
+
+def test_has_permissions_fail_server_error():
+    wsc = create_autospec(Workspace, spec_set=True, instance=True)
+    ws = WS(wsc)
+
+    wsc.administer.side_effect = ServerError('JSONRPCError', -32500, 'Thanks Obama')
+
+    with raises(Exception) as got:
+        ws.has_permissions(UserID('a'), WorkspaceAccessType.READ, [1, 2])
+    assert_exception_correct(got.value, ServerError('JSONRPCError', -32500, 'Thanks Obama'))
+
+
+def test_has_permissions_fail_bad_input():
+    wsc = create_autospec(Workspace, spec_set=True, instance=True)
+    ws = WS(wsc)
+    u = UserID('a')
+    r = WorkspaceAccessType.READ
+
+    _has_permissions_fail(ws, u, None, [1], None, ValueError(
+        'perm cannot be a value that evaluates to false'))
+    _has_permissions_fail(ws, u, r, None, None, ValueError(
+        'Either UPAs or workspace IDs must be supplied'))
+    _has_permissions_fail(ws, u, r, [1, 0], None, IllegalParameterError(
+        '0 is not a valid workspace ID'))
+    _has_permissions_fail(ws, u, r, None, [UPA('1/1/1'), None], ValueError(
+        'Index 1 of iterable upas cannot be a value that evaluates to false'))
+
+    wsc.administer.assert_called_once_with({'command': 'listModRequests'})
+
+
+def _has_permissions_fail(ws, user, perm, wsids, upas, expected):
+    with raises(Exception) as got:
+        ws.has_permissions(user, perm, wsids, upas)
+    assert_exception_correct(got.value, expected)
+
+
 def test_get_user_workspaces():
     _get_user_workspaces([], [], [])
     _get_user_workspaces([8, 89], [], [8, 89])
@@ -371,6 +615,42 @@ def test_get_user_workspaces_anonymous():
     wsc.list_workspace_ids.assert_called_once_with({'onlyGlobal': 1})
 
 
+def test_get_user_workspaces_cache():
+    wsc = create_autospec(Workspace, spec_set=True, instance=True)
+    now = [1000]
+    ws = WS(wsc, cache_expiration=10, cache_timer=lambda: now[0])
+
+    wsc.administer.side_effect = [
+        {'workspaces': [4, 2], 'pub': [1]},
+        {'workspaces': [], 'pub': [1]},
+        {'workspaces': [4], 'pub': [1]},
+        ]
+    wsc.list_workspace_ids.return_value = {'workspaces': [], 'pub': [1]}
+
+    got = ws.get_user_workspaces(UserID('usera'))
+    assert got == [1, 2, 4]
+    got.append(8)  # callers can't modify the cache
+    assert ws.get_user_workspaces(UserID('usera')) == [1, 2, 4]
+    assert ws.get_user_workspaces(UserID('userb')) == [1]
+    assert ws.get_user_workspaces(None) == [1]
+    assert ws.get_user_workspaces(None) == [1]
+    now[0] = 1010
+    assert ws.get_user_workspaces(UserID('usera')) == [1, 4]
+
+    def lwsids(user):
+        return (({'command': 'listWorkspaceIDs',
+                  'user': user,
+                  'params': {'perm': 'r', 'excludeGlobal': 0}},),)
+
+    assert wsc.administer.call_args_list == [
+        (({'command': 'listModRequests'},),),
+        lwsids('usera'),
+        lwsids('userb'),
+        lwsids('usera'),
+        ]
+    wsc.list_workspace_ids.assert_called_once_with({'onlyGlobal': 1})
+
+
 def test_get_user_workspaces_fail_invalid_user():
     _get_user_workspaces_fail_ws_exception(
         ServerError('JSONRPCError', -32500, 'User foo is not a valid user'),